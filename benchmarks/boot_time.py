@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Pod boot time by image variant
+Builds a synthetic dependency set (local wheels, no network) and times what
+each variant does before services can start:
+
+    code-only   pip installs every wheel (first_run_setup.sh, minus downloads)
+    snapshot    unpacks an env_snapshot of the installed set, 1 shard vs N
+    prebaked    nothing at boot; the cost is pulling the bigger image, given
+                as the compressed layer size at a pull rate
+
+The code-only time is a floor: on a real pod the downloads and any sdist
+builds come on top of it.
+"""
+
+import base64
+import hashlib
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+
+from fixtures import environment, metric
+
+from download_queue import format_bytes
+from env_snapshot import SHARDS, create, extract
+
+DEFAULT_PULL_MBPS = 200.0
+
+
+def _quiet(*_):
+    pass
+
+
+def _record_hash(data):
+    digest = base64.urlsafe_b64encode(hashlib.sha256(data).digest()).rstrip(b"=").decode()
+    return f"sha256={digest}"
+
+
+def make_wheels(root, packages, files, file_size, seed=0):
+    """Write `packages` installable wheels of `files` modules each (plus one binary blob); returns their paths"""
+    rng = random.Random(seed)
+    os.makedirs(root, exist_ok=True)
+    wheels = []
+    for index in range(packages):
+        name, version = f"bootbench_pkg{index:03}", "1.0.0"
+        dist_info = f"{name}-{version}.dist-info"
+        contents = {}
+        for number in range(files):
+            lines = [f"def function_{number}_{line}(value):\n    return value * {rng.randint(1, 999)}\n"
+                     for line in range(max(1, file_size // 48))]
+            contents[f"{name}/module_{number:03}.py"] = "".join(lines).encode()
+        contents[f"{name}/__init__.py"] = b""
+        # Compiled extensions compress poorly; one per package
+        contents[f"{name}/_native.so"] = rng.randbytes(file_size * files)
+        contents[f"{dist_info}/METADATA"] = f"Metadata-Version: 2.1\nName: {name}\nVersion: {version}\n".encode()
+        contents[f"{dist_info}/WHEEL"] = b"Wheel-Version: 1.0\nGenerator: boot_time\nRoot-Is-Purelib: true\nTag: py3-none-any\n"
+        record = [f"{path},{_record_hash(data)},{len(data)}" for path, data in contents.items()]
+        contents[f"{dist_info}/RECORD"] = ("\n".join(record + [f"{dist_info}/RECORD,,"]) + "\n").encode()
+        path = os.path.join(root, f"{name}-{version}-py3-none-any.whl")
+        with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as wheel:
+            for member, data in contents.items():
+                wheel.writestr(member, data)
+        wheels.append(path)
+    return wheels
+
+
+def _tree(root):
+    return [os.path.join(folder, name) for folder, _, names in os.walk(root) for name in names]
+
+
+def run(packages=40, files=30, file_size=16 * 1024, shards=SHARDS, pull_mbps=DEFAULT_PULL_MBPS,
+        workdir=None, log=print):
+    """Time the code-only install and the snapshot restores; returns a result dict"""
+    workdir = tempfile.mkdtemp(prefix="bench-boot-", dir=workdir)
+    variants = []
+    try:
+        wheels = make_wheels(os.path.join(workdir, "wheels"), packages, files, file_size)
+        site = os.path.join(workdir, "code-only")
+        started = time.time()
+        result = subprocess.run([sys.executable, "-m", "pip", "install", "--quiet", "--no-index", "--no-deps",
+                                 "--no-compile", "--target", site] + wheels, capture_output=True, text=True)
+        if result.returncode != 0:
+            raise RuntimeError("pip install failed: " + result.stderr.strip()[-300:])
+        installed = _tree(site)
+        variants.append({"variant": "code-only", "seconds": round(time.time() - started, 3),
+                         "files": len(installed)})
+        log(f"   code-only (pip install): {variants[-1]['seconds']:.2f}s")
+
+        for count in sorted({1, shards}):
+            folder = os.path.join(workdir, f"snapshot-{count}")
+            manifest = create(installed, folder, site, shards=count, log=_quiet)
+            target = os.path.join(workdir, f"restored-{count}")
+            started = time.time()
+            extract(folder, target, workers=count, log=_quiet)
+            variants.append({"variant": f"snapshot x{count}", "shards": count,
+                             "seconds": round(time.time() - started, 3), "files": len(_tree(target)),
+                             "archive_bytes": manifest["size"]})
+            log(f"   snapshot, {count:>2} shards: {variants[-1]['seconds']:.2f}s")
+
+        # The prebaked layer holds the same files; its compressed size is what the pull adds
+        layer_bytes = variants[-1]["archive_bytes"]
+        variants.append({"variant": "prebaked", "seconds": 0.0, "files": len(installed),
+                         "pull_bytes": layer_bytes, "pull_seconds": round(layer_bytes / (pull_mbps * 1e6), 3)})
+        log(f"   prebaked: 0s at boot, +{format_bytes(layer_bytes)} to pull")
+        installed_bytes = sum(os.path.getsize(path) for path in installed)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    metrics = {}
+    for variant in variants:
+        if variant["variant"] == "code-only":
+            metrics["boot.code_only_s"] = metric(variant["seconds"], "s", noise=0.1)
+        elif variant["variant"] == "prebaked":
+            metrics["boot.prebaked_pull_s"] = metric(variant["pull_seconds"], "s", noise=0.05)
+        else:
+            metrics[f"boot.snapshot_x{variant['shards']}_s"] = metric(variant["seconds"], "s", noise=0.05)
+    return {
+        "benchmark": "boot_time",
+        "params": {"packages": packages, "files_per_package": files, "file_size": file_size,
+                   "shards": shards, "pull_mbps": pull_mbps, "installed_bytes": installed_bytes},
+        "results": variants,
+        "ok": all(variant["files"] == variants[0]["files"] for variant in variants),
+        "metrics": metrics,
+    }
+
+
+def format_report(result):
+    lines = ["=" * 60, "BOOT TIME BY IMAGE VARIANT", "=" * 60]
+    params = result["params"]
+    lines.append(f"{params['packages']} packages, {format_bytes(params['installed_bytes'])} installed")
+    code_only = result["results"][0]["seconds"]
+    for variant in result["results"]:
+        icon = "✅" if variant["files"] == result["results"][0]["files"] else "❌"
+        if variant["variant"] == "prebaked":
+            lines.append(f"{icon} {'prebaked':<14} 0.00s at boot (+{format_bytes(variant['pull_bytes'])} image, "
+                         f"~{variant['pull_seconds']:.2f}s at {params['pull_mbps']:g} MB/s)")
+            continue
+        speedup = f" ({code_only / variant['seconds']:.1f}x faster)" if variant["variant"] != "code-only" \
+            and variant["seconds"] else ""
+        lines.append(f"{icon} {variant['variant']:<14} {variant['seconds']:.2f}s{speedup}")
+    lines.append("ℹ️  code-only excludes downloads and sdist builds, so real pods take longer")
+    lines.append("=" * 60)
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Compare pod boot time of the code-only, snapshot and prebaked variants")
+    parser.add_argument("--packages", type=int, default=40)
+    parser.add_argument("--files", type=int, default=30, help="Modules per package")
+    parser.add_argument("--shards", type=int, default=SHARDS, help="Snapshot shards restored in parallel")
+    parser.add_argument("--pull-mbps", type=float, default=DEFAULT_PULL_MBPS, help="Image pull rate (MB/s)")
+    parser.add_argument("--workdir", help="Where the fixtures go (default: system temp)")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args(argv)
+
+    result = run(args.packages, args.files, shards=args.shards, pull_mbps=args.pull_mbps, workdir=args.workdir,
+                 log=_quiet if args.json else print)
+    result["environment"] = environment()
+    print(json.dumps(result, indent=1) if args.json else format_report(result))
+    return 0 if result["ok"] else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Download throughput vs. connection count
+Serves a synthetic multi-GB file from the local Range-capable server and
+downloads it with the segmented engine at each connection count, checking
+the streamed sha256 every time. `--rate-limit` caps each connection the way
+a WAN link does, which is where extra connections actually pay off.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import time
+
+from fixtures import environment, metric
+
+from range_server import make_synthetic_file, serve
+from segmented_download import segmented_download
+
+DEFAULT_SIZE_MB = 2048
+DEFAULT_CONNECTIONS = (1, 2, 4, 8, 16)
+
+
+def run(size_mb=DEFAULT_SIZE_MB, connections=DEFAULT_CONNECTIONS, rate_limit=None, ranges=True,
+        workdir=None, log=print):
+    """Download the same file once per connection count; returns a result dict"""
+    workdir = tempfile.mkdtemp(prefix="bench-download-", dir=workdir)
+    results = []
+    try:
+        source = os.path.join(workdir, "model.safetensors")
+        started = time.time()
+        expected = make_synthetic_file(source, size_mb * 1024 * 1024)
+        log(f"🧪 {size_mb} MB synthetic file written in {time.time() - started:.1f}s")
+        server, base_url = serve(workdir, ranges=ranges, rate_limit=rate_limit * 1e6 if rate_limit else None)
+        try:
+            for count in connections:
+                target = os.path.join(workdir, f"out-{count}.bin")
+                result = segmented_download(f"{base_url}/model.safetensors", target, connections=count)
+                results.append({
+                    "connections": count,
+                    "used": result["connections"],
+                    "seconds": round(result["elapsed"], 3),
+                    "mb_per_s": round(result["bytes_per_sec"] / (1024 * 1024), 1),
+                    "sha256_ok": result["sha256"] == expected,
+                })
+                os.remove(target)
+                log(f"   {count:>3} connections: {results[-1]['mb_per_s']:8.1f} MB/s")
+        finally:
+            server.shutdown()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        "benchmark": "download_throughput",
+        "params": {"size_mb": size_mb, "connections": list(connections),
+                   "rate_limit_mb_s": rate_limit, "ranges": ranges},
+        "results": results,
+        "ok": all(r["sha256_ok"] for r in results),
+        "metrics": {f"download.c{r['connections']}.mb_per_s": metric(r["mb_per_s"], "MB/s", "higher")
+                    for r in results},
+    }
+
+
+def format_report(result):
+    lines = ["=" * 60, "DOWNLOAD THROUGHPUT", "=" * 60]
+    params = result["params"]
+    limit = f", {params['rate_limit_mb_s']} MB/s per connection" if params["rate_limit_mb_s"] else ""
+    lines.append(f"{params['size_mb']} MB file{limit}")
+    for r in result["results"]:
+        icon = "✅" if r["sha256_ok"] else "❌"
+        lines.append(f"{icon} {r['connections']:>3} connections ({r['used']} used): "
+                     f"{r['mb_per_s']:8.1f} MB/s in {r['seconds']:.2f}s")
+    lines.append("=" * 60)
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Measure download throughput against a local Range server")
+    parser.add_argument("--size-mb", type=int, default=DEFAULT_SIZE_MB)
+    parser.add_argument("--connections", type=int, nargs="+", default=list(DEFAULT_CONNECTIONS))
+    parser.add_argument("--rate-limit", type=float, metavar="MB_PER_SEC",
+                        help="Cap each connection's throughput (simulates a WAN link)")
+    parser.add_argument("--no-ranges", action="store_true", help="Server ignores Range headers")
+    parser.add_argument("--workdir", help="Where the synthetic file goes (default: system temp)")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args(argv)
+
+    result = run(args.size_mb, args.connections, args.rate_limit, not args.no_ranges, args.workdir,
+                 log=(lambda *_: None) if args.json else print)
+    result["environment"] = environment()
+    print(json.dumps(result, indent=1) if args.json else format_report(result))
+    return 0 if result["ok"] else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Synthetic fixtures for the offline benchmarks
+Builds everything the benchmarks need without touching the network: model
+trees of real (sparse) safetensors files, bare git repos standing in for
+the custom nodes, and the environment/commit stamp every result carries.
+"""
+
+import json
+import os
+import platform
+import shutil
+import struct
+import subprocess
+import sys
+import time
+from importlib import metadata as importlib_metadata
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPTS_DIR = os.path.join(REPO_DIR, "scripts")
+if SCRIPTS_DIR not in sys.path:
+    sys.path.insert(0, SCRIPTS_DIR)
+# Benchmark runs shouldn't land in the pod's metrics trace
+os.environ.setdefault("METRICS_TRACE", "")
+
+GIT_IDENTITY = ["-c", "user.name=benchmark", "-c", "user.email=benchmark@localhost"]
+
+# MODEL_DIRS category: (share of the library, filename prefix, [(tensor name, shape)])
+MODEL_TEMPLATES = {
+    "LoRAs": (0.40, "lora_sdxl", [
+        (f"lora_unet_input_blocks_4_1_transformer_blocks_{i}_attn1_to_{p}.lora_{d}.weight",
+         [16, 640] if d == "down" else [640, 16])
+        for i in range(10) for p in "kqv" for d in ("down", "up")
+    ]),
+    "Checkpoints": (0.10, "sdxl_ckpt", [
+        ("model.diffusion_model.input_blocks.0.0.weight", [320, 4, 3, 3]),
+        ("model.diffusion_model.label_emb.0.0.weight", [1280, 2816]),
+        ("first_stage_model.decoder.conv_in.weight", [512, 4, 3, 3]),
+    ] + [(f"conditioner.embedders.0.transformer.text_model.encoder.layers.{i}.mlp.fc1.weight", [3072, 768])
+         for i in range(12)]),
+    "Diffusion Models": (0.10, "flux_dev", [
+        (f"double_blocks.{i}.img_attn.qkv.weight", [9216, 3072]) for i in range(19)
+    ] + [(f"single_blocks.{i}.linear1.weight", [21504, 3072]) for i in range(38)]),
+    "VAE": (0.05, "ae", [
+        ("decoder.conv_in.weight", [512, 16, 3, 3]),
+        ("decoder.up.0.block.0.conv1.weight", [128, 256, 3, 3]),
+        ("encoder.down.0.block.0.conv1.weight", [128, 128, 3, 3]),
+    ]),
+    "CLIP": (0.05, "t5xxl", [
+        ("encoder.block.0.layer.0.SelfAttention.relative_attention_bias.weight", [32, 64]),
+    ] + [(f"encoder.block.{i}.layer.0.SelfAttention.{p}.weight", [4096, 4096])
+         for i in range(24) for p in "kqvo"]),
+    "ControlNet": (0.10, "control_canny", [
+        ("control_model.input_hint_block.0.weight", [16, 3, 3, 3]),
+        ("control_model.input_blocks.0.0.weight", [320, 4, 3, 3]),
+    ] + [(f"control_model.zero_convs.{i}.0.weight", [320, 320, 1, 1]) for i in range(12)]),
+    "CLIP Vision": (0.05, "clip_vision_h", [
+        (f"vision_model.encoder.layers.{i}.mlp.fc1.weight", [5120, 1280]) for i in range(32)
+    ]),
+    "IP-Adapter": (0.05, "ip_adapter_sdxl", [
+        ("image_proj.proj.weight", [8192, 1280]),
+        ("ip_adapter.1.to_k_ip.weight", [640, 2048]),
+    ]),
+    "Upscale Models": (0.05, "4x_esrgan", [
+        ("conv_first.weight", [64, 3, 3, 3]),
+    ] + [(f"body.{i}.rdb1.conv1.weight", [32, 64, 3, 3]) for i in range(23)]),
+    "Embeddings": (0.05, "embedding", [
+        ("clip_l", [8, 768]),
+        ("clip_g", [8, 1280]),
+    ]),
+}
+
+SUBFOLDERS = ("", "", "sdxl", "flux", "wan/2.1")  # Every few files go one or two levels deeper
+
+
+def write_safetensors(path, tensors, dtype="F16", metadata=None):
+    """
+    Write a valid safetensors header for `tensors` ([(name, shape)]).
+
+    The tensor data is a sparse hole (truncate), so a "12 GB" model costs a
+    few KB of disk while still reporting its real size to stat and the
+    header parser.
+    """
+    header = {"__metadata__": metadata or {"format": "pt"}}
+    offset = 0
+    for name, shape in tensors:
+        size = 2
+        for dim in shape:
+            size *= dim
+        header[name] = {"dtype": dtype, "shape": shape, "data_offsets": [offset, offset + size]}
+        offset += size
+    text = json.dumps(header, separators=(",", ":")).encode()
+    with open(path, "wb") as f:
+        f.write(struct.pack("<Q", len(text)))
+        f.write(text)
+        f.truncate(8 + len(text) + offset)
+    return 8 + len(text) + offset
+
+
+def make_model_tree(root, count):
+    """
+    Fill `root` with `count` safetensors files spread over the MODEL_DIRS categories.
+
+    Returns {category: directory}, shaped like model_downloader.MODEL_DIRS.
+    """
+    from model_downloader import MODEL_DIRS
+
+    model_dirs = {category: os.path.join(root, os.path.basename(path)) for category, path in MODEL_DIRS.items()}
+    made = 0
+    for position, (category, (share, prefix, tensors)) in enumerate(MODEL_TEMPLATES.items()):
+        last = position == len(MODEL_TEMPLATES) - 1
+        files = count - made if last else round(count * share)
+        for i in range(files):
+            directory = os.path.join(model_dirs[category], SUBFOLDERS[i % len(SUBFOLDERS)])
+            os.makedirs(directory, exist_ok=True)
+            write_safetensors(os.path.join(directory, f"{prefix}_{i:05d}.safetensors"), tensors,
+                              metadata={"format": "pt", "ss_output_name": f"{prefix}_{i}"})
+        made += files
+    return model_dirs
+
+
+def installed_requirements(limit=5):
+    """Requirement lines that are already satisfied here (so an install run needs no network)"""
+    names = sorted({dist.metadata["Name"] for dist in importlib_metadata.distributions() if dist.metadata["Name"]},
+                   key=str.lower)
+    return [name for name in names if name.lower() not in ("pip", "setuptools")][:limit] or ["pip"]
+
+
+def _git(*args, cwd=None):
+    subprocess.run(["git"] + GIT_IDENTITY + list(args), cwd=cwd, check=True, capture_output=True)
+
+
+def make_node_repos(root, count, files=40, file_size=8 * 1024, requirements=()):
+    """
+    Create `count` bare git repos laid out like ComfyUI custom nodes.
+
+    Each has an __init__.py, `files` Python modules of about `file_size`
+    bytes and a requirements.txt. Returns node dicts (name, file:// url)
+    in the format of node_installer.CUSTOM_NODES.
+    """
+    nodes = []
+    work = os.path.join(root, "src")
+    for i in range(count):
+        name = f"ComfyUI-Bench-Node-{i:02d}"
+        source = os.path.join(work, name)
+        os.makedirs(os.path.join(source, "nodes"))
+        with open(os.path.join(source, "__init__.py"), "w") as f:
+            f.write("NODE_CLASS_MAPPINGS = {}\nNODE_DISPLAY_NAME_MAPPINGS = {}\n")
+        with open(os.path.join(source, "requirements.txt"), "w") as f:
+            f.write("\n".join(requirements) + "\n")
+        line = f"# {name} synthetic module padding\n"
+        for j in range(files):
+            with open(os.path.join(source, "nodes", f"node_{j:03d}.py"), "w") as f:
+                f.write(line * max(1, file_size // len(line)))
+        _git("init", "--quiet", "-b", "main", source)
+        _git("add", "-A", cwd=source)
+        _git("commit", "--quiet", "-m", "Synthetic node", cwd=source)
+        bare = os.path.join(root, "remotes", name + ".git")
+        _git("clone", "--quiet", "--bare", source, bare)
+        # file:// so `git clone --depth 1` behaves like it does against GitHub
+        nodes.append({"name": name, "url": "file://" + bare})
+    shutil.rmtree(work, ignore_errors=True)
+    return nodes
+
+
+def advance_node_repos(root, nodes, files=2):
+    """Push a commit touching `files` modules (and requirements.txt) to every bare repo from make_node_repos"""
+    for node in nodes:
+        work = os.path.join(root, "advance", node["name"])
+        _git("clone", "--quiet", node["url"], work)
+        for j in range(files):
+            with open(os.path.join(work, "nodes", f"node_{j:03d}.py"), "a") as f:
+                f.write(f"# updated at {time.time()}\n")
+        with open(os.path.join(work, "requirements.txt"), "a") as f:
+            f.write("\n")
+        _git("commit", "--quiet", "-am", "Synthetic update", cwd=work)
+        _git("push", "--quiet", "origin", "HEAD", cwd=work)
+        shutil.rmtree(work, ignore_errors=True)
+
+
+def repo_commit():
+    result = subprocess.run(["git", "-C", REPO_DIR, "rev-parse", "--short", "HEAD"],
+                            capture_output=True, text=True)
+    return result.stdout.strip() or None
+
+
+def environment():
+    """Where a result was measured, so numbers are only compared like for like"""
+    return {
+        "commit": repo_commit(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def write_json(path, data):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, indent=1)
+    os.replace(tmp_path, path)
+
+
+def metric(value, unit, better="lower", noise=0.0):
+    """
+    One comparable number. `better` says whether lower or higher values are
+    an improvement; changes smaller than `noise` (in `unit`) never count.
+    """
+    return {"value": round(value, 4), "unit": unit, "better": better, "noise": noise}
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Gateway batching under bursty load
+Starts the fake ComfyUI (and, for the second pass, the gateway) in-process
+and sends the same burst of jobs, interleaved across checkpoints, from
+several clients three times: straight to ComfyUI, one prompt per job;
+through the gateway with model affinity off (batches in arrival order);
+and through the gateway as configured. Reports throughput, latency
+percentiles, how many prompts ComfyUI ran and how often it switched models.
+Needs aiohttp, which ComfyUI depends on; without it the benchmark is skipped.
+"""
+
+import asyncio
+import json
+import statistics
+import time
+
+from fixtures import environment, metric
+
+DEFAULT_JOBS = 64
+DEFAULT_CLIENTS = 8
+DEFAULT_CHECKPOINTS = 3
+DEFAULT_MAX_BATCH = 4
+DEFAULT_SCALE = 0.05  # Fake ComfyUI delays x this (per prompt 10 ms, model switch 75 ms, sampler 25 ms)
+MODES = ("direct", "fifo", "gateway")
+
+
+def api_prompt(checkpoint, seed, text):
+    """A plain text-to-image graph in API format"""
+    return {
+        "4": {"class_type": "CheckpointLoaderSimple", "inputs": {"ckpt_name": checkpoint}},
+        "6": {"class_type": "CLIPTextEncode", "inputs": {"text": text, "clip": ["4", 1]}},
+        "7": {"class_type": "CLIPTextEncode", "inputs": {"text": "blurry, low quality", "clip": ["4", 1]}},
+        "5": {"class_type": "EmptyLatentImage", "inputs": {"width": 512, "height": 512, "batch_size": 1}},
+        "3": {"class_type": "KSampler", "inputs": {
+            "seed": seed, "steps": 20, "cfg": 7.0, "sampler_name": "euler", "scheduler": "normal", "denoise": 1.0,
+            "model": ["4", 0], "positive": ["6", 0], "negative": ["7", 0], "latent_image": ["5", 0]}},
+        "8": {"class_type": "VAEDecode", "inputs": {"samples": ["3", 0], "vae": ["4", 2]}},
+        "9": {"class_type": "SaveImage", "inputs": {"filename_prefix": "bench", "images": ["8", 0]}},
+    }
+
+
+def make_jobs(jobs, clients, checkpoints):
+    """[(client, prompt)] with checkpoints interleaved, the worst order for model switches"""
+    return [(f"client-{i % clients}", api_prompt(f"model_{i % checkpoints}.safetensors", i, f"a photo of thing {i}"))
+            for i in range(jobs)]
+
+
+async def _serve(app):
+    from aiohttp import web
+
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    return runner, f"http://127.0.0.1:{runner.addresses[0][1]}"
+
+
+async def _client(session, base_url, client, prompts, gateway):
+    """Submit one client's prompts at once and wait for all of them; returns latencies"""
+    ws_url = base_url.replace("http", "ws", 1) + (f"/ws?client_id={client}" if gateway else f"/ws?clientId={client}")
+    submitted, finished, failed = {}, {}, 0
+    async with session.ws_connect(ws_url) as ws:
+        for prompt in prompts:
+            async with session.post(f"{base_url}/prompt", json={"prompt": prompt, "client_id": client}) as resp:
+                body = await resp.json()
+            submitted[body["job_id" if gateway else "prompt_id"]] = time.perf_counter()
+        async for msg in ws:
+            event = json.loads(msg.data)
+            if gateway:
+                key, done = event.get("job_id"), event.get("type") in ("done", "failed")
+                failed += event.get("type") == "failed"
+            else:
+                key = event.get("data", {}).get("prompt_id")
+                done = event.get("type") in ("execution_success", "execution_error")
+                failed += event.get("type") == "execution_error"
+            if done and key not in finished:
+                finished[key] = time.perf_counter()
+            if len(finished) == len(prompts) and set(finished) == set(submitted):
+                break
+    return [finished[key] - submitted[key] for key in submitted], failed
+
+
+async def _scenario(jobs, scale, mode, max_batch):
+    import aiohttp
+
+    from fake_comfyui import FakeComfyUI, build_app as fake_app
+    from gateway import Gateway, build_app as gateway_app
+
+    fake = FakeComfyUI(scale=scale, log=lambda *_: None)
+    runners = []
+    try:
+        runner, base_url = await _serve(fake_app(fake))
+        runners.append(runner)
+        front = None
+        gateway = mode != "direct"
+        if gateway:
+            front = Gateway(base_url, max_batch=max_batch, rate=0, log=lambda *_: None,
+                            **({"max_skips": 0} if mode == "fifo" else {}))
+            runner, base_url = await _serve(gateway_app(front))
+            runners.append(runner)
+        by_client = {}
+        for client, prompt in jobs:
+            by_client.setdefault(client, []).append(prompt)
+        started = time.perf_counter()
+        async with aiohttp.ClientSession() as session:
+            results = await asyncio.gather(*(_client(session, base_url, client, prompts, gateway)
+                                             for client, prompts in by_client.items()))
+        seconds = time.perf_counter() - started
+        latencies = sorted(latency for client_latencies, _ in results for latency in client_latencies)
+        return {
+            "seconds": round(seconds, 3),
+            "jobs_per_s": round(len(latencies) / seconds, 2),
+            "p50_s": round(statistics.median(latencies), 3),
+            "p95_s": round(latencies[int(0.95 * (len(latencies) - 1))], 3),
+            "failed": sum(failed for _, failed in results),
+            "prompts": fake.stats["prompts"],
+            "model_loads": fake.stats["model_loads"],
+            "mean_batch_size": front.stats()["mean_batch_size"] if front else 1.0,
+            "swaps_avoided": front.stats()["swaps_avoided"] if front else 0,
+        }
+    finally:
+        for runner in reversed(runners):
+            await runner.cleanup()
+
+
+def run(jobs=DEFAULT_JOBS, clients=DEFAULT_CLIENTS, checkpoints=DEFAULT_CHECKPOINTS, scale=DEFAULT_SCALE,
+        max_batch=DEFAULT_MAX_BATCH, log=print):
+    """Send the same burst direct and through the gateway with and without affinity; returns a result dict"""
+    params = {"jobs": jobs, "clients": clients, "checkpoints": checkpoints, "scale": scale, "max_batch": max_batch}
+    try:
+        import aiohttp  # noqa: F401
+    except ImportError:
+        log("⏭️  aiohttp not installed; gateway benchmark skipped")
+        return {"benchmark": "gateway_load", "params": params, "skipped": "aiohttp not installed",
+                "ok": True, "metrics": {}}
+    burst = make_jobs(jobs, clients, checkpoints)
+    results = {}
+    for mode in MODES:
+        results[mode] = asyncio.run(_scenario(burst, scale, mode, max_batch))
+        row = results[mode]
+        log(f"   {mode:<8} {row['jobs_per_s']:7.1f} jobs/s, p95 {row['p95_s']:.2f}s, "
+            f"{row['prompts']} prompts, {row['model_loads']} model loads")
+
+    direct, fifo, batched = results["direct"], results["fifo"], results["gateway"]
+    speedup = batched["jobs_per_s"] / direct["jobs_per_s"] if direct["jobs_per_s"] else 0.0
+    return {
+        "benchmark": "gateway_load",
+        "params": params,
+        "results": results,
+        "speedup": round(speedup, 2),
+        "ok": not any(row["failed"] for row in results.values()),
+        "metrics": {
+            "gateway.direct.jobs_per_s": metric(direct["jobs_per_s"], "jobs/s", "higher", noise=1.0),
+            "gateway.batched.jobs_per_s": metric(batched["jobs_per_s"], "jobs/s", "higher", noise=1.0),
+            "gateway.batched.p95_s": metric(batched["p95_s"], "s", noise=0.05),
+            "gateway.batched.mean_batch_size": metric(batched["mean_batch_size"], "jobs", "higher", noise=0.5),
+            "gateway.fifo.model_loads": metric(fifo["model_loads"], "loads", noise=1),
+            "gateway.batched.model_loads": metric(batched["model_loads"], "loads", noise=1),
+        },
+    }
+
+
+def format_report(result):
+    lines = ["=" * 60, "GATEWAY LOAD", "=" * 60]
+    params = result["params"]
+    if result.get("skipped"):
+        lines.append(f"⏭️  Skipped: {result['skipped']}")
+        lines.append("=" * 60)
+        return "\n".join(lines)
+    lines.append(f"{params['jobs']} jobs from {params['clients']} clients, {params['checkpoints']} checkpoints "
+                 f"(fake delays x{params['scale']:g})")
+    for mode, row in result["results"].items():
+        icon = "✅" if not row["failed"] else "❌"
+        lines.append(f"{icon} {mode:<8} {row['jobs_per_s']:7.1f} jobs/s · p50 {row['p50_s']:.2f}s · "
+                     f"p95 {row['p95_s']:.2f}s · {row['prompts']} prompts · {row['model_loads']} model loads"
+                     + (f" · batches of {row['mean_batch_size']:.1f}" if mode != "direct" else ""))
+    lines.append(f"🚀 Gateway throughput: {result['speedup']:.1f}x direct submission")
+    fifo, batched = result["results"]["fifo"], result["results"]["gateway"]
+    lines.append(f"🔁 Model affinity: {batched['model_loads']} model loads vs {fifo['model_loads']} in arrival order")
+    lines.append("=" * 60)
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Load-test the job gateway against a fake ComfyUI")
+    parser.add_argument("--jobs", type=int, default=DEFAULT_JOBS)
+    parser.add_argument("--clients", type=int, default=DEFAULT_CLIENTS)
+    parser.add_argument("--checkpoints", type=int, default=DEFAULT_CHECKPOINTS)
+    parser.add_argument("--scale", type=float, default=DEFAULT_SCALE, help="Multiplies the fake ComfyUI's delays")
+    parser.add_argument("--max-batch", type=int, default=DEFAULT_MAX_BATCH, help="Gateway batch size limit")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args(argv)
+
+    result = run(args.jobs, args.clients, args.checkpoints, args.scale, args.max_batch,
+                 log=(lambda *_: None) if args.json else print)
+    result["environment"] = environment()
+    print(json.dumps(result, indent=1) if args.json else format_report(result))
+    return 0 if result["ok"] else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
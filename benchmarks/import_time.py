@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Import-time benchmark for the pod scripts
+Runs `python -X importtime` on each module in a fresh interpreter (best of
+several runs) and reports the cumulative import time, the slowest imports
+and whether heavy UI libraries were pulled in. Exits non-zero when a module
+exceeds its budget or imports a forbidden module, so startup regressions
+show up in CI or on a pod.
+"""
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+SCRIPTS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts")
+
+# module: (budget in ms, modules it must not import)
+DEFAULT_TARGETS = {
+    "model_downloader": (500, ["gradio"]),
+    "supervisor": (300, []),
+    "hf_auth": (300, []),
+    "safetensors_info": (200, []),
+}
+
+
+def parse_importtime(stderr):
+    """[(module, self µs, cumulative µs)] from `-X importtime` output, in import order"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def measure(module, scripts_dir=SCRIPTS_DIR, python=sys.executable):
+    """Import `module` once in a fresh interpreter; returns (rows, error or None)"""
+    result = subprocess.run([python, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=scripts_dir, capture_output=True, text=True)
+    if result.returncode != 0:
+        return [], result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "import failed"
+    return parse_importtime(result.stderr), None
+
+
+def benchmark(module, budget_ms=None, forbidden=(), runs=5, top=10, scripts_dir=SCRIPTS_DIR):
+    """Best-of-`runs` import time for `module` plus its slowest imports"""
+    totals = []
+    rows = []
+    for _ in range(runs):
+        rows, error = measure(module, scripts_dir)
+        if error:
+            return {"module": module, "ok": False, "error": error}
+        totals.append(next(cumulative for name, _, cumulative in rows if name == module) / 1000)
+    imported = {name for name, _, _ in rows}
+    pulled_in = sorted(name for name in forbidden if name in imported)
+    best = min(totals)
+    slowest = sorted(rows, key=lambda row: row[1], reverse=True)[:top]
+    return {
+        "module": module,
+        "ok": not pulled_in and (budget_ms is None or best <= budget_ms),
+        "best_ms": round(best, 1),
+        "median_ms": round(statistics.median(totals), 1),
+        "budget_ms": budget_ms,
+        "modules_imported": len(imported),
+        "forbidden_imported": pulled_in,
+        "slowest_self_ms": [{"module": name, "ms": round(self_us / 1000, 1)} for name, self_us, _ in slowest],
+    }
+
+
+def format_report(results):
+    lines = []
+    lines.append("=" * 60)
+    lines.append("IMPORT TIME")
+    lines.append("=" * 60)
+    for result in results:
+        if "error" in result:
+            lines.append(f"❌ {result['module']:<20} {result['error']}")
+            continue
+        icon = "✅" if result["ok"] else "❌"
+        budget = f" (budget {result['budget_ms']} ms)" if result["budget_ms"] is not None else ""
+        lines.append(f"{icon} {result['module']:<20} {result['best_ms']:>7.1f} ms best, "
+                     f"{result['median_ms']:.1f} ms median{budget}")
+        if result["forbidden_imported"]:
+            lines.append(f"   ⚠️  imports {', '.join(result['forbidden_imported'])}")
+        heaviest = ", ".join(f"{row['module']} {row['ms']:.1f}" for row in result["slowest_self_ms"][:3])
+        lines.append(f"   slowest: {heaviest}")
+    lines.append("=" * 60)
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Measure import time of the pod scripts")
+    parser.add_argument("modules", nargs="*", help=f"Modules to measure (default: {', '.join(DEFAULT_TARGETS)})")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters per module (best is kept)")
+    parser.add_argument("--budget", type=float, help="Budget in ms for every module (overrides defaults)")
+    parser.add_argument("--scripts-dir", default=SCRIPTS_DIR)
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args(argv)
+
+    results = []
+    for module in args.modules or list(DEFAULT_TARGETS):
+        budget, forbidden = DEFAULT_TARGETS.get(module, (None, []))
+        if args.budget is not None:
+            budget = args.budget
+        results.append(benchmark(module, budget, forbidden, args.runs, scripts_dir=args.scripts_dir))
+
+    print(json.dumps(results, indent=1) if args.json else format_report(results))
+    return 0 if all(result["ok"] for result in results) else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Model inventory latency vs. library size
+Builds synthetic model trees (sparse safetensors files with realistic
+headers) of increasing size and times what the Browse tab does: the first
+full index, a no-op refresh, a refresh after a few new files, and
+`list_models` page, search and sort queries against the index.
+"""
+
+import json
+import os
+import shutil
+import statistics
+import tempfile
+import time
+
+from fixtures import MODEL_TEMPLATES, environment, make_model_tree, metric, write_safetensors
+
+import model_downloader
+from model_inventory import ModelInventory
+
+DEFAULT_SIZES = (500, 2000, 5000)
+QUERY_REPEATS = 20
+NEW_FILES = 10
+
+# name: list_models arguments
+QUERIES = {
+    "list_all": ("All", "", "name", 1),
+    "list_loras": ("LoRAs", "", "name", 1),
+    "search": ("All", "flux lora", "name", 1),
+    "sort_size": ("All", "", "size", 1),
+    "last_page": ("All", "", "name", None),
+}
+
+
+def _timed(function, *args):
+    started = time.perf_counter()
+    value = function(*args)
+    return time.perf_counter() - started, value
+
+
+def measure(size, workdir):
+    """Index a `size`-file library and time refreshes and queries; returns one result row"""
+    root = os.path.join(workdir, f"models-{size}")
+    started = time.time()
+    model_dirs = make_model_tree(root, size)
+    build_seconds = time.time() - started
+
+    inventory = ModelInventory(model_dirs, db_path=os.path.join(workdir, f"inventory-{size}.db"))
+    row = {"files": size, "build_seconds": round(build_seconds, 2)}
+    row["cold_refresh_s"] = _timed(inventory.refresh)[0]
+    row["indexed"] = sum(files for files, _ in inventory.totals().values())
+    row["warm_refresh_ms"] = _timed(inventory.refresh)[0] * 1000
+
+    _, prefix, tensors = MODEL_TEMPLATES["LoRAs"]
+    for i in range(NEW_FILES):
+        write_safetensors(os.path.join(model_dirs["LoRAs"], f"new_{prefix}_{i}.safetensors"), tensors)
+    row["incremental_refresh_ms"] = _timed(inventory.refresh)[0] * 1000
+
+    # The Browse tab goes through list_models, which renders from the shared inventory
+    model_downloader.model_inventory = inventory
+    last_page = max(1, -(-(size + NEW_FILES) // model_downloader.BROWSE_PAGE_SIZE))
+    try:
+        for name, (model_type, search, sort, page) in QUERIES.items():
+            args = (model_type, search, sort, page or last_page)
+            samples = [_timed(model_downloader.list_models, *args)[0] for _ in range(QUERY_REPEATS)]
+            row[f"{name}_ms"] = statistics.median(samples) * 1000
+    finally:
+        model_downloader.model_inventory = None
+        inventory.stop()
+    return {key: round(value, 3) if isinstance(value, float) else value for key, value in row.items()}
+
+
+def run(sizes=DEFAULT_SIZES, workdir=None, log=print):
+    workdir = tempfile.mkdtemp(prefix="bench-inventory-", dir=workdir)
+    results = []
+    try:
+        for size in sizes:
+            results.append(measure(size, workdir))
+            row = results[-1]
+            log(f"   {size:>6} files: cold {row['cold_refresh_s']:.2f}s, warm {row['warm_refresh_ms']:.1f} ms, "
+                f"list {row['list_all_ms']:.1f} ms")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    metrics = {}
+    for row in results:
+        key = f"inventory.n{row['files']}"
+        metrics[f"{key}.cold_refresh_s"] = metric(row["cold_refresh_s"], "s", noise=0.02)
+        for name in ["warm_refresh", "incremental_refresh"] + list(QUERIES):
+            metrics[f"{key}.{name}_ms"] = metric(row[f"{name}_ms"], "ms", noise=0.5)
+    return {
+        "benchmark": "inventory_latency",
+        "params": {"sizes": list(sizes), "query_repeats": QUERY_REPEATS, "new_files": NEW_FILES},
+        "results": results,
+        "ok": all(row["indexed"] == row["files"] for row in results),
+        "metrics": metrics,
+    }
+
+
+def format_report(result):
+    lines = ["=" * 60, "INVENTORY LATENCY", "=" * 60]
+    for row in result["results"]:
+        icon = "✅" if row["indexed"] == row["files"] else "❌"
+        lines.append(f"{icon} {row['files']} files ({row['indexed']} indexed)")
+        lines.append(f"   refresh: cold {row['cold_refresh_s']:.2f}s · warm {row['warm_refresh_ms']:.1f} ms · "
+                     f"+{NEW_FILES} files {row['incremental_refresh_ms']:.1f} ms")
+        lines.append("   list_models: " + " · ".join(f"{name} {row[f'{name}_ms']:.1f} ms" for name in QUERIES))
+    lines.append("=" * 60)
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Measure model inventory refresh and query latency")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES), help="Library sizes (files)")
+    parser.add_argument("--workdir", help="Where the synthetic trees go (default: system temp)")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args(argv)
+
+    result = run(args.sizes, args.workdir, log=(lambda *_: None) if args.json else print)
+    result["environment"] = environment()
+    print(json.dumps(result, indent=1) if args.json else format_report(result))
+    return 0 if result["ok"] else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Custom node install wall time
+Creates local bare git repos standing in for CUSTOM_NODES and times the
+parallel installer against them: the clone phase at different worker
+counts (each with an empty git cache), the same clones from a warm cache
+at pinned commits (a new pod on the same volume), a full install_nodes run
+(clones, merged requirements, lockfile), the no-op re-run a restarted pod
+does and an update after every repo got a new commit. The requirements
+name packages that are already installed, so no step needs the network.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import time
+
+from fixtures import advance_node_repos, environment, installed_requirements, make_node_repos, metric
+
+from node_installer import CLONE_WORKERS, CUSTOM_NODES, clone_all, install_nodes, update_nodes
+
+DEFAULT_WORKERS = tuple(sorted({1, CLONE_WORKERS}))
+
+
+def _quiet(*_):
+    pass
+
+
+def run(nodes=len(CUSTOM_NODES), workers=DEFAULT_WORKERS, files=40, deps=True, workdir=None, log=print):
+    """Time clones per worker count (cold and warm cache), then a full install, its re-run and an update; returns a result dict"""
+    workdir = tempfile.mkdtemp(prefix="bench-nodes-", dir=workdir)
+    clones = []
+    install = None
+    try:
+        started = time.time()
+        repos = make_node_repos(workdir, nodes, files=files, requirements=installed_requirements())
+        log(f"🧪 {nodes} node repos created in {time.time() - started:.1f}s")
+
+        for count in workers:
+            target = os.path.join(workdir, f"custom_nodes-{count}")
+            started = time.time()
+            results = clone_all(repos, target, count, log=_quiet, cache_dir=os.path.join(workdir, f"cache-{count}"))
+            clones.append({
+                "workers": count,
+                "seconds": round(time.time() - started, 3),
+                "failed": sum(1 for r in results if r["status"] == "failed"),
+            })
+            shutil.rmtree(target, ignore_errors=True)
+            log(f"   clone with {count:>2} workers: {clones[-1]['seconds']:.2f}s")
+
+        # Same clones at the commits just recorded, from the cache the last run filled
+        pinned = [dict(repo, commit=result["commit"]) for repo, result in zip(repos, results)]
+        target = os.path.join(workdir, "custom_nodes-warm")
+        started = time.time()
+        results = clone_all(pinned, target, max(workers), log=_quiet,
+                            cache_dir=os.path.join(workdir, f"cache-{workers[-1]}"))
+        warm = {
+            "workers": max(workers),
+            "seconds": round(time.time() - started, 3),
+            "failed": sum(1 for r in results if r["status"] == "failed"),
+            "fetched": sum(1 for r in results if r.get("fetched")),
+        }
+        shutil.rmtree(target, ignore_errors=True)
+        log(f"   clone from warm cache: {warm['seconds']:.2f}s ({warm['fetched']} upstream fetches)")
+
+        if deps:
+            target = os.path.join(workdir, "custom_nodes")
+            lockfile = os.path.join(workdir, "custom_nodes.lock.json")
+            cache = os.path.join(workdir, "cache")
+            summary = install_nodes(repos, target, max(workers), extra_packages=(), lockfile=lockfile, log=_quiet,
+                                    cache_dir=cache)
+            started = time.time()
+            rerun = install_nodes(repos, target, max(workers), extra_packages=(), lockfile=lockfile, log=_quiet,
+                                  cache_dir=cache)
+            rerun_seconds = time.time() - started
+            advance_node_repos(workdir, repos)
+            update = update_nodes(repos, target, max(workers), lockfile=lockfile, log=_quiet, cache_dir=cache)
+            install = {
+                "seconds": round(summary["elapsed"], 3),
+                "clone_seconds": round(summary["clone_elapsed"], 3),
+                "deps_seconds": round(summary["elapsed"] - summary["clone_elapsed"], 3),
+                "deps_ok": summary["deps_ok"],
+                "failed": summary["failed"],
+                "rerun_seconds": round(rerun_seconds, 3),
+                "rerun_skipped": rerun["skipped"],
+                "update_seconds": round(update["elapsed"], 3),
+                "update_fetch_seconds": round(update["fetch_elapsed"], 3),
+                "updated": update["updated"],
+                "update_ok": update["deps_ok"] and not update["failed"],
+            }
+            log(f"   install_nodes: {install['seconds']:.2f}s, re-run {install['rerun_seconds']:.2f}s, "
+                f"update {install['update_seconds']:.2f}s")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    metrics = {f"nodes.clone.w{c['workers']}_s": metric(c["seconds"], "s", noise=0.1) for c in clones}
+    metrics["nodes.clone.warm_s"] = metric(warm["seconds"], "s", noise=0.1)
+    if install:
+        metrics["nodes.install_s"] = metric(install["seconds"], "s", noise=0.1)
+        metrics["nodes.deps_s"] = metric(install["deps_seconds"], "s", noise=0.1)
+        metrics["nodes.rerun_s"] = metric(install["rerun_seconds"], "s", noise=0.1)
+        metrics["nodes.update_fetch_s"] = metric(install["update_fetch_seconds"], "s", noise=0.1)
+    ok = all(not c["failed"] for c in clones) and not warm["failed"] and not warm["fetched"] and (
+        install is None or (install["deps_ok"] and not install["failed"] and install["rerun_skipped"] == nodes
+                            and install["update_ok"] and install["updated"] == nodes))
+    return {
+        "benchmark": "node_install",
+        "params": {"nodes": nodes, "workers": list(workers), "files_per_node": files, "deps": deps},
+        "clones": clones,
+        "warm": warm,
+        "install": install,
+        "ok": ok,
+        "metrics": metrics,
+    }
+
+
+def format_report(result):
+    lines = ["=" * 60, "NODE INSTALL", "=" * 60]
+    params = result["params"]
+    lines.append(f"{params['nodes']} nodes, {params['files_per_node']} files each")
+    for clone in result["clones"]:
+        icon = "✅" if not clone["failed"] else "❌"
+        lines.append(f"{icon} clone, {clone['workers']:>2} workers: {clone['seconds']:.2f}s")
+    warm = result["warm"]
+    icon = "✅" if not warm["failed"] and not warm["fetched"] else "❌"
+    lines.append(f"{icon} clone from warm cache, {warm['workers']:>2} workers: {warm['seconds']:.2f}s "
+                 f"({warm['fetched']} upstream fetches)")
+    install = result["install"]
+    if install:
+        icon = "✅" if install["deps_ok"] and not install["failed"] else "❌"
+        lines.append(f"{icon} install_nodes: {install['seconds']:.2f}s (clones {install['clone_seconds']:.2f}s, "
+                     f"deps + lockfile {install['deps_seconds']:.2f}s)")
+        lines.append(f"⏭️  re-run: {install['rerun_seconds']:.2f}s ({install['rerun_skipped']} skipped)")
+        icon = "✅" if install["update_ok"] else "❌"
+        lines.append(f"{icon} update after new commits: {install['update_seconds']:.2f}s "
+                     f"(fetch + checkout {install['update_fetch_seconds']:.2f}s, {install['updated']} updated)")
+    lines.append("=" * 60)
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Measure custom node install time against local git repos")
+    parser.add_argument("--nodes", type=int, default=len(CUSTOM_NODES))
+    parser.add_argument("--workers", type=int, nargs="+", default=list(DEFAULT_WORKERS))
+    parser.add_argument("--files", type=int, default=40, help="Python files per node repo")
+    parser.add_argument("--clone-only", action="store_true", help="Skip the install_nodes run")
+    parser.add_argument("--workdir", help="Where the repos and clones go (default: system temp)")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args(argv)
+
+    result = run(args.nodes, args.workers, args.files, not args.clone_only, args.workdir,
+                 log=_quiet if args.json else print)
+    result["environment"] = environment()
+    print(json.dumps(result, indent=1) if args.json else format_report(result))
+    return 0 if result["ok"] else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark suite
+Runs the download, inventory, node-install, import-time, gateway and
+boot-time benchmarks (no network needed) and writes one JSON document with
+every result and a flat table of metrics. `--compare` checks those metrics against an earlier
+run and exits non-zero when any of them regressed past the threshold, so
+two commits can be compared on the same machine.
+"""
+
+import json
+import os
+import sys
+
+import fixtures
+import boot_time
+import download_throughput
+import gateway_load
+import import_time
+import inventory_latency
+import node_install
+
+BENCHMARKS = ("download", "inventory", "nodes", "imports", "gateway", "boot")
+DEFAULT_THRESHOLD = 10.0  # Percent
+
+# Smaller fixtures for a smoke run (CI, or checking a pod before a longer run)
+QUICK = {
+    "download": {"size_mb": 256, "connections": (1, 4, 8)},
+    "inventory": {"sizes": (200, 2000)},
+    "nodes": {"nodes": 6},
+    "imports": {"runs": 3},
+    "gateway": {"jobs": 32},
+    "boot": {"packages": 12},
+}
+
+
+def run_imports(runs=5, log=print):
+    """import_time results in the suite's result/metrics shape"""
+    results = [import_time.benchmark(module, budget, forbidden, runs)
+               for module, (budget, forbidden) in import_time.DEFAULT_TARGETS.items()]
+    for result in results:
+        if "error" not in result:
+            log(f"   {result['module']:<20} {result['best_ms']:.1f} ms")
+    return {
+        "benchmark": "import_time",
+        "params": {"runs": runs},
+        "results": results,
+        "ok": all(result["ok"] for result in results),
+        "metrics": {f"imports.{r['module']}_ms": fixtures.metric(r["best_ms"], "ms", noise=5.0)
+                    for r in results if "best_ms" in r},
+    }
+
+
+def run(selected=BENCHMARKS, quick=False, workdir=None, log=print):
+    if workdir:
+        os.makedirs(workdir, exist_ok=True)  # The runners make their fixture folders inside it
+    runners = {
+        "download": lambda **kw: download_throughput.run(workdir=workdir, log=log, **kw),
+        "inventory": lambda **kw: inventory_latency.run(workdir=workdir, log=log, **kw),
+        "nodes": lambda **kw: node_install.run(workdir=workdir, log=log, **kw),
+        "imports": lambda **kw: run_imports(log=log, **kw),
+        "gateway": lambda **kw: gateway_load.run(log=log, **kw),
+        "boot": lambda **kw: boot_time.run(workdir=workdir, log=log, **kw),
+    }
+    report = {"environment": fixtures.environment(), "quick": quick, "benchmarks": {}, "metrics": {}}
+    for name in selected:
+        log(f"▶️  {name}")
+        result = runners[name](**(QUICK[name] if quick else {}))
+        report["benchmarks"][name] = result
+        report["metrics"].update(result["metrics"])
+    report["ok"] = all(result["ok"] for result in report["benchmarks"].values())
+    return report
+
+
+def compare(baseline, current, threshold=DEFAULT_THRESHOLD):
+    """
+    Metric-by-metric change from `baseline` to `current` (both suite reports).
+
+    Returns rows of (name, old, new, change %, status) where status is
+    "regressed", "improved" or "same"; metrics missing on either side are
+    skipped and changes within a metric's noise floor are "same".
+    """
+    rows = []
+    for name, new in sorted(current["metrics"].items()):
+        old = baseline.get("metrics", {}).get(name)
+        if old is None or not old["value"]:
+            continue
+        change = 100.0 * (new["value"] - old["value"]) / old["value"]
+        worse = change < 0 if new["better"] == "higher" else change > 0
+        noisy = abs(new["value"] - old["value"]) <= new.get("noise", 0.0)
+        status = "same" if noisy or abs(change) < threshold else ("regressed" if worse else "improved")
+        rows.append((name, old["value"], new["value"], change, status))
+    return rows
+
+
+def format_comparison(rows, baseline, current, threshold=DEFAULT_THRESHOLD):
+    icons = {"regressed": "❌", "improved": "🚀", "same": "✅"}
+    lines = ["=" * 60, "BENCHMARK COMPARISON", "=" * 60]
+    lines.append(f"{baseline['environment'].get('commit')} → {current['environment'].get('commit')} "
+                 f"(threshold {threshold:g}%)")
+    if baseline["environment"].get("platform") != current["environment"].get("platform"):
+        lines.append("⚠️  Measured on different machines; differences may not mean much")
+    for name, old, new, change, status in rows:
+        lines.append(f"{icons[status]} {name:<42} {old:>10.3f} → {new:>10.3f} ({change:+.1f}%)")
+    regressed = sum(1 for row in rows if row[4] == "regressed")
+    lines.append("=" * 60)
+    lines.append(f"{len(rows)} metrics compared, {regressed} regressed")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run the offline benchmark suite")
+    parser.add_argument("benchmarks", nargs="*", help=f"Benchmarks to run (default: {', '.join(BENCHMARKS)})")
+    parser.add_argument("--quick", action="store_true", help="Small fixtures for a smoke run")
+    parser.add_argument("--output", help="Write the JSON report here")
+    parser.add_argument("--input", help="Use an existing report instead of running")
+    parser.add_argument("--compare", metavar="BASELINE", help="Report to compare against")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Percent change that counts as a regression")
+    parser.add_argument("--workdir", help="Where fixtures go (default: system temp)")
+    args = parser.parse_args(argv)
+    unknown = sorted(set(args.benchmarks) - set(BENCHMARKS))
+    if unknown:
+        parser.error(f"unknown benchmark(s): {', '.join(unknown)}")
+
+    if args.input:
+        with open(args.input) as f:
+            report = json.load(f)
+    else:
+        # Progress goes to stderr so stdout stays valid JSON
+        report = run(args.benchmarks or BENCHMARKS, args.quick, args.workdir,
+                     log=lambda *a: print(*a, file=sys.stderr))
+        if args.output:
+            fixtures.write_json(args.output, report)
+
+    if not args.compare:
+        if not args.output:
+            print(json.dumps(report, indent=1))
+        return 0 if report["ok"] else 1
+
+    with open(args.compare) as f:
+        baseline = json.load(f)
+    rows = compare(baseline, report, args.threshold)
+    print(format_comparison(rows, baseline, report, args.threshold))
+    return 1 if not report["ok"] or any(row[4] == "regressed" for row in rows) else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
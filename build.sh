@@ -2,9 +2,17 @@
 
 # RunPod ComfyUI Template Builder
 # This script builds and optionally pushes the Docker image
+#
+#   ./build.sh              code-only image (dependencies install on first pod start)
+#   ./build.sh --prebaked   pre-baked image (dependencies in cached layers, see Dockerfile.prebaked)
 
 set -e
 
+PREBAKED=0
+if [ "$1" = "--prebaked" ]; then
+    PREBAKED=1
+fi
+
 echo "========================================="
 echo "RunPod ComfyUI Template Builder"
 echo "========================================="
@@ -20,14 +28,35 @@ fi
 
 IMAGE_NAME="$DOCKER_USER/comfyui-runpod"
 TAG="latest"
+DOCKERFILE="Dockerfile"
+if [ "$PREBAKED" -eq 1 ]; then
+    TAG="prebaked"
+    DOCKERFILE="Dockerfile.prebaked"
+fi
 FULL_IMAGE="$IMAGE_NAME:$TAG"
 
+# The pre-baked layers are keyed on their lockfiles. Resolve them inside the base image
+# (so torch & co. pin to what it ships) unless they exist; delete docker/locks to refresh.
+if [ "$PREBAKED" -eq 1 ] && [ ! -f docker/locks/nodes.lock.json ]; then
+    BASE_IMAGE=$(awk '/^FROM/ {print $2; exit}' "$DOCKERFILE")
+    echo ""
+    echo "Resolving layer lockfiles in $BASE_IMAGE..."
+    mkdir -p docker/locks
+    docker run --rm \
+        -v "$PWD/scripts:/opt/prebake:ro" \
+        -v "$PWD/docker/locks:/locks" \
+        -e METRICS_TRACE= \
+        "$BASE_IMAGE" \
+        python3 /opt/prebake/prebake.py lock --locks /locks
+fi
+
 echo ""
 echo "Building image: $FULL_IMAGE"
 echo ""
 
 # Build the image
 docker build \
+    --file "$DOCKERFILE" \
     --tag "$FULL_IMAGE" \
     --progress=plain \
     .
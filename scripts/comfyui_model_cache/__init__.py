@@ -0,0 +1,53 @@
+"""
+ComfyUI model cache hook
+Times every model file load, logs it with the storage tier it came from and
+promotes models read from the network volume into the local cache in the
+background (see scripts/model_cache.py). Adds no nodes.
+"""
+
+import os
+import sys
+import threading
+import time
+
+# The package is symlinked into custom_nodes; model_cache.py lives next to its real location
+sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+import comfy.utils
+import model_cache
+
+NODE_CLASS_MAPPINGS = {}
+NODE_DISPLAY_NAME_MAPPINGS = {}
+
+_load_torch_file = comfy.utils.load_torch_file
+_promoting = set()
+_lock = threading.Lock()
+
+
+def _promote(path):
+    try:
+        model_cache.promote(path, log=lambda message: print(f"[model-cache] {message}"))
+    except OSError as e:
+        print(f"[model-cache] Could not cache {path}: {e}")
+    finally:
+        with _lock:
+            _promoting.discard(path)
+
+
+def load_torch_file(ckpt, *args, **kwargs):
+    started = time.perf_counter()
+    result = _load_torch_file(ckpt, *args, **kwargs)
+    try:
+        where = model_cache.record_access(ckpt, time.perf_counter() - started)
+        if where == "volume" and model_cache.cache_path(ckpt):
+            with _lock:
+                start = ckpt not in _promoting
+                _promoting.add(ckpt)
+            if start:
+                threading.Thread(target=_promote, args=(ckpt,), daemon=True, name="model-cache").start()
+    except OSError:
+        pass  # Logging/caching must never break a model load
+    return result
+
+
+comfy.utils.load_torch_file = load_torch_file
@@ -0,0 +1,530 @@
+#!/usr/bin/env python3
+"""
+Download job queue
+Runs downloads on a bounded worker pool with a per-host concurrency limit.
+Every job has an ID, live progress (bytes/sec, ETA, percent) and can be
+cancelled or retried while other jobs keep running. Jobs are only started
+once their size fits on disk next to every running download, and bandwidth
+can be capped globally, for background jobs and per job.
+"""
+
+import collections
+import itertools
+import os
+import threading
+import time
+import urllib.parse
+
+from segmented_download import (
+    segmented_download, probe, DownloadCancelled, TokenBucket, DEFAULT_CONNECTIONS
+)
+from model_integrity import IntegrityIndex, published_sha256
+from model_store import has_blob, link_blob, adopt
+import metrics
+
+MAX_WORKERS = int(os.environ.get("DOWNLOAD_WORKERS", "4"))
+MAX_PER_HOST = int(os.environ.get("DOWNLOAD_PER_HOST", "2"))
+# Low-priority (background) jobs share at most this many workers and use fewer connections
+BACKGROUND_WORKERS = int(os.environ.get("DOWNLOAD_BACKGROUND_WORKERS", "1"))
+BACKGROUND_CONNECTIONS = int(os.environ.get("DOWNLOAD_BACKGROUND_CONNECTIONS", "2"))
+SPEED_WINDOW = 5.0  # Seconds of samples used for the bytes/sec estimate
+# Space always left free on the target filesystem; jobs that would cut into it wait or fail
+MIN_FREE_BYTES = int(float(os.environ.get("DOWNLOAD_MIN_FREE_GB", "2")) * 1024 ** 3)
+SPACE_RECHECK = 30.0  # Seconds before a job waiting for disk space is looked at again
+# Bandwidth caps in MB/s (0 = unlimited): all downloads together, and background ones
+MAX_BYTES_PER_SEC = float(os.environ.get("DOWNLOAD_MAX_MB_PER_SEC", "0")) * 1024 * 1024
+BACKGROUND_BYTES_PER_SEC = float(os.environ.get("DOWNLOAD_BACKGROUND_MAX_MB_PER_SEC", "0")) * 1024 * 1024
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+STATUS_ICONS = {QUEUED: "⏳", RUNNING: "⬇️", DONE: "✅", FAILED: "❌", CANCELLED: "🚫"}
+
+# Lower runs first; interactive and manifest downloads are HIGH, prefetch is LOW
+PRIORITY_HIGH, PRIORITY_LOW = 0, 10
+
+
+def format_bytes(count):
+    """Human readable byte count"""
+    count = float(count or 0)
+    for unit in ("B", "KB", "MB", "GB"):
+        if count < 1024:
+            return f"{count:.1f} {unit}"
+        count /= 1024
+    return f"{count:.1f} TB"
+
+
+def free_bytes(path):
+    """Bytes an unprivileged process can still write on the filesystem holding `path`"""
+    st = os.statvfs(path)
+    return st.f_bavail * st.f_frsize
+
+
+def allocated_bytes(path):
+    """Disk actually allocated to `path` (sparse and preallocated files differ from their size)"""
+    try:
+        return os.stat(path).st_blocks * 512
+    except OSError:
+        return 0
+
+
+def format_eta(seconds):
+    if seconds is None:
+        return "--:--"
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes:02d}:{seconds:02d}"
+
+
+class DownloadJob:
+    """A single queued download and its live progress"""
+
+    def __init__(self, job_id, url, target_dir, filename=None, headers=None, label=None,
+                 sha256=None, route=None, priority=PRIORITY_HIGH, max_bytes_per_sec=None):
+        self.id = job_id
+        self.url = url
+        self.target_dir = target_dir
+        self.filename = filename
+        self.headers = headers or {}
+        self.sha256 = sha256.lower() if sha256 else None  # Expected hash, if known
+        self.label = label or ""
+        self.route = route  # route(path) -> (label, directory) to move the finished file, or None
+        self.priority = priority
+        self.preempted = False  # Set when a higher-priority job takes this job's worker
+        self.limit = TokenBucket(max_bytes_per_sec)
+        self.admitted = False  # True while its disk space is reserved
+        self.waiting = ""  # Why a queued job is held back (e.g. disk space)
+        self.deferred_until = 0.0
+        self.host = urllib.parse.urlparse(url).hostname or ""
+        self.output_path = None
+        self.status = QUEUED
+        self.error = ""
+        self.attempts = 0
+        self.bytes_done = 0
+        self.total = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.result = None
+        self.verified = False  # True once the hash matched a manifest/published sha256
+        self.cancel_event = threading.Event()
+        self.done_event = threading.Event()
+        self._samples = collections.deque()
+
+    def _on_progress(self, done, total):
+        now = time.time()
+        self.bytes_done = done
+        self.total = total
+        self._samples.append((now, done))
+        while self._samples and now - self._samples[0][0] > SPEED_WINDOW:
+            self._samples.popleft()
+
+    @property
+    def speed(self):
+        """Bytes/sec over the last few seconds (average speed once finished)"""
+        if self.status == DONE and self.result:
+            return self.result["bytes_per_sec"]
+        samples = list(self._samples)
+        if len(samples) < 2 or samples[-1][0] <= samples[0][0]:
+            return 0.0
+        return (samples[-1][1] - samples[0][1]) / (samples[-1][0] - samples[0][0])
+
+    @property
+    def percent(self):
+        if self.status == DONE:
+            return 100.0
+        if not self.total:
+            return None
+        return 100.0 * self.bytes_done / self.total
+
+    @property
+    def eta(self):
+        speed = self.speed
+        if self.status != RUNNING or not self.total or speed <= 0:
+            return None
+        return (self.total - self.bytes_done) / speed
+
+    def wait(self, timeout=None):
+        return self.done_event.wait(timeout)
+
+    def snapshot(self):
+        """Plain dict view of the job for UIs and APIs"""
+        return {
+            "id": self.id,
+            "label": self.label,
+            "url": self.url,
+            "filename": self.filename,
+            "path": self.output_path,
+            "status": self.status,
+            "bytes_done": self.bytes_done,
+            "total": self.total,
+            "percent": self.percent,
+            "bytes_per_sec": self.speed,
+            "eta": self.eta,
+            "attempts": self.attempts,
+            "error": self.error,
+            "sha256": self.sha256,
+            "priority": self.priority,
+            "waiting": self.waiting,
+        }
+
+    def describe(self):
+        """One status line for the text UI"""
+        name = self.filename or self.url.split("/")[-1].split("?")[0] or self.url
+        line = f"{STATUS_ICONS[self.status]} [{self.id}] {name}"
+        if self.status == DONE and self.route is not None:
+            line += f" → {self.label}"
+        if self.status == RUNNING:
+            percent = self.percent
+            line += (
+                f" — {percent:.1f}%" if percent is not None else " —"
+            ) + (
+                f" {format_bytes(self.bytes_done)}/{format_bytes(self.total)}"
+                f" @ {format_bytes(self.speed)}/s ETA {format_eta(self.eta)}"
+            )
+        elif self.status == DONE and self.result and self.result.get("from_store"):
+            line += f" — {format_bytes(self.bytes_done)} linked from store"
+        elif self.status == DONE:
+            line += f" — {format_bytes(self.bytes_done)} @ {format_bytes(self.speed)}/s"
+            line += " (sha256 verified)" if self.verified else ""
+        elif self.status == FAILED:
+            line += f" — {self.error}"
+        elif self.status == QUEUED and self.waiting:
+            line += f" — {self.waiting}"
+        elif self.status == QUEUED and self.bytes_done:
+            line += f" — paused at {format_bytes(self.bytes_done)}"
+        elif self.status == QUEUED and self.attempts:
+            line += f" — retry #{self.attempts}"
+        if self.priority > PRIORITY_HIGH and self.status in (QUEUED, RUNNING):
+            line += " (background)"
+        return line
+
+
+class DownloadScheduler:
+    """Bounded worker pool that hands out queued jobs per-host fairly"""
+
+    def __init__(self, max_workers=MAX_WORKERS, max_per_host=MAX_PER_HOST,
+                 connections=DEFAULT_CONNECTIONS, index=None, min_free=MIN_FREE_BYTES,
+                 max_bytes_per_sec=MAX_BYTES_PER_SEC):
+        self.max_workers = max_workers
+        self.max_per_host = max_per_host
+        self.connections = connections
+        self.min_free = min_free
+        self.bandwidth = TokenBucket(max_bytes_per_sec)
+        self.background_bandwidth = TokenBucket(BACKGROUND_BYTES_PER_SEC)
+        self.index = index or IntegrityIndex()
+        self._jobs = collections.OrderedDict()
+        self._pending = collections.deque()
+        self._host_active = collections.Counter()
+        self._ids = itertools.count(1)
+        self._cond = threading.Condition()
+        self._workers = []
+
+    def _ensure_workers(self):
+        self._workers = [w for w in self._workers if w.is_alive()]
+        while len(self._workers) < self.max_workers:
+            worker = threading.Thread(target=self._worker, daemon=True, name="download-worker")
+            worker.start()
+            self._workers.append(worker)
+
+    def submit(self, url, target_dir, filename=None, headers=None, label=None, sha256=None,
+               route=None, priority=PRIORITY_HIGH, max_bytes_per_sec=None):
+        """Queue a download and return its job; `sha256` is verified when given
+
+        `route(path)` is called once the file is complete and may return a
+        (label, directory) pair to move it into. PRIORITY_LOW jobs only use
+        spare capacity and are paused (then resumed) for PRIORITY_HIGH ones.
+        `max_bytes_per_sec` caps this job on top of the scheduler-wide limits.
+        """
+        with self._cond:
+            job = DownloadJob(str(next(self._ids)), url, target_dir, filename, headers, label,
+                              sha256, route, priority, max_bytes_per_sec)
+            self._jobs[job.id] = job
+            self._pending.append(job)
+            if priority == PRIORITY_HIGH:
+                self._preempt_for(job)
+            self._ensure_workers()
+            self._cond.notify_all()
+        return job
+
+    def _running(self):
+        return [job for job in self._jobs.values() if job.status == RUNNING]
+
+    def _preempt_for(self, job):
+        """Pause a running background job if `job` would otherwise have to wait for it"""
+        running = self._running()
+        background = [j for j in running if j.priority > PRIORITY_HIGH and not j.preempted]
+        if not background:
+            return
+        if self._host_active[job.host] >= self.max_per_host:
+            background = [j for j in background if j.host == job.host]
+        elif len(running) < self.max_workers:
+            return  # A worker is free
+        if background:
+            victim = max(background, key=lambda j: j.started or 0)
+            victim.preempted = True
+            victim.cancel_event.set()
+
+    def get(self, job_id):
+        return self._jobs.get(str(job_id).strip())
+
+    def jobs(self):
+        return list(self._jobs.values())
+
+    def active(self):
+        return any(job.status in (QUEUED, RUNNING) for job in self._jobs.values())
+
+    def cancel(self, job_id):
+        """Cancel a queued or running job; returns False if it already finished"""
+        job = self.get(job_id)
+        if job is None:
+            return False
+        with self._cond:
+            if job.status == QUEUED:
+                self._pending.remove(job)
+                self._finish(job, CANCELLED)
+                return True
+            if job.status == RUNNING:
+                job.preempted = False  # A user cancel wins over a pending pause
+                job.cancel_event.set()
+                return True
+        return False
+
+    def retry(self, job_id):
+        """Re-queue a failed or cancelled job; partial data is resumed"""
+        job = self.get(job_id)
+        if job is None or job.status not in (FAILED, CANCELLED):
+            return False
+        with self._cond:
+            job.status = QUEUED
+            job.error = ""
+            job.waiting = ""
+            job.deferred_until = 0.0
+            job.cancel_event.clear()
+            job.done_event.clear()
+            job.finished = None
+            self._pending.append(job)
+            self._ensure_workers()
+            self._cond.notify_all()
+        return True
+
+    def clear_finished(self):
+        with self._cond:
+            for job_id in [j.id for j in self._jobs.values() if j.status in (DONE, CANCELLED)]:
+                del self._jobs[job_id]
+
+    def _next_job(self):
+        """Pop the highest-priority pending job whose host still has a free slot"""
+        background_running = sum(1 for job in self._running() if job.priority > PRIORITY_HIGH)
+        now = time.time()
+        best = None
+        for job in self._pending:
+            if self._host_active[job.host] >= self.max_per_host or job.deferred_until > now:
+                continue
+            if job.priority > PRIORITY_HIGH and background_running >= BACKGROUND_WORKERS:
+                continue
+            if best is None or job.priority < best.priority:
+                best = job
+                if job.priority == PRIORITY_HIGH:
+                    break
+        if best is not None:
+            self._pending.remove(best)
+        return best
+
+    def _finish(self, job, status, error=""):
+        job.status = status
+        job.error = error
+        job.finished = time.time()
+        if job.started is not None:
+            source = "store" if job.result and job.result.get("from_store") else "network"
+            labels = {"result": status, "source": source,
+                      "priority": "background" if job.priority > PRIORITY_HIGH else "interactive"}
+            metrics.record_span("download", job.finished - job.started, "ok" if status == DONE else "error",
+                                labels, job.started, file=job.filename, host=job.host, error=error,
+                                bytes=job.bytes_done, attempts=job.attempts)
+            if status == DONE:
+                metrics.inc("download_bytes", job.bytes_done, {"source": source})
+        job.done_event.set()
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                job = self._next_job()
+                while job is None:
+                    self._cond.wait(SPACE_RECHECK)  # Timed so deferred jobs get re-checked
+                    job = self._next_job()
+                job.status = RUNNING
+                job.attempts += 1
+                job.started = time.time()
+                self._host_active[job.host] += 1
+            try:
+                self._run(job)
+            finally:
+                with self._cond:
+                    self._host_active[job.host] -= 1
+                    if job.admitted:
+                        # Its reservation is gone, so jobs waiting for space may fit now
+                        job.admitted = False
+                        for waiting in self._pending:
+                            waiting.deferred_until = 0.0
+                    self._cond.notify_all()
+
+    def _record(self, job, sha256, source):
+        """Index a finished file; the download itself is done, so an index error only gets noted"""
+        try:
+            self.index.record(job.output_path, sha256, source)
+        except OSError as e:
+            job.result["index_error"] = str(e)  # Still in memory; the next save writes it
+
+    def _route(self, job):
+        """Move a finished file wherever the job's route callback says it belongs"""
+        if job.route is None:
+            return
+        destination = job.route(job.output_path)
+        if not destination or destination[1] == job.target_dir:
+            return
+        label, target_dir = destination
+        os.makedirs(target_dir, exist_ok=True)
+        new_path = os.path.join(target_dir, job.filename)
+        if os.path.exists(new_path) and self.index.sha256(new_path) == job.result["sha256"]:
+            # The same file is already there: keep it instead of a second copy
+            os.remove(job.output_path)
+        else:
+            # A different file with this name is never overwritten; this one gets a numbered name
+            stem, ext = os.path.splitext(job.filename)
+            number = 1
+            while os.path.exists(new_path):
+                new_path = os.path.join(target_dir, f"{stem}_{number}{ext}")
+                number += 1
+            os.replace(job.output_path, new_path)  # Same filesystem: a rename, not a copy
+        job.label, job.target_dir, job.output_path = label, target_dir, new_path
+        job.filename = os.path.basename(new_path)
+
+    def _outstanding(self, job):
+        """Bytes `job` still has to claim on disk: its size minus what its .part already holds"""
+        if not job.total or not job.output_path:
+            return 0
+        return max(0, job.total - allocated_bytes(job.output_path + ".part"))
+
+    def _admit(self, job):
+        """
+        Reserve disk space for `job` against everything already running.
+
+        Returns None once the job is admitted, or the reason it has to wait
+        while other downloads hold the space. Raises IOError when it cannot
+        fit even on its own, so it fails now instead of at 90%.
+        """
+        device = os.stat(job.target_dir).st_dev
+        with self._cond:
+            needed = self._outstanding(job)
+            free = free_bytes(job.target_dir)
+            if needed > free - self.min_free:
+                raise IOError(
+                    f"Not enough disk space: needs {format_bytes(needed)}, {format_bytes(free)} free "
+                    f"(keeping {format_bytes(self.min_free)} spare)"
+                )
+            reserved = sum(self._outstanding(other) for other in self._running()
+                           if other.admitted and os.stat(other.target_dir).st_dev == device)
+            if needed > free - reserved - self.min_free:
+                return (f"waiting for disk space: needs {format_bytes(needed)}, running downloads "
+                        f"still claim {format_bytes(reserved)} of {format_bytes(free)} free")
+            job.admitted = True
+            job.waiting = ""
+        return None
+
+    def _limits(self, job):
+        """Token buckets a job's bytes are paced by"""
+        limits = [self.bandwidth, job.limit]
+        if job.priority > PRIORITY_HIGH:
+            limits.append(self.background_bandwidth)
+        return limits
+
+    def _run(self, job):
+        try:
+            info = probe(job.url, job.headers)
+            if not job.filename:
+                job.filename = (
+                    info["filename"] or job.url.split("/")[-1].split("?")[0]
+                    or "downloaded_model.safetensors"
+                )
+            job.total = info["size"]
+            job.output_path = os.path.join(job.target_dir, job.filename)
+            os.makedirs(job.target_dir, exist_ok=True)
+            expected = job.sha256 or published_sha256(job.url, job.headers)
+
+            if has_blob(expected):
+                # Same weights are already on the volume; link instead of downloading
+                method = link_blob(expected, job.output_path)
+                size = os.path.getsize(job.output_path)
+                job.result = {"path": job.output_path, "size": size, "elapsed": 0.0,
+                              "connections": 0, "segmented": False, "bytes_per_sec": 0.0,
+                              "sha256": expected, "from_store": method}
+                job.bytes_done = job.total = size
+                job.verified = True
+                self._route(job)
+                job.result["path"] = job.output_path
+                self._record(job, expected, "store")
+                self._finish(job, DONE)
+                return
+
+            reason = self._admit(job)
+            if reason:
+                with self._cond:
+                    job.waiting = reason
+                    job.status = QUEUED
+                    job.attempts -= 1  # Waiting for space is not a failed attempt
+                    job.deferred_until = time.time() + SPACE_RECHECK
+                    self._pending.append(job)
+                return
+
+            connections = self.connections
+            if job.priority > PRIORITY_HIGH:
+                connections = min(connections, BACKGROUND_CONNECTIONS)
+            job.result = segmented_download(
+                job.url, job.output_path, connections=connections, headers=job.headers,
+                progress=job._on_progress, cancel_event=job.cancel_event, info=info,
+                limits=self._limits(job),
+            )
+            job.bytes_done = job.total = job.result["size"]
+            if expected and job.result["sha256"] != expected:
+                os.remove(job.output_path)
+                raise IOError(
+                    f"sha256 mismatch: got {job.result['sha256'][:12]}…, expected {expected[:12]}…"
+                )
+            job.sha256 = job.result["sha256"]
+            job.verified = bool(expected)
+            self._route(job)
+            job.result["path"] = job.output_path
+            try:
+                adopt(job.output_path, job.sha256)
+            except OSError:
+                pass  # The store is an optimisation; a plain file still works
+            self._record(job, job.sha256, "published" if expected else "download")
+            self._finish(job, DONE)
+        except DownloadCancelled:
+            if job.preempted:
+                # Paused for a higher-priority job: back in the queue, partial data is resumed
+                with self._cond:
+                    job.preempted = False
+                    job.cancel_event.clear()
+                    job.status = QUEUED
+                    job.attempts -= 1  # A pause is not a failed attempt
+                    self._pending.appendleft(job)
+                return
+            self._finish(job, CANCELLED)
+        except Exception as e:
+            self._finish(job, FAILED, str(e))
+
+    def format_status(self):
+        """Multi-line text summary of every job for the Gradio UI"""
+        jobs = self.jobs()
+        if not jobs:
+            return "📭 No downloads queued"
+        counts = collections.Counter(job.status for job in jobs)
+        total_speed = sum(job.speed for job in jobs if job.status == RUNNING)
+        lines = [job.describe() for job in jobs]
+        lines.append("")
+        lines.append(
+            f"Running: {counts[RUNNING]} | Queued: {counts[QUEUED]} | Done: {counts[DONE]} | "
+            f"Failed: {counts[FAILED]} | Cancelled: {counts[CANCELLED]} | "
+            f"Total: {format_bytes(total_speed)}/s"
+        )
+        return "\n".join(lines)
@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+"""
+Environment snapshots on the network volume
+Archives what first_run_setup.sh and the node installer put on a pod (the
+Python packages they installed and the custom nodes) as zstd tarballs on
+the volume. The next fresh pod unpacks them instead of installing
+everything again. Files are split into size-balanced shards so restoring
+decompresses and writes in parallel, and every shard is hash-checked before
+anything is unpacked. Snapshots are kept per Python/torch/architecture, so an image with
+a different base never restores packages built for another one.
+
+    env_snapshot.py snapshot [--if-changed]   archive this pod's environment
+    env_snapshot.py restore                   unpack the latest matching snapshot
+    env_snapshot.py status                    show the snapshot for this pod
+"""
+
+import contextlib
+import hashlib
+import json
+import os
+import platform
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from importlib import metadata
+
+import metrics
+from download_queue import format_bytes
+from node_git import head
+from node_installer import CUSTOM_NODES_DIR, LOCKFILE as NODES_LOCKFILE
+from volume_migrate import VOLUME_DIR
+from wheelhouse import BASE_PACKAGES, BASE_PREFIXES, canonical_name
+
+SNAPSHOT_DIR = os.environ.get("ENV_SNAPSHOT_DIR", os.path.join(VOLUME_DIR, ".env-snapshots"))
+SHARDS = int(os.environ.get("ENV_SNAPSHOT_SHARDS", "8"))
+ZSTD_LEVEL = int(os.environ.get("ENV_SNAPSHOT_ZSTD_LEVEL", "3"))
+SETUP_MARKERS = ("/workspace/.setup_complete", NODES_LOCKFILE)
+MANIFEST_NAME = "manifest.json"
+LATEST_NAME = "latest.json"
+HASH_CHUNK = 8 * 1024 * 1024
+
+
+def compat_key():
+    """Snapshots only restore on the same Python, torch and CPU architecture"""
+    try:
+        torch = f"torch{metadata.version('torch')}"
+    except metadata.PackageNotFoundError:
+        torch = "notorch"
+    key = f"py{sys.version_info[0]}.{sys.version_info[1]}-{torch}-{platform.machine()}"
+    return re.sub(r"[^A-Za-z0-9._-]", "_", key)
+
+
+def installed_distributions():
+    """{canonical name: distribution} of packages the base image doesn't provide"""
+    found = {}
+    for dist in metadata.distributions():
+        name = dist.metadata["Name"]
+        if not name:
+            continue
+        key = canonical_name(name)
+        if key not in BASE_PACKAGES and not key.startswith(BASE_PREFIXES) and key not in found:
+            found[key] = dist
+    return found
+
+
+def _tree_files(top, skip_dirs=("__pycache__",)):
+    for folder, dirs, names in os.walk(top):
+        dirs[:] = [d for d in dirs if d not in skip_dirs]
+        for name in names:
+            yield os.path.join(folder, name)
+
+
+def environment_files(custom_nodes_dir=CUSTOM_NODES_DIR):
+    """Absolute paths of everything setup added: installed packages' files, custom nodes, setup markers"""
+    files = set()
+    for dist in installed_distributions().values():
+        for path in dist.files or ():
+            files.add(os.path.normpath(str(dist.locate_file(path))))
+    if os.path.isdir(custom_nodes_dir):
+        files.update(_tree_files(custom_nodes_dir))
+    files.update(SETUP_MARKERS)
+    return sorted(path for path in files if os.path.isfile(path) or os.path.islink(path))
+
+
+def fingerprint(custom_nodes_dir=CUSTOM_NODES_DIR):
+    """Changes whenever a package version, a custom node's commit or any file of an untracked node changes"""
+    digest = hashlib.sha256()
+    for key, dist in sorted(installed_distributions().items()):
+        digest.update(f"{key}=={dist.version}\n".encode())
+    if os.path.isdir(custom_nodes_dir):
+        for entry in sorted(os.scandir(custom_nodes_dir), key=lambda e: e.name):
+            # A pack's folder mtime doesn't change when a file deeper down does (e.g. an
+            # in-place update), so use its commit, or every file's size and mtime without one
+            commit = head(entry.path) if entry.is_dir() else None
+            digest.update(f"{entry.name} {commit or ''}\n".encode())
+            if commit is None:
+                for path in sorted(_tree_files(entry.path) if entry.is_dir() else [entry.path]):
+                    st = os.lstat(path)
+                    digest.update(f"{path} {st.st_size} {st.st_mtime_ns}\n".encode())
+    return digest.hexdigest()[:16]
+
+
+def plan_shards(files, shards, root="/"):
+    """Split files into `shards` lists of about equal size (largest first onto the lightest shard)"""
+    sized = []
+    for path in files:
+        try:
+            sized.append((os.lstat(path).st_size, os.path.relpath(path, root)))
+        except OSError:
+            continue
+    plan = [{"files": [], "bytes": 0} for _ in range(max(1, min(shards, len(sized))))]
+    for size, relpath in sorted(sized, reverse=True):
+        lightest = min(plan, key=lambda shard: shard["bytes"])
+        lightest["files"].append(relpath)
+        lightest["bytes"] += size
+    return plan
+
+
+def _zstd():
+    if not shutil.which("zstd"):
+        raise RuntimeError("zstd is not installed (apt-get install zstd)")
+
+
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _write_shard(root, shard, path, level):
+    with tempfile.NamedTemporaryFile("w", suffix=".list", delete=False) as listing:
+        listing.write("\n".join(shard["files"]) + "\n")
+    try:
+        result = subprocess.run(["tar", "-C", root, "-I", f"zstd -{level} -T1 -q", "-cf", path,
+                                 "-T", listing.name], capture_output=True, text=True)
+    finally:
+        os.remove(listing.name)
+    if result.returncode != 0:
+        raise RuntimeError(f"tar failed for {os.path.basename(path)}: {result.stderr.strip()[-300:]}")
+    return {"file": os.path.basename(path), "files": len(shard["files"]), "bytes": shard["bytes"],
+            "size": os.path.getsize(path), "sha256": _file_sha256(path)}
+
+
+def create(files, dest, root="/", shards=SHARDS, level=ZSTD_LEVEL, workers=None, meta=None, log=print):
+    """
+    Archive `files` (absolute paths under `root`) into shard tarballs in the
+    new folder `dest`, written next to it first so a half-written snapshot
+    is never visible. Returns the manifest.
+    """
+    _zstd()
+    started = time.time()
+    plan = plan_shards(files, shards, root)
+    staging = f"{dest}.partial-{os.getpid()}"
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+    try:
+        with ThreadPoolExecutor(max_workers=workers or len(plan)) as pool:
+            entries = list(pool.map(lambda item: _write_shard(root, item[1], os.path.join(
+                staging, f"shard-{item[0]:02}.tar.zst"), level), enumerate(plan)))
+        manifest = dict(meta or {}, version=1, created=round(time.time(), 3), shards=entries,
+                        files=sum(e["files"] for e in entries), bytes=sum(e["bytes"] for e in entries),
+                        size=sum(e["size"] for e in entries), seconds=round(time.time() - started, 2))
+        with open(os.path.join(staging, MANIFEST_NAME), "w") as f:
+            json.dump(manifest, f, indent=1)
+        shutil.rmtree(dest, ignore_errors=True)
+        os.replace(staging, dest)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    log(f"🗜️  Snapshot: {manifest['files']} files, {format_bytes(manifest['bytes'])} → "
+        f"{format_bytes(manifest['size'])} in {len(entries)} shards ({manifest['seconds']:.1f}s)")
+    return manifest
+
+
+def _fetch_shard(folder, entry, staging):
+    """Copy one shard to local disk, hashing it on the way; raises on a bad hash"""
+    digest = hashlib.sha256()
+    local = os.path.join(staging, entry["file"])
+    with open(os.path.join(folder, entry["file"]), "rb") as src, open(local, "wb") as dst:
+        for chunk in iter(lambda: src.read(HASH_CHUNK), b""):
+            digest.update(chunk)
+            dst.write(chunk)
+    if digest.hexdigest() != entry["sha256"]:
+        raise RuntimeError(f"{entry['file']}: sha256 mismatch (snapshot corrupted)")
+    return local
+
+
+def _extract_shard(path, root):
+    result = subprocess.run(["tar", "-C", root, "-I", "zstd -d -T1 -q", "-xf", path],
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"{os.path.basename(path)}: tar failed: {result.stderr.strip()[-300:]}")
+
+
+def extract(folder, root="/", workers=SHARDS, log=print):
+    """
+    Unpack every shard of the snapshot in `folder` into `root`, in parallel;
+    returns the manifest.
+
+    Every shard is copied to local disk and hash-checked before anything is
+    unpacked, so a corrupted snapshot leaves `root` untouched. If unpacking
+    itself fails, the setup markers are removed again so the pod still runs
+    its normal setup.
+    """
+    _zstd()
+    started = time.time()
+    with open(os.path.join(folder, MANIFEST_NAME)) as f:
+        manifest = json.load(f)
+    os.makedirs(root, exist_ok=True)
+    staging = tempfile.mkdtemp(prefix="env-restore-")
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            shards = list(pool.map(lambda entry: _fetch_shard(folder, entry, staging), manifest["shards"]))
+            try:
+                list(pool.map(lambda path: _extract_shard(path, root), shards))
+            except BaseException:
+                for marker in SETUP_MARKERS:
+                    with contextlib.suppress(OSError):
+                        os.remove(os.path.join(root, os.path.relpath(marker, "/")))
+                raise
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+    elapsed = time.time() - started
+    log(f"📦 Restored {manifest['files']} files ({format_bytes(manifest['bytes'])}) from "
+        f"{len(manifest['shards'])} shards in {elapsed:.1f}s")
+    return manifest
+
+
+def latest(snapshot_dir=SNAPSHOT_DIR, compat=None):
+    """Folder of the newest snapshot for this pod's base, or None"""
+    compat = compat or compat_key()
+    try:
+        with open(os.path.join(snapshot_dir, compat, LATEST_NAME)) as f:
+            name = json.load(f)["name"]
+    except (OSError, ValueError, KeyError):
+        return None
+    folder = os.path.join(snapshot_dir, compat, name)
+    return folder if os.path.exists(os.path.join(folder, MANIFEST_NAME)) else None
+
+
+def snapshot(snapshot_dir=SNAPSHOT_DIR, if_changed=False, shards=SHARDS, log=print):
+    """Archive this pod's environment; returns the manifest, or None when unchanged"""
+    compat = compat_key()
+    key = fingerprint()
+    current = latest(snapshot_dir, compat)
+    if if_changed and current and os.path.basename(current) == key:
+        log(f"✅ Snapshot {compat}/{key} is up to date")
+        return None
+    with metrics.span("env_snapshot", shards=shards) as info:
+        manifest = create(environment_files(), os.path.join(snapshot_dir, compat, key), "/", shards,
+                          meta={"compat": compat, "fingerprint": key}, log=log)
+        info.update(bytes=manifest["bytes"], size=manifest["size"])
+    pointer = os.path.join(snapshot_dir, compat, LATEST_NAME)
+    with open(pointer + ".tmp", "w") as f:
+        json.dump({"name": key, "created": manifest["created"]}, f)
+    os.replace(pointer + ".tmp", pointer)
+    # Older snapshots for this base are superseded
+    for entry in os.scandir(os.path.join(snapshot_dir, compat)):
+        if entry.is_dir() and entry.name != key:
+            shutil.rmtree(entry.path, ignore_errors=True)
+    return manifest
+
+
+def restore(snapshot_dir=SNAPSHOT_DIR, root="/", workers=SHARDS, log=print):
+    """Unpack the latest snapshot for this base; returns success"""
+    folder = latest(snapshot_dir)
+    if folder is None:
+        log(f"⏭️  No environment snapshot for {compat_key()} in {snapshot_dir}")
+        return False
+    with metrics.span("env_restore") as info:
+        try:
+            manifest = extract(folder, root, workers, log)
+        except (OSError, RuntimeError) as e:
+            info.update(status="error", error=str(e))
+            log(f"❌ Restore failed: {e}")
+            return False
+        info.update(bytes=manifest["bytes"], shards=len(manifest["shards"]))
+    return True
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Snapshot/restore the set-up environment on the volume")
+    parser.add_argument("command", choices=["snapshot", "restore", "status"])
+    parser.add_argument("--dir", default=SNAPSHOT_DIR, help="Snapshot folder")
+    parser.add_argument("--if-changed", action="store_true", help="snapshot: skip if packages/nodes are unchanged")
+    parser.add_argument("--shards", type=int, default=SHARDS, help="Archives restored in parallel")
+    args = parser.parse_args(argv)
+
+    if args.command == "status":
+        folder = latest(args.dir)
+        if folder is None:
+            print(f"No snapshot for {compat_key()} in {args.dir}")
+            return 1
+        with open(os.path.join(folder, MANIFEST_NAME)) as f:
+            manifest = json.load(f)
+        state = "current" if manifest["fingerprint"] == fingerprint() else "outdated"
+        print(f"🗜️  {compat_key()}/{manifest['fingerprint']} ({state}): {manifest['files']} files, "
+              f"{format_bytes(manifest['bytes'])} in {format_bytes(manifest['size'])}, "
+              f"{len(manifest['shards'])} shards, taken {time.strftime('%Y-%m-%d %H:%M', time.localtime(manifest['created']))}")
+        return 0
+    try:
+        if args.command == "snapshot":
+            snapshot(args.dir, args.if_changed, args.shards)
+            return 0
+        return 0 if restore(args.dir, workers=args.shards) else 1
+    except (OSError, RuntimeError) as e:
+        print(f"❌ {e}")
+        return 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
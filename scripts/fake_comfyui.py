@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Fake ComfyUI for offline load tests
+Implements the parts of ComfyUI's API that the gateway and its clients use:
+POST /prompt, /queue, /history, /ws events, /view and /system_stats. It
+"executes" prompts one at a time without a GPU, using a simple cost model:
+a fixed overhead per prompt, a load delay whenever a prompt needs model
+files that aren't loaded, and a fixed time per distinct sampler node. Node types starting
+with "Invalid" fail validation and "FakeError" fails at run time, which
+exercises the error paths.
+"""
+
+import asyncio
+import collections
+import itertools
+import json
+import time
+import uuid
+
+from gateway import model_inputs
+
+OUTPUT_TYPES = {"SaveImage", "PreviewImage", "VHS_VideoCombine"}
+# 1x1 transparent PNG served for every /view request
+PIXEL = bytes.fromhex("89504e470d0a1a0a0000000d4948445200000001000000010806000000"
+                      "1f15c4890000000d49444154789c6360000002000001e221bc330000000049454e44ae426082")
+
+
+class FakeComfyUI:
+    def __init__(self, overhead=0.2, load=1.5, sampler=0.5, scale=1.0, log=print):
+        self.overhead = overhead * scale
+        self.load = load * scale
+        self.sampler = sampler * scale
+        self.log = log
+        self.queue = collections.deque()  # (number, prompt_id, prompt, client_id)
+        self.running = None
+        self.history = {}
+        self.sockets = {}  # client_id -> set of WebSockets
+        self.numbers = itertools.count()
+        self.loaded = None
+        self.wake = None
+        self.stats = collections.Counter()
+
+    async def send(self, client_id, kind, data):
+        for ws in list(self.sockets.get(client_id, ())):
+            try:
+                await ws.send_str(json.dumps({"type": kind, "data": data}))
+            except (ConnectionError, RuntimeError):
+                self.sockets[client_id].discard(ws)
+
+    async def worker(self):
+        while True:
+            if not self.queue:
+                self.wake.clear()
+                await self.wake.wait()
+                continue
+            number, prompt_id, prompt, client_id = self.queue.popleft()
+            self.running = (number, prompt_id, prompt, client_id)
+            started = time.time()
+            await self.send(client_id, "execution_start", {"prompt_id": prompt_id})
+
+            cost = self.overhead
+            models = set(model_inputs(prompt))
+            if self.loaded is None or not models <= self.loaded:
+                cost += self.load
+                self.loaded = models
+                self.stats["model_loads"] += 1
+            outputs = {}
+            error = None
+            for node_id, node in prompt.items():
+                if node["class_type"] == "FakeError":
+                    error = {"prompt_id": prompt_id, "node_id": node_id, "node_type": "FakeError",
+                             "exception_message": "fake failure", "exception_type": "RuntimeError"}
+                    break
+                if "Sampler" in node["class_type"]:
+                    cost += self.sampler
+                if node["class_type"] in OUTPUT_TYPES:
+                    prefix = node.get("inputs", {}).get("filename_prefix", "ComfyUI")
+                    outputs[node_id] = {"images": [{"filename": f"{prefix}_{number:05}_{node_id}.png",
+                                                    "subfolder": "", "type": "output"}]}
+            await self.send(client_id, "executing", {"node": next(iter(prompt)), "prompt_id": prompt_id})
+            await asyncio.sleep(cost)
+
+            messages = [["execution_start", {"prompt_id": prompt_id, "timestamp": started}]]
+            if error:
+                messages.append(["execution_error", error])
+            self.history[prompt_id] = {
+                "prompt": [number, prompt_id, prompt, {"client_id": client_id}, list(outputs)],
+                "outputs": {} if error else outputs,
+                "status": {"status_str": "error" if error else "success", "completed": not error,
+                           "messages": messages},
+            }
+            self.running = None
+            self.stats["prompts"] += 1
+            self.stats["busy_seconds"] += cost
+            if error:
+                await self.send(client_id, "execution_error", error)
+            else:
+                for node_id, output in outputs.items():
+                    await self.send(client_id, "executed", {"node": node_id, "output": output,
+                                                            "prompt_id": prompt_id})
+                await self.send(client_id, "executing", {"node": None, "prompt_id": prompt_id})
+                await self.send(client_id, "execution_success", {"prompt_id": prompt_id})
+
+
+def build_app(fake):
+    from aiohttp import WSMsgType, web
+
+    async def prompt(request):
+        try:
+            body = await request.json()
+            graph = body["prompt"]
+            classes = [node["class_type"] for node in graph.values()]
+        except (ValueError, KeyError, TypeError, AttributeError):
+            return web.json_response({"error": {"type": "invalid_prompt", "message": "Invalid prompt"},
+                                      "node_errors": {}}, status=400)
+        invalid = {node_id: {"errors": [{"message": "Invalid node"}]} for node_id, node in graph.items()
+                   if node["class_type"].startswith("Invalid")}
+        if invalid:
+            return web.json_response({"error": {"type": "prompt_outputs_failed_validation",
+                                                "message": "Prompt outputs failed validation"},
+                                      "node_errors": invalid}, status=400)
+        prompt_id = str(uuid.uuid4())
+        number = next(fake.numbers)
+        fake.queue.append((number, prompt_id, graph, body.get("client_id")))
+        fake.wake.set()
+        fake.stats["nodes"] += len(classes)
+        return web.json_response({"prompt_id": prompt_id, "number": number, "node_errors": {}})
+
+    async def queue(request):
+        return web.json_response({
+            "queue_running": [list(fake.running[:3])] if fake.running else [],
+            "queue_pending": [list(entry[:3]) for entry in fake.queue],
+        })
+
+    async def history(request):
+        prompt_id = request.match_info["prompt_id"]
+        entry = fake.history.get(prompt_id)
+        return web.json_response({prompt_id: entry} if entry else {})
+
+    async def ws_handler(request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        client_id = request.query.get("clientId") or uuid.uuid4().hex
+        fake.sockets.setdefault(client_id, set()).add(ws)
+        await ws.send_str(json.dumps({"type": "status", "data": {"sid": client_id, "status": {
+            "exec_info": {"queue_remaining": len(fake.queue)}}}}))
+        try:
+            async for msg in ws:
+                if msg.type == WSMsgType.ERROR:
+                    break
+        finally:
+            fake.sockets[client_id].discard(ws)
+        return ws
+
+    async def view(request):
+        return web.Response(body=PIXEL, content_type="image/png")
+
+    async def system_stats(request):
+        return web.json_response({"system": {"comfyui_version": "fake"}, "devices": [],
+                                  "fake": dict(fake.stats)})
+
+    async def on_startup(app):
+        fake.wake = asyncio.Event()
+        app["worker"] = asyncio.ensure_future(fake.worker())
+
+    async def on_cleanup(app):
+        app["worker"].cancel()
+        await asyncio.gather(app["worker"], return_exceptions=True)
+
+    app = web.Application(client_max_size=32 * 2 ** 20)
+    app.add_routes([
+        web.post("/prompt", prompt),
+        web.get("/queue", queue),
+        web.get("/history/{prompt_id}", history),
+        web.get("/ws", ws_handler),
+        web.get("/view", view),
+        web.get("/system_stats", system_stats),
+    ])
+    app.on_startup.append(on_startup)
+    app.on_cleanup.append(on_cleanup)
+    return app
+
+
+def main(argv=None):
+    import argparse
+
+    from aiohttp import web
+
+    parser = argparse.ArgumentParser(description="Serve a fake ComfyUI API for offline gateway load tests")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8188)
+    parser.add_argument("--overhead", type=float, default=0.2, help="Seconds per prompt")
+    parser.add_argument("--load", type=float, default=1.5, help="Seconds to switch model files")
+    parser.add_argument("--sampler", type=float, default=0.5, help="Seconds per sampler node")
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiplies every delay")
+    args = parser.parse_args(argv)
+
+    print(f"🧪 Fake ComfyUI on port {args.port}")
+    web.run_app(build_app(FakeComfyUI(args.overhead, args.load, args.sampler, args.scale)),
+                host=args.host, port=args.port, access_log=None, print=None)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -8,6 +8,7 @@ set +e  # Don't exit on errors - CRITICAL!
 
 SETUP_COMPLETE_FLAG="/workspace/.setup_complete"
 SETUP_LOG="/workspace/first_run_setup.log"
+METRICS="python3 /workspace/scripts/metrics.py"
 
 # Check if setup has already been completed
 if [ -f "$SETUP_COMPLETE_FLAG" ]; then
@@ -18,55 +19,68 @@ fi
 echo "=========================================" | tee "$SETUP_LOG"
 echo "FIRST RUN SETUP - Installing Dependencies" | tee -a "$SETUP_LOG"
 echo "=========================================" | tee -a "$SETUP_LOG"
-echo "This will take 5-10 minutes using RunPod's fast internet" | tee -a "$SETUP_LOG"
+echo "First pod on a volume: 5-10 minutes; afterwards installs offline from the wheelhouse" | tee -a "$SETUP_LOG"
 echo "Pod will start even if some packages fail to install" | tee -a "$SETUP_LOG"
 echo "" | tee -a "$SETUP_LOG"
 
-# Install Jupyter and Gradio first (needed for UI)
-echo "📦 [1/5] Installing Jupyter and Gradio..." | tee -a "$SETUP_LOG"
-pip install --no-cache-dir \
-    jupyter \
-    jupyterlab \
-    notebook \
-    gradio 2>&1 | tee -a "$SETUP_LOG" || echo "⚠️ Some packages failed, continuing..." | tee -a "$SETUP_LOG"
+# Online install, used only when the wheelhouse can't be built or installed
+online_install() {
+    # Install Jupyter and Gradio first (needed for UI)
+    echo "📦 Installing Jupyter and Gradio..." | tee -a "$SETUP_LOG"
+    $METRICS span pip --label command=install --label via=online -- pip install --no-cache-dir \
+        jupyter \
+        jupyterlab \
+        notebook \
+        gradio 2>&1 | tee -a "$SETUP_LOG" || echo "⚠️ Some packages failed, continuing..." | tee -a "$SETUP_LOG"
 
-# Install ComfyUI dependencies
-echo "📦 [2/5] Installing ComfyUI dependencies..." | tee -a "$SETUP_LOG"
-cd /workspace/ComfyUI
-pip install --no-cache-dir -r requirements.txt 2>&1 | tee -a "$SETUP_LOG" || echo "⚠️ Some packages failed, continuing..." | tee -a "$SETUP_LOG"
+    # Install ComfyUI dependencies
+    echo "📦 Installing ComfyUI dependencies..." | tee -a "$SETUP_LOG"
+    cd /workspace/ComfyUI
+    $METRICS span pip --label command=install --label via=online -- pip install --no-cache-dir -r requirements.txt 2>&1 | tee -a "$SETUP_LOG" || echo "⚠️ Some packages failed, continuing..." | tee -a "$SETUP_LOG"
 
-# Install additional video processing packages
-echo "📦 [3/5] Installing video processing packages..." | tee -a "$SETUP_LOG"
-pip install --no-cache-dir \
-    opencv-python \
-    imageio \
-    imageio-ffmpeg \
-    av \
-    moviepy \
-    insightface \
-    onnxruntime-gpu 2>&1 | tee -a "$SETUP_LOG" || echo "⚠️ Some packages failed, continuing..." | tee -a "$SETUP_LOG"
+    # Install additional video processing packages
+    echo "📦 Installing video processing packages..." | tee -a "$SETUP_LOG"
+    $METRICS span pip --label command=install --label via=online -- pip install --no-cache-dir \
+        opencv-python \
+        imageio \
+        imageio-ffmpeg \
+        av \
+        moviepy \
+        insightface \
+        onnxruntime-gpu 2>&1 | tee -a "$SETUP_LOG" || echo "⚠️ Some packages failed, continuing..." | tee -a "$SETUP_LOG"
 
-# Fix numpy version compatibility (opencv-python upgrades to 2.x which breaks scipy/ComfyUI)
-echo "🔧 Fixing numpy version compatibility..." | tee -a "$SETUP_LOG"
-pip install --no-cache-dir 'numpy<2.0' --force-reinstall 2>&1 | tee -a "$SETUP_LOG" || echo "⚠️ Numpy downgrade failed, continuing..." | tee -a "$SETUP_LOG"
+    # Fix numpy version compatibility (opencv-python upgrades to 2.x which breaks scipy/ComfyUI)
+    echo "🔧 Fixing numpy version compatibility..." | tee -a "$SETUP_LOG"
+    $METRICS span pip --label command=install --label via=online -- pip install --no-cache-dir 'numpy<2.0' --force-reinstall 2>&1 | tee -a "$SETUP_LOG" || echo "⚠️ Numpy downgrade failed, continuing..." | tee -a "$SETUP_LOG"
+}
+
+# Install Python dependencies from the wheelhouse on the volume (offline, hash-checked).
+# The first pod on a volume resolves and builds it; later pods reinstall in seconds.
+echo "📦 [1/3] Installing Python dependencies from the wheelhouse..." | tee -a "$SETUP_LOG"
+$METRICS span setup_step --label step=wheelhouse -- python3 /workspace/scripts/wheelhouse.py sync 2>&1 | tee -a "$SETUP_LOG"
+if [ "${PIPESTATUS[0]}" -ne 0 ]; then
+    echo "⚠️ Wheelhouse unavailable, falling back to online install..." | tee -a "$SETUP_LOG"
+    STEP_START=$(date +%s.%N)
+    online_install
+    $METRICS record setup_step --since "$STEP_START" --label step=online_install
+fi
 
 # Install ComfyUI Manager
-echo "📦 [4/5] Installing ComfyUI Manager..." | tee -a "$SETUP_LOG"
+echo "📦 [2/3] Installing ComfyUI Manager..." | tee -a "$SETUP_LOG"
+# (checked out from the shared git cache, keeping .git so it can update itself)
 cd /workspace/ComfyUI/custom_nodes
 if [ ! -d "ComfyUI-Manager" ]; then
-    git clone --depth 1 https://github.com/ltdrdata/ComfyUI-Manager.git 2>&1 | tee -a "$SETUP_LOG" || echo "⚠️ ComfyUI-Manager clone failed, continuing..." | tee -a "$SETUP_LOG"
-    if [ -d "ComfyUI-Manager" ]; then
-        cd ComfyUI-Manager
-        rm -rf .git
-        cd ..
-    fi
+    $METRICS span node_clone --label node=ComfyUI-Manager -- \
+        python3 /workspace/scripts/node_git.py clone https://github.com/ltdrdata/ComfyUI-Manager.git 2>&1 | tee -a "$SETUP_LOG" || echo "⚠️ ComfyUI-Manager clone failed, continuing..." | tee -a "$SETUP_LOG"
 fi
 
 # Cleanup (never fails)
-echo "🧹 [5/5] Cleaning up..." | tee -a "$SETUP_LOG"
+echo "🧹 [3/3] Cleaning up..." | tee -a "$SETUP_LOG"
+STEP_START=$(date +%s.%N)
 rm -rf /root/.cache/pip /tmp/* /var/tmp/* 2>/dev/null || true
 find /usr/local/lib/python3.10/dist-packages -type d -name "tests" -exec rm -rf {} + 2>/dev/null || true
 find /usr/local/lib/python3.10/dist-packages -type d -name "test" -exec rm -rf {} + 2>/dev/null || true
+$METRICS record setup_step --since "$STEP_START" --label step=cleanup
 
 # ALWAYS mark setup as complete - even if errors occurred
 touch "$SETUP_COMPLETE_FLAG"
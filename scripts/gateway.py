@@ -0,0 +1,721 @@
+#!/usr/bin/env python3
+"""
+ComfyUI job gateway
+Accepts API-format prompts on its own port, applies per-client rate limits
+and a bounded queue, and merges prompts that share a workflow graph and
+checkpoint into one ComfyUI submission in which identical nodes, such as
+the loaders and shared text encodes, run once. Batches that use the models
+ComfyUI already has loaded go first, within fairness bounds, so interleaved
+jobs for different checkpoints don't reload weights every time. Each job's
+outputs are split back out and pushed to its client over WebSocket. aiohttp, which ComfyUI
+already depends on, is imported only when the server starts.
+"""
+
+import asyncio
+import collections
+import hashlib
+import json
+import os
+import re
+import time
+import uuid
+
+import metrics
+
+COMFYUI_URL = os.environ.get("GATEWAY_COMFYUI_URL", "http://127.0.0.1:8188")
+GATEWAY_HOST = os.environ.get("GATEWAY_HOST", "0.0.0.0")
+GATEWAY_PORT = int(os.environ.get("GATEWAY_PORT", "8190"))
+MAX_BATCH = int(os.environ.get("GATEWAY_MAX_BATCH", "8"))
+BATCH_WINDOW = float(os.environ.get("GATEWAY_BATCH_WINDOW_MS", "50")) / 1000
+MAX_IN_FLIGHT = int(os.environ.get("GATEWAY_MAX_IN_FLIGHT", "2"))  # One running, one waiting in ComfyUI
+MAX_QUEUED = int(os.environ.get("GATEWAY_MAX_QUEUED", "256"))
+CLIENT_RATE = float(os.environ.get("GATEWAY_CLIENT_RATE", "2"))  # Jobs/sec per client (0 = unlimited)
+CLIENT_BURST = float(os.environ.get("GATEWAY_CLIENT_BURST", "20"))
+POLL_INTERVAL = 2.0
+LOST_AFTER = 10.0  # Seconds before a prompt missing from ComfyUI's queue and history counts as lost
+RETRY_DELAY = 2.0
+MAX_ATTEMPTS = 3
+RESULTS_KEPT = 1000
+# Model affinity: a batch needing other models may be passed over this many times, or for this long
+AFFINITY_MAX_SKIPS = int(os.environ.get("GATEWAY_AFFINITY_MAX_SKIPS", "4"))  # 0 = plain FIFO
+AFFINITY_MAX_WAIT = float(os.environ.get("GATEWAY_AFFINITY_MAX_WAIT", "120"))
+SWAP_SECONDS = float(os.environ.get("GATEWAY_SWAP_SECONDS", "20"))  # Reload cost until one is measured
+TIMINGS_KEPT = 100
+
+QUEUED, SUBMITTED, RUNNING, DONE, FAILED, CANCELLED = \
+    "queued", "submitted", "running", "done", "failed", "cancelled"
+
+# Inputs naming model files: prompts only batch together when these match
+MODEL_INPUT_RE = re.compile(r"(ckpt|unet|lora|vae|clip|control_net|model|ipadapter)_(name|file)\d*$")
+# Loaders with a differently named input (WanVideoModelLoader's "model") are caught by extension
+MODEL_EXTENSIONS = (".safetensors", ".sft", ".ckpt", ".pt", ".pt2", ".pth", ".bin", ".gguf", ".onnx")
+
+
+class PromptError(ValueError):
+    """The prompt isn't a valid API-format graph"""
+
+
+class Rejected(Exception):
+    """The gateway won't take the job right now (rate limited or queue full)"""
+
+    def __init__(self, status, message, retry_after):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+def _is_link(value, prompt):
+    return (isinstance(value, list) and len(value) == 2 and isinstance(value[1], int)
+            and str(value[0]) in prompt)
+
+
+def topological_order(prompt):
+    """Node ids with every node after the nodes it takes inputs from; raises PromptError"""
+    if not isinstance(prompt, dict) or not prompt:
+        raise PromptError("prompt must be a non-empty object of nodes")
+    dependents = {node_id: [] for node_id in prompt}
+    waiting = {}
+    for node_id, node in prompt.items():
+        if not isinstance(node, dict) or not isinstance(node.get("class_type"), str):
+            raise PromptError(f"node {node_id} has no class_type")
+        inputs = node.get("inputs") or {}
+        if not isinstance(inputs, dict):
+            raise PromptError(f"node {node_id} inputs must be an object")
+        sources = {str(value[0]) for value in inputs.values() if _is_link(value, prompt)}
+        waiting[node_id] = len(sources)
+        for source in sources:
+            dependents[source].append(node_id)
+    ready = collections.deque(node_id for node_id, count in waiting.items() if count == 0)
+    order = []
+    while ready:
+        node_id = ready.popleft()
+        order.append(node_id)
+        for dependent in dependents[node_id]:
+            waiting[dependent] -= 1
+            if waiting[dependent] == 0:
+                ready.append(dependent)
+    if len(order) < len(prompt):
+        raise PromptError("prompt graph has a cycle")
+    return order
+
+
+def _is_model_input(name, value):
+    return isinstance(value, str) and (MODEL_INPUT_RE.search(name) is not None
+                                       or value.lower().endswith(MODEL_EXTENSIONS))
+
+
+def model_inputs(prompt):
+    """Model filenames a prompt loads (values of ckpt_name, unet_name, lora_name, ...)"""
+    return sorted({value for node in prompt.values() for name, value in (node.get("inputs") or {}).items()
+                   if _is_model_input(name, value)})
+
+
+def batch_key(prompt):
+    """
+    Graph shape plus model files: prompts with the same key differ only in
+    literal inputs (text, seed, size...) and can share one submission.
+    """
+    order = topological_order(prompt)
+    index = {node_id: position for position, node_id in enumerate(order)}
+    shape = []
+    for node_id in order:
+        inputs = []
+        for name, value in sorted((prompt[node_id].get("inputs") or {}).items()):
+            if _is_link(value, prompt):
+                inputs.append([name, index[str(value[0])], value[1]])
+            elif _is_model_input(name, value):
+                inputs.append([name, value])
+        shape.append([prompt[node_id]["class_type"], inputs])
+    return hashlib.sha1(json.dumps(shape).encode()).hexdigest()[:16]
+
+
+def merge_prompts(prompts):
+    """
+    Combine prompts into one graph, with nodes that have the same class and
+    the same inputs (after remapping links) merged into one.
+
+    Returns (merged prompt, [{original node id: merged node id}] per prompt).
+    """
+    merged = {}
+    mappings = []
+    canonical_ids = {}
+    for prompt in prompts:
+        mapping = {}
+        for node_id in topological_order(prompt):
+            node = prompt[node_id]
+            inputs = {}
+            for name, value in (node.get("inputs") or {}).items():
+                inputs[name] = [mapping[str(value[0])], value[1]] if _is_link(value, prompt) else value
+            canonical = json.dumps([node["class_type"], inputs], sort_keys=True)
+            if canonical not in canonical_ids:
+                canonical_ids[canonical] = str(len(merged) + 1)
+                merged[canonical_ids[canonical]] = dict(node, inputs=inputs)
+            mapping[node_id] = canonical_ids[canonical]
+        mappings.append(mapping)
+    return merged, mappings
+
+
+def split_outputs(outputs, mapping):
+    """One job's outputs, keyed by its own node ids, from the merged prompt's outputs"""
+    return {node_id: outputs[merged_id] for node_id, merged_id in mapping.items() if merged_id in outputs}
+
+
+class RateLimiter:
+    """Per-client token buckets: `rate` jobs/sec sustained with bursts of `burst`"""
+
+    def __init__(self, rate=CLIENT_RATE, burst=CLIENT_BURST):
+        self.rate = float(rate or 0)
+        self.burst = float(burst or max(self.rate, 1.0))
+        self.buckets = {}  # client -> (tokens, updated)
+
+    def check(self, client, now=None):
+        """0 when `client` may submit now (and takes a token), else seconds until it may"""
+        if not self.rate:
+            return 0.0
+        now = time.monotonic() if now is None else now
+        tokens, updated = self.buckets.get(client, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        if tokens < 1:
+            self.buckets[client] = (tokens, now)
+            return (1 - tokens) / self.rate
+        self.buckets[client] = (tokens - 1, now)
+        if len(self.buckets) > 10000:
+            # Forget clients whose bucket has refilled anyway
+            refill = self.burst / self.rate
+            self.buckets = {c: b for c, b in self.buckets.items() if now - b[1] < refill}
+        return 0.0
+
+
+class Job:
+    """One submitted prompt and, once it ran, its outputs"""
+
+    def __init__(self, prompt, client, key):
+        self.id = uuid.uuid4().hex
+        self.prompt = prompt
+        self.client = client
+        self.key = key
+        self.models = frozenset(model_inputs(prompt))
+        self.status = QUEUED
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.outputs = None
+        self.error = None
+        self.batch_size = None
+        self.attempts = 0
+
+    def describe(self):
+        return {
+            "job_id": self.id, "client_id": self.client, "status": self.status,
+            "created": self.created, "started": self.started, "finished": self.finished,
+            "batch_size": self.batch_size, "outputs": self.outputs, "error": self.error,
+        }
+
+
+class Batch:
+    """Jobs sent to ComfyUI as one merged prompt"""
+
+    def __init__(self, jobs, prompt, mappings, swap=False):
+        self.jobs = jobs
+        self.prompt = prompt
+        self.mappings = mappings
+        self.swap = swap  # ComfyUI has to load other models first
+        self.prompt_id = None
+        self.submitted = time.time()
+        self.started = None
+        self.running = False
+        self.done = False
+
+
+class Gateway:
+    """
+    Queue, batcher and result router in front of one ComfyUI.
+
+    Jobs wait in per-key buckets. While ComfyUI is busy (MAX_IN_FLIGHT
+    prompts submitted) they accumulate, so bursts batch up without added
+    latency; when it's idle, a partial bucket waits at most BATCH_WINDOW
+    for company.
+
+    Among buckets ready to go, one whose models are those of the last
+    submission (what ComfyUI will have loaded) goes ahead of older ones,
+    unless the oldest job has already been passed over `max_skips` times
+    or has waited `max_wait` seconds.
+    """
+
+    def __init__(self, comfyui_url=COMFYUI_URL, max_batch=MAX_BATCH, window=BATCH_WINDOW,
+                 max_in_flight=MAX_IN_FLIGHT, max_queued=MAX_QUEUED, rate=CLIENT_RATE, burst=CLIENT_BURST,
+                 max_skips=AFFINITY_MAX_SKIPS, max_wait=AFFINITY_MAX_WAIT, log=print):
+        self.comfyui_url = comfyui_url.rstrip("/")
+        self.max_batch = max(1, max_batch)
+        self.window = window
+        self.max_in_flight = max(1, max_in_flight)
+        self.max_queued = max_queued
+        self.limiter = RateLimiter(rate, burst)
+        self.max_skips = max_skips
+        self.max_wait = max_wait
+        self.log = log
+        self.client_id = f"gateway-{uuid.uuid4().hex[:8]}"
+        self.jobs = collections.OrderedDict()  # Recent jobs, oldest first
+        self.pending = collections.OrderedDict()  # batch key -> deque of queued jobs
+        self.in_flight = {}  # ComfyUI prompt_id -> Batch
+        self.subscribers = {}  # client -> set of WebSockets
+        self.counts = collections.Counter()
+        self.loaded = None  # Models of the last submission; None until known
+        self.skipping = None  # Job being passed over for model affinity, and how often it was
+        self.skips = 0
+        self.warm_timings = collections.deque(maxlen=TIMINGS_KEPT)  # (seconds, jobs) per batch
+        self.swap_timings = collections.deque(maxlen=TIMINGS_KEPT)
+        self.session = None
+        self.wake = None
+
+    # Queue -----------------------------------------------------------------
+
+    def queued(self):
+        return sum(len(jobs) for jobs in self.pending.values())
+
+    def submit(self, prompt, client):
+        """Validate and queue a prompt; raises PromptError or Rejected"""
+        key = batch_key(prompt)
+        retry_after = self.limiter.check(client)
+        if retry_after:
+            self.counts["rate_limited"] += 1
+            raise Rejected(429, f"rate limit: {self.limiter.rate:g} jobs/s per client", retry_after)
+        if self.queued() >= self.max_queued:
+            self.counts["queue_full"] += 1
+            raise Rejected(503, f"gateway queue is full ({self.max_queued} jobs)", RETRY_DELAY)
+        job = Job(prompt, client, key)
+        self.jobs[job.id] = job
+        while len(self.jobs) > RESULTS_KEPT and next(iter(self.jobs.values())).finished:
+            self.jobs.popitem(last=False)
+        self.pending.setdefault(key, collections.deque()).append(job)
+        self.counts["accepted"] += 1
+        self._wake()
+        return job
+
+    def cancel(self, job_id):
+        """Drop a job that hasn't been sent to ComfyUI yet; returns success"""
+        job = self.jobs.get(job_id)
+        if not job or job.status != QUEUED:
+            return False
+        bucket = self.pending.get(job.key)
+        if bucket and job in bucket:
+            bucket.remove(job)
+            if not bucket:
+                del self.pending[job.key]
+        job.status, job.finished = CANCELLED, time.time()
+        return True
+
+    def _requeue(self, jobs, solo=False):
+        """Put jobs back at the front of the queue (alone, when their batch failed as a whole)"""
+        for job in reversed(jobs):
+            job.status, job.batch_size = QUEUED, None
+            key = f"solo:{job.id}" if solo else job.key
+            self.pending.setdefault(key, collections.deque()).appendleft(job)
+            self.pending.move_to_end(key, last=False)
+        self._wake()
+
+    def needs_load(self, models):
+        """True when running a job for `models` would make ComfyUI load other weights"""
+        return self.loaded is None or not models <= self.loaded
+
+    def next_batch(self, now=None):
+        """
+        Jobs to submit together now: the oldest ready bucket, or an older-
+        than-the-rest one that needs no model swap. Returns (jobs, 0.0), or
+        ([], seconds until a partial bucket's window closes).
+        """
+        now = time.time() if now is None else now
+        oldest, warm, delay = None, None, None
+        for key, jobs in self.pending.items():
+            age = now - jobs[0].created
+            if len(jobs) >= self.max_batch or age >= self.window or key.startswith("solo:"):
+                if oldest is None or jobs[0].created < self.pending[oldest][0].created:
+                    oldest = key
+                if not self.needs_load(jobs[0].models) and \
+                        (warm is None or jobs[0].created < self.pending[warm][0].created):
+                    warm = key
+            else:
+                delay = min(delay if delay is not None else self.window, self.window - age)
+        if oldest is None:
+            return [], delay
+        ready = oldest
+        first = self.pending[oldest][0]
+        if warm is not None and warm != oldest and self.needs_load(first.models):
+            if self.skipping != first.id:
+                self.skipping, self.skips = first.id, 0
+            if self.skips < self.max_skips and now - first.created < self.max_wait:
+                if self.skips == 0:
+                    # Under FIFO this job's models would load now and the current ones again after
+                    self.counts["swaps_avoided"] += 1
+                    metrics.inc("gateway_swaps_avoided")
+                self.skips += 1
+                self.counts["reordered"] += 1
+                ready = warm
+        jobs = self.pending[ready]
+        batch = [jobs.popleft() for _ in range(min(len(jobs), self.max_batch))]
+        if not jobs:
+            del self.pending[ready]
+        return batch, 0.0
+
+    def _wake(self):
+        if self.wake is not None:
+            self.wake.set()
+
+    # ComfyUI ---------------------------------------------------------------
+
+    async def dispatch_loop(self):
+        while True:
+            self.wake.clear()
+            delay = None
+            if self.pending and len(self.in_flight) < self.max_in_flight:
+                jobs, delay = self.next_batch()
+                if jobs:
+                    await self._submit(jobs)
+                    continue
+            try:
+                await asyncio.wait_for(self.wake.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _submit(self, jobs):
+        from aiohttp import ClientError
+
+        prompt, mappings = merge_prompts([job.prompt for job in jobs])
+        models = frozenset().union(*(job.models for job in jobs))
+        batch = Batch(jobs, prompt, mappings, swap=self.needs_load(models))
+        for job in jobs:
+            job.attempts += 1
+        try:
+            async with self.session.post(f"{self.comfyui_url}/prompt",
+                                         json={"prompt": prompt, "client_id": self.client_id}) as resp:
+                body = await resp.json(content_type=None)
+                status = resp.status
+        except (ClientError, OSError, asyncio.TimeoutError, ValueError) as e:
+            # ComfyUI down or restarting: keep the jobs and try again shortly
+            self.log(f"⚠️  ComfyUI unreachable ({e}); {len(jobs)} jobs wait")
+            self._requeue(jobs)
+            await asyncio.sleep(RETRY_DELAY)
+            return
+        if status >= 500:
+            self._requeue(jobs)
+            await asyncio.sleep(RETRY_DELAY)
+            return
+        if status != 200 or not body.get("prompt_id"):
+            error = body.get("error") or {}
+            message = error.get("message") if isinstance(error, dict) else str(error)
+            if len(jobs) > 1:
+                # One bad prompt rejects the whole merged graph: find it by sending each alone
+                self._requeue(jobs, solo=True)
+            else:
+                await self._complete(jobs[0], FAILED, error=f"ComfyUI rejected the prompt: {message or status}")
+            return
+
+        batch.prompt_id = body["prompt_id"]
+        self.in_flight[batch.prompt_id] = batch
+        if batch.swap:
+            self.counts["model_loads"] += 1
+            metrics.inc("gateway_model_loads")
+            self.loaded = models  # ComfyUI runs prompts in order, so these are loaded next
+        self.counts["batches"] += 1
+        self.counts["batched_jobs"] += len(jobs)
+        for job in jobs:
+            job.status, job.batch_size = SUBMITTED, len(jobs)
+            await self.publish(job, "submitted")
+
+    async def _history(self, prompt_id):
+        async with self.session.get(f"{self.comfyui_url}/history/{prompt_id}") as resp:
+            history = await resp.json(content_type=None)
+        return (history or {}).get(prompt_id)
+
+    async def _queue_ids(self):
+        async with self.session.get(f"{self.comfyui_url}/queue") as resp:
+            queue = await resp.json(content_type=None)
+        return {entry[1] for name in ("queue_running", "queue_pending") for entry in queue.get(name, [])
+                if isinstance(entry, list) and len(entry) > 1}
+
+    async def _finish(self, batch, entry):
+        if batch.done:
+            return
+        batch.done = True
+        self.in_flight.pop(batch.prompt_id, None)
+        self._wake()
+        status = entry.get("status") or {}
+        error = None
+        if status.get("status_str") == "error":
+            error = "execution failed"
+            for message in status.get("messages") or []:
+                if message[0] == "execution_error":
+                    error = f"{message[1].get('node_type')}: {message[1].get('exception_message', '').strip()}"
+                elif message[0] == "execution_interrupted":
+                    error = "interrupted"
+        if error and len(batch.jobs) > 1 and error != "interrupted":
+            self._requeue(batch.jobs, solo=True)
+            return
+        metrics.record_span("gateway_batch", time.time() - batch.submitted, "error" if error else "ok",
+                            {"swap": "yes" if batch.swap else "no"}, batch.submitted, size=len(batch.jobs))
+        if not error and batch.started:
+            timings = self.swap_timings if batch.swap else self.warm_timings
+            timings.append((time.time() - batch.started, len(batch.jobs)))
+        outputs = entry.get("outputs") or {}
+        for job, mapping in zip(batch.jobs, batch.mappings):
+            await self._complete(job, FAILED if error else DONE, split_outputs(outputs, mapping), error)
+
+    async def _complete(self, job, status, outputs=None, error=None):
+        job.status, job.outputs, job.error, job.finished = status, outputs, error, time.time()
+        self.counts[status] += 1
+        metrics.record_span("gateway_job", job.finished - job.created, "ok" if status == DONE else "error",
+                            {"batched": "yes" if (job.batch_size or 1) > 1 else "no"}, job.created,
+                            batch_size=job.batch_size, error=error)
+        await self.publish(job, status)
+
+    async def _on_event(self, message):
+        data = message.get("data") or {}
+        batch = self.in_flight.get(data.get("prompt_id"))
+        if batch is None:
+            return
+        kind = message.get("type")
+        node = data.get("node")
+        if (kind == "execution_start" or kind == "executing" and node is not None) and not batch.running:
+            batch.running, batch.started = True, time.time()
+            for job in batch.jobs:
+                job.status, job.started = RUNNING, time.time()
+                await self.publish(job, "running")
+        if kind == "executing" and node is None or \
+                kind in ("execution_success", "execution_error", "execution_interrupted"):
+            from aiohttp import ClientError
+
+            try:
+                entry = await self._history(batch.prompt_id)
+            except (ClientError, OSError, asyncio.TimeoutError, ValueError):
+                return  # poll_loop collects it
+            if entry is None and kind in ("execution_error", "execution_interrupted"):
+                entry = {"status": {"status_str": "error", "messages": [[kind, data]]}}
+            if entry is not None:
+                await self._finish(batch, entry)
+
+    async def listen_loop(self):
+        """Follow ComfyUI's progress events on its WebSocket, reconnecting as needed"""
+        from aiohttp import ClientError, WSMsgType
+
+        url = re.sub(r"^http", "ws", self.comfyui_url) + f"/ws?clientId={self.client_id}"
+        while True:
+            try:
+                async with self.session.ws_connect(url, heartbeat=30) as ws:
+                    async for msg in ws:
+                        if msg.type == WSMsgType.TEXT:
+                            await self._on_event(json.loads(msg.data))
+            except (ClientError, OSError, asyncio.TimeoutError, ValueError):
+                pass
+            await asyncio.sleep(RETRY_DELAY)
+
+    async def poll_loop(self):
+        """Safety net for missed events: collect finished prompts, requeue ones ComfyUI lost"""
+        from aiohttp import ClientError
+
+        while True:
+            await asyncio.sleep(POLL_INTERVAL)
+            queue_ids = None
+            for batch in list(self.in_flight.values()):
+                try:
+                    entry = await self._history(batch.prompt_id)
+                    if entry is not None:
+                        await self._finish(batch, entry)
+                        continue
+                    if time.time() - batch.submitted < LOST_AFTER:
+                        continue
+                    queue_ids = await self._queue_ids() if queue_ids is None else queue_ids
+                except (ClientError, OSError, asyncio.TimeoutError, ValueError):
+                    break
+                if batch.prompt_id in queue_ids or batch.done:
+                    continue
+                # ComfyUI restarted (or dropped the prompt): run the jobs again
+                batch.done = True
+                self.in_flight.pop(batch.prompt_id, None)
+                self.loaded = None
+                retry = [job for job in batch.jobs if job.attempts < MAX_ATTEMPTS]
+                for job in batch.jobs:
+                    if job not in retry:
+                        await self._complete(job, FAILED, error="lost by ComfyUI")
+                self.log(f"🔁 Prompt {batch.prompt_id} was lost by ComfyUI; requeueing {len(retry)} jobs")
+                self._requeue(retry)
+
+    # Clients ---------------------------------------------------------------
+
+    async def publish(self, job, event):
+        sockets = self.subscribers.get(job.client)
+        if not sockets:
+            return
+        message = dict(job.describe(), type=event)
+        for ws in list(sockets):
+            try:
+                await ws.send_json(message)
+            except (ConnectionError, RuntimeError):
+                sockets.discard(ws)
+
+    def swap_seconds(self):
+        """
+        Measured cost of a model swap: how much longer batches that loaded
+        models ran than the per-job time of batches that didn't.
+        """
+        warm_jobs = sum(jobs for _, jobs in self.warm_timings)
+        if not warm_jobs or not self.swap_timings:
+            return SWAP_SECONDS
+        per_job = sum(seconds for seconds, _ in self.warm_timings) / warm_jobs
+        extra = [seconds - jobs * per_job for seconds, jobs in self.swap_timings]
+        return max(0.0, sum(extra) / len(extra))
+
+    def stats(self):
+        batches = self.counts["batches"]
+        swap_seconds = self.swap_seconds()
+        return {
+            "queued": self.queued(),
+            "in_flight": len(self.in_flight),
+            "accepted": self.counts["accepted"],
+            "done": self.counts[DONE],
+            "failed": self.counts[FAILED],
+            "rate_limited": self.counts["rate_limited"],
+            "queue_full": self.counts["queue_full"],
+            "batches": batches,
+            "mean_batch_size": round(self.counts["batched_jobs"] / batches, 2) if batches else 0.0,
+            "model_loads": self.counts["model_loads"],
+            "swaps_avoided": self.counts["swaps_avoided"],
+            "reordered": self.counts["reordered"],
+            "swap_seconds": round(swap_seconds, 2),
+            "time_saved_s": round(self.counts["swaps_avoided"] * swap_seconds, 1),
+            "clients_connected": sum(len(sockets) for sockets in self.subscribers.values()),
+        }
+
+    async def start(self):
+        import aiohttp
+
+        self.session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=60))
+        self.wake = asyncio.Event()
+        self.tasks = [asyncio.ensure_future(loop()) for loop in (self.dispatch_loop, self.listen_loop,
+                                                                  self.poll_loop)]
+
+    async def stop(self):
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        await self.session.close()
+
+
+def build_app(gateway):
+    """aiohttp application serving the gateway's HTTP and WebSocket API"""
+    from aiohttp import ClientError, WSMsgType, web
+
+    def client_of(request, body=None):
+        return ((body or {}).get("client_id") or request.query.get("client_id")
+                or request.headers.get("X-Client-Id") or request.remote or "anonymous")
+
+    async def submit(request):
+        try:
+            body = await request.json()
+        except ValueError:
+            return web.json_response({"error": "body must be JSON"}, status=400)
+        if not isinstance(body, dict):
+            return web.json_response({"error": "body must be a JSON object"}, status=400)
+        try:
+            job = gateway.submit(body.get("prompt"), client_of(request, body))
+        except PromptError as e:
+            return web.json_response({"error": str(e)}, status=400)
+        except Rejected as e:
+            return web.json_response({"error": str(e)}, status=e.status,
+                                     headers={"Retry-After": str(max(1, round(e.retry_after)))})
+        return web.json_response({"job_id": job.id, "status": job.status, "queued": gateway.queued()})
+
+    async def job_status(request):
+        job = gateway.jobs.get(request.match_info["job_id"])
+        if job is None:
+            return web.json_response({"error": "unknown job"}, status=404)
+        return web.json_response(job.describe())
+
+    async def cancel(request):
+        if gateway.cancel(request.match_info["job_id"]):
+            return web.json_response({"cancelled": True})
+        return web.json_response({"error": "job is not queued"}, status=409)
+
+    async def results(request):
+        """WebSocket: every status change of the client's jobs, starting with the unfinished ones"""
+        ws = web.WebSocketResponse(heartbeat=30)
+        await ws.prepare(request)
+        client = client_of(request)
+        gateway.subscribers.setdefault(client, set()).add(ws)
+        try:
+            for job in list(gateway.jobs.values()):
+                if job.client == client and not job.finished:
+                    await ws.send_json(dict(job.describe(), type=job.status))
+            async for msg in ws:
+                if msg.type == WSMsgType.ERROR:
+                    break
+        finally:
+            gateway.subscribers.get(client, set()).discard(ws)
+        return ws
+
+    async def view(request):
+        """Proxy ComfyUI's /view so clients only need the gateway's port"""
+        try:
+            async with gateway.session.get(f"{gateway.comfyui_url}/view", params=request.query) as resp:
+                return web.Response(body=await resp.read(), status=resp.status, content_type=resp.content_type)
+        except (ClientError, OSError, asyncio.TimeoutError):
+            return web.json_response({"error": "ComfyUI unreachable"}, status=502)
+
+    async def stats(request):
+        return web.json_response(gateway.stats())
+
+    async def health(request):
+        return web.Response(text="ok\n")
+
+    async def on_startup(app):
+        await gateway.start()
+
+    async def on_cleanup(app):
+        await gateway.stop()
+
+    app = web.Application(client_max_size=32 * 2 ** 20)
+    app.add_routes([
+        web.post("/prompt", submit),
+        web.get("/jobs/{job_id}", job_status),
+        web.delete("/jobs/{job_id}", cancel),
+        web.get("/ws", results),
+        web.get("/view", view),
+        web.get("/stats", stats),
+        web.get("/health", health),
+    ])
+    app.on_startup.append(on_startup)
+    app.on_cleanup.append(on_cleanup)
+    return app
+
+
+def main(argv=None):
+    import argparse
+
+    from aiohttp import web
+
+    parser = argparse.ArgumentParser(description="Batching, rate-limited job gateway in front of ComfyUI")
+    parser.add_argument("--host", default=GATEWAY_HOST)
+    parser.add_argument("--port", type=int, default=GATEWAY_PORT)
+    parser.add_argument("--comfyui", default=COMFYUI_URL, help="ComfyUI base URL")
+    parser.add_argument("--max-batch", type=int, default=MAX_BATCH, help="Prompts merged into one submission")
+    parser.add_argument("--window-ms", type=float, default=BATCH_WINDOW * 1000,
+                        help="How long an idle gateway waits to fill a batch")
+    parser.add_argument("--max-in-flight", type=int, default=MAX_IN_FLIGHT,
+                        help="Submissions ComfyUI holds at once")
+    parser.add_argument("--rate", type=float, default=CLIENT_RATE, help="Jobs/sec per client (0 = unlimited)")
+    parser.add_argument("--burst", type=float, default=CLIENT_BURST)
+    parser.add_argument("--max-skips", type=int, default=AFFINITY_MAX_SKIPS,
+                        help="Times a job may be passed over for one that needs no model swap (0 = FIFO)")
+    parser.add_argument("--max-wait", type=float, default=AFFINITY_MAX_WAIT,
+                        help="Seconds after which a job is no longer passed over")
+    args = parser.parse_args(argv)
+
+    gateway = Gateway(args.comfyui, args.max_batch, args.window_ms / 1000, args.max_in_flight, MAX_QUEUED,
+                      args.rate, args.burst, args.max_skips, args.max_wait)
+    print(f"🚦 Gateway on port {args.port} → {args.comfyui} (batches of up to {args.max_batch}, "
+          f"{args.rate:g} jobs/s per client)")
+    web.run_app(build_app(gateway), host=args.host, port=args.port, access_log=None, print=None)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Hugging Face authentication without the CLI
+Reads and writes the same token file huggingface_hub uses (so AI-Toolkit and
+ComfyUI nodes pick it up) and checks it with a direct whoami API call, instead
+of installing huggingface_hub and spawning `huggingface-cli`.
+"""
+
+import json
+import os
+import sys
+import urllib.error
+import urllib.request
+
+HF_ENDPOINT = os.environ.get("HF_ENDPOINT", "https://huggingface.co").rstrip("/")
+WHOAMI_TIMEOUT = 10
+
+
+def token_path():
+    """Token file location, resolved the way huggingface_hub does it"""
+    if os.environ.get("HF_TOKEN_PATH"):
+        return os.environ["HF_TOKEN_PATH"]
+    cache_home = os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache"))
+    hf_home = os.environ.get("HF_HOME", os.path.join(cache_home, "huggingface"))
+    return os.path.join(os.path.expanduser(hf_home), "token")
+
+
+def read_token():
+    """Token from HF_TOKEN / HUGGING_FACE_HUB_TOKEN, else the token file, else None"""
+    for var in ("HF_TOKEN", "HUGGING_FACE_HUB_TOKEN"):
+        if os.environ.get(var, "").strip():
+            return os.environ[var].strip()
+    try:
+        with open(token_path()) as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+def save_token(token):
+    """Store the token (owner-readable only) where huggingface_hub looks for it"""
+    path = token_path()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w") as f:
+        f.write(token)
+    os.replace(tmp_path, path)
+    return path
+
+
+def whoami(token, timeout=WHOAMI_TIMEOUT):
+    """Account info for `token` from the Hub API; raises PermissionError if it is rejected"""
+    request = urllib.request.Request(f"{HF_ENDPOINT}/api/whoami-v2",
+                                     headers={"Authorization": f"Bearer {token}"})
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as resp:
+            return json.load(resp)
+    except urllib.error.HTTPError as e:
+        if e.code in (401, 403):
+            raise PermissionError("Invalid or revoked Hugging Face token") from e
+        raise
+
+
+def describe_account(info):
+    """One line summary, e.g. 'alice (read token) · orgs: acme'"""
+    role = ((info.get("auth") or {}).get("accessToken") or {}).get("role")
+    orgs = [org.get("name") for org in info.get("orgs") or [] if org.get("name")]
+    line = info.get("name", "?")
+    if role:
+        line += f" ({role} token)"
+    if orgs:
+        line += f" · orgs: {', '.join(orgs)}"
+    return line
+
+
+def login(token):
+    """Validate `token` and save it; returns a status message"""
+    token = (token or "").strip()
+    if not token:
+        return "❌ Please provide a Hugging Face token"
+    try:
+        info = whoami(token)
+    except PermissionError as e:
+        return f"❌ Login failed: {e}"
+    except (OSError, ValueError) as e:
+        return f"❌ Could not reach Hugging Face: {e}"
+    path = save_token(token)
+    return (f"✅ Successfully logged in to Hugging Face as {describe_account(info)}\n"
+            f"Token saved to {path}\n\n"
+            "You can now use AI-Toolkit to access gated models like Flux.")
+
+
+def status():
+    """Login status message for the stored token"""
+    token = read_token()
+    if not token:
+        return "❌ Not logged in to Hugging Face"
+    try:
+        return f"✅ Logged in as:\n{describe_account(whoami(token))}"
+    except PermissionError as e:
+        return f"❌ {e} (stored in {token_path()})"
+    except (OSError, ValueError) as e:
+        return f"⚠️  Token found but Hugging Face is unreachable: {e}"
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Hugging Face login without huggingface-cli")
+    subparsers = parser.add_subparsers(dest="command")
+    login_parser = subparsers.add_parser("login", help="Validate and store a token")
+    login_parser.add_argument("--token", help="Token (default: read from stdin)")
+    subparsers.add_parser("whoami", help="Show the logged in account (default)")
+    args = parser.parse_args(argv)
+
+    if args.command == "login":
+        message = login(args.token if args.token else sys.stdin.readline())
+    else:
+        message = status()
+    print(message)
+    return 0 if message.startswith("✅") else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
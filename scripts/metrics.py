@@ -0,0 +1,368 @@
+#!/usr/bin/env python3
+"""
+Timing spans and counters for the pod scripts
+Every process (the manager, the installers, the supervisor and the shell
+scripts through this CLI) appends span and counter events to one JSONL
+trace. The trace is folded into Prometheus text for the supervisor's
+/metrics endpoint and into a bring-up timeline showing where boot time went.
+Past METRICS_TRACE_MAX_MB the trace is rotated to <trace>.1 (replacing the
+previous one), so at most two files' worth of history is kept.
+"""
+
+import contextlib
+import fcntl
+import json
+import os
+import re
+import threading
+import time
+
+TRACE_FILE = os.environ.get("METRICS_TRACE", "/workspace/.metrics_trace.jsonl")
+PREFIX = "comfyui_pod"
+MAX_ATTR_LENGTH = 200
+TRACE_MAX_BYTES = int(float(os.environ.get("METRICS_TRACE_MAX_MB", "16")) * 1024 * 1024)
+ROTATED_SUFFIX = ".1"
+
+
+def emit(event, path=None):
+    """
+    Append one event to the trace. A single O_APPEND write per line keeps
+    lines from different processes whole; failures are ignored because
+    metrics must never break the work they measure. The write that takes the
+    trace past TRACE_MAX_BYTES rotates it.
+    """
+    path = TRACE_FILE if path is None else path
+    if not path:
+        return
+    event = dict(event, ts=round(time.time(), 3), pid=os.getpid())
+    line = (json.dumps(event, separators=(",", ":"), default=str) + "\n").encode()
+    try:
+        fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, line)
+            if os.fstat(fd).st_size > TRACE_MAX_BYTES:
+                _rotate(path, fd)
+        finally:
+            os.close(fd)
+    except OSError:
+        pass
+
+
+def _rotate(path, fd):
+    """Move the trace open as `fd` to <path>.1 unless another process already has"""
+    fcntl.flock(fd, fcntl.LOCK_EX)
+    try:
+        # Whoever got the lock first renamed it; the path then holds a new, small trace
+        if os.stat(path).st_ino == os.fstat(fd).st_ino:
+            os.replace(path, path + ROTATED_SUFFIX)
+    except FileNotFoundError:
+        pass
+    finally:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+
+
+def _clean_attrs(attrs):
+    return {key: value[:MAX_ATTR_LENGTH] if isinstance(value, str) else value
+            for key, value in attrs.items() if value is not None}
+
+
+def record_span(name, seconds, status="ok", labels=None, start=None, **attrs):
+    """
+    Record a finished span. `labels` become Prometheus labels, so keep them
+    low-cardinality (a node name, not a URL); `attrs` only go to the trace.
+    """
+    emit({"type": "span", "name": name, "seconds": round(seconds, 4), "status": status,
+          "start": round(start if start is not None else time.time() - seconds, 3),
+          "labels": dict(labels or {}), "attrs": _clean_attrs(attrs)})
+
+
+@contextlib.contextmanager
+def span(name, labels=None, **attrs):
+    """
+    Time the enclosed block. Yields a dict the block can add attrs to; setting
+    its "status" (e.g. to "error") marks a failure that didn't raise.
+    """
+    started = time.time()
+    clock = time.perf_counter()
+    info = dict(attrs)
+    try:
+        yield info
+    except BaseException as e:
+        info["status"] = "error"
+        info.setdefault("error", f"{type(e).__name__}: {e}")
+        raise
+    finally:
+        status = info.pop("status", "ok")
+        record_span(name, time.perf_counter() - clock, status, labels, started, **info)
+
+
+def inc(name, value=1, labels=None):
+    """Add `value` to counter `name` (exported as <name>_total)"""
+    emit({"type": "counter", "name": name, "value": value, "labels": dict(labels or {})})
+
+
+def mark(name, **attrs):
+    """A point in time, e.g. "boot", that timelines are measured from"""
+    emit({"type": "mark", "name": name, "attrs": _clean_attrs(attrs)})
+
+
+def read_trace(path=None):
+    """Every event in the rotated and current trace, oldest first (unparseable lines are skipped)"""
+    path = TRACE_FILE if path is None else path
+    events = []
+    for filename in (path + ROTATED_SUFFIX, path):
+        try:
+            with open(filename) as f:
+                for line in f:
+                    try:
+                        events.append(json.loads(line))
+                    except ValueError:
+                        continue
+        except OSError:
+            pass
+    return events
+
+
+def _metric_name(name):
+    return re.sub(r"[^a-zA-Z0-9_]", "_", f"{PREFIX}_{name}")
+
+
+def _label_text(labels):
+    if not labels:
+        return ""
+    escaped = (f'{re.sub(r"[^a-zA-Z0-9_]", "_", key)}="'
+               + str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+               for key, value in sorted(labels))
+    return "{" + ",".join(escaped) + "}"
+
+
+class TraceAggregator:
+    """
+    Folds trace events into span summaries and counters.
+
+    `update()` only reads what was appended since the last call, so scraping
+    stays cheap as the trace grows. When the trace was rotated it finishes
+    the old file first and carries on, so totals keep counting up; if the
+    file it was reading is gone, it starts over from <trace>.1.
+    """
+
+    def __init__(self, path=None):
+        self.path = TRACE_FILE if path is None else path
+        self.lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.offset = 0
+        self.inode = None
+        self.partial = b""
+        self.spans = {}  # (name, labels) -> [count, sum, max]
+        self.counters = {}  # (name, labels) -> value
+        self.events = 0
+
+    def fold(self, event):
+        labels = tuple(sorted((event.get("labels") or {}).items()))
+        if event.get("type") == "span":
+            labels += (("status", event.get("status", "ok")),)
+            entry = self.spans.setdefault((event["name"], labels), [0, 0.0, 0.0])
+            entry[0] += 1
+            entry[1] += event["seconds"]
+            entry[2] = max(entry[2], event["seconds"])
+        elif event.get("type") == "counter":
+            key = (event["name"], labels)
+            self.counters[key] = self.counters.get(key, 0) + event["value"]
+        self.events += 1
+
+    def _read(self, path, end=None):
+        """Fold `path` from self.offset to `end` (default: its end)"""
+        with open(path, "rb") as f:
+            f.seek(self.offset)
+            data = self.partial + (f.read() if end is None else f.read(end - self.offset))
+        self.offset += len(data) - len(self.partial)
+        lines = data.split(b"\n")
+        self.partial = lines.pop()  # A line still being written
+        for line in lines:
+            try:
+                self.fold(json.loads(line))
+            except (ValueError, KeyError, TypeError):
+                continue
+
+    def update(self):
+        with self.lock:
+            try:
+                st = os.stat(self.path)
+            except OSError:
+                return
+            if st.st_ino != self.inode:
+                rotated = self.path + ROTATED_SUFFIX
+                try:
+                    finishing = self.inode is not None and os.stat(rotated).st_ino == self.inode
+                except OSError:
+                    finishing = False
+                if not finishing:
+                    # First read, trace replaced, or rotated twice since the last read: start over from .1
+                    self._reset()
+                with contextlib.suppress(OSError):
+                    self._read(rotated)
+                self.offset, self.partial, self.inode = 0, b"", st.st_ino
+            elif st.st_size < self.offset:
+                self._reset()
+                self.inode = st.st_ino
+            if st.st_size > self.offset:
+                try:
+                    self._read(self.path, st.st_size)
+                except OSError:
+                    return
+
+    def render(self):
+        """Prometheus text exposition of everything folded so far"""
+        self.update()
+        lines = []
+        with self.lock:
+            spans = sorted(self.spans.items())
+            counters = sorted(self.counters.items())
+        for family in sorted({name for (name, _), _ in spans}):
+            metric = _metric_name(f"{family}_seconds")
+            lines.append(f"# TYPE {metric} summary")
+            for (name, labels), (count, total, _) in spans:
+                if name == family:
+                    lines.append(f"{metric}_count{_label_text(labels)} {count}")
+                    lines.append(f"{metric}_sum{_label_text(labels)} {total:.4f}")
+            lines.append(f"# TYPE {metric}_max gauge")
+            for (name, labels), (_, _, longest) in spans:
+                if name == family:
+                    lines.append(f"{metric}_max{_label_text(labels)} {longest:.4f}")
+        for family in sorted({name for (name, _), _ in counters}):
+            metric = _metric_name(f"{family}_total")
+            lines.append(f"# TYPE {metric} counter")
+            for (name, labels), value in counters:
+                if name == family:
+                    lines.append(f"{metric}{_label_text(labels)} {int(value) if value == int(value) else value}")
+        return "\n".join(lines) + "\n" if lines else ""
+
+
+def gauge_lines(name, values, help_text=None):
+    """Prometheus lines for a gauge family from [(labels dict, value)]"""
+    metric = _metric_name(name)
+    lines = [f"# HELP {metric} {help_text}"] if help_text else []
+    lines.append(f"# TYPE {metric} gauge")
+    lines.extend(f"{metric}{_label_text(sorted(labels.items()))} {value}" for labels, value in values)
+    return lines
+
+
+def timeline(events, since_mark="boot"):
+    """Spans recorded after the last `since_mark` mark, with their offset from it"""
+    start = None
+    for event in events:
+        if event.get("type") == "mark" and event.get("name") == since_mark:
+            start = event["ts"]
+    if start is None:
+        start = min((e["start"] for e in events if e.get("type") == "span"), default=0.0)
+    spans = [e for e in events if e.get("type") == "span" and e.get("start", 0) >= start - 1]
+    return start, sorted(spans, key=lambda e: e["start"])
+
+
+def format_timeline(start, spans, limit=40):
+    lines = []
+    lines.append("=" * 60)
+    lines.append("BRING-UP TIMELINE")
+    lines.append("=" * 60)
+    if not spans:
+        lines.append("No spans recorded yet")
+        lines.append("=" * 60)
+        return "\n".join(lines)
+    end = max(e["start"] + e["seconds"] for e in spans)
+    # Long boots: only the slowest spans, still in the order they started
+    shown = sorted(sorted(spans, key=lambda e: -e["seconds"])[:limit], key=lambda e: e["start"])
+    for event in shown:
+        icon = "✅" if event.get("status", "ok") == "ok" else "❌"
+        label = ",".join(f"{k}={v}" for k, v in sorted(event.get("labels", {}).items()))
+        name = event["name"] + (f"[{label}]" if label else "")
+        lines.append(f"{icon} +{event['start'] - start:7.1f}s {event['seconds']:8.2f}s  {name}")
+    lines.append("")
+    totals = {}
+    for event in spans:
+        totals[event["name"]] = totals.get(event["name"], 0.0) + event["seconds"]
+    lines.append("Time by span: " + ", ".join(f"{name} {seconds:.1f}s" for name, seconds in
+                                              sorted(totals.items(), key=lambda item: -item[1])[:6]))
+    lines.append(f"Wall clock: {end - start:.1f}s from {time.strftime('%H:%M:%S', time.localtime(start))}")
+    lines.append("=" * 60)
+    return "\n".join(lines)
+
+
+def _parse_labels(pairs):
+    labels = {}
+    for pair in pairs or []:
+        key, _, value = pair.partition("=")
+        labels[key] = value
+    return labels
+
+
+def main(argv=None):
+    import argparse
+    import subprocess
+    import sys
+
+    # `span NAME [--label k=v] -- command ...`: everything after -- is the command
+    argv = list(sys.argv[1:] if argv is None else argv)
+    command = []
+    if "--" in argv:
+        command = argv[argv.index("--") + 1:]
+        argv = argv[:argv.index("--")]
+
+    parser = argparse.ArgumentParser(description="Record and inspect pod timing metrics")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    span_parser = subparsers.add_parser("span", help="Run a command (after --) and record how long it took")
+    span_parser.add_argument("name")
+    span_parser.add_argument("--label", action="append", metavar="KEY=VALUE")
+
+    record_parser = subparsers.add_parser("record", help="Record a span that started at --since")
+    record_parser.add_argument("name")
+    record_parser.add_argument("--since", type=float, required=True, help="Start time (epoch seconds)")
+    record_parser.add_argument("--status", default="ok")
+    record_parser.add_argument("--label", action="append", metavar="KEY=VALUE")
+
+    inc_parser = subparsers.add_parser("inc", help="Add to a counter")
+    inc_parser.add_argument("name")
+    inc_parser.add_argument("--value", type=float, default=1)
+    inc_parser.add_argument("--label", action="append", metavar="KEY=VALUE")
+
+    mark_parser = subparsers.add_parser("mark", help="Record a point in time (e.g. boot)")
+    mark_parser.add_argument("name")
+
+    report_parser = subparsers.add_parser("report", help="Show where time went since the last boot")
+    report_parser.add_argument("--since", default="boot", help="Mark to measure from")
+    report_parser.add_argument("--json", action="store_true")
+
+    subparsers.add_parser("prometheus", help="Print the trace as Prometheus text")
+    args = parser.parse_args(argv)
+
+    if args.command == "span":
+        if not command:
+            parser.error("span needs a command after --")
+        with span(args.name, _parse_labels(args.label), command=" ".join(command)) as info:
+            code = subprocess.call(command)
+            if code != 0:
+                info.update(status="error", exit_code=code)
+        return code
+    if args.command == "record":
+        record_span(args.name, max(0.0, time.time() - args.since), args.status,
+                    _parse_labels(args.label), args.since)
+        return 0
+    if args.command == "inc":
+        inc(args.name, args.value, _parse_labels(args.label))
+        return 0
+    if args.command == "mark":
+        mark(args.name)
+        return 0
+    if args.command == "prometheus":
+        print(TraceAggregator().render(), end="")
+        return 0
+
+    start, spans = timeline(read_trace(), args.since)
+    print(json.dumps({"start": start, "spans": spans}, indent=1) if args.json else format_timeline(start, spans))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
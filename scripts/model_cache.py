@@ -0,0 +1,386 @@
+#!/usr/bin/env python3
+"""
+Two-tier model cache: local container disk in front of the network volume
+ComfyUI is pointed at a local cache directory first (extra_model_paths with
+is_default), so models copied there load from NVMe; everything else falls
+through to the volume, which stays the source of truth. Models are promoted
+on first use (by the comfyui_model_cache hook) or pre-warmed from the access
+log, and the least recently used ones are evicted to stay within budget.
+"""
+
+import fcntl
+import json
+import os
+import shutil
+import statistics
+import time
+
+MODELS_DIR = "/workspace/ComfyUI/models"
+CACHE_DIR = os.environ.get("MODEL_CACHE_DIR", "/workspace/.model-cache")
+CACHE_MODELS_DIR = os.path.join(CACHE_DIR, "models")
+CACHE_CONFIG = os.path.join(CACHE_DIR, "extra_model_paths.yaml")
+# Kept on the volume so a fresh pod can pre-warm from the previous pods' history
+ACCESS_LOG = os.environ.get(
+    "MODEL_ACCESS_LOG",
+    "/runpod-volume/.model_access.jsonl" if os.path.isdir("/runpod-volume") else "/workspace/.model_access.jsonl",
+)
+# Past this size eviction compacts the log to the newest ACCESS_LOG_KEEP loads (plus each model's last one)
+ACCESS_LOG_MAX_BYTES = 4 * 1024 * 1024
+ACCESS_LOG_KEEP = 10000
+# Cache budget; 0 means 60% of what the cache filesystem can hold
+MAX_BYTES = int(float(os.environ.get("MODEL_CACHE_MAX_GB", "0")) * 1024 ** 3)
+AUTO_FRACTION = 0.6
+
+NODE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "comfyui_model_cache")
+
+# ComfyUI folder name -> model subfolders it reads (the cache mirrors the models tree)
+FOLDERS = {
+    "checkpoints": ["checkpoints"],
+    "diffusion_models": ["diffusion_models", "unet"],
+    "loras": ["loras"],
+    "vae": ["vae"],
+    "controlnet": ["controlnet"],
+    "text_encoders": ["text_encoders", "clip"],
+    "clip_vision": ["clip_vision"],
+    "ipadapter": ["ipadapter"],
+    "upscale_models": ["upscale_models"],
+    "embeddings": ["embeddings"],
+}
+
+PARTIAL_SUFFIX = ".partial"
+
+
+def _device(path):
+    while not os.path.exists(path):
+        path = os.path.dirname(path)
+    return os.stat(path).st_dev
+
+
+def enabled(models_dir=MODELS_DIR, cache_dir=CACHE_DIR):
+    """A cache only helps when the models live on a different filesystem than the cache"""
+    return os.path.isdir(models_dir) and _device(os.path.realpath(models_dir)) != _device(cache_dir)
+
+
+def relative_path(path, models_dir=MODELS_DIR, cache_models_dir=CACHE_MODELS_DIR):
+    """Path of a model relative to the models tree (or the cache mirror of it), or None"""
+    real = os.path.realpath(path)
+    for root in (os.path.realpath(cache_models_dir), os.path.realpath(models_dir)):
+        if real.startswith(root + os.sep):
+            return os.path.relpath(real, root)
+    return None
+
+
+def cache_path(path, models_dir=MODELS_DIR, cache_models_dir=CACHE_MODELS_DIR):
+    relpath = relative_path(path, models_dir, cache_models_dir)
+    return os.path.join(cache_models_dir, relpath) if relpath else None
+
+
+def tier(path, cache_models_dir=CACHE_MODELS_DIR):
+    """'cache' for the local copy, 'volume' for network storage, else 'local'"""
+    real = os.path.realpath(path)
+    if real.startswith(os.path.realpath(cache_models_dir) + os.sep):
+        return "cache"
+    return "volume" if _device(real) != _device(cache_models_dir) else "local"
+
+
+def record_access(path, seconds, log_path=ACCESS_LOG):
+    """Append one model load to the access log; returns the tier it was read from"""
+    where = tier(path)
+    entry = {
+        "ts": round(time.time(), 3),
+        "model": relative_path(path) or os.path.realpath(path),
+        "tier": where,
+        "seconds": round(seconds, 3),
+        "bytes": os.path.getsize(path),
+    }
+    line = (json.dumps(entry) + "\n").encode()
+    while True:
+        # One short O_APPEND write per line keeps concurrent writers from interleaving
+        fd = os.open(log_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_SH)
+            # Compaction swaps in a new file under an exclusive lock; make sure this is still the log
+            if os.fstat(fd).st_ino == os.stat(log_path).st_ino:
+                os.write(fd, line)
+                return where
+        finally:
+            os.close(fd)
+
+
+def read_access_log(log_path=ACCESS_LOG):
+    entries = []
+    try:
+        with open(log_path) as f:
+            for line in f:
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    continue
+    except OSError:
+        pass
+    return entries
+
+
+def compact_access_log(log_path=ACCESS_LOG, keep=ACCESS_LOG_KEEP):
+    """
+    Rewrite an access log larger than ACCESS_LOG_MAX_BYTES with only its
+    newest `keep` entries plus the last load of every other model, so LRU
+    order and pre-warm survive. Returns the number of entries dropped.
+    """
+    try:
+        fd = os.open(log_path, os.O_RDONLY)
+    except FileNotFoundError:
+        return 0
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        if os.fstat(fd).st_size <= ACCESS_LOG_MAX_BYTES:
+            return 0
+        entries = read_access_log(log_path)
+        recent = entries[-keep:] if keep else []
+        seen = {entry["model"] for entry in recent}
+        last = {}
+        for index, entry in enumerate(entries[:len(entries) - len(recent)]):
+            if entry["model"] not in seen:
+                last[entry["model"]] = index
+        kept = [entries[index] for index in sorted(last.values())] + recent
+        tmp_path = log_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            f.writelines(json.dumps(entry) + "\n" for entry in kept)
+        os.replace(tmp_path, log_path)
+        return len(entries) - len(kept)
+    finally:
+        os.close(fd)
+
+
+def last_access(entries):
+    """{model relpath: last load time}"""
+    last = {}
+    for entry in entries:
+        last[entry["model"]] = max(last.get(entry["model"], 0), entry["ts"])
+    return last
+
+
+def cached_files(cache_models_dir=CACHE_MODELS_DIR):
+    """{relpath: size} of complete files in the cache"""
+    files = {}
+    for root, _, names in os.walk(cache_models_dir):
+        for name in names:
+            if name.endswith(PARTIAL_SUFFIX):
+                continue
+            path = os.path.join(root, name)
+            files[os.path.relpath(path, cache_models_dir)] = os.path.getsize(path)
+    return files
+
+
+def budget(cache_dir=CACHE_DIR, cache_models_dir=CACHE_MODELS_DIR):
+    """Bytes the cache may use"""
+    if MAX_BYTES:
+        return MAX_BYTES
+    stats = os.statvfs(cache_dir)
+    used = sum(cached_files(cache_models_dir).values())
+    return int((stats.f_bavail * stats.f_frsize + used) * AUTO_FRACTION)
+
+
+def is_fresh(source, cached):
+    """The cached copy matches the volume file (copies keep the source mtime)"""
+    try:
+        src, dst = os.stat(source), os.stat(cached)
+    except OSError:
+        return False
+    return src.st_size == dst.st_size and int(src.st_mtime) == int(dst.st_mtime)
+
+
+class _CacheLock:
+    """Serialises promotion/eviction between ComfyUI and the CLI"""
+
+    def __init__(self, cache_dir=CACHE_DIR):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.path = os.path.join(cache_dir, ".lock")
+
+    def __enter__(self):
+        self.fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        fcntl.flock(self.fd, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        fcntl.flock(self.fd, fcntl.LOCK_UN)
+        os.close(self.fd)
+
+
+def _evict(target_bytes, keep=(), models_dir=MODELS_DIR, cache_models_dir=CACHE_MODELS_DIR, log=print):
+    """Drop stale copies, then least recently used ones until the cache fits `target_bytes`"""
+    files = cached_files(cache_models_dir)
+    freed = 0
+    for relpath in list(files):
+        if not is_fresh(os.path.join(models_dir, relpath), os.path.join(cache_models_dir, relpath)):
+            os.remove(os.path.join(cache_models_dir, relpath))
+            freed += files.pop(relpath)
+    total = sum(files.values())
+    try:
+        compact_access_log()
+    except OSError as e:
+        log(f"⚠️  Could not compact {ACCESS_LOG}: {e}")
+    last = last_access(read_access_log())
+    for relpath in sorted(files, key=lambda r: last.get(r, 0)):
+        if total <= target_bytes:
+            break
+        if relpath in keep:
+            continue
+        os.remove(os.path.join(cache_models_dir, relpath))
+        total -= files[relpath]
+        freed += files[relpath]
+        log(f"🧹 Evicted {relpath} ({files[relpath] / 1024 ** 3:.1f} GB)")
+    return freed
+
+
+def evict(target_bytes=None, log=print):
+    with _CacheLock():
+        return _evict(budget() if target_bytes is None else target_bytes, log=log)
+
+
+def promote(source, models_dir=MODELS_DIR, cache_models_dir=CACHE_MODELS_DIR, log=print):
+    """Copy a volume model into the cache (evicting cold ones); returns the cached path or None"""
+    cached = cache_path(source, models_dir, cache_models_dir)
+    if cached is None or not os.path.isfile(source):
+        return None
+    with _CacheLock():
+        if is_fresh(source, cached):
+            return cached
+        size = os.path.getsize(source)
+        limit = budget()
+        if size > limit:
+            log(f"⚠️  {os.path.basename(source)} is larger than the cache budget; not cached")
+            return None
+        _evict(limit - size, keep={os.path.relpath(cached, cache_models_dir)}, models_dir=models_dir,
+               cache_models_dir=cache_models_dir, log=log)
+        os.makedirs(os.path.dirname(cached), exist_ok=True)
+        tmp_path = f"{cached}.{os.getpid()}{PARTIAL_SUFFIX}"
+        started = time.time()
+        try:
+            shutil.copyfile(source, tmp_path)
+            shutil.copystat(source, tmp_path)
+            os.replace(tmp_path, cached)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        elapsed = max(time.time() - started, 1e-6)
+        log(f"📥 Cached {os.path.relpath(cached, cache_models_dir)} "
+            f"({size / 1024 ** 3:.1f} GB in {elapsed:.1f}s, {size / elapsed / 1024 ** 2:.0f} MB/s)")
+    return cached
+
+
+def prewarm(models_dir=MODELS_DIR, log=print):
+    """Promote the most recently used models until the budget is full"""
+    started = time.time()
+    limit = budget()
+    last = last_access(read_access_log())
+    planned, used = [], 0
+    for relpath in sorted(last, key=last.get, reverse=True):
+        source = os.path.join(models_dir, relpath)
+        if not os.path.isfile(source):
+            continue
+        size = os.path.getsize(source)
+        if used + size > limit:
+            continue
+        planned.append(source)
+        used += size
+    for source in planned:
+        try:
+            promote(source, log=log)
+        except OSError as e:
+            log(f"❌ Could not cache {source}: {e}")
+    log(f"🔥 Pre-warm done: {len(planned)} models ({used / 1024 ** 3:.1f} GB) "
+        f"in {time.time() - started:.1f}s")
+    return planned
+
+
+def latency_stats(entries):
+    """Per-tier load statistics: loads, median seconds and median MB/s"""
+    by_tier = {}
+    for entry in entries:
+        by_tier.setdefault(entry["tier"], []).append(entry)
+    stats = {}
+    for where, loads in by_tier.items():
+        throughputs = [e["bytes"] / e["seconds"] / 1024 ** 2 for e in loads if e["seconds"] > 0]
+        stats[where] = {
+            "loads": len(loads),
+            "median_seconds": round(statistics.median(e["seconds"] for e in loads), 2),
+            "median_mb_per_sec": round(statistics.median(throughputs), 1) if throughputs else None,
+        }
+    return stats
+
+
+def write_config(config_path=CACHE_CONFIG, cache_models_dir=CACHE_MODELS_DIR):
+    """extra_model_paths config that puts the cache ahead of the models folder"""
+    lines = ["# Generated by model_cache.py: local cache searched before the network volume",
+             "model_cache:", f"    base_path: {cache_models_dir}", "    is_default: true"]
+    for folder, subfolders in FOLDERS.items():
+        if len(subfolders) == 1:
+            lines.append(f"    {folder}: {subfolders[0]}/")
+        else:
+            lines.append(f"    {folder}: |")
+            lines.extend(f"        {subfolder}/" for subfolder in subfolders)
+    os.makedirs(os.path.dirname(config_path), exist_ok=True)
+    tmp_path = config_path + ".tmp"
+    with open(tmp_path, "w") as f:
+        f.write("\n".join(lines) + "\n")
+    os.replace(tmp_path, config_path)
+
+
+def setup(comfyui_dir=os.path.dirname(MODELS_DIR), log=print):
+    """Write the config and link the load hook into custom_nodes; False if no cache is needed"""
+    if not enabled():
+        if os.path.exists(CACHE_CONFIG):
+            os.remove(CACHE_CONFIG)
+        log("ℹ️  Models are on local disk; model cache not needed")
+        return False
+    for subfolders in FOLDERS.values():
+        for subfolder in subfolders:
+            os.makedirs(os.path.join(CACHE_MODELS_DIR, subfolder), exist_ok=True)
+    write_config()
+    link = os.path.join(comfyui_dir, "custom_nodes", os.path.basename(NODE_DIR))
+    if not os.path.lexists(link):
+        os.symlink(NODE_DIR, link)
+    log(f"⚡ Model cache enabled: {CACHE_MODELS_DIR} (budget {budget() / 1024 ** 3:.0f} GB)")
+    return True
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Local model cache in front of the network volume")
+    parser.add_argument("command", choices=["setup", "prewarm", "promote", "evict", "stats"])
+    parser.add_argument("paths", nargs="*", help="promote: model files to cache")
+    parser.add_argument("--json", action="store_true", help="stats: print JSON")
+    args = parser.parse_args(argv)
+
+    if args.command == "setup":
+        return 0 if setup() else 1
+    if args.command == "prewarm":
+        prewarm()
+        return 0
+    if args.command == "promote":
+        return 0 if all(promote(path) for path in args.paths) else 1
+    if args.command == "evict":
+        freed = evict()
+        print(f"🧹 Freed {freed / 1024 ** 3:.1f} GB")
+        return 0
+
+    entries = read_access_log()
+    stats = latency_stats(entries)
+    files = cached_files()
+    if args.json:
+        print(json.dumps({"tiers": stats, "cached_files": len(files), "cached_bytes": sum(files.values()),
+                          "budget_bytes": budget()}, indent=1))
+        return 0
+    print(f"Cache: {len(files)} files, {sum(files.values()) / 1024 ** 3:.1f} GB "
+          f"of {budget() / 1024 ** 3:.0f} GB ({CACHE_MODELS_DIR})")
+    for where, s in sorted(stats.items()):
+        speed = f"{s['median_mb_per_sec']:.0f} MB/s" if s["median_mb_per_sec"] else "-"
+        print(f"  {where:<7} {s['loads']:>5} loads, median {s['median_seconds']:.2f}s, {speed}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -5,7 +5,6 @@ Simple web interface to download models, LoRAs, and other files
 Includes custom node installation functionality
 """
 
-import gradio as gr
 import os
 import subprocess
 from pathlib import Path
@@ -13,117 +12,253 @@ import threading
 import time
 import re
 
+from download_queue import DownloadScheduler, DONE, RUNNING
+from model_store import STORE_DIR, dedup_scan, garbage_collect, store_stats
+from model_integrity import verify_tree
+from model_inventory import ModelInventory
+from safetensors_info import CATEGORY_FOR_KIND, inspect, guess_category_from_name, describe
+from node_installer import CUSTOM_NODES, CUSTOM_NODES_DIR, is_installed, install_nodes, update_nodes
+from node_registry import DISABLED_SUFFIX, LAZY_NODES, NodeRegistry, start_background_hydration
+import hf_auth
+import metrics
+from model_manifest import (
+    DEFAULT_MANIFEST, ManifestError, load_manifest, queue_manifest, wait_for_manifest, format_report
+)
+
 # Model directories
 MODEL_DIRS = {
     "Checkpoints": "/workspace/ComfyUI/models/checkpoints",
+    "Diffusion Models": "/workspace/ComfyUI/models/diffusion_models",
     "LoRAs": "/workspace/ComfyUI/models/loras",
     "VAE": "/workspace/ComfyUI/models/vae",
     "ControlNet": "/workspace/ComfyUI/models/controlnet",
     "CLIP": "/workspace/ComfyUI/models/clip",
+    "CLIP Vision": "/workspace/ComfyUI/models/clip_vision",
     "IP-Adapter": "/workspace/ComfyUI/models/ipadapter",
     "Upscale Models": "/workspace/ComfyUI/models/upscale_models",
     "Embeddings": "/workspace/ComfyUI/models/embeddings",
 }
 
-# Custom nodes list (from install_custom_nodes.sh)
-CUSTOM_NODES = [
-    {"name": "ComfyUI-VideoHelperSuite", "url": "https://github.com/Kosinkadink/ComfyUI-VideoHelperSuite.git"},
-    {"name": "ComfyUI_IPAdapter_plus", "url": "https://github.com/cubiq/ComfyUI_IPAdapter_plus.git"},
-    {"name": "ComfyUI-Impact-Pack", "url": "https://github.com/ltdrdata/ComfyUI-Impact-Pack.git"},
-    {"name": "ComfyUI-Impact-Subpack", "url": "https://github.com/ltdrdata/ComfyUI-Impact-Subpack.git"},
-    {"name": "ComfyUI-Advanced-ControlNet", "url": "https://github.com/Kosinkadink/ComfyUI-Advanced-ControlNet.git"},
-    {"name": "ComfyUI-AnimateDiff-Evolved", "url": "https://github.com/Kosinkadink/ComfyUI-AnimateDiff-Evolved.git"},
-    {"name": "ComfyUI-Frame-Interpolation", "url": "https://github.com/Fannovel16/ComfyUI-Frame-Interpolation.git"},
-    {"name": "comfyui_controlnet_aux", "url": "https://github.com/Fannovel16/comfyui_controlnet_aux.git"},
-    {"name": "ComfyUI_essentials", "url": "https://github.com/cubiq/ComfyUI_essentials.git"},
-    {"name": "ComfyUI-SUPIR", "url": "https://github.com/kijai/ComfyUI-SUPIR.git"},
-    {"name": "efficiency-nodes-comfyui", "url": "https://github.com/jags111/efficiency-nodes-comfyui.git"},
-    {"name": "ComfyUI-Custom-Scripts", "url": "https://github.com/pythongosssss/ComfyUI-Custom-Scripts.git"},
-    {"name": "rgthree-comfy", "url": "https://github.com/rgthree/rgthree-comfy.git"},
-    {"name": "was-node-suite-comfyui", "url": "https://github.com/WASasquatch/was-node-suite-comfyui.git"},
-    {"name": "ComfyUI_UltimateSDUpscale", "url": "https://github.com/ssitu/ComfyUI_UltimateSDUpscale.git"},
-    {"name": "ComfyUI-AnimateLCM", "url": "https://github.com/daniabib/ComfyUI-AnimateLCM.git"},
-    {"name": "ComfyUI_FizzNodes", "url": "https://github.com/FizzleDorf/ComfyUI_FizzNodes.git"},
-]
-
-# Global download status
-download_status = {"active": False, "message": ""}
+# "Auto-detect" downloads land here first, then move to the folder their header says they belong in
+AUTO_DETECT = "Auto-detect"
+INCOMING_DIR = "/workspace/ComfyUI/models/.incoming"
+
+# Shared download queue (bounded worker pool, per-host limits)
+download_scheduler = DownloadScheduler()
+
+# Indexed view of everything under MODEL_DIRS (created on first use)
+model_inventory = None
+
+BROWSE_PAGE_SIZE = 50
 
 # Custom nodes installation status
 nodes_status = {"installing": False, "log": "", "progress": ""}
 
-def download_file(url, model_type, filename=None):
-    """Download a file to the specified model directory"""
-    global download_status
+def route_download(path):
+    """Pick the MODEL_DIRS entry for a finished download from its safetensors header"""
+    info = inspect(path)
+    category = (info or {}).get("category") or guess_category_from_name(os.path.basename(path))
+    return category, MODEL_DIRS[category]
 
+def queue_download(url, model_type, filename=None, max_bytes_per_sec=None):
+    """Queue a file for download to the specified model directory"""
     if not url:
-        return "❌ Please provide a URL"
+        return None, "❌ Please provide a URL"
+
+    if model_type == AUTO_DETECT:
+        job = download_scheduler.submit(url.strip(), INCOMING_DIR, filename or None,
+                                        label=AUTO_DETECT, route=route_download,
+                                        max_bytes_per_sec=max_bytes_per_sec)
+        return job, f"⏳ Queued download #{job.id} → folder picked from the model header"
 
     if model_type not in MODEL_DIRS:
-        return f"❌ Invalid model type: {model_type}"
+        return None, f"❌ Invalid model type: {model_type}"
+
+    job = download_scheduler.submit(url.strip(), MODEL_DIRS[model_type], filename or None,
+                                    label=model_type, max_bytes_per_sec=max_bytes_per_sec)
+    return job, f"⏳ Queued download #{job.id} → {model_type}"
+
+def download_file(url, model_type, filename=None, max_bytes_per_sec=None):
+    """Download a file to the specified model directory and wait for it"""
+    job, message = queue_download(url, model_type, filename, max_bytes_per_sec)
+    if job is None:
+        return message
+
+    job.wait()
+    if job.status != DONE:
+        return f"❌ Download failed:\n{job.error or job.status}"
+
+    file_size = job.result["size"] / (1024 * 1024 * 1024)  # GB
+    speed = job.result["bytes_per_sec"] / (1024 * 1024)  # MB/s
+    return (
+        f"✅ Downloaded successfully!\n📁 Location: {job.output_path}\n💾 Size: {file_size:.2f} GB\n"
+        f"🧠 Detected: {describe(inspect(job.output_path))}\n"
+        f"⚡ Speed: {speed:.1f} MB/s over {job.result['connections']} connection(s)"
+    )
 
-    target_dir = MODEL_DIRS[model_type]
-    os.makedirs(target_dir, exist_ok=True)
+def start_download(url, model_type, filename=None):
+    """Gradio handler: queue the download and return immediately"""
+    return queue_download(url, model_type, filename)[1]
+
+def watch_downloads():
+    """Stream the download queue status until nothing is queued or running"""
+    yield download_scheduler.format_status()
+    while download_scheduler.active():
+        time.sleep(1)
+        yield download_scheduler.format_status()
+    yield download_scheduler.format_status()
+
+def cancel_download(job_id):
+    """Cancel a queued or running download by ID"""
+    if download_scheduler.cancel(job_id):
+        return f"🚫 Cancelling download #{job_id}"
+    return f"⚠️  No queued or running download with ID {job_id}"
+
+def retry_download(job_id):
+    """Re-queue a failed or cancelled download by ID"""
+    if download_scheduler.retry(job_id):
+        return f"🔁 Retrying download #{job_id}"
+    return f"⚠️  No failed or cancelled download with ID {job_id}"
+
+def import_manifest(manifest_path, uploaded_file=None):
+    """Gradio handler: queue every model listed in a manifest file"""
+    path = uploaded_file or (manifest_path or "").strip() or DEFAULT_MANIFEST
+    try:
+        entries = load_manifest(path, MODEL_DIRS)
+    except (OSError, ManifestError) as e:
+        return f"❌ Could not load manifest {path}:\n{str(e)}"
+
+    jobs, skipped = queue_manifest(entries, download_scheduler, MODEL_DIRS)
+    return f"📋 Manifest {os.path.basename(path)}: queued {len(jobs)}, skipped {len(skipped)} already present"
+
+def fetch_manifest_cli(manifest_path):
+    """Download a whole manifest concurrently and print a throughput report"""
+    entries = load_manifest(manifest_path, MODEL_DIRS)
+    print(f"📋 {len(entries)} models in {manifest_path}")
+
+    started = time.time()
+    jobs, skipped = queue_manifest(entries, download_scheduler, MODEL_DIRS)
+    print(f"⏳ Queued {len(jobs)} downloads, {len(skipped)} already present")
+
+    # Print a progress line every few seconds while jobs are running
+    while download_scheduler.active():
+        time.sleep(5)
+        running = [job.describe() for job in jobs if job.status == RUNNING]
+        if running:
+            print("\n".join(running), flush=True)
+
+    summary = wait_for_manifest(jobs, skipped, started)
+    print(format_report(summary))
+    required_failures = [entry for entry, _ in summary["failed"] if not entry["optional"]]
+    metrics.record_span("manifest_fetch", time.time() - started, "error" if required_failures else "ok",
+                        start=started, manifest=os.path.basename(manifest_path), queued=len(jobs),
+                        skipped=len(skipped), failed=len(summary["failed"]))
+    return 1 if required_failures else 0
+
+def get_inventory():
+    """Return the shared model inventory, creating it on first use"""
+    global model_inventory
+    if model_inventory is None:
+        model_inventory = ModelInventory(MODEL_DIRS, index=download_scheduler.index)
+        model_inventory.refresh()
+    return model_inventory
+
+def list_models(model_type, search="", sort="name", page=1, refresh=False):
+    """List indexed model files (recursively) with search, sort and pagination"""
+    if model_type != "All" and model_type not in MODEL_DIRS:
+        return "Invalid model type"
 
-    # Determine filename
-    if not filename:
-        filename = url.split("/")[-1].split("?")[0]
-        if not filename or filename == "":
-            filename = "downloaded_model.safetensors"
+    inventory = get_inventory()
+    if refresh:
+        inventory.refresh()
 
-    output_path = os.path.join(target_dir, filename)
+    descending = sort in ("size", "modified")  # Biggest / newest first
+    rows, total = inventory.browse(
+        None if model_type == "All" else model_type, search, sort, descending,
+        page, BROWSE_PAGE_SIZE
+    )
 
-    download_status["active"] = True
-    download_status["message"] = f"⏳ Downloading {filename}..."
+    if not total:
+        return f"📂 No files in {model_type}" + (f" matching '{search}'" if search else "")
+
+    page = max(1, int(page or 1))
+    pages = -(-total // BROWSE_PAGE_SIZE)
+    first = (page - 1) * BROWSE_PAGE_SIZE + 1
+    files = [f"Showing {first}–{first + len(rows) - 1} of {total} (page {page}/{pages})", ""]
+    for row in rows:
+        size = row["size"] / (1024 * 1024)  # MB
+        prefix = f"[{row['category']}] " if model_type == "All" else ""
+        line = f"📄 {prefix}{row['relpath']} ({size:.1f} MB)"
+        if row["kind"]:
+            line += f" — {describe(row)}"
+            expected = CATEGORY_FOR_KIND.get(row["kind"])
+            if expected and expected != row["category"]:
+                line += f" ⚠️  looks like {expected}"
+        files.append(line)
 
-    try:
-        # Use wget with progress
-        cmd = [
-            "wget",
-            "-c",  # Continue partial downloads
-            "--content-disposition",  # Use server-provided filename if available
-            "-O", output_path,
-            url
-        ]
+    return "\n".join(files)
 
-        result = subprocess.run(cmd, capture_output=True, text=True)
+def refresh_models(model_type, search="", sort="name", page=1):
+    """Re-scan changed directories, then list models"""
+    return list_models(model_type, search, sort, page, refresh=True)
 
-        if result.returncode == 0:
-            file_size = os.path.getsize(output_path) / (1024 * 1024 * 1024)  # GB
-            download_status["active"] = False
-            download_status["message"] = ""
-            return f"✅ Downloaded successfully!\n📁 Location: {output_path}\n💾 Size: {file_size:.2f} GB"
-        else:
-            download_status["active"] = False
-            download_status["message"] = ""
-            return f"❌ Download failed:\n{result.stderr}"
+def deduplicate_models(adopt_all=False):
+    """Collapse duplicate model files across MODEL_DIRS into the content-addressed store"""
+    log_lines = []
+    log_lines.append("=" * 60)
+    log_lines.append("DEDUPLICATING MODELS")
+    log_lines.append("=" * 60)
+    log_lines.append(f"Store: {STORE_DIR}")
+    log_lines.append("")
 
+    try:
+        summary = dedup_scan(list(MODEL_DIRS.values()), adopt_all=adopt_all, log=log_lines.append)
+        freed = garbage_collect(log=log_lines.append)
     except Exception as e:
-        download_status["active"] = False
-        download_status["message"] = ""
-        return f"❌ Error: {str(e)}"
-
-def list_models(model_type):
-    """List all files in a model directory"""
-    if model_type not in MODEL_DIRS:
-        return "Invalid model type"
+        log_lines.append(f"❌ Error: {str(e)}")
+        return "\n".join(log_lines)
 
-    target_dir = MODEL_DIRS[model_type]
+    stats = store_stats()
+    log_lines.append("")
+    log_lines.append(f"🔗 Linked duplicates: {summary['linked']}")
+    log_lines.append(f"📦 New blobs stored: {summary['stored']}")
+    log_lines.append(f"💾 Space saved: {summary['bytes_saved'] / (1024 ** 3):.2f} GB")
+    if freed:
+        log_lines.append(f"🗑️  Unreferenced blobs removed: {freed / (1024 ** 3):.2f} GB")
+    log_lines.append(f"Store now holds {stats['blobs']} blobs ({stats['bytes'] / (1024 ** 3):.2f} GB)")
+    log_lines.append("=" * 60)
+    return "\n".join(log_lines)
 
-    if not os.path.exists(target_dir):
-        return f"📂 Directory is empty: {target_dir}"
+def verify_models():
+    """Re-hash every model file and compare against the integrity index"""
+    return _verify_models()[0]
 
-    files = []
-    for f in sorted(os.listdir(target_dir)):
-        file_path = os.path.join(target_dir, f)
-        if os.path.isfile(file_path):
-            size = os.path.getsize(file_path) / (1024 * 1024)  # MB
-            files.append(f"📄 {f} ({size:.1f} MB)")
+def _verify_models():
+    """verify_models() report plus the verify_tree summary (None when the run failed)"""
+    log_lines = []
+    log_lines.append("=" * 60)
+    log_lines.append("VERIFYING MODEL INTEGRITY")
+    log_lines.append("=" * 60)
+    log_lines.append("")
 
-    if not files:
-        return f"📂 No files in {model_type}"
+    try:
+        summary = verify_tree(list(MODEL_DIRS.values()), index=download_scheduler.index,
+                              log=log_lines.append)
+    except Exception as e:
+        log_lines.append(f"❌ Error: {str(e)}")
+        return "\n".join(log_lines), None
 
-    return "\n".join(files)
+    speed = summary["bytes"] / max(summary["elapsed"], 1e-6) / (1024 * 1024)
+    log_lines.append("")
+    log_lines.append(f"✅ Verified: {summary['ok']}")
+    log_lines.append(f"🆕 Newly indexed: {summary['new']}")
+    log_lines.append(f"🔄 Changed and re-indexed: {summary['changed']}")
+    log_lines.append(f"❌ Corrupt: {len(summary['corrupt'])}")
+    if summary["errors"]:
+        log_lines.append(f"⚠️  Unreadable: {len(summary['errors'])}")
+    log_lines.append(f"⚡ Hashed {summary['bytes'] / (1024 ** 3):.2f} GB in {summary['elapsed']:.1f}s ({speed:.0f} MB/s)")
+    log_lines.append("=" * 60)
+    return "\n".join(log_lines), summary
 
 def get_quick_links():
     """Return a list of popular model sources"""
@@ -138,7 +273,7 @@ def get_quick_links():
 1. Find your model on CivitAI
 2. Click the download button → Copy link address
 3. Paste the URL here
-4. Select the correct model type
+4. Leave Model Type on Auto-detect (or pick a folder yourself)
 5. Click Download!
 
 **Example URLs:**
@@ -146,12 +281,6 @@ def get_quick_links():
 - CivitAI: `https://civitai.com/api/download/models/MODEL_ID`
 """
 
-def check_node_installed(node_name):
-    """Check if a custom node is already installed"""
-    custom_nodes_dir = "/workspace/ComfyUI/custom_nodes"
-    node_path = os.path.join(custom_nodes_dir, node_name)
-    return os.path.exists(node_path) and os.path.isdir(node_path)
-
 def get_installed_nodes():
     """Get list of installed custom nodes with status"""
     status_lines = []
@@ -160,74 +289,33 @@ def get_installed_nodes():
     status_lines.append("=" * 60)
     status_lines.append("")
 
+    # Import times ComfyUI printed at its last start (recorded by the supervisor)
+    imports = NodeRegistry().data["imports"]
     installed_count = 0
+    disabled_count = 0
     for node in CUSTOM_NODES:
-        is_installed = check_node_installed(node["name"])
-        if is_installed:
-            status_lines.append(f"✅ {node['name']}")
+        timing = imports.get(node["name"])
+        note = f" ({timing['seconds']:.1f}s import{', FAILED' if timing['failed'] else ''})" if timing else ""
+        if is_installed(node["name"]):
+            status_lines.append(f"✅ {node['name']}{note}")
+            installed_count += 1
+        elif is_installed(node["name"] + DISABLED_SUFFIX):
+            status_lines.append(f"⏸️  {node['name']} (disabled: no saved workflow uses it)")
             installed_count += 1
+            disabled_count += 1
         else:
             status_lines.append(f"⬜ {node['name']}")
 
     status_lines.append("")
     status_lines.append("=" * 60)
-    status_lines.append(f"Installed: {installed_count}/{len(CUSTOM_NODES)} nodes")
+    status_lines.append(f"Installed: {installed_count}/{len(CUSTOM_NODES)} nodes"
+                        + (f" ({disabled_count} disabled until a workflow needs them)" if disabled_count else ""))
     status_lines.append("=" * 60)
 
     return "\n".join(status_lines)
 
-def install_single_node(node_name, node_url):
-    """Install a single custom node"""
-    custom_nodes_dir = "/workspace/ComfyUI/custom_nodes"
-    os.makedirs(custom_nodes_dir, exist_ok=True)
-
-    node_dir = os.path.join(custom_nodes_dir, node_name)
-
-    # Check if already installed
-    if os.path.exists(node_dir):
-        return f"⚠️  {node_name} already installed, skipping..."
-
-    try:
-        # Clone the repository
-        print(f"Installing {node_name}...")
-        clone_result = subprocess.run(
-            ["git", "clone", "--depth", "1", node_url, node_dir],
-            cwd=custom_nodes_dir,
-            capture_output=True,
-            text=True,
-            timeout=300
-        )
-
-        if clone_result.returncode != 0:
-            return f"❌ Failed to clone {node_name}"
-
-        # Install requirements if they exist
-        requirements_file = os.path.join(node_dir, "requirements.txt")
-        if os.path.exists(requirements_file):
-            print(f"Installing dependencies for {node_name}...")
-            pip_result = subprocess.run(
-                ["pip", "install", "--no-cache-dir", "-r", "requirements.txt"],
-                cwd=node_dir,
-                capture_output=True,
-                text=True,
-                timeout=600
-            )
-            # Don't fail if pip install has issues, just continue
-
-        # Remove .git directory to save space
-        git_dir = os.path.join(node_dir, ".git")
-        if os.path.exists(git_dir):
-            subprocess.run(["rm", "-rf", git_dir])
-
-        return f"✅ {node_name} installed successfully"
-
-    except subprocess.TimeoutExpired:
-        return f"⏱️  {node_name} installation timed out"
-    except Exception as e:
-        return f"❌ {node_name} failed: {str(e)}"
-
 def install_all_nodes():
-    """Install all custom nodes with progress updates"""
+    """Clone all custom nodes in parallel, then install their dependencies in one resolve"""
     global nodes_status
 
     if nodes_status["installing"]:
@@ -245,61 +333,28 @@ def install_all_nodes():
     log_lines.append(f"📦 Total nodes to install: {len(CUSTOM_NODES)}")
     log_lines.append("")
 
-    installed = 0
-    skipped = 0
-    failed = 0
-
-    for i, node in enumerate(CUSTOM_NODES, 1):
-        node_name = node["name"]
-        node_url = node["url"]
-
-        progress_msg = f"[{i}/{len(CUSTOM_NODES)}] Installing {node_name}..."
-        log_lines.append(progress_msg)
-        nodes_status["progress"] = progress_msg
+    def log(line):
+        log_lines.append(line)
+        nodes_status["progress"] = line
         nodes_status["log"] = "\n".join(log_lines)
 
-        result = install_single_node(node_name, node_url)
-        log_lines.append(result)
-
-        if "successfully" in result:
-            installed += 1
-        elif "already installed" in result or "skipping" in result:
-            skipped += 1
-        else:
-            failed += 1
-
-        log_lines.append("")
-        nodes_status["log"] = "\n".join(log_lines)
-
-    # Install additional Python packages
-    log_lines.append("=" * 60)
-    log_lines.append("Installing additional Python packages...")
-    log_lines.append("=" * 60)
-
-    packages = [
-        "scikit-image", "kornia", "spandrel", "facexlib",
-        "timm", "einops", "transformers", "accelerate",
-        "safetensors", "omegaconf", "pytorch-lightning"
-    ]
-
     try:
-        subprocess.run(
-            ["pip", "install", "--no-cache-dir", "-q"] + packages,
-            capture_output=True,
-            text=True,
-            timeout=600
-        )
-        log_lines.append("✅ Additional packages installed")
-    except:
-        log_lines.append("⚠️  Some additional packages may have failed")
+        summary = install_nodes(log=log)
+    except Exception as e:
+        log(f"❌ Error: {str(e)}")
+        nodes_status["installing"] = False
+        return nodes_status["log"]
 
     log_lines.append("")
     log_lines.append("=" * 60)
     log_lines.append("INSTALLATION COMPLETE!")
     log_lines.append("=" * 60)
-    log_lines.append(f"✅ Successfully installed: {installed}")
-    log_lines.append(f"⏭️  Skipped (already installed): {skipped}")
-    log_lines.append(f"❌ Failed: {failed}")
+    log_lines.append(f"✅ Successfully installed: {summary['installed']}")
+    log_lines.append(f"⏭️  Skipped (already installed): {summary['skipped']}")
+    log_lines.append(f"❌ Failed: {summary['failed']}")
+    if not summary["deps_ok"]:
+        log_lines.append("⚠️  Some dependencies failed to install (see above)")
+    log_lines.append(f"⏱️  Took {summary['elapsed']:.0f}s (clones: {summary['clone_elapsed']:.0f}s)")
     log_lines.append("")
     log_lines.append("🔄 Restart ComfyUI to use the new custom nodes!")
     log_lines.append("=" * 60)
@@ -310,6 +365,42 @@ def install_all_nodes():
 
     return nodes_status["log"]
 
+def update_all_nodes():
+    """Move every installed custom node to its upstream tip (incremental fetches, in parallel)"""
+    if nodes_status["installing"]:
+        return "⚠️  Installation already in progress..."
+
+    nodes_status["installing"] = True
+    log_lines = ["=" * 60, "UPDATING COMFYUI CUSTOM NODES", "=" * 60, ""]
+
+    def log(line):
+        log_lines.append(line)
+        nodes_status["progress"] = line
+        nodes_status["log"] = "\n".join(log_lines)
+
+    try:
+        summary = update_nodes(log=log)
+    except Exception as e:
+        log(f"❌ Error: {str(e)}")
+        nodes_status["installing"] = False
+        return nodes_status["log"]
+
+    log_lines.append("")
+    log_lines.append("=" * 60)
+    log_lines.append(f"⬆️  Updated: {summary['updated']} | ✔️  Unchanged: {summary['unchanged']} | "
+                     f"❌ Failed: {summary['failed']}")
+    if not summary["deps_ok"]:
+        log_lines.append("⚠️  Some dependencies failed to install (see above)")
+    log_lines.append(f"⏱️  Took {summary['elapsed']:.0f}s")
+    if summary["updated"]:
+        log_lines.append("🔄 Restart ComfyUI to use the updated custom nodes!")
+    log_lines.append("=" * 60)
+
+    nodes_status["log"] = "\n".join(log_lines)
+    nodes_status["progress"] = "Update complete!"
+    nodes_status["installing"] = False
+    return nodes_status["log"]
+
 def install_ai_toolkit():
     """Install AI-Toolkit for LoRA training"""
     if os.path.exists("/workspace/ai-toolkit"):
@@ -323,12 +414,15 @@ def install_ai_toolkit():
 
     try:
         # Run the installation script
-        result = subprocess.run(
-            ["bash", "/workspace/scripts/install_ai_toolkit.sh"],
-            capture_output=True,
-            text=True,
-            timeout=600
-        )
+        with metrics.span("ai_toolkit_install") as span:
+            result = subprocess.run(
+                ["bash", "/workspace/scripts/install_ai_toolkit.sh"],
+                capture_output=True,
+                text=True,
+                timeout=600
+            )
+            if result.returncode != 0:
+                span.update(status="error", exit_code=result.returncode)
 
         log_lines.append(result.stdout)
 
@@ -353,283 +447,436 @@ def install_ai_toolkit():
     return "\n".join(log_lines)
 
 def huggingface_login(token):
-    """Login to Hugging Face using CLI"""
-    if not token or token.strip() == "":
-        return "❌ Please provide a Hugging Face token"
+    """Validate a Hugging Face token and store it for huggingface_hub/AI-Toolkit"""
+    return hf_auth.login(token)
 
-    try:
-        # Install huggingface_hub if not already installed
-        subprocess.run(
-            ["pip", "install", "--no-cache-dir", "-q", "huggingface_hub"],
-            capture_output=True,
-            timeout=60
-        )
-
-        # Login using the token
-        result = subprocess.run(
-            ["huggingface-cli", "login", "--token", token.strip()],
-            capture_output=True,
-            text=True,
-            timeout=30
-        )
+def check_hf_login_status():
+    """Check if user is logged into Hugging Face"""
+    return hf_auth.status()
+
+def build_app():
+    """Build the Gradio interface (Gradio is only imported when the UI is requested)"""
+    import gradio as gr
+
+    with gr.Blocks(title="ComfyUI Manager", theme=gr.themes.Soft()) as app:
+        gr.Markdown("# 📥 ComfyUI Model & Custom Nodes Manager")
+        gr.Markdown("Download models, LoRAs, ControlNets, and install custom nodes directly to your ComfyUI installation")
+
+        with gr.Tab("Download"):
+            with gr.Row():
+                with gr.Column():
+                    url_input = gr.Textbox(
+                        label="Model URL",
+                        placeholder="https://huggingface.co/.../model.safetensors",
+                        lines=2
+                    )
+                    model_type = gr.Dropdown(
+                        choices=[AUTO_DETECT] + list(MODEL_DIRS.keys()),
+                        label="Model Type",
+                        value=AUTO_DETECT
+                    )
+                    filename_input = gr.Textbox(
+                        label="Custom Filename (optional)",
+                        placeholder="Leave empty to use original filename"
+                    )
+                    download_btn = gr.Button("⬇️ Download", variant="primary", size="lg")
+
+                with gr.Column():
+                    output = gr.Textbox(
+                        label="Download Status",
+                        lines=2,
+                        interactive=False
+                    )
+                    with gr.Row():
+                        job_id_input = gr.Textbox(label="Job ID", placeholder="e.g. 3", scale=2)
+                        cancel_btn = gr.Button("🚫 Cancel", scale=1)
+                        retry_btn = gr.Button("🔁 Retry", scale=1)
+                        refresh_jobs_btn = gr.Button("🔄 Refresh", scale=1)
+
+            jobs_output = gr.Textbox(
+                label="Download Queue",
+                lines=12,
+                interactive=False,
+                placeholder="Queued downloads run side by side; progress updates live here..."
+            )
 
-        if result.returncode == 0:
-            return f"✅ Successfully logged in to Hugging Face!\n\n{result.stdout}\n\nYou can now use AI-Toolkit to access gated models like Flux."
-        else:
-            return f"❌ Login failed:\n{result.stderr}"
+            download_btn.click(
+                fn=start_download,
+                inputs=[url_input, model_type, filename_input],
+                outputs=output
+            ).then(
+                fn=watch_downloads,
+                outputs=jobs_output,
+                concurrency_limit=None
+            )
 
-    except subprocess.TimeoutExpired:
-        return "⏱️ Login timed out"
-    except Exception as e:
-        return f"❌ Error: {str(e)}"
+            cancel_btn.click(fn=cancel_download, inputs=job_id_input, outputs=output)
 
-def check_hf_login_status():
-    """Check if user is logged into Hugging Face"""
-    try:
-        result = subprocess.run(
-            ["huggingface-cli", "whoami"],
-            capture_output=True,
-            text=True,
-            timeout=10
-        )
+            retry_btn.click(
+                fn=retry_download,
+                inputs=job_id_input,
+                outputs=output
+            ).then(
+                fn=watch_downloads,
+                outputs=jobs_output,
+                concurrency_limit=None
+            )
 
-        if result.returncode == 0:
-            return f"✅ Logged in as:\n{result.stdout}"
-        else:
-            return "❌ Not logged in to Hugging Face"
-
-    except:
-        return "❌ Unable to check login status (huggingface-cli not installed)"
-
-# Create Gradio interface
-with gr.Blocks(title="ComfyUI Manager", theme=gr.themes.Soft()) as app:
-    gr.Markdown("# 📥 ComfyUI Model & Custom Nodes Manager")
-    gr.Markdown("Download models, LoRAs, ControlNets, and install custom nodes directly to your ComfyUI installation")
-
-    with gr.Tab("Download"):
-        with gr.Row():
-            with gr.Column():
-                url_input = gr.Textbox(
-                    label="Model URL",
-                    placeholder="https://huggingface.co/.../model.safetensors",
-                    lines=2
+            refresh_jobs_btn.click(fn=watch_downloads, outputs=jobs_output, concurrency_limit=None)
+
+            with gr.Accordion("📋 Import Manifest (batch download)", open=False):
+                gr.Markdown(
+                    "Queue every model listed in a JSON manifest (`url`, `category`, `filename`, "
+                    "`size`, `sha256`). Files already present and verified are skipped."
                 )
-                model_type = gr.Dropdown(
-                    choices=list(MODEL_DIRS.keys()),
-                    label="Model Type",
+                with gr.Row():
+                    manifest_path_input = gr.Textbox(
+                        label="Manifest Path",
+                        value=DEFAULT_MANIFEST,
+                        scale=3
+                    )
+                    manifest_file = gr.File(
+                        label="...or upload a manifest",
+                        file_types=[".json", ".yaml", ".yml"],
+                        type="filepath",
+                        scale=2
+                    )
+                import_manifest_btn = gr.Button("📥 Queue Manifest")
+
+            import_manifest_btn.click(
+                fn=import_manifest,
+                inputs=[manifest_path_input, manifest_file],
+                outputs=output
+            ).then(
+                fn=watch_downloads,
+                outputs=jobs_output,
+                concurrency_limit=None
+            )
+
+        with gr.Tab("Browse Models"):
+            with gr.Row():
+                browse_type = gr.Dropdown(
+                    choices=["All"] + list(MODEL_DIRS.keys()),
+                    label="Select Model Type",
                     value="Checkpoints"
                 )
-                filename_input = gr.Textbox(
-                    label="Custom Filename (optional)",
-                    placeholder="Leave empty to use original filename"
+                search_input = gr.Textbox(label="Search", placeholder="Filter by name or subfolder")
+                sort_input = gr.Dropdown(
+                    choices=["name", "size", "modified"],
+                    label="Sort By",
+                    value="name"
                 )
-                download_btn = gr.Button("⬇️ Download", variant="primary", size="lg")
+                page_input = gr.Number(label="Page", value=1, minimum=1, precision=0)
+                refresh_btn = gr.Button("🔄 Refresh")
+
+            files_list = gr.Textbox(
+                label="Installed Models",
+                lines=15,
+                interactive=False
+            )
 
-            with gr.Column():
-                output = gr.Textbox(
-                    label="Download Status",
-                    lines=6,
-                    interactive=False
+            browse_inputs = [browse_type, search_input, sort_input, page_input]
+
+            for browse_control in (browse_type, sort_input, page_input):
+                browse_control.change(
+                    fn=list_models,
+                    inputs=browse_inputs,
+                    outputs=files_list
                 )
 
-        download_btn.click(
-            fn=download_file,
-            inputs=[url_input, model_type, filename_input],
-            outputs=output
-        )
-
-    with gr.Tab("Browse Models"):
-        with gr.Row():
-            browse_type = gr.Dropdown(
-                choices=list(MODEL_DIRS.keys()),
-                label="Select Model Type",
-                value="Checkpoints"
+            search_input.submit(
+                fn=list_models,
+                inputs=browse_inputs,
+                outputs=files_list
+            )
+
+            refresh_btn.click(
+                fn=refresh_models,
+                inputs=browse_inputs,
+                outputs=files_list
             )
-            refresh_btn = gr.Button("🔄 Refresh")
-
-        files_list = gr.Textbox(
-            label="Installed Models",
-            lines=15,
-            interactive=False
-        )
-
-        browse_type.change(
-            fn=list_models,
-            inputs=browse_type,
-            outputs=files_list
-        )
-
-        refresh_btn.click(
-            fn=list_models,
-            inputs=browse_type,
-            outputs=files_list
-        )
-
-    with gr.Tab("🧩 Custom Nodes"):
-        gr.Markdown("## Install ComfyUI Custom Nodes")
-        gr.Markdown("Install all custom nodes with one click. This uses RunPod's fast internet connection!")
-
-        with gr.Row():
-            with gr.Column():
-                install_all_btn = gr.Button(
-                    "🚀 Install All Custom Nodes",
-                    variant="primary",
-                    size="lg"
-                )
-                check_status_btn = gr.Button("🔍 Check Installation Status", size="lg")
-
-            with gr.Column():
-                gr.Markdown(f"""
-                **Nodes to be installed:** {len(CUSTOM_NODES)}
-
-                This will install:
-                - Video processing nodes (AnimateDiff, Frame Interpolation)
-                - ControlNet and IP-Adapter nodes
-                - Quality & upscaling nodes (SUPIR, Ultimate SD Upscale)
-                - Workflow helpers and utilities
-                - Additional Python dependencies
-
-                **Note:** Installation may take 5-15 minutes depending on internet speed.
-                You can monitor progress in real-time below.
-                """)
-
-        installation_output = gr.Textbox(
-            label="Installation Log",
-            lines=20,
-            interactive=False,
-            placeholder="Click 'Install All Custom Nodes' to begin installation..."
-        )
-
-        nodes_status_output = gr.Textbox(
-            label="Installed Nodes Status",
-            lines=15,
-            interactive=False
-        )
-
-        install_all_btn.click(
-            fn=install_all_nodes,
-            outputs=installation_output
-        )
-
-        check_status_btn.click(
-            fn=get_installed_nodes,
-            outputs=nodes_status_output
-        )
-
-    with gr.Tab("🎨 AI-Toolkit"):
-        gr.Markdown("## Install AI-Toolkit for LoRA Training")
-        gr.Markdown("AI-Toolkit enables easy Flux and SDXL LoRA training directly on your RunPod instance.")
-
-        with gr.Row():
-            with gr.Column():
-                install_toolkit_btn = gr.Button(
-                    "🚀 Install AI-Toolkit",
-                    variant="primary",
-                    size="lg"
-                )
 
-            with gr.Column():
-                gr.Markdown("""
-                **What is AI-Toolkit?**
-
-                AI-Toolkit is a powerful tool for training custom LoRAs for:
-                - Flux models
-                - SDXL models
-                - Custom character/style training
-
-                **Installation includes:**
-                - AI-Toolkit repository
-                - Training dependencies
-                - Pre-configured training templates
-                - Launch scripts
-
-                **Note:** Installation takes ~5 minutes.
-                """)
-
-        toolkit_output = gr.Textbox(
-            label="Installation Log",
-            lines=15,
-            interactive=False,
-            placeholder="Click 'Install AI-Toolkit' to begin installation..."
-        )
-
-        install_toolkit_btn.click(
-            fn=install_ai_toolkit,
-            outputs=toolkit_output
-        )
-
-    with gr.Tab("🔑 HF Login"):
-        gr.Markdown("## Hugging Face Login")
-        gr.Markdown("Login to Hugging Face to access gated models (required for Flux and other restricted models in AI-Toolkit)")
-
-        with gr.Row():
-            with gr.Column():
-                gr.Markdown("""
-                **How to get your token:**
-
-                1. Go to [Hugging Face Settings](https://huggingface.co/settings/tokens)
-                2. Click "New token" or use an existing one
-                3. Copy the token
-                4. Paste it below and click Login
-
-                **Token permissions needed:**
-                - Read access to repos
-
-                **This is required for:**
-                - Accessing Flux models in AI-Toolkit
-                - Downloading gated models
-                - Using private repositories
-                """)
-
-                check_status_btn_hf = gr.Button("🔍 Check Login Status", size="lg")
-
-            with gr.Column():
-                hf_token_input = gr.Textbox(
-                    label="Hugging Face Token",
-                    placeholder="hf_...",
-                    type="password",
-                    lines=1
+            with gr.Row():
+                verify_btn = gr.Button("🔎 Verify Integrity")
+                dedup_btn = gr.Button("🧬 Deduplicate Models")
+                adopt_all_checkbox = gr.Checkbox(
+                    label="Hash every file into the store (slower; lets future downloads skip known hashes)",
+                    value=False
                 )
-                login_btn = gr.Button("🔑 Login to Hugging Face", variant="primary", size="lg")
 
-        hf_output = gr.Textbox(
-            label="Login Status",
-            lines=10,
-            interactive=False,
-            placeholder="Enter your Hugging Face token above and click Login..."
-        )
+            verify_btn.click(fn=verify_models, outputs=files_list)
 
-        login_btn.click(
-            fn=huggingface_login,
-            inputs=hf_token_input,
-            outputs=hf_output
-        )
+            dedup_btn.click(
+                fn=deduplicate_models,
+                inputs=adopt_all_checkbox,
+                outputs=files_list
+            )
 
-        check_status_btn_hf.click(
-            fn=check_hf_login_status,
-            outputs=hf_output
-        )
+        with gr.Tab("🧩 Custom Nodes"):
+            gr.Markdown("## Install ComfyUI Custom Nodes")
+            gr.Markdown("Install all custom nodes with one click. This uses RunPod's fast internet connection!")
+
+            with gr.Row():
+                with gr.Column():
+                    install_all_btn = gr.Button(
+                        "🚀 Install All Custom Nodes",
+                        variant="primary",
+                        size="lg"
+                    )
+                    update_all_btn = gr.Button("⬆️ Update Installed Nodes", size="lg")
+                    check_status_btn = gr.Button("🔍 Check Installation Status", size="lg")
+
+                with gr.Column():
+                    gr.Markdown(f"""
+                    **Nodes to be installed:** {len(CUSTOM_NODES)}
+
+                    This will install:
+                    - Video processing nodes (AnimateDiff, Frame Interpolation)
+                    - ControlNet and IP-Adapter nodes
+                    - Quality & upscaling nodes (SUPIR, Ultimate SD Upscale)
+                    - Workflow helpers and utilities
+                    - Additional Python dependencies
+
+                    **Note:** Nodes are cloned in parallel and their dependencies installed in a
+                    single resolve (`numpy<2` pinned). You can monitor progress in real-time below.
+                    Updates fetch only what changed and reinstall requirements only for nodes
+                    whose requirements.txt changed.
+                    """)
+
+            installation_output = gr.Textbox(
+                label="Installation Log",
+                lines=20,
+                interactive=False,
+                placeholder="Click 'Install All Custom Nodes' to begin installation..."
+            )
 
-    with gr.Tab("📚 Quick Links"):
-        gr.Markdown(get_quick_links())
+            nodes_status_output = gr.Textbox(
+                label="Installed Nodes Status",
+                lines=15,
+                interactive=False
+            )
 
-    gr.Markdown("---")
-    gr.Markdown("💡 **Tip:** Use a network volume for persistent storage across pod restarts!")
+            install_all_btn.click(
+                fn=install_all_nodes,
+                outputs=installation_output
+            )
 
-if __name__ == "__main__":
+            update_all_btn.click(
+                fn=update_all_nodes,
+                outputs=installation_output
+            )
+
+            check_status_btn.click(
+                fn=get_installed_nodes,
+                outputs=nodes_status_output
+            )
+
+        with gr.Tab("🎨 AI-Toolkit"):
+            gr.Markdown("## Install AI-Toolkit for LoRA Training")
+            gr.Markdown("AI-Toolkit enables easy Flux and SDXL LoRA training directly on your RunPod instance.")
+
+            with gr.Row():
+                with gr.Column():
+                    install_toolkit_btn = gr.Button(
+                        "🚀 Install AI-Toolkit",
+                        variant="primary",
+                        size="lg"
+                    )
+
+                with gr.Column():
+                    gr.Markdown("""
+                    **What is AI-Toolkit?**
+
+                    AI-Toolkit is a powerful tool for training custom LoRAs for:
+                    - Flux models
+                    - SDXL models
+                    - Custom character/style training
+
+                    **Installation includes:**
+                    - AI-Toolkit repository
+                    - Training dependencies
+                    - Pre-configured training templates
+                    - Launch scripts
+
+                    **Note:** Installation takes ~5 minutes.
+                    """)
+
+            toolkit_output = gr.Textbox(
+                label="Installation Log",
+                lines=15,
+                interactive=False,
+                placeholder="Click 'Install AI-Toolkit' to begin installation..."
+            )
+
+            install_toolkit_btn.click(
+                fn=install_ai_toolkit,
+                outputs=toolkit_output
+            )
+
+        with gr.Tab("🔑 HF Login"):
+            gr.Markdown("## Hugging Face Login")
+            gr.Markdown("Login to Hugging Face to access gated models (required for Flux and other restricted models in AI-Toolkit)")
+
+            with gr.Row():
+                with gr.Column():
+                    gr.Markdown("""
+                    **How to get your token:**
+
+                    1. Go to [Hugging Face Settings](https://huggingface.co/settings/tokens)
+                    2. Click "New token" or use an existing one
+                    3. Copy the token
+                    4. Paste it below and click Login
+
+                    **Token permissions needed:**
+                    - Read access to repos
+
+                    **This is required for:**
+                    - Accessing Flux models in AI-Toolkit
+                    - Downloading gated models
+                    - Using private repositories
+                    """)
+
+                    check_status_btn_hf = gr.Button("🔍 Check Login Status", size="lg")
+
+                with gr.Column():
+                    hf_token_input = gr.Textbox(
+                        label="Hugging Face Token",
+                        placeholder="hf_...",
+                        type="password",
+                        lines=1
+                    )
+                    login_btn = gr.Button("🔑 Login to Hugging Face", variant="primary", size="lg")
+
+            hf_output = gr.Textbox(
+                label="Login Status",
+                lines=10,
+                interactive=False,
+                placeholder="Enter your Hugging Face token above and click Login..."
+            )
+
+            login_btn.click(
+                fn=huggingface_login,
+                inputs=hf_token_input,
+                outputs=hf_output
+            )
+
+            check_status_btn_hf.click(
+                fn=check_hf_login_status,
+                outputs=hf_output
+            )
+
+        with gr.Tab("📚 Quick Links"):
+            gr.Markdown(get_quick_links())
+
+        gr.Markdown("---")
+        gr.Markdown("💡 **Tip:** Use a network volume for persistent storage across pod restarts!")
+    return app
+
+def launch_ui():
+    """Start the Gradio web interface"""
     # Create all model directories
     for dir_path in MODEL_DIRS.values():
         os.makedirs(dir_path, exist_ok=True)
 
     # Create custom_nodes directory if it doesn't exist
-    os.makedirs("/workspace/ComfyUI/custom_nodes", exist_ok=True)
+    os.makedirs(CUSTOM_NODES_DIR, exist_ok=True)
+
+    # Keep the model inventory fresh so browsing never scans the models tree
+    get_inventory().start_background_refresh()
+
+    # Fetch the models saved workflows need at low priority (Download tab jobs go first)
+    from prefetch import PREFETCH_ENABLED, start_background_prefetch
+    if PREFETCH_ENABLED:
+        start_background_prefetch(download_scheduler, get_inventory())
+    # Enable or install the node packs newly saved workflows need (LAZY_NODES=1)
+    if LAZY_NODES:
+        start_background_hydration()
 
     print("🚀 Starting ComfyUI Model & Custom Nodes Manager on port 7860...")
     print("   - Download models, LoRAs, and other files")
     print("   - Install custom nodes with one click")
-    app.launch(
+    build_app().launch(
         server_name="0.0.0.0",
         server_port=7860,
         share=False,
         show_error=True
     )
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="ComfyUI Model & Custom Nodes Manager")
+    subparsers = parser.add_subparsers(dest="command")
+    subparsers.add_parser("ui", help="Start the web interface (default)")
+
+    fetch_parser = subparsers.add_parser("fetch", help="Download every model in a manifest")
+    fetch_parser.add_argument("--manifest", default=DEFAULT_MANIFEST)
+    fetch_parser.add_argument("--workers", type=int, help="Concurrent downloads")
+    fetch_parser.add_argument("--per-host", type=int, help="Concurrent downloads per host")
+    fetch_parser.add_argument("--connections", type=int, help="Connections per download")
+    fetch_parser.add_argument("--max-speed", type=float, help="Bandwidth cap for all downloads (MB/s)")
+
+    dedup_parser = subparsers.add_parser("dedup", help="Hardlink duplicate models into the store")
+    dedup_parser.add_argument("--all", action="store_true", help="Hash every file into the store")
+
+    subparsers.add_parser("verify", help="Re-hash all models and check the integrity index")
+
+    download_parser = subparsers.add_parser("download", help="Download one model (no web UI)")
+    download_parser.add_argument("url")
+    download_parser.add_argument("--type", default=AUTO_DETECT, choices=[AUTO_DETECT] + list(MODEL_DIRS))
+    download_parser.add_argument("--filename", help="Save as (default: from the URL)")
+    download_parser.add_argument("--max-speed", type=float, help="Bandwidth cap for this download (MB/s)")
+
+    list_parser = subparsers.add_parser("list", help="List installed models of one type")
+    list_parser.add_argument("--type", default="All", choices=["All"] + list(MODEL_DIRS))
+    list_parser.add_argument("--search", default="")
+
+    hf_parser = subparsers.add_parser("hf", help="Hugging Face login status, or log in with --token")
+    hf_parser.add_argument("--token", help="Validate and store this token")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "download":
+        max_bytes_per_sec = args.max_speed * 1024 * 1024 if args.max_speed else None
+        message = download_file(args.url, args.type, args.filename, max_bytes_per_sec)
+        print(message)
+        return 0 if message.startswith("✅") else 1
+
+    if args.command == "list":
+        print(list_models(args.type, args.search, refresh=True))
+        return 0
+
+    if args.command == "hf":
+        message = huggingface_login(args.token) if args.token else check_hf_login_status()
+        print(message)
+        return 0 if message.startswith("✅") else 1
+
+    if args.command == "verify":
+        report, summary = _verify_models()
+        print(report)
+        return 1 if summary is None or summary["corrupt"] else 0
+
+    if args.command == "dedup":
+        print(deduplicate_models(adopt_all=args.all))
+        return 0
+
+    if args.command == "fetch":
+        if args.workers:
+            download_scheduler.max_workers = args.workers
+        if args.per_host:
+            download_scheduler.max_per_host = args.per_host
+        if args.connections:
+            download_scheduler.connections = args.connections
+        if args.max_speed:
+            download_scheduler.bandwidth.set_rate(args.max_speed * 1024 * 1024)
+        try:
+            return fetch_manifest_cli(args.manifest)
+        except (OSError, ManifestError) as e:
+            print(f"❌ {e}")
+            return 2
+
+    launch_ui()
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
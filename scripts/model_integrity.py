@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Model integrity index
+Records the sha256 of every downloaded model in a persistent index, looks up
+the hashes HuggingFace and CivitAI publish for a URL, and re-verifies the
+whole models tree in parallel.
+"""
+
+import fcntl
+import hashlib
+import json
+import mmap
+import os
+import re
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+INDEX_PATH = os.environ.get(
+    "MODEL_INTEGRITY_INDEX",
+    "/runpod-volume/.model_integrity.json" if os.path.isdir("/runpod-volume")
+    else "/workspace/.model_integrity.json",
+)
+VERIFY_WORKERS = os.cpu_count() or 4
+HASH_WINDOW = 64 * 1024 * 1024
+CIVITAI_FILE_FIELDS = ("type", "format", "size", "fp")
+
+
+def mmap_sha256(path):
+    """sha256 of a file through a read-only memory map (no userspace copies)"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return digest.hexdigest()
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if hasattr(mm, "madvise"):
+                mm.madvise(mmap.MADV_SEQUENTIAL)
+            view = memoryview(mm)
+            try:
+                for offset in range(0, len(mm), HASH_WINDOW):
+                    digest.update(view[offset:offset + HASH_WINDOW])
+            finally:
+                view.release()
+    return digest.hexdigest()
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+def published_sha256(url, headers=None, timeout=15):
+    """
+    Return the sha256 the hosting site publishes for `url`, or None.
+
+    HuggingFace exposes the LFS oid in the X-Linked-Etag header of the
+    resolve redirect; CivitAI lists file hashes in its model-version API.
+    """
+    parsed = urllib.parse.urlparse(url)
+    host = parsed.hostname or ""
+    request_headers = dict(headers or {})
+    try:
+        if host.endswith("huggingface.co") and "/resolve/" in parsed.path:
+            opener = urllib.request.build_opener(_NoRedirect)
+            request = urllib.request.Request(url, headers=request_headers, method="HEAD")
+            try:
+                response_headers = opener.open(request, timeout=timeout).headers
+            except urllib.error.HTTPError as e:
+                response_headers = e.headers
+            etag = (response_headers.get("X-Linked-Etag") or "").strip('"')
+            return etag.lower() if re.fullmatch(r"[0-9a-fA-F]{64}", etag) else None
+
+        match = re.search(r"/api/download/models/(\d+)", parsed.path)
+        if host.endswith("civitai.com") and match:
+            api_url = f"https://civitai.com/api/v1/model-versions/{match.group(1)}"
+            request = urllib.request.Request(api_url, headers=request_headers)
+            with urllib.request.urlopen(request, timeout=timeout) as resp:
+                version = json.load(resp)
+            query = {key: values[0].lower() for key, values in urllib.parse.parse_qs(parsed.query).items()}
+            candidates = []
+            for f in version.get("files") or []:
+                # ?type= picks the file kind; format/size/fp pick a variant from its metadata
+                fields = dict(f.get("metadata") or {}, type=f.get("type"))
+                if any(str(fields.get(key) or "").lower() != query[key]
+                       for key in CIVITAI_FILE_FIELDS if key in query):
+                    continue
+                candidates.append(f)
+            if not any(key in query for key in CIVITAI_FILE_FIELDS):
+                candidates = [f for f in candidates if f.get("primary")]
+            # Several matches means CivitAI picks by account preferences we can't see
+            if len(candidates) == 1:
+                sha256 = (candidates[0].get("hashes") or {}).get("SHA256")
+                return sha256.lower() if sha256 else None
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+class IntegrityIndex:
+    """
+    Persistent path → {sha256, size, mtime} map, saved as JSON.
+
+    Several processes share the file (the manager, volume_migrate, verify),
+    so a save merges the entries this process recorded into what is on disk
+    under an exclusive file lock instead of overwriting it.
+    """
+
+    def __init__(self, path=INDEX_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        self.entries = self._read()
+        self.dirty = set()
+
+    def _read(self):
+        try:
+            with open(self.path) as f:
+                return json.load(f).get("files", {})
+        except (OSError, ValueError):
+            return {}
+
+    def save(self):
+        with self.lock:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path + ".lock", "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    # Entries other processes saved since we loaded, with ours on top
+                    merged = self._read()
+                    merged.update({path: self.entries[path] for path in self.dirty if path in self.entries})
+                    fd, tmp_path = tempfile.mkstemp(prefix=".model_integrity-", suffix=".tmp",
+                                                    dir=os.path.dirname(self.path) or ".")
+                    try:
+                        with os.fdopen(fd, "w") as f:
+                            json.dump({"version": 1, "files": merged}, f, indent=1, sort_keys=True)
+                        os.replace(tmp_path, self.path)
+                    except BaseException:
+                        os.unlink(tmp_path)
+                        raise
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+            self.entries = merged
+            self.dirty.clear()
+
+    def record(self, path, sha256, source="download", save=True):
+        st = os.stat(path)
+        real = os.path.realpath(path)
+        with self.lock:
+            self.entries[real] = {
+                "sha256": sha256,
+                "size": st.st_size,
+                "mtime": st.st_mtime,
+                "source": source,
+                "verified": time.time(),
+            }
+            self.dirty.add(real)
+        if save:
+            self.save()
+
+    def lookup(self, path):
+        """Recorded sha256 for `path` if the file hasn't changed since, else None"""
+        real = os.path.realpath(path)
+        entry = self.entries.get(real)
+        if not entry:
+            return None
+        try:
+            st = os.stat(real)
+        except OSError:
+            return None
+        if st.st_size != entry["size"] or abs(st.st_mtime - entry["mtime"]) > 1e-3:
+            return None
+        return entry["sha256"]
+
+    def sha256(self, path, source="scan"):
+        """Recorded sha256 when still valid, otherwise hash the file and record it"""
+        sha256 = self.lookup(path)
+        if sha256 is None:
+            sha256 = mmap_sha256(path)
+            self.record(path, sha256, source)
+        return sha256
+
+
+def _model_files(dirs):
+    for root_dir in dirs:
+        for root, _, files in os.walk(root_dir, followlinks=True):
+            for name in files:
+                if not name.endswith((".part", ".part.json", ".tmp", ".link-tmp")):
+                    yield os.path.join(root, name)
+
+
+def verify_tree(dirs, index=None, workers=VERIFY_WORKERS, log=print):
+    """
+    Re-hash every model file under `dirs` and compare with the index.
+
+    Files are hashed on a thread pool; hashlib releases the GIL on large
+    buffers, so the mmap'd reads are spread across all cores. Files the
+    index doesn't know yet, and files whose size or mtime changed since
+    they were recorded (replaced on purpose), are hashed and recorded; only
+    an unchanged file with a different hash counts as corrupt. Files that
+    can't be read are reported in "errors" without stopping the run.
+    """
+    index = index or IntegrityIndex()
+    paths = sorted(set(os.path.realpath(p) for p in _model_files(dirs)))
+    started = time.time()
+    summary = {"ok": 0, "new": 0, "changed": 0, "corrupt": [], "errors": [], "bytes": 0}
+
+    def check(path):
+        try:
+            st = os.stat(path)
+            return path, st, mmap_sha256(path), None
+        except OSError as e:
+            return path, None, None, e
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        for path, st, sha256, error in pool.map(check, paths):
+            if error is not None:
+                summary["errors"].append(path)
+                log(f"⚠️  {path}: {error.strerror or error}")
+                continue
+            summary["bytes"] += st.st_size
+            entry = index.entries.get(path)
+            if entry is None:
+                index.record(path, sha256, "scan", save=False)
+                summary["new"] += 1
+            elif st.st_size != entry["size"] or abs(st.st_mtime - entry["mtime"]) > 1e-3:
+                index.record(path, sha256, "scan", save=False)
+                summary["changed"] += 1
+                log(f"🔄 {path}: changed since it was indexed; re-indexed")
+            elif entry["sha256"] != sha256:
+                summary["corrupt"].append(path)
+                log(f"❌ {path}: sha256 {sha256[:12]} != recorded {entry['sha256'][:12]}")
+            else:
+                index.record(path, sha256, entry.get("source", "scan"), save=False)
+                summary["ok"] += 1
+    index.save()
+    summary["elapsed"] = time.time() - started
+    return summary
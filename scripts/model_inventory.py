@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Model inventory index
+Keeps a SQLite index of every file under MODEL_DIRS (recursively) with size,
+mtime, sha256, safetensors header metadata and the architecture/kind/dtype
+classification from safetensors_info. Refreshes are incremental:
+only directories whose mtime changed since the last pass are re-listed, so
+browsing never has to touch the (possibly network-mounted) models tree.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from safetensors_info import inspect
+
+INVENTORY_DB = os.environ.get("MODEL_INVENTORY_DB", "/workspace/.model_inventory.db")
+REFRESH_INTERVAL = float(os.environ.get("MODEL_INVENTORY_REFRESH", "15"))
+FULL_RESCAN_EVERY = 20  # Background passes between full re-stats (catches in-place rewrites)
+SKIP_SUFFIXES = (".part", ".part.json", ".tmp", ".link-tmp")
+SORT_COLUMNS = {"name": "name COLLATE NOCASE", "size": "size", "modified": "mtime", "path": "relpath"}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    category TEXT NOT NULL,
+    relpath TEXT NOT NULL,
+    name TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    sha256 TEXT,
+    metadata TEXT,
+    indexed_at REAL NOT NULL,
+    kind TEXT,
+    architecture TEXT,
+    dtype TEXT,
+    params INTEGER
+);
+CREATE INDEX IF NOT EXISTS files_category_name ON files (category, name COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS files_category_size ON files (category, size);
+CREATE INDEX IF NOT EXISTS files_category_mtime ON files (category, mtime);
+CREATE TABLE IF NOT EXISTS dirs (
+    path TEXT PRIMARY KEY,
+    parent TEXT,
+    category TEXT NOT NULL,
+    mtime REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS dirs_parent ON dirs (parent);
+"""
+FILE_COLUMNS = ("path", "category", "relpath", "name", "size", "mtime", "sha256", "metadata",
+                "indexed_at", "kind", "architecture", "dtype", "params")
+ADDED_COLUMNS = {"kind": "TEXT", "architecture": "TEXT", "dtype": "TEXT", "params": "INTEGER"}
+INSERT_FILE = "INSERT OR REPLACE INTO files ({}) VALUES ({})".format(
+    ", ".join(FILE_COLUMNS), ", ".join("?" * len(FILE_COLUMNS)))
+
+
+class ModelInventory:
+    """SQLite-backed, incrementally refreshed index of the models tree"""
+
+    def __init__(self, model_dirs, db_path=INVENTORY_DB, index=None):
+        self.model_dirs = dict(model_dirs)
+        self.db_path = db_path
+        self.index = index  # Optional IntegrityIndex for sha256 lookups
+        self.lock = threading.RLock()
+        self.last_refresh = 0.0
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        with self.lock:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.executescript(SCHEMA)
+            self._migrate()
+            self.conn.commit()
+        # Browsing gets its own connection so WAL readers never wait on a refresh
+        self.read_conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.read_conn.row_factory = sqlite3.Row
+        self.read_lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+
+    def _migrate(self):
+        """Add columns introduced after the database was created"""
+        existing = {row["name"] for row in self.conn.execute("PRAGMA table_info(files)")}
+        missing = [name for name in ADDED_COLUMNS if name not in existing]
+        for name in missing:
+            self.conn.execute(f"ALTER TABLE files ADD COLUMN {name} {ADDED_COLUMNS[name]}")
+        if missing:
+            # Force every directory to be re-listed and every file re-read on the next refresh
+            self.conn.execute("UPDATE files SET mtime = -1")
+            self.conn.execute("UPDATE dirs SET mtime = -1")
+
+    def _file_row(self, category, root, path, st):
+        info = inspect(path) or {}
+        metadata = info.get("metadata")
+        sha256 = self.index.lookup(path) if self.index is not None else None
+        return (
+            path, category, os.path.relpath(path, root), os.path.basename(path),
+            st.st_size, st.st_mtime, sha256, json.dumps(metadata) if metadata else None,
+            time.time(), info.get("kind"), info.get("architecture"), info.get("dtype"),
+            info.get("params"),
+        )
+
+    def _refresh_dir(self, category, root, directory, parent, seen_dirs, stats, full, ancestors=frozenset()):
+        try:
+            st = os.stat(directory)
+        except OSError:
+            return
+        # Directory symlinks are followed; one pointing back up the tree would recurse forever
+        key = (st.st_dev, st.st_ino)
+        if key in ancestors:
+            return
+        ancestors = ancestors | {key}
+        seen_dirs.add(directory)
+        row = self.conn.execute("SELECT mtime FROM dirs WHERE path = ?", (directory,)).fetchone()
+
+        if not full and row is not None and row["mtime"] == st.st_mtime:
+            # Entries unchanged: skip listing, just descend into the known subdirectories
+            subdirs = [r["path"] for r in self.conn.execute(
+                "SELECT path FROM dirs WHERE parent = ?", (directory,))]
+        else:
+            stats["dirs_scanned"] += 1
+            subdirs = []
+            known = {r["path"]: (r["size"], r["mtime"]) for r in self.conn.execute(
+                "SELECT path, size, mtime FROM files WHERE path LIKE ? ESCAPE '\\' AND path NOT LIKE ? ESCAPE '\\'",
+                (_like_prefix(directory) + "%", _like_prefix(directory) + "%/%"))}
+            present = set()
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=True):
+                        subdirs.append(entry.path)
+                        continue
+                    if entry.name.startswith(".") or entry.name.endswith(SKIP_SUFFIXES):
+                        continue
+                    try:
+                        file_st = entry.stat(follow_symlinks=True)
+                    except OSError:
+                        continue
+                    present.add(entry.path)
+                    if known.get(entry.path) == (file_st.st_size, file_st.st_mtime):
+                        continue
+                    self.conn.execute(INSERT_FILE, self._file_row(category, root, entry.path, file_st))
+                    stats["files_updated"] += 1
+            for gone in set(known) - present:
+                self.conn.execute("DELETE FROM files WHERE path = ?", (gone,))
+                stats["files_removed"] += 1
+            self.conn.execute("INSERT OR REPLACE INTO dirs VALUES (?, ?, ?, ?)",
+                              (directory, parent, category, st.st_mtime))
+
+        for subdir in subdirs:
+            self._refresh_dir(category, root, subdir, directory, seen_dirs, stats, full, ancestors)
+
+    def refresh(self, full=False):
+        """Bring the index up to date; returns counts of what changed
+
+        Only directories whose mtime moved are re-listed unless `full` is set.
+        """
+        started = time.time()
+        stats = {"dirs_scanned": 0, "files_updated": 0, "files_removed": 0}
+        with self.lock:
+            seen_dirs = set()
+            for category, root in self.model_dirs.items():
+                if os.path.isdir(root):
+                    self._refresh_dir(category, root, root, None, seen_dirs, stats, full)
+            # Directories (and their files) that disappeared since the last pass
+            for row in self.conn.execute("SELECT path FROM dirs").fetchall():
+                if row["path"] not in seen_dirs:
+                    prefix = _like_prefix(row["path"])
+                    cursor = self.conn.execute(
+                        "DELETE FROM files WHERE path LIKE ? ESCAPE '\\' AND path NOT LIKE ? ESCAPE '\\'",
+                        (prefix + "%", prefix + "%/%"))
+                    stats["files_removed"] += cursor.rowcount
+                    self.conn.execute("DELETE FROM dirs WHERE path = ?", (row["path"],))
+            self.conn.commit()
+            self.last_refresh = time.time()
+        stats["elapsed"] = self.last_refresh - started
+        return stats
+
+    def browse(self, category=None, search="", sort="name", descending=False, page=1, page_size=50):
+        """Search/sort/paginate the index; returns (rows, total_count)"""
+        where, params = [], []
+        if category:
+            where.append("category = ?")
+            params.append(category)
+        for term in (search or "").split():
+            # Terms match the path or the classification, e.g. "flux lora"
+            where.append("(relpath LIKE ? ESCAPE '\\' OR architecture LIKE ? ESCAPE '\\' "
+                         "OR kind LIKE ? ESCAPE '\\')")
+            params.extend(["%" + _like_escape(term) + "%"] * 3)
+        clause = ("WHERE " + " AND ".join(where)) if where else ""
+        order = SORT_COLUMNS.get(sort, SORT_COLUMNS["name"]) + (" DESC" if descending else "")
+        page = max(1, int(page or 1))
+        with self.read_lock:
+            total = self.read_conn.execute(f"SELECT COUNT(*) FROM files {clause}", params).fetchone()[0]
+            rows = self.read_conn.execute(
+                f"SELECT * FROM files {clause} ORDER BY {order} LIMIT ? OFFSET ?",
+                params + [page_size, (page - 1) * page_size]).fetchall()
+        return [dict(row) for row in rows], total
+
+    def get(self, path):
+        with self.read_lock:
+            row = self.read_conn.execute("SELECT * FROM files WHERE path = ?", (path,)).fetchone()
+        return dict(row) if row else None
+
+    def find(self, name):
+        """Files whose name matches the basename of `name` (a bare or folder-relative filename)"""
+        basename = name.replace("\\", "/").rsplit("/", 1)[-1]
+        with self.read_lock:
+            rows = self.read_conn.execute("SELECT * FROM files WHERE name = ?", (basename,)).fetchall()
+        return [dict(row) for row in rows]
+
+    def totals(self):
+        """Per-category file count and bytes"""
+        with self.read_lock:
+            rows = self.read_conn.execute(
+                "SELECT category, COUNT(*) AS files, SUM(size) AS bytes FROM files GROUP BY category"
+            ).fetchall()
+        return {row["category"]: (row["files"], row["bytes"] or 0) for row in rows}
+
+    def start_background_refresh(self, interval=REFRESH_INTERVAL):
+        """Refresh in a daemon thread every `interval` seconds"""
+        if self._thread and self._thread.is_alive():
+            return
+
+        def loop():
+            passes = 0
+            while not self._stop.is_set():
+                try:
+                    self.refresh(full=passes % FULL_RESCAN_EVERY == FULL_RESCAN_EVERY - 1)
+                    passes += 1
+                except Exception as e:
+                    print(f"⚠️  Model inventory refresh failed: {e}")
+                self._stop.wait(interval)
+
+        self._thread = threading.Thread(target=loop, daemon=True, name="model-inventory")
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+
+def _like_escape(text):
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _like_prefix(directory):
+    return _like_escape(directory.rstrip("/")) + "/"
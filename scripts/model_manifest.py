@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Declarative model manifest
+Loads a JSON (or YAML, if PyYAML is installed) list of models to fetch and
+queues the whole set on the download scheduler, skipping files that are
+already present and verified.
+"""
+
+import json
+import os
+import time
+
+from download_queue import DONE, PRIORITY_HIGH, format_bytes
+from model_integrity import IntegrityIndex
+
+DEFAULT_MANIFEST = os.path.join(os.path.dirname(os.path.abspath(__file__)), "models_manifest.json")
+
+
+class ManifestError(ValueError):
+    """Raised for a manifest that can't be parsed or references unknown categories"""
+
+
+def _parse(text, path=""):
+    if path.endswith((".yaml", ".yml")):
+        try:
+            import yaml
+        except ImportError:
+            raise ManifestError("PyYAML is not installed; use a .json manifest instead")
+        return yaml.safe_load(text)
+    try:
+        return json.loads(text)
+    except ValueError as e:
+        raise ManifestError(f"Invalid manifest JSON: {e}")
+
+
+def load_manifest(path, model_dirs):
+    """Read and validate a manifest; returns a list of normalised entries"""
+    with open(path) as f:
+        data = _parse(f.read(), path)
+
+    entries = data.get("models", []) if isinstance(data, dict) else data
+    if not isinstance(entries, list):
+        raise ManifestError("Manifest must be a list of models or {\"models\": [...]}")
+
+    normalised = []
+    for i, entry in enumerate(entries, 1):
+        if not isinstance(entry, dict) or not entry.get("url"):
+            raise ManifestError(f"Entry {i} has no url")
+        category = entry.get("category")
+        if category not in model_dirs:
+            raise ManifestError(
+                f"Entry {i} has unknown category {category!r} "
+                f"(expected one of: {', '.join(model_dirs)})"
+            )
+        filename = entry.get("filename") or entry["url"].split("/")[-1].split("?")[0]
+        normalised.append({
+            "url": entry["url"],
+            "category": category,
+            "filename": filename,
+            "size": entry.get("size"),
+            "sha256": (entry.get("sha256") or "").lower() or None,
+            "optional": bool(entry.get("optional", False)),
+            "headers": entry.get("headers") or {},
+        })
+    return normalised
+
+
+def check_present(entry, path, index=None):
+    """Return (ok, reason) for an existing file against the manifest's size/sha256"""
+    if not os.path.isfile(path):
+        return False, "missing"
+    if entry["size"] and os.path.getsize(path) != entry["size"]:
+        return False, "size mismatch"
+    # The integrity index avoids re-hashing files that haven't changed since they were verified
+    if entry["sha256"] and (index or IntegrityIndex()).sha256(path) != entry["sha256"]:
+        return False, "sha256 mismatch"
+    return True, "verified" if entry["sha256"] else "present"
+
+
+def queue_manifest(entries, scheduler, model_dirs, priority=PRIORITY_HIGH):
+    """Queue every entry that isn't already present; returns (jobs, skipped)"""
+    jobs, skipped = [], []
+    for entry in entries:
+        target_dir = model_dirs[entry["category"]]
+        path = os.path.join(target_dir, entry["filename"])
+        ok, reason = check_present(entry, path, scheduler.index)
+        if ok:
+            skipped.append((entry, reason))
+            continue
+        job = scheduler.submit(entry["url"], target_dir, entry["filename"],
+                               headers=entry["headers"], label=entry["category"],
+                               sha256=entry["sha256"], priority=priority)
+        job.manifest_entry = entry
+        jobs.append(job)
+    return jobs, skipped
+
+
+def wait_for_manifest(jobs, skipped, started):
+    """Wait for queued manifest jobs and build a summary (jobs verify their own sha256)"""
+    for job in jobs:
+        job.wait()
+
+    downloaded, failed = [], []
+    for job in jobs:
+        entry = job.manifest_entry
+        if job.status != DONE:
+            failed.append((entry, job.error or job.status))
+            continue
+        if entry["size"] and job.result["size"] != entry["size"]:
+            failed.append((entry, "size mismatch"))
+            continue
+        downloaded.append((entry, job))
+
+    elapsed = max(time.time() - started, 1e-6)
+    total_bytes = sum(job.result["size"] for _, job in downloaded)
+    return {
+        "downloaded": downloaded,
+        "skipped": skipped,
+        "failed": failed,
+        "bytes": total_bytes,
+        "elapsed": elapsed,
+        "bytes_per_sec": total_bytes / elapsed,
+    }
+
+
+def format_report(summary):
+    """Human readable throughput report for a finished manifest run"""
+    lines = []
+    lines.append("=" * 60)
+    lines.append("MANIFEST DOWNLOAD REPORT")
+    lines.append("=" * 60)
+    for entry, job in summary["downloaded"]:
+        lines.append(
+            f"✅ {entry['category']}/{entry['filename']} — {format_bytes(job.result['size'])} "
+            f"@ {format_bytes(job.result['bytes_per_sec'])}/s"
+        )
+    for entry, reason in summary["skipped"]:
+        lines.append(f"⏭️  {entry['category']}/{entry['filename']} — {reason}")
+    for entry, reason in summary["failed"]:
+        tag = " (optional)" if entry["optional"] else ""
+        lines.append(f"❌ {entry['category']}/{entry['filename']}{tag} — {reason}")
+    lines.append("")
+    lines.append(f"Downloaded: {len(summary['downloaded'])} | Skipped: {len(summary['skipped'])} | "
+                 f"Failed: {len(summary['failed'])}")
+    lines.append(f"Transferred {format_bytes(summary['bytes'])} in {summary['elapsed']:.1f}s "
+                 f"({format_bytes(summary['bytes_per_sec'])}/s aggregate)")
+    lines.append("=" * 60)
+    return "\n".join(lines)
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Content-addressed model store
+Keeps one copy of every model blob under the persistent volume, keyed by
+sha256. Files in MODEL_DIRS become hardlinks (or reflinks) into the store, so
+the same weights saved under several names only use disk space once.
+"""
+
+import collections
+import errno
+import fcntl
+import hashlib
+import os
+import shutil
+import stat
+from concurrent.futures import ThreadPoolExecutor
+
+STORE_DIR = os.environ.get(
+    "MODEL_STORE_DIR",
+    "/runpod-volume/.model-store" if os.path.isdir("/runpod-volume") else "/workspace/.model-store",
+)
+FICLONE = 0x40049409  # ioctl(2) request for a copy-on-write clone (btrfs, xfs, ...)
+HASH_WORKERS = max(2, min(8, os.cpu_count() or 2))
+MIN_DEDUP_SIZE = 1024 * 1024  # Config/json sidecars aren't worth linking
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(8 * 1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def blob_path(sha256, store_dir=None):
+    sha256 = sha256.lower()
+    return os.path.join(store_dir or STORE_DIR, "sha256", sha256[:2], sha256)
+
+
+def has_blob(sha256, store_dir=None):
+    return bool(sha256) and os.path.isfile(blob_path(sha256, store_dir))
+
+
+def _reflink(src, dst):
+    """Copy-on-write clone src to dst; raises OSError where unsupported"""
+    with open(src, "rb") as s, open(dst, "wb") as d:
+        try:
+            fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+        except OSError:
+            d.close()
+            os.remove(dst)
+            raise
+
+
+def _materialise(src, dst):
+    """Create dst as a hardlink/reflink/copy of src; returns the method used"""
+    tmp = dst + ".link-tmp"
+    if os.path.lexists(tmp):
+        os.remove(tmp)
+    try:
+        os.link(src, tmp)
+        method = "hardlink"
+    except OSError:
+        try:
+            _reflink(src, tmp)
+            method = "reflink"
+        except OSError:
+            shutil.copyfile(src, tmp)
+            method = "copy"
+    os.replace(tmp, dst)
+    return method
+
+
+def link_blob(sha256, dest, store_dir=None):
+    """Materialise a stored blob at `dest`; returns the method used"""
+    os.makedirs(os.path.dirname(dest) or ".", exist_ok=True)
+    return _materialise(blob_path(sha256, store_dir), dest)
+
+
+def adopt(path, sha256=None, store_dir=None):
+    """
+    Move `path` under content addressing.
+
+    If the blob already exists, `path` is replaced by a link to it (the
+    duplicate's space is freed); otherwise the file itself becomes the blob.
+    Returns (sha256, action) where action is "linked", "stored" or "skipped".
+    """
+    sha256 = (sha256 or file_sha256(path)).lower()
+    blob = blob_path(sha256, store_dir)
+    if os.path.isfile(blob):
+        blob_st, path_st = os.stat(blob), os.stat(path)
+        if (blob_st.st_dev, blob_st.st_ino) == (path_st.st_dev, path_st.st_ino):
+            return sha256, "skipped"
+        if blob_st.st_dev != path_st.st_dev:
+            return sha256, "skipped"  # A cross-filesystem "link" would just be another copy
+        _materialise(blob, path)
+        return sha256, "linked"
+
+    os.makedirs(os.path.dirname(blob), exist_ok=True)
+    try:
+        os.link(path, blob)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+        # Store lives on another filesystem; keeping a second copy would defeat the point
+        return sha256, "skipped"
+    os.chmod(blob, stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)  # Blobs are immutable
+    return sha256, "stored"
+
+
+def _iter_files(dirs):
+    for root_dir in dirs:
+        for root, _, files in os.walk(root_dir):
+            for name in files:
+                if name.endswith((".part", ".json.tmp", ".link-tmp")):
+                    continue
+                path = os.path.join(root, name)
+                if not os.path.islink(path):
+                    yield path
+
+
+def dedup_scan(dirs, adopt_all=False, store_dir=None, log=print):
+    """
+    Collapse duplicate files across `dirs` into store links.
+
+    Only files whose size collides with another file are hashed, unless
+    `adopt_all` is set, in which case every file is hashed and moved into
+    the store.
+    Returns a summary dict with counts and bytes saved.
+    """
+    by_size = collections.defaultdict(list)
+    seen_inodes = set()
+    for path in _iter_files(dirs):
+        st = os.stat(path)
+        if st.st_size < MIN_DEDUP_SIZE or (st.st_dev, st.st_ino) in seen_inodes:
+            continue
+        seen_inodes.add((st.st_dev, st.st_ino))
+        by_size[st.st_size].append(path)
+
+    candidates = [p for paths in by_size.values() if adopt_all or len(paths) > 1 for p in paths]
+    log(f"🔍 {sum(len(p) for p in by_size.values())} files scanned, hashing {len(candidates)}")
+
+    with ThreadPoolExecutor(max_workers=HASH_WORKERS) as pool:
+        hashes = dict(zip(candidates, pool.map(file_sha256, candidates)))
+
+    summary = {"scanned": len(seen_inodes), "hashed": len(candidates),
+               "linked": 0, "stored": 0, "bytes_saved": 0}
+    for path, sha256 in hashes.items():
+        size = os.path.getsize(path)
+        _, action = adopt(path, sha256, store_dir)
+        if action == "linked":
+            summary["linked"] += 1
+            summary["bytes_saved"] += size
+            log(f"🔗 {path} → {sha256[:12]}")
+        elif action == "stored":
+            summary["stored"] += 1
+    return summary
+
+
+def garbage_collect(store_dir=None, log=print):
+    """Delete blobs no MODEL_DIRS file links to any more; returns bytes freed"""
+    freed = 0
+    root = os.path.join(store_dir or STORE_DIR, "sha256")
+    for path in _iter_files([root]):
+        st = os.stat(path)
+        if st.st_nlink == 1:
+            os.remove(path)
+            freed += st.st_size
+            log(f"🗑️  {os.path.basename(path)[:12]} ({st.st_size / (1024 ** 3):.2f} GB)")
+    return freed
+
+
+def store_stats(store_dir=None):
+    root = os.path.join(store_dir or STORE_DIR, "sha256")
+    blobs = list(_iter_files([root])) if os.path.isdir(root) else []
+    return {"blobs": len(blobs), "bytes": sum(os.path.getsize(p) for p in blobs)}
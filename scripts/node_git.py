@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Custom node git checkouts from a shared object cache
+Every node repo is fetched into a shallow bare repo in a cache on the
+network volume, one per URL, and node folders are checked out from that
+cache. A pod whose cache already has a commit gets it without touching the
+network. Updates are incremental `--depth 1` fetches of the new tip, and
+node folders keep their .git, so a node moves to another commit in place
+instead of being deleted and cloned again.
+
+    node_git.py status [--dir DIR]        each node's commit and whether the cache has a newer tip
+    node_git.py clone URL [--name NAME]   check one node out into custom_nodes (if missing)
+    node_git.py gc                        repack the cache repos
+
+Updating the nodes this template manages (and their requirements) is
+`node_installer.py --update`.
+"""
+
+import contextlib
+import fcntl
+import hashlib
+import os
+import re
+import shutil
+import subprocess
+import time
+
+GIT_CACHE_DIR = os.environ.get(
+    "NODE_GIT_CACHE",
+    "/runpod-volume/.node-git-cache" if os.path.isdir("/runpod-volume") else "/workspace/.node-git-cache",
+)
+GIT_TIMEOUT = 300
+TIP_REF = "refs/heads/tip"
+PIN_PREFIX = "refs/pins/"
+
+
+def _git(args, cwd=None, timeout=GIT_TIMEOUT):
+    return subprocess.run(["git"] + (["-C", cwd] if cwd else []) + list(args),
+                          capture_output=True, text=True, timeout=timeout)
+
+
+def _check(result, what):
+    """stdout of a git run, or RuntimeError with git's last error line"""
+    if result.returncode != 0:
+        error = result.stderr.strip().splitlines()[-1:] or [f"git {what} failed"]
+        raise RuntimeError(error[0])
+    return result.stdout.strip()
+
+
+def cache_path(url, cache_dir=GIT_CACHE_DIR):
+    """Bare cache repo for `url`: readable name plus a hash of the full URL"""
+    name = re.sub(r"\.git$", "", url.rstrip("/").split("/")[-1])
+    name = re.sub(r"[^A-Za-z0-9._-]", "_", name) or "repo"
+    return os.path.join(cache_dir, f"{name}-{hashlib.sha1(url.encode()).hexdigest()[:10]}.git")
+
+
+@contextlib.contextmanager
+def _locked(repo):
+    """Exclusive lock on a cache repo (pods sharing the volume, or threads of this one)"""
+    with open(repo + ".lock", "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _commit(repo, rev):
+    result = _git(["rev-parse", "--verify", "--quiet", f"{rev}^{{commit}}"], repo)
+    return result.stdout.strip() if result.returncode == 0 else None
+
+
+def head(path):
+    """Commit checked out in a node folder, or None when it isn't a git checkout"""
+    if not os.path.exists(os.path.join(path, ".git")):
+        return None
+    return _commit(path, "HEAD")
+
+
+def fetch(url, commit=None, cache_dir=GIT_CACHE_DIR):
+    """
+    Make sure the cache repo for `url` has `commit` (default: the remote's
+    current HEAD). A commit already in the cache costs no network; anything
+    else is a `--depth 1` fetch, which only transfers objects the cache
+    lacks. Returns (cache repo, full commit sha, whether the network was used).
+    """
+    repo = cache_path(url, cache_dir)
+    os.makedirs(cache_dir, exist_ok=True)
+    with _locked(repo):
+        if not os.path.isdir(repo):
+            _check(_git(["init", "--bare", "--quiet", repo]), "init")
+        if commit:
+            sha = _commit(repo, commit)
+            if sha:
+                return repo, sha, False
+            _check(_git(["fetch", "--depth", "1", "--no-tags", "--quiet", url, commit], repo), "fetch")
+            sha = _check(_git(["rev-parse", "FETCH_HEAD"], repo), "rev-parse")
+        else:
+            _check(_git(["fetch", "--depth", "1", "--no-tags", "--quiet", url, f"+HEAD:{TIP_REF}"], repo), "fetch")
+            sha = _commit(repo, TIP_REF)
+        # Every commit handed out stays referenced, so gc never drops what a lockfile points at
+        _git(["update-ref", PIN_PREFIX + sha, sha], repo)
+        _git(["gc", "--auto", "--quiet"], repo)
+    return repo, sha, True
+
+
+def checkout(url, sha, path, repo):
+    """
+    Put the node folder `path` at `sha`, taking objects from the cache repo.
+
+    A missing folder becomes a shallow clone whose origin is the real URL;
+    a git checkout moves to `sha` (refusing to overwrite local edits); a
+    folder without .git (installed before nodes kept theirs) is adopted in
+    place. Returns the commit the folder was at before, if any.
+    """
+    adopt = os.path.isdir(path) and not os.path.exists(os.path.join(path, ".git"))
+    previous = head(path)
+    if previous == sha:
+        return previous
+    if previous is None:
+        _check(_git(["init", "--quiet", path]), "init")
+        _git(["remote", "add", "origin", url], path)
+    _check(_git(["fetch", "--depth", "1", "--no-tags", "--quiet", f"file://{repo}", sha], path), "fetch")
+    if adopt:
+        _check(_git(["reset", "--hard", "--quiet", sha], path), "reset")
+    else:
+        result = _git(["checkout", "--quiet", sha], path)
+        if result.returncode != 0 and "local changes" in result.stderr:
+            raise RuntimeError("local edits would be overwritten; commit or stash them, or `git checkout .` to drop them")
+        _check(result, "checkout")
+    _git(["gc", "--auto", "--quiet"], path)
+    return previous
+
+
+def changed(path, old, new, filename):
+    """Whether `filename` differs between two commits of a checkout (True when unknown)"""
+    if not old or not new:
+        return True
+    return _git(["diff", "--quiet", old, new, "--", filename], path).returncode != 0
+
+
+def sync_node(node, path, commit=None, cache_dir=GIT_CACHE_DIR):
+    """
+    Bring node {name, url} in `path` to `commit` (default: upstream HEAD)
+    through the cache. Returns {name, url, path, commit, previous, fetched,
+    status, message} with status installed/updated/unchanged/failed.
+    """
+    result = {"name": node["name"], "url": node["url"], "path": path, "commit": None, "previous": None,
+              "fetched": False}
+    fresh = not os.path.exists(path)
+    started = time.time()
+    try:
+        repo, sha, result["fetched"] = fetch(node["url"], commit, cache_dir)
+        result["previous"] = checkout(node["url"], sha, path, repo)
+    except (OSError, RuntimeError, subprocess.TimeoutExpired) as e:
+        if fresh:
+            shutil.rmtree(path, ignore_errors=True)
+        error = "timed out" if isinstance(e, subprocess.TimeoutExpired) else str(e)
+        return dict(result, status="failed", message=f"❌ {node['name']}: {error}")
+    result["commit"] = sha
+    source = "fetched" if result["fetched"] else "from cache"
+    if fresh:
+        return dict(result, status="installed",
+                    message=f"✅ {node['name']} {sha[:10]} ({source}) in {time.time() - started:.1f}s")
+    if result["previous"] == sha:
+        return dict(result, status="unchanged", message=f"✔️  {node['name']} already at {sha[:10]}")
+    was = result["previous"][:10] if result["previous"] else "untracked"
+    return dict(result, status="updated", message=f"⬆️  {node['name']} {was} → {sha[:10]} ({source})")
+
+
+def status(custom_nodes_dir, cache_dir=GIT_CACHE_DIR):
+    """[(folder, commit or None, cached tip or None)] for every node folder"""
+    rows = []
+    for entry in sorted(os.scandir(custom_nodes_dir), key=lambda e: e.name.lower()):
+        if not entry.is_dir() or entry.name.startswith((".", "__")):
+            continue
+        commit = head(entry.path)
+        url = _git(["remote", "get-url", "origin"], entry.path).stdout.strip() if commit else ""
+        repo = cache_path(url, cache_dir) if url else None
+        tip = _commit(repo, TIP_REF) if repo and os.path.isdir(repo) else None
+        rows.append((entry.name, commit, tip))
+    return rows
+
+
+def main(argv=None):
+    import argparse
+
+    from node_installer import CUSTOM_NODES_DIR
+
+    parser = argparse.ArgumentParser(description="Custom node checkouts from the shared git cache")
+    parser.add_argument("command", choices=["status", "clone", "gc"])
+    parser.add_argument("url", nargs="?", help="clone: repository URL")
+    parser.add_argument("--name", help="clone: folder name (default: from the URL)")
+    parser.add_argument("--dir", default=CUSTOM_NODES_DIR, help="custom_nodes directory")
+    parser.add_argument("--cache", default=GIT_CACHE_DIR, help="Shared bare-repo cache")
+    args = parser.parse_args(argv)
+
+    if args.command == "clone":
+        if not args.url:
+            parser.error("clone needs a URL")
+        name = args.name or re.sub(r"\.git$", "", args.url.rstrip("/").split("/")[-1])
+        path = os.path.join(args.dir, name)
+        if os.path.exists(path):
+            print(f"⏭️  {name} already installed")
+            return 0
+        os.makedirs(args.dir, exist_ok=True)
+        result = sync_node({"name": name, "url": args.url}, path, cache_dir=args.cache)
+        print(result["message"])
+        return 1 if result["status"] == "failed" else 0
+
+    if args.command == "gc":
+        repos = [entry.path for entry in os.scandir(args.cache) if entry.name.endswith(".git")] \
+            if os.path.isdir(args.cache) else []
+        for repo in repos:
+            with _locked(repo):
+                _git(["gc", "--quiet", "--prune=now"], repo, timeout=None)
+        print(f"🧹 Repacked {len(repos)} cache repos in {args.cache}")
+        return 0
+
+    print("=" * 60)
+    print(f"CUSTOM NODE CHECKOUTS (cache: {args.cache})")
+    print("=" * 60)
+    for name, commit, tip in status(args.dir, args.cache):
+        if commit is None:
+            print(f"⚪ {name}: not a git checkout")
+        elif tip and tip != commit:
+            print(f"⬆️  {name}: {commit[:10]}, cache has {tip[:10]}")
+        else:
+            print(f"✅ {name}: {commit[:10]}")
+    print("=" * 60)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
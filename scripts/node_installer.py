@@ -0,0 +1,418 @@
+#!/usr/bin/env python3
+"""
+Parallel custom node installer
+Clones every custom node concurrently, merges all of their requirements.txt
+files (plus the extra package list) into one constrained install, and records
+the resolved package set and node commits in a lockfile. Checkouts come from
+the shared git cache (node_git.py) and keep their .git, so `--update` moves
+installed nodes to newer commits in place.
+"""
+
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import metrics
+import node_git
+from node_git import GIT_CACHE_DIR
+
+CUSTOM_NODES_DIR = "/workspace/ComfyUI/custom_nodes"
+LOCKFILE = os.environ.get("NODES_LOCKFILE", "/workspace/custom_nodes.lock.json")
+CLONE_WORKERS = int(os.environ.get("NODE_CLONE_WORKERS", "8"))
+INSTALL_TIMEOUT = 1800
+
+# Custom nodes installed by the one-click installer
+CUSTOM_NODES = [
+    {"name": "ComfyUI-VideoHelperSuite", "url": "https://github.com/Kosinkadink/ComfyUI-VideoHelperSuite.git"},
+    {"name": "ComfyUI_IPAdapter_plus", "url": "https://github.com/cubiq/ComfyUI_IPAdapter_plus.git"},
+    {"name": "ComfyUI-Impact-Pack", "url": "https://github.com/ltdrdata/ComfyUI-Impact-Pack.git"},
+    {"name": "ComfyUI-Impact-Subpack", "url": "https://github.com/ltdrdata/ComfyUI-Impact-Subpack.git"},
+    {"name": "ComfyUI-Advanced-ControlNet", "url": "https://github.com/Kosinkadink/ComfyUI-Advanced-ControlNet.git"},
+    {"name": "ComfyUI-AnimateDiff-Evolved", "url": "https://github.com/Kosinkadink/ComfyUI-AnimateDiff-Evolved.git"},
+    {"name": "ComfyUI-Frame-Interpolation", "url": "https://github.com/Fannovel16/ComfyUI-Frame-Interpolation.git"},
+    {"name": "comfyui_controlnet_aux", "url": "https://github.com/Fannovel16/comfyui_controlnet_aux.git"},
+    {"name": "ComfyUI_essentials", "url": "https://github.com/cubiq/ComfyUI_essentials.git"},
+    {"name": "ComfyUI-SUPIR", "url": "https://github.com/kijai/ComfyUI-SUPIR.git"},
+    {"name": "efficiency-nodes-comfyui", "url": "https://github.com/jags111/efficiency-nodes-comfyui.git"},
+    {"name": "ComfyUI-Custom-Scripts", "url": "https://github.com/pythongosssss/ComfyUI-Custom-Scripts.git"},
+    {"name": "rgthree-comfy", "url": "https://github.com/rgthree/rgthree-comfy.git"},
+    {"name": "was-node-suite-comfyui", "url": "https://github.com/WASasquatch/was-node-suite-comfyui.git"},
+    {"name": "ComfyUI_UltimateSDUpscale", "url": "https://github.com/ssitu/ComfyUI_UltimateSDUpscale.git"},
+    {"name": "ComfyUI-AnimateLCM", "url": "https://github.com/daniabib/ComfyUI-AnimateLCM.git"},
+    {"name": "ComfyUI_FizzNodes", "url": "https://github.com/FizzleDorf/ComfyUI_FizzNodes.git"},
+]
+
+# Installed alongside the nodes' own requirements
+EXTRA_PACKAGES = [
+    "scikit-image", "kornia", "spandrel", "facexlib",
+    "timm", "einops", "transformers", "accelerate",
+    "safetensors", "omegaconf", "pytorch-lightning",
+]
+
+# Applied to the whole resolve (opencv pulls numpy 2.x, which breaks scipy/ComfyUI)
+CONSTRAINTS = ["numpy<2.0"]
+
+_REQUIREMENT_RE = re.compile(r"^([A-Za-z0-9][A-Za-z0-9._-]*)\s*(\[[^\]]*\])?\s*(.*)$")
+
+
+def canonical_name(name):
+    """PEP 503 normalised project name"""
+    return re.sub(r"[-_.]+", "-", name).lower()
+
+
+def is_installed(node_name, custom_nodes_dir=CUSTOM_NODES_DIR):
+    """Check if a custom node is already installed"""
+    return os.path.isdir(os.path.join(custom_nodes_dir, node_name))
+
+
+def clone_node(node, custom_nodes_dir=CUSTOM_NODES_DIR, cache_dir=GIT_CACHE_DIR):
+    """
+    Check one node out from the shared git cache (at node["commit"] when
+    given); returns a result dict with status installed/skipped/failed.
+    """
+    node_dir = os.path.join(custom_nodes_dir, node["name"])
+    if os.path.exists(node_dir):
+        return {"name": node["name"], "url": node["url"], "path": node_dir, "commit": None,
+                "status": "skipped", "message": f"⏭️  {node['name']} already installed"}
+    with metrics.span("node_clone", {"node": node["name"]}) as span:
+        result = node_git.sync_node(node, node_dir, node.get("commit"), cache_dir)
+        span.update(fetched=result["fetched"])
+        if result["status"] == "failed":
+            span.update(status="error", error=result["message"])
+    return result
+
+
+def clone_all(nodes, custom_nodes_dir=CUSTOM_NODES_DIR, workers=CLONE_WORKERS, log=print,
+              cache_dir=GIT_CACHE_DIR):
+    """Clone nodes on a thread pool; returns results in the order of `nodes`"""
+    os.makedirs(custom_nodes_dir, exist_ok=True)
+    results = {}
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = {pool.submit(clone_node, node, custom_nodes_dir, cache_dir): node["name"] for node in nodes}
+        for done, future in enumerate(as_completed(futures), 1):
+            result = future.result()
+            results[result["name"]] = result
+            log(f"[{done}/{len(nodes)}] {result['message']}")
+    return [results[node["name"]] for node in nodes]
+
+
+def read_requirements(path):
+    """Requirement lines from a requirements.txt (comments, options and -r/-e lines dropped)"""
+    lines = []
+    with open(path, errors="replace") as f:
+        for line in f:
+            line = line.split(" #")[0].strip()
+            if not line or line.startswith(("#", "-")):
+                continue
+            lines.append(line)
+    return lines
+
+
+def merge_requirements(requirement_lists):
+    """
+    Merge requirement lines from many sources into one deduplicated list.
+
+    Plain `name[extras] specifier` lines for the same project are combined
+    (extras unioned, specifiers joined with commas) so the resolver sees a
+    single requirement per project. Lines with environment markers or direct
+    URLs are kept verbatim.
+    """
+    merged = {}
+    verbatim = []
+    for line in (line for lines in requirement_lists for line in lines):
+        match = _REQUIREMENT_RE.match(line)
+        if not match or ";" in line or "@" in line or "://" in line:
+            if line not in verbatim:
+                verbatim.append(line)
+            continue
+        name, extras, spec = match.groups()
+        entry = merged.setdefault(canonical_name(name), {"name": name, "extras": set(), "specs": []})
+        if extras:
+            entry["extras"].update(e.strip() for e in extras[1:-1].split(",") if e.strip())
+        for part in spec.replace(" ", "").split(","):
+            if part and part not in entry["specs"]:
+                entry["specs"].append(part)
+
+    lines = []
+    for key in sorted(merged):
+        entry = merged[key]
+        extras = f"[{','.join(sorted(entry['extras']))}]" if entry["extras"] else ""
+        lines.append(f"{entry['name']}{extras}{','.join(entry['specs'])}")
+    return lines + verbatim
+
+
+def _installer():
+    """uv when available (much faster resolver), otherwise pip for this interpreter"""
+    uv = shutil.which("uv")
+    if uv:
+        return [uv, "pip"], ["--python", sys.executable]
+    return [sys.executable, "-m", "pip"], []
+
+
+def install_requirements(requirements, constraints=CONSTRAINTS, log=print):
+    """Resolve and install the merged requirements in a single installer run; returns success"""
+    tool, target = _installer()
+    with tempfile.TemporaryDirectory() as tmp:
+        requirements_file = os.path.join(tmp, "requirements.txt")
+        constraints_file = os.path.join(tmp, "constraints.txt")
+        with open(requirements_file, "w") as f:
+            f.write("\n".join(requirements) + "\n")
+        with open(constraints_file, "w") as f:
+            f.write("\n".join(constraints) + "\n")
+
+        command = tool + ["install"] + target + ["-r", requirements_file, "-c", constraints_file]
+        if not target:
+            command.append("--no-cache-dir")
+        log(f"📦 Installing {len(requirements)} requirements with {os.path.basename(tool[0])} "
+            f"(constraints: {', '.join(constraints)})")
+        with metrics.span("pip", {"command": "install", "via": os.path.basename(tool[0])},
+                          requirements=len(requirements)) as span:
+            try:
+                result = subprocess.run(command, capture_output=True, text=True, timeout=INSTALL_TIMEOUT)
+            except subprocess.TimeoutExpired:
+                span.update(status="error", error="timed out")
+                log("⏱️  Dependency install timed out")
+                return False
+            if result.returncode != 0:
+                span.update(status="error", exit_code=result.returncode)
+    if result.returncode != 0:
+        log("⚠️  Combined install failed:")
+        log("\n".join(result.stderr.strip().splitlines()[-15:]))
+        return False
+    return True
+
+
+def freeze():
+    """Installed packages as sorted `name==version` lines"""
+    tool, target = _installer()
+    result = subprocess.run(tool + ["freeze"] + target, capture_output=True, text=True, timeout=120)
+    return sorted((line for line in result.stdout.splitlines() if line and not line.startswith("#")),
+                  key=str.lower)
+
+
+def write_lockfile(path, node_results, requirements, packages, constraints=CONSTRAINTS, deps_ok=True):
+    """
+    Record node commits, the merged requirements and the resolved package
+    set. `deps_ok` False marks the requirements as not (fully) installed, so
+    the next install_nodes run retries them.
+    """
+    previous = load_lockfile(path)
+    nodes = previous.get("nodes", {})
+    for result in node_results:
+        if result["status"] != "failed" and result["commit"]:
+            nodes[result["name"]] = {"url": result["url"], "commit": result["commit"]}
+    data = {
+        "version": 1,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": sys.version.split()[0],
+        "constraints": constraints,
+        "nodes": nodes,
+        "requirements": requirements,
+        "packages": packages,
+        "deps_ok": deps_ok,
+    }
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, indent=1)
+    os.replace(tmp_path, path)
+
+
+def load_lockfile(path=LOCKFILE):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _pinned(nodes, lockfile):
+    """Nodes with the commit the lockfile recorded for them (same URL only), unless already pinned"""
+    locked = load_lockfile(lockfile).get("nodes", {})
+    pinned = []
+    for node in nodes:
+        entry = locked.get(node["name"], {})
+        if not node.get("commit") and entry.get("url") == node["url"] and entry.get("commit"):
+            node = dict(node, commit=entry["commit"])
+        pinned.append(node)
+    return pinned
+
+
+def install_nodes(nodes=CUSTOM_NODES, custom_nodes_dir=CUSTOM_NODES_DIR, workers=CLONE_WORKERS,
+                  extra_packages=EXTRA_PACKAGES, lockfile=LOCKFILE, log=print, cache_dir=GIT_CACHE_DIR):
+    """
+    Clone all nodes concurrently, then install every dependency in one go.
+
+    Nodes the lockfile knows are checked out at their recorded commit, so a
+    new pod reproduces the last one. Returns a summary with
+    installed/skipped/failed counts and timings. When nothing new was cloned
+    and a lockfile exists, the dependency step is skipped entirely, unless
+    the lockfile says the last one failed.
+    """
+    started = time.time()
+    log(f"📦 Cloning {len(nodes)} custom nodes ({workers} at a time)...")
+    results = clone_all(_pinned(nodes, lockfile), custom_nodes_dir, workers, log, cache_dir)
+    clone_elapsed = time.time() - started
+
+    new_nodes = [r for r in results if r["status"] == "installed"]
+    summary = {
+        "installed": len(new_nodes),
+        "skipped": sum(1 for r in results if r["status"] == "skipped"),
+        "failed": sum(1 for r in results if r["status"] == "failed"),
+        "clone_elapsed": clone_elapsed,
+        "deps_ok": True,
+        "packages": 0,
+    }
+
+    previous = load_lockfile(lockfile)
+    retry = previous.get("deps_ok") is False
+    if not new_nodes and os.path.exists(lockfile) and not retry:
+        log("⏭️  No new nodes; dependencies already match the lockfile")
+    else:
+        requirement_lists = [list(extra_packages)]
+        if retry:
+            log("🔁 The last dependency install failed; retrying it")
+            requirement_lists.append(previous.get("requirements", []))
+        for result in new_nodes:
+            requirements_file = os.path.join(result["path"], "requirements.txt")
+            if os.path.isfile(requirements_file):
+                requirement_lists.append(read_requirements(requirements_file))
+        requirements = merge_requirements(requirement_lists)
+        total_lines = sum(len(lines) for lines in requirement_lists)
+        log(f"🧮 Merged {total_lines} requirement lines from {len(requirement_lists)} sources "
+            f"into {len(requirements)}")
+        deps_started = time.time()
+        summary["deps_ok"] = install_requirements(requirements, log=log) if requirements else True
+        if not summary["deps_ok"]:
+            # Conflicting pins: install what each source can, one constrained run per source
+            log("🔁 Falling back to one install per node")
+            for lines in requirement_lists:
+                if lines:
+                    install_requirements(lines, log=log)
+        packages = freeze()
+        summary["packages"] = len(packages)
+        write_lockfile(lockfile, results, requirements, packages, deps_ok=summary["deps_ok"])
+        log(f"🔒 Lockfile written: {lockfile} ({len(packages)} packages) "
+            f"in {time.time() - deps_started:.1f}s")
+
+    summary["elapsed"] = time.time() - started
+    metrics.record_span("node_install", summary["elapsed"],
+                        "ok" if summary["deps_ok"] and not summary["failed"] else "error", start=started,
+                        installed=summary["installed"], skipped=summary["skipped"], failed=summary["failed"],
+                        clone_seconds=round(clone_elapsed, 2))
+    return summary
+
+
+def node_path(name, custom_nodes_dir=CUSTOM_NODES_DIR):
+    """Folder of an installed node (parked <name>.disabled counts), or None"""
+    from node_registry import DISABLED_SUFFIX
+
+    for path in (os.path.join(custom_nodes_dir, name), os.path.join(custom_nodes_dir, name + DISABLED_SUFFIX)):
+        if os.path.isdir(path):
+            return path
+    return None
+
+
+def update_nodes(nodes=CUSTOM_NODES, custom_nodes_dir=CUSTOM_NODES_DIR, workers=CLONE_WORKERS,
+                 lockfile=LOCKFILE, locked=False, log=print, cache_dir=GIT_CACHE_DIR):
+    """
+    Move every installed node to its upstream tip (or, with `locked`, to the
+    lockfile's commit) in parallel: one incremental fetch into the shared
+    cache per node, then an in-place checkout. Nodes whose requirements.txt
+    changed get their requirements installed again, and the new commits are
+    recorded in the lockfile.
+
+    Returns a summary with updated/unchanged/failed counts and timings.
+    """
+    started = time.time()
+    installed = [dict(node, path=node_path(node["name"], custom_nodes_dir)) for node in nodes]
+    installed = [node for node in installed if node["path"]]
+    pins = {}
+    if locked:
+        # Nodes the lockfile doesn't know stay where they are
+        pins = {node["name"]: node["commit"] for node in _pinned(installed, lockfile) if node.get("commit")}
+        installed = [node for node in installed if node["name"] in pins]
+    target = "lockfile commits" if locked else "upstream tips"
+    log(f"🔄 Updating {len(installed)} installed nodes to their {target} ({workers} at a time)...")
+
+    results = []
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = [pool.submit(node_git.sync_node, node, node["path"], pins.get(node["name"]), cache_dir)
+                   for node in installed]
+        for done, future in enumerate(as_completed(futures), 1):
+            results.append(future.result())
+            log(f"[{done}/{len(installed)}] {results[-1]['message']}")
+    results.sort(key=lambda result: result["name"].lower())
+
+    updated = [r for r in results if r["status"] == "updated"]
+    summary = {
+        "updated": len(updated),
+        "unchanged": sum(1 for r in results if r["status"] == "unchanged"),
+        "failed": sum(1 for r in results if r["status"] == "failed"),
+        "fetched": sum(1 for r in results if r["fetched"]),
+        "fetch_elapsed": time.time() - started,
+        "deps_ok": True,
+    }
+
+    previous = load_lockfile(lockfile)
+    requirements, packages = previous.get("requirements", []), previous.get("packages", [])
+    new_requirements = []
+    for result in updated:
+        requirements_file = os.path.join(result["path"], "requirements.txt")
+        if os.path.isfile(requirements_file) and node_git.changed(result["path"], result["previous"],
+                                                                 result["commit"], "requirements.txt"):
+            new_requirements.append(read_requirements(requirements_file))
+    merged = merge_requirements(new_requirements)
+    if merged:
+        log(f"🧮 {len(new_requirements)} updated nodes changed their requirements ({len(merged)} lines)")
+        summary["deps_ok"] = install_requirements(merged, log=log)
+        requirements = merge_requirements([requirements, merged])
+        packages = freeze()
+    if results:
+        # A failed install from an earlier run stays marked until install_nodes retries it
+        write_lockfile(lockfile, results, requirements, packages,
+                       deps_ok=summary["deps_ok"] and previous.get("deps_ok", True))
+        log(f"🔒 Commits recorded in {lockfile}")
+
+    summary["elapsed"] = time.time() - started
+    metrics.record_span("node_update", summary["elapsed"],
+                        "ok" if summary["deps_ok"] and not summary["failed"] else "error", start=started,
+                        updated=summary["updated"], unchanged=summary["unchanged"], failed=summary["failed"],
+                        fetched=summary["fetched"])
+    return summary
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Install ComfyUI custom nodes in parallel")
+    parser.add_argument("--dir", default=CUSTOM_NODES_DIR, help="custom_nodes directory")
+    parser.add_argument("--workers", type=int, default=CLONE_WORKERS, help="Concurrent clones")
+    parser.add_argument("--lockfile", default=LOCKFILE)
+    parser.add_argument("--update", action="store_true", help="Move installed nodes to their upstream tips")
+    parser.add_argument("--locked", action="store_true", help="With --update: move them to the lockfile's commits")
+    args = parser.parse_args(argv)
+
+    if args.update:
+        summary = update_nodes(custom_nodes_dir=args.dir, workers=args.workers, lockfile=args.lockfile,
+                               locked=args.locked)
+        print(f"⬆️  Updated: {summary['updated']} | ✔️  Unchanged: {summary['unchanged']} | "
+              f"❌ Failed: {summary['failed']} | {summary['elapsed']:.1f}s "
+              f"({summary['fetched']} fetched from upstream)")
+        return 0 if summary["deps_ok"] and not summary["failed"] else 1
+
+    summary = install_nodes(custom_nodes_dir=args.dir, workers=args.workers, lockfile=args.lockfile)
+    print(f"✅ Installed: {summary['installed']} | ⏭️  Skipped: {summary['skipped']} | "
+          f"❌ Failed: {summary['failed']} | {summary['elapsed']:.1f}s "
+          f"(clones {summary['clone_elapsed']:.1f}s)")
+    return 0 if summary["deps_ok"] else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,604 @@
+#!/usr/bin/env python3
+"""
+Custom node registry and on-demand hydration
+Maps node class types to the packs that provide them (static hints plus an
+index of every pack's NODE_CLASS_MAPPINGS, cached on disk). With
+LAZY_NODES=1, packs no saved workflow uses are renamed to <pack>.disabled
+at boot so ComfyUI skips importing them. They are enabled again, or cloned
+if they were never installed, when a workflow needs them. The per-pack
+import times ComfyUI prints at startup are recorded too, so slow packs
+stand out.
+"""
+
+import json
+import os
+import re
+import threading
+import time
+import urllib.request
+
+import metrics
+from node_installer import CLONE_WORKERS, CUSTOM_NODES, CUSTOM_NODES_DIR, install_nodes
+
+COMFYUI_DIR = os.path.dirname(CUSTOM_NODES_DIR)
+COMFYUI_LOG = "/workspace/comfyui.log"
+COMFYUI_URL = "http://127.0.0.1:8188"
+SUPERVISOR_URL = f"http://127.0.0.1:{os.environ.get('SUPERVISOR_PORT', '9099')}"
+REGISTRY_FILE = os.environ.get("NODE_REGISTRY", "/workspace/.node_registry.json")
+LAZY_NODES = os.environ.get("LAZY_NODES", "0") == "1"
+DISABLED_SUFFIX = ".disabled"  # ComfyUI doesn't import custom_nodes entries ending in this
+HYDRATE_INTERVAL = 60
+LOG_TAIL_BYTES = 4 * 1024 * 1024
+
+# Packs that workflows commonly need beyond CUSTOM_NODES
+KNOWN_PACKS = [
+    {"name": "ComfyUI-WanVideoWrapper", "url": "https://github.com/kijai/ComfyUI-WanVideoWrapper.git"},
+    {"name": "ComfyUI-KJNodes", "url": "https://github.com/kijai/ComfyUI-KJNodes.git"},
+    {"name": "ComfyUI-RMBG", "url": "https://github.com/1038lab/ComfyUI-RMBG.git"},
+    {"name": "ComfyUI-GGUF", "url": "https://github.com/city96/ComfyUI-GGUF.git"},
+]
+
+# UI extensions: used without ever appearing as a node type, so never disabled
+ALWAYS_ENABLED = ["ComfyUI-Custom-Scripts", "rgthree-comfy"] + \
+    [name for name in os.environ.get("LAZY_NODES_KEEP", "").split(",") if name.strip()]
+
+# Frontend-only node types that never need a pack
+VIRTUAL_TYPES = {"Reroute", "PrimitiveNode", "Note", "MarkdownNote"}
+
+# Node types saved without a cnr_id in older workflows
+KNOWN_TYPES = {"SetNode": "ComfyUI-KJNodes", "GetNode": "ComfyUI-KJNodes", "INTConstant": "ComfyUI-KJNodes",
+               "UnetLoaderGGUF": "ComfyUI-GGUF"}
+KNOWN_PREFIXES = {"WanVideo": "ComfyUI-WanVideoWrapper", "VHS_": "ComfyUI-VideoHelperSuite",
+                  "ADE_": "ComfyUI-AnimateDiff-Evolved", "ACN_": "ComfyUI-Advanced-ControlNet",
+                  "SUPIR_": "ComfyUI-SUPIR", "IPAdapter": "ComfyUI_IPAdapter_plus",
+                  "UltimateSDUpscale": "ComfyUI_UltimateSDUpscale"}
+KNOWN_SUFFIXES = {" (rgthree)": "rgthree-comfy", "|pysssss": "ComfyUI-Custom-Scripts",
+                  "(Efficient)": "efficiency-nodes-comfyui", "+": "ComfyUI_essentials"}
+
+_UUID_RE = re.compile(r"^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$")
+# NODE_CLASS_MAPPINGS = {...} / NODE_CLASS_MAPPINGS.update({...}) and NODE_CLASS_MAPPINGS["X"] = ...
+_MAPPING_BLOCK_RE = re.compile(r"NODE_CLASS_MAPPINGS(?:\s*\.\s*update\s*\(|\s*(?::[^=\n]*)?=)\s*\{(.*?)\}", re.S)
+_MAPPING_KEY_RE = re.compile(r"""^\s*["']([^"'\n]+)["']\s*:""", re.M)
+_MAPPING_ITEM_RE = re.compile(r"""NODE_CLASS_MAPPINGS\s*\[\s*["']([^"'\n]+)["']\s*\]\s*=""")
+_IMPORT_TIME_RE = re.compile(r"([\d.]+) seconds( \(IMPORT FAILED\))?: (\S.*)$")
+
+
+def pack_key(name):
+    name = name.rstrip("/").rsplit("/", 1)[-1]
+    if name.endswith(DISABLED_SUFFIX):
+        name = name[:-len(DISABLED_SUFFIX)]
+    return re.sub(r"\.git$", "", name).lower().replace("_", "-")
+
+
+def known_packs():
+    """{pack key: {name, url}} for every pack we know how to install"""
+    packs = {pack_key(node["name"]): node for node in KNOWN_PACKS}
+    packs.update({pack_key(node["name"]): node for node in CUSTOM_NODES})
+    return packs
+
+
+def _pack_dirs(custom_nodes_dir, disabled):
+    try:
+        names = os.listdir(custom_nodes_dir)
+    except OSError:
+        return {}
+    return {pack_key(name): name for name in names
+            if os.path.isdir(os.path.join(custom_nodes_dir, name)) and name.endswith(DISABLED_SUFFIX) == disabled}
+
+
+def installed_packs(custom_nodes_dir=CUSTOM_NODES_DIR):
+    """{pack key: directory name} for enabled packs in custom_nodes"""
+    return _pack_dirs(custom_nodes_dir, disabled=False)
+
+
+def disabled_packs(custom_nodes_dir=CUSTOM_NODES_DIR):
+    """{pack key: directory name} for packs ComfyUI currently skips"""
+    return _pack_dirs(custom_nodes_dir, disabled=True)
+
+
+def _source_files(directory, extensions=(".py", ".js")):
+    for root, dirs, files in os.walk(directory):
+        dirs[:] = [d for d in dirs if d not in (".git", "node_modules", "__pycache__")]
+        for filename in files:
+            if filename.endswith(extensions):
+                yield os.path.join(root, filename)
+
+
+def mapping_types(text):
+    """Node types a Python source declares in NODE_CLASS_MAPPINGS"""
+    types = set(_MAPPING_ITEM_RE.findall(text))
+    for block in _MAPPING_BLOCK_RE.findall(text):
+        types.update(_MAPPING_KEY_RE.findall(block))
+    return types
+
+
+def pack_types(pack_dir):
+    types = set()
+    for path in _source_files(pack_dir, (".py",)):
+        try:
+            with open(path, encoding="utf-8", errors="ignore") as f:
+                text = f.read()
+        except OSError:
+            continue
+        if "NODE_CLASS_MAPPINGS" in text:
+            types.update(mapping_types(text))
+    return types
+
+
+def find_defining_packs(node_types, comfyui_dir=COMFYUI_DIR):
+    """
+    Locate node types by searching ComfyUI's and the packs' sources (enabled
+    or not) for their quoted name. Returns {type: pack key or "comfy-core"}.
+    """
+    remaining = set(node_types)
+    found = {}
+    custom_nodes_dir = os.path.join(comfyui_dir, "custom_nodes")
+    roots = [("comfy-core", os.path.join(comfyui_dir, "nodes.py")),
+             ("comfy-core", os.path.join(comfyui_dir, "comfy_extras"))]
+    packs = dict(disabled_packs(custom_nodes_dir), **installed_packs(custom_nodes_dir))
+    for key, name in packs.items():
+        roots.append((key, os.path.join(custom_nodes_dir, name)))
+    for pack, root in roots:
+        if not remaining:
+            break
+        files = [root] if os.path.isfile(root) else _source_files(root)
+        for path in files:
+            try:
+                with open(path, encoding="utf-8", errors="ignore") as f:
+                    text = f.read()
+            except OSError:
+                continue
+            for node_type in [t for t in remaining if f'"{t}"' in text or f"'{t}'" in text]:
+                found[node_type] = pack
+                remaining.discard(node_type)
+    return found
+
+
+def static_pack(node_type):
+    """Pack key for node types we recognise by name alone, else None"""
+    if node_type in KNOWN_TYPES:
+        return pack_key(KNOWN_TYPES[node_type])
+    for prefix, pack in KNOWN_PREFIXES.items():
+        if node_type.startswith(prefix):
+            return pack_key(pack)
+    for suffix, pack in KNOWN_SUFFIXES.items():
+        if node_type.endswith(suffix):
+            return pack_key(pack)
+    return None
+
+
+class NodeRegistry:
+    """
+    Node type -> pack index over custom_nodes, plus recorded import times.
+
+    Each pack's types are re-read only when its directory (or __init__.py)
+    changed since they were cached, so lookups after the first are cheap.
+    """
+
+    def __init__(self, custom_nodes_dir=CUSTOM_NODES_DIR, path=REGISTRY_FILE):
+        self.custom_nodes_dir = custom_nodes_dir
+        self.path = path
+        self.lock = threading.Lock()
+        try:
+            with open(path) as f:
+                self.data = json.load(f)
+        except (OSError, ValueError):
+            self.data = {}
+        self.data.setdefault("packs", {})
+        self.data.setdefault("imports", {})
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.data, f, indent=1)
+        os.replace(tmp_path, self.path)
+
+    def _stamp(self, pack_dir):
+        stamp = 0.0
+        for path in (pack_dir, os.path.join(pack_dir, "__init__.py")):
+            try:
+                stamp = max(stamp, os.stat(path).st_mtime)
+            except OSError:
+                pass
+        return stamp
+
+    def refresh(self):
+        """Re-index packs that appeared or changed; returns {type: pack key}"""
+        packs = dict(disabled_packs(self.custom_nodes_dir), **installed_packs(self.custom_nodes_dir))
+        with self.lock:
+            cached = self.data["packs"]
+            changed = False
+            for key, name in packs.items():
+                pack_dir = os.path.join(self.custom_nodes_dir, name)
+                stamp = self._stamp(pack_dir)
+                if cached.get(key, {}).get("stamp") != stamp:
+                    cached[key] = {"stamp": stamp, "types": sorted(pack_types(pack_dir))}
+                    changed = True
+                cached[key]["dir"] = name
+            for key in set(cached) - set(packs):
+                del cached[key]
+                changed = True
+            if changed:
+                try:
+                    self.save()
+                except OSError:
+                    pass
+            return {node_type: key for key, entry in cached.items() for node_type in entry["types"]}
+
+    def resolve(self, types, subgraphs=(), comfyui_dir=COMFYUI_DIR):
+        """
+        Place node types (a {type: pack hint or None} dict, as in a workflow
+        scan) in packs. Returns ({type: pack key or "comfy-core"}, [unresolved]).
+        """
+        packs_for_type = {}
+        unplaced = []
+        for node_type, hint in types.items():
+            if node_type in VIRTUAL_TYPES or node_type in subgraphs or _UUID_RE.match(node_type):
+                continue
+            if hint:
+                packs_for_type[node_type] = "comfy-core" if hint == "comfy-core" else pack_key(hint)
+            elif static_pack(node_type):
+                packs_for_type[node_type] = static_pack(node_type)
+            else:
+                unplaced.append(node_type)
+        if unplaced:
+            index = self.refresh()
+            packs_for_type.update({t: index[t] for t in unplaced if t in index})
+            remaining = [t for t in unplaced if t not in packs_for_type]
+            packs_for_type.update(find_defining_packs(remaining, comfyui_dir))
+        return packs_for_type, sorted(t for t in unplaced if t not in packs_for_type)
+
+    def record_imports(self, times):
+        """Store the latest per-pack import times ({name: (seconds, failed)})"""
+        with self.lock:
+            now = round(time.time(), 1)
+            self.data["imports"] = {name: {"seconds": seconds, "failed": failed, "at": now}
+                                    for name, (seconds, failed) in times.items()}
+            self.save()
+
+
+def parse_import_times(log_path=COMFYUI_LOG):
+    """
+    {custom node name: (seconds, import failed)} from the last "Import times
+    for custom nodes" block in ComfyUI's log, or {} when there is none.
+    """
+    try:
+        with open(log_path, "rb") as f:
+            f.seek(max(0, os.fstat(f.fileno()).st_size - LOG_TAIL_BYTES))
+            text = f.read().decode("utf-8", "replace")
+    except OSError:
+        return {}
+    start = text.rfind("Import times for custom nodes:")
+    if start < 0:
+        return {}
+    times = {}
+    for line in text[start:].splitlines()[1:]:
+        match = _IMPORT_TIME_RE.search(line)
+        if not match:
+            if times:
+                break
+            continue
+        seconds, failed, path = match.groups()
+        times[os.path.basename(path.strip().rstrip("/"))] = (float(seconds), bool(failed))
+    return times
+
+
+def record_import_times(log_path=COMFYUI_LOG, registry=None, log=print):
+    """Read ComfyUI's import times after it started and record them as spans and in the registry"""
+    times = parse_import_times(log_path)
+    if not times:
+        return {}
+    for name, (seconds, failed) in times.items():
+        metrics.record_span("node_import", seconds, "error" if failed else "ok", {"pack": name})
+    try:
+        (registry or NodeRegistry()).record_imports(times)
+    except OSError:
+        pass
+    slowest = sorted(times.items(), key=lambda item: -item[1][0])[:3]
+    log(f"🧩 {len(times)} custom nodes imported in {sum(s for s, _ in times.values()):.1f}s; slowest: "
+        + ", ".join(f"{name} {seconds:.1f}s" for name, (seconds, _) in slowest))
+    return times
+
+
+def _set_enabled(name, enabled, custom_nodes_dir=CUSTOM_NODES_DIR):
+    """Rename a pack in or out of ComfyUI's import path; returns whether anything moved"""
+    base = name[:-len(DISABLED_SUFFIX)] if name.endswith(DISABLED_SUFFIX) else name
+    active = os.path.join(custom_nodes_dir, base)
+    parked = active + DISABLED_SUFFIX
+    source, target = (parked, active) if enabled else (active, parked)
+    if not os.path.isdir(source) or os.path.exists(target):
+        return False
+    os.rename(source, target)
+    return True
+
+
+def hydrate(packs, custom_nodes_dir=CUSTOM_NODES_DIR, workers=CLONE_WORKERS, log=print):
+    """
+    Make the given packs ({name, url} as in a workflow plan) importable:
+    disabled ones are renamed back, missing ones are cloned and their own
+    requirements installed (without the full EXTRA_PACKAGES set).
+
+    Returns {"enabled": [...], "installed": [...], "failed": [...]}.
+    """
+    started = time.time()
+    summary = {"enabled": [], "installed": [], "failed": []}
+    missing = []
+    for pack in packs:
+        if _set_enabled(pack["name"], True, custom_nodes_dir):
+            summary["enabled"].append(pack["name"])
+            log(f"▶️  {pack['name']} enabled")
+        elif os.path.isdir(os.path.join(custom_nodes_dir, pack["name"])):
+            continue
+        elif pack.get("url"):
+            missing.append({"name": pack["name"], "url": pack["url"]})
+        else:
+            summary["failed"].append(pack["name"])
+            log(f"❓ {pack['name']}: not installed and no URL known")
+    if missing:
+        result = install_nodes(missing, custom_nodes_dir, workers, extra_packages=(), log=log)
+        for node in missing:
+            installed = os.path.isdir(os.path.join(custom_nodes_dir, node["name"])) and result["deps_ok"]
+            summary["installed" if installed else "failed"].append(node["name"])
+    metrics.record_span("node_hydrate", time.time() - started, "error" if summary["failed"] else "ok",
+                        start=started, enabled=len(summary["enabled"]), installed=len(summary["installed"]),
+                        failed=len(summary["failed"]))
+    return summary
+
+
+def needed_packs(types, packs_for_type, custom_nodes_dir=CUSTOM_NODES_DIR):
+    """{pack key: {type: hint}} for the placed types whose pack isn't enabled"""
+    enabled = installed_packs(custom_nodes_dir)
+    needed = {}
+    for node_type, pack in sorted(packs_for_type.items()):
+        if pack != "comfy-core" and pack not in enabled:
+            needed.setdefault(pack, {})[node_type] = types.get(node_type)
+    return needed
+
+
+def plan_packs(needed, custom_nodes_dir=CUSTOM_NODES_DIR):
+    """
+    Turn needed_packs() into [{name, url, types, disabled}] to hydrate.
+    Unknown packs are looked up through aux_id hints (GitHub owner/repo);
+    returns (packs, node types no known pack provides).
+    """
+    disabled = disabled_packs(custom_nodes_dir)
+    available = known_packs()
+    packs, unresolved = [], []
+    for key, types in sorted(needed.items()):
+        repo = next((hint for hint in types.values() if hint and "/" in hint), None)
+        if key in disabled:
+            name = disabled[key][:-len(DISABLED_SUFFIX)]
+            packs.append({"name": name, "url": available.get(key, {}).get("url"), "disabled": True})
+        elif key in available:
+            packs.append(dict(available[key], disabled=False))
+        elif repo:
+            packs.append({"name": repo.split("/")[-1], "url": f"https://github.com/{repo}.git", "disabled": False})
+        else:
+            unresolved.extend(types)
+            continue
+        packs[-1]["types"] = sorted(types)
+    return packs, sorted(unresolved)
+
+
+def _scan_workflows(workflows_dir, log=print):
+    """Union of the node types ({type: hint}) and subgraph ids used by every saved workflow"""
+    from prefetch import workflow_files
+    from workflow_analyzer import scan_workflow
+
+    types, subgraphs = {}, set()
+    for path in sorted(workflow_files(workflows_dir)):
+        try:
+            scan = scan_workflow(path)
+        except (OSError, ValueError) as e:
+            log(f"⚠️  Skipping {os.path.basename(path)}: {e}")
+            continue
+        for node_type, hint in scan.types.items():
+            types[node_type] = hint or types.get(node_type)
+        subgraphs |= scan.subgraphs
+    return types, subgraphs
+
+
+def sync(workflows_dir=None, custom_nodes_dir=CUSTOM_NODES_DIR, registry=None, dry_run=False, log=print):
+    """
+    Boot-time pass: enable the installed packs saved workflows use and
+    disable the other packs this template manages (CUSTOM_NODES and
+    KNOWN_PACKS). Packs installed by hand and ALWAYS_ENABLED are left alone.
+
+    Returns {"enabled": [...], "disabled": [...], "kept": [...]}.
+    """
+    from prefetch import WORKFLOWS_DIR
+
+    registry = registry or NodeRegistry(custom_nodes_dir)
+    types, subgraphs = _scan_workflows(workflows_dir or WORKFLOWS_DIR, log)
+    packs_for_type, _ = registry.resolve(types, subgraphs, os.path.dirname(custom_nodes_dir))
+    used = set(packs_for_type.values()) | {pack_key(name) for name in ALWAYS_ENABLED}
+    managed = set(known_packs())
+
+    summary = {"enabled": [], "disabled": [], "kept": []}
+    for key, name in sorted(disabled_packs(custom_nodes_dir).items()):
+        if key in used and (dry_run or _set_enabled(name, True, custom_nodes_dir)):
+            summary["enabled"].append(name[:-len(DISABLED_SUFFIX)])
+    for key, name in sorted(installed_packs(custom_nodes_dir).items()):
+        if key in used or key not in managed:
+            summary["kept"].append(name)
+        elif dry_run or _set_enabled(name, False, custom_nodes_dir):
+            summary["disabled"].append(name)
+    return summary
+
+
+def comfyui_idle(url=COMFYUI_URL):
+    """True when ComfyUI has nothing queued or running (or isn't answering at all)"""
+    try:
+        with urllib.request.urlopen(f"{url}/queue", timeout=5) as resp:
+            queue = json.load(resp)
+    except (OSError, ValueError):
+        return True
+    return not queue.get("queue_running") and not queue.get("queue_pending")
+
+
+def restart_comfyui(url=SUPERVISOR_URL):
+    """Ask the supervisor to restart ComfyUI so it imports newly enabled packs; returns success"""
+    request = urllib.request.Request(f"{url}/restart/ComfyUI", data=b"", method="POST")
+    try:
+        with urllib.request.urlopen(request, timeout=10) as resp:
+            return resp.status == 200
+    except OSError:
+        return False
+
+
+def start_background_hydration(workflows_dir=None, interval=HYDRATE_INTERVAL, log=print):
+    """
+    Watch saved workflows in a daemon thread: packs a new or changed
+    workflow needs are enabled or installed, and ComfyUI is restarted to
+    load them once its queue is empty.
+    """
+    from prefetch import WORKFLOWS_DIR, workflow_files
+    from workflow_analyzer import scan_workflow
+
+    workflows_dir = workflows_dir or WORKFLOWS_DIR
+    registry = NodeRegistry()
+    seen = {}
+    pending_restart = []
+
+    def pass_once():
+        changed = {path: mtime for path, mtime in workflow_files(workflows_dir).items() if seen.get(path) != mtime}
+        seen.update(changed)
+        needed = {}
+        for path in sorted(changed):
+            try:
+                scan = scan_workflow(path)
+            except (OSError, ValueError):
+                continue
+            packs_for_type, _ = registry.resolve(scan.types, scan.subgraphs)
+            for pack, types in needed_packs(scan.types, packs_for_type).items():
+                needed.setdefault(pack, {}).update(types)
+        packs, _ = plan_packs(needed)
+        if packs:
+            summary = hydrate(packs, log=log)
+            if summary["enabled"] or summary["installed"]:
+                pending_restart.append(True)
+        if pending_restart and comfyui_idle():
+            if restart_comfyui():
+                log("🔄 ComfyUI restarting to load the node packs workflows need")
+            pending_restart.clear()
+
+    def loop():
+        while True:
+            try:
+                pass_once()
+            except Exception as e:
+                log(f"⚠️  Node hydration failed: {e}")
+            time.sleep(interval)
+
+    thread = threading.Thread(target=loop, daemon=True, name="node-hydration")
+    thread.start()
+    return thread
+
+
+def format_imports(imports, custom_nodes_dir=CUSTOM_NODES_DIR):
+    lines = []
+    lines.append("=" * 60)
+    lines.append("CUSTOM NODE IMPORT TIMES")
+    lines.append("=" * 60)
+    if not imports:
+        lines.append("No import times recorded yet (ComfyUI prints them at startup)")
+        lines.append("=" * 60)
+        return "\n".join(lines)
+    disabled = disabled_packs(custom_nodes_dir)
+    for name, entry in sorted(imports.items(), key=lambda item: -item[1]["seconds"]):
+        icon = "❌" if entry["failed"] else "⏸️ " if pack_key(name) in disabled else "✅"
+        note = " (import failed)" if entry["failed"] else " (disabled since)" if icon == "⏸️ " else ""
+        lines.append(f"{icon} {entry['seconds']:6.1f}s  {name}{note}")
+    lines.append("")
+    lines.append(f"Total: {sum(e['seconds'] for e in imports.values()):.1f}s across {len(imports)} custom nodes")
+    lines.append("=" * 60)
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Custom node registry: lookups, lazy loading and import times")
+    parser.add_argument("--dir", default=CUSTOM_NODES_DIR, help="custom_nodes directory")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    resolve_parser = subparsers.add_parser("resolve", help="Show which pack provides each node type")
+    resolve_parser.add_argument("types", nargs="+")
+
+    sync_parser = subparsers.add_parser("sync", help="Enable the packs saved workflows use, disable the rest")
+    sync_parser.add_argument("--workflows", help="Workflows directory")
+    sync_parser.add_argument("--dry-run", action="store_true")
+
+    hydrate_parser = subparsers.add_parser("hydrate", help="Enable or install the packs a workflow needs")
+    hydrate_parser.add_argument("workflow", help="Workflow JSON (UI export or API prompt)")
+    hydrate_parser.add_argument("--restart", action="store_true", help="Restart ComfyUI afterwards (when idle)")
+
+    enable_parser = subparsers.add_parser("enable", help="Put disabled packs back on ComfyUI's import path")
+    enable_parser.add_argument("names", nargs="*", help="Pack directory names (default: all)")
+
+    imports_parser = subparsers.add_parser("imports", help="Per-pack import times from ComfyUI's last start")
+    imports_parser.add_argument("--log", default=COMFYUI_LOG, help="ComfyUI log to read")
+    args = parser.parse_args(argv)
+
+    registry = NodeRegistry(args.dir)
+    if args.command == "resolve":
+        packs_for_type, unresolved = registry.resolve({t: None for t in args.types},
+                                                      comfyui_dir=os.path.dirname(args.dir))
+        for node_type in args.types:
+            print(f"{'✅' if node_type in packs_for_type else '❓'} {node_type} → "
+                  f"{packs_for_type.get(node_type, 'unknown')}")
+        return 1 if unresolved else 0
+
+    if args.command == "sync":
+        summary = sync(args.workflows, args.dir, registry, args.dry_run)
+        prefix = "Would " if args.dry_run else ""
+        for name in summary["enabled"]:
+            print(f"▶️  {prefix}enable {name}")
+        for name in summary["disabled"]:
+            print(f"⏸️  {prefix}disable {name}")
+        print(f"🧩 {len(summary['kept']) + len(summary['enabled'])} packs enabled, "
+              f"{len(summary['disabled'])} disabled for this boot")
+        return 0
+
+    if args.command == "hydrate":
+        from workflow_analyzer import scan_workflow
+
+        try:
+            scan = scan_workflow(args.workflow)
+        except (OSError, ValueError) as e:
+            print(f"❌ {e}")
+            return 2
+        packs_for_type, unresolved = registry.resolve(scan.types, scan.subgraphs, os.path.dirname(args.dir))
+        packs, unknown = plan_packs(needed_packs(scan.types, packs_for_type, args.dir), args.dir)
+        for node_type in unresolved + unknown:
+            print(f"❓ No known pack provides node type {node_type}")
+        if not packs:
+            print("✅ Every node pack this workflow uses is enabled")
+            return 0
+        summary = hydrate(packs, args.dir)
+        print(f"🧩 Enabled {len(summary['enabled'])}, installed {len(summary['installed'])}, "
+              f"failed {len(summary['failed'])}")
+        if args.restart and (summary["enabled"] or summary["installed"]):
+            if not comfyui_idle():
+                print("⏳ ComfyUI is busy; restart it when the queue is empty")
+            elif restart_comfyui():
+                print("🔄 ComfyUI restarting")
+        return 1 if summary["failed"] else 0
+
+    if args.command == "enable":
+        names = args.names or [name for name in disabled_packs(args.dir).values()]
+        for name in names:
+            if _set_enabled(name, True, args.dir):
+                print(f"▶️  {name.replace(DISABLED_SUFFIX, '')} enabled")
+        return 0
+
+    times = parse_import_times(args.log)
+    if times:
+        registry.record_imports(times)
+    print(format_imports(registry.data["imports"], args.dir))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,604 @@
+#!/usr/bin/env python3
+"""
+Output pipeline: ships ComfyUI outputs off the generation hot path
+With a network volume, ComfyUI writes its outputs to local disk and this
+service follows the output folder (inotify, or a periodic scan where that
+isn't available). Each finished file goes to a bounded worker pool that
+makes a thumbnail (images via Pillow, videos via ffmpeg), transcodes
+videos browsers can't play into an H.264 preview, and copies everything to
+the volume and/or an S3 bucket (MinIO works as a local stand-in). Local
+copies are kept for ComfyUI's /view until they exceed OUTPUT_LOCAL_KEEP_GB,
+then the oldest shipped ones are dropped. Queue depth and lag are served
+on /status and /metrics.
+"""
+
+import collections
+import ctypes
+import ctypes.util
+import errno
+import gzip
+import json
+import mimetypes
+import os
+import select
+import shutil
+import struct
+import subprocess
+import threading
+import time
+
+import metrics
+from volume_migrate import COMFYUI_DIR, VOLUME_DIR
+
+OUTPUT_DIR = os.environ.get("OUTPUT_DIR", os.path.join(COMFYUI_DIR, "output"))
+VOLUME_OUTPUT_DIR = os.environ.get("OUTPUT_VOLUME_DIR", os.path.join(VOLUME_DIR, "output"))
+S3_BUCKET = os.environ.get("OUTPUT_S3_BUCKET", "")
+S3_PREFIX = os.environ.get("OUTPUT_S3_PREFIX", "outputs/")
+S3_ENDPOINT = os.environ.get("OUTPUT_S3_ENDPOINT", "")  # e.g. a local MinIO: http://127.0.0.1:9000
+STATE_FILE = os.environ.get("OUTPUT_PIPELINE_STATE", "/workspace/.output_pipeline.json")
+SCRATCH_DIR = "/workspace/.output_pipeline"
+WORKERS = int(os.environ.get("OUTPUT_WORKERS", "2"))
+LOCAL_KEEP_BYTES = int(float(os.environ.get("OUTPUT_LOCAL_KEEP_GB", "20")) * 2 ** 30)
+PIPELINE_HOST = os.environ.get("OUTPUT_PIPELINE_HOST", "127.0.0.1")
+PIPELINE_PORT = int(os.environ.get("OUTPUT_PIPELINE_PORT", "9097"))
+NICENESS = 10  # Stay behind ComfyUI for CPU; ffmpeg children inherit it
+SETTLE_SECONDS = 2.0  # Scan mode: a file unchanged this long is finished
+SCAN_INTERVAL = 5.0  # Without inotify
+RESCAN_INTERVAL = 60.0  # With inotify: catches anything missed (queue overflow, races with new folders)
+COPY_CHUNK = 8 * 1024 * 1024
+THUMB_SIZE = 384
+LAGS_KEPT = 500
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp")
+VIDEO_EXTENSIONS = (".mp4", ".webm", ".mov", ".mkv", ".avi", ".gif")
+WEB_VIDEO_EXTENSIONS = (".mp4", ".webm")  # Play in browsers as they are; others get an H.264 preview
+COMPRESSIBLE_EXTENSIONS = (".json", ".txt", ".csv", ".svg", ".obj", ".ply")  # gzipped for S3
+TEMP_SUFFIXES = (".tmp", ".part", ".partial", ".temp")
+PREVIEW_DIR = ".previews"  # Thumbnails and previews, next to the outputs on the volume/bucket
+
+# inotify(7)
+IN_CLOSE_WRITE, IN_MOVED_TO, IN_CREATE = 0x8, 0x80, 0x100
+IN_Q_OVERFLOW, IN_IGNORED, IN_ISDIR = 0x4000, 0x8000, 0x40000000
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+EVENT_HEADER = struct.Struct("iIII")
+
+
+def _wanted(relpath):
+    """Outputs to ship: not hidden, not a temp file still being written"""
+    parts = relpath.split(os.sep)
+    return not any(part.startswith(".") for part in parts) and not relpath.endswith(TEMP_SUFFIXES)
+
+
+def kind_of(relpath):
+    lower = relpath.lower()
+    if lower.endswith(IMAGE_EXTENSIONS):
+        return "image"
+    if lower.endswith(VIDEO_EXTENSIONS):
+        return "video"
+    return "other"
+
+
+class InotifyWatcher:
+    """
+    Recursive watch on a folder through inotify (ctypes, no extra package).
+    Raises OSError where inotify isn't available, and the caller falls back
+    to scanning.
+    """
+
+    def __init__(self, root):
+        libc_name = ctypes.util.find_library("c") or "libc.so.6"
+        self.libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(self.libc, "inotify_init1"):
+            raise OSError(errno.ENOSYS, "inotify is not available")
+        self.fd = self.libc.inotify_init1(os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.root = root
+        self.watches = {}  # watch descriptor -> folder
+        self.add_tree(root)
+
+    def add_tree(self, top):
+        for folder, dirs, _ in os.walk(top):
+            dirs[:] = [d for d in dirs if not d.startswith(".")]
+            wd = self.libc.inotify_add_watch(self.fd, os.fsencode(folder), WATCH_MASK)
+            if wd >= 0:
+                self.watches[wd] = folder
+            elif ctypes.get_errno() == errno.ENOSPC:
+                raise OSError(errno.ENOSPC, "inotify watch limit reached (fs.inotify.max_user_watches)")
+
+    def read(self, timeout):
+        """
+        Paths of files finished since the last call (relative to the root),
+        waiting up to `timeout` seconds. None means events were lost and the
+        caller should rescan.
+        """
+        if not select.select([self.fd], [], [], timeout)[0]:
+            return []
+        data = os.read(self.fd, 256 * 1024)
+        finished, overflow, offset = [], False, 0
+        while offset + EVENT_HEADER.size <= len(data):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            name = data[offset + EVENT_HEADER.size:offset + EVENT_HEADER.size + length].rstrip(b"\0")
+            offset += EVENT_HEADER.size + length
+            if mask & IN_Q_OVERFLOW:
+                overflow = True
+                continue
+            if mask & IN_IGNORED:
+                self.watches.pop(wd, None)
+                continue
+            folder = self.watches.get(wd)
+            if folder is None or not name:
+                continue
+            path = os.path.join(folder, os.fsdecode(name))
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO) and not os.path.basename(path).startswith("."):
+                    # Files written before the watch existed are picked up by the scan the caller runs
+                    self.add_tree(path)
+                    overflow = True
+            elif mask & (IN_CLOSE_WRITE | IN_MOVED_TO):
+                finished.append(os.path.relpath(path, self.root))
+        return None if overflow else finished
+
+    def close(self):
+        os.close(self.fd)
+
+
+class VolumeSink:
+    """Copies files under a folder (the network volume), atomically and fsynced"""
+
+    name = "volume"
+
+    def __init__(self, root=VOLUME_OUTPUT_DIR):
+        self.root = root
+
+    def put(self, path, relpath):
+        target = os.path.join(self.root, relpath)
+        st = os.stat(path)
+        try:
+            existing = os.stat(target)
+            if existing.st_size == st.st_size and int(existing.st_mtime) == int(st.st_mtime):
+                return 0
+        except FileNotFoundError:
+            pass
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        tmp_path = target + ".partial"
+        with open(path, "rb") as src, open(tmp_path, "wb") as dst:
+            shutil.copyfileobj(src, dst, COPY_CHUNK)
+            dst.flush()
+            os.fsync(dst.fileno())
+        os.utime(tmp_path, ns=(st.st_atime_ns, st.st_mtime_ns))
+        os.replace(tmp_path, target)
+        return st.st_size
+
+
+class S3Sink:
+    """
+    Uploads to an S3 bucket, or anything speaking the S3 API (MinIO) via
+    OUTPUT_S3_ENDPOINT. boto3 is imported only when a bucket is configured;
+    credentials come from the usual AWS_* variables.
+    """
+
+    name = "s3"
+
+    def __init__(self, bucket=S3_BUCKET, prefix=S3_PREFIX, endpoint=S3_ENDPOINT):
+        import boto3
+
+        self.bucket = bucket
+        self.prefix = prefix
+        self.client = boto3.client("s3", endpoint_url=endpoint or None)
+
+    def put(self, path, relpath):
+        key = self.prefix + relpath.replace(os.sep, "/")
+        extra = {"ContentType": mimetypes.guess_type(path)[0] or "application/octet-stream"}
+        if not path.lower().endswith(COMPRESSIBLE_EXTENSIONS):
+            self.client.upload_file(path, self.bucket, key, ExtraArgs=extra)
+            return os.path.getsize(path)
+        with open(path, "rb") as f:
+            body = gzip.compress(f.read(), compresslevel=6)
+        self.client.put_object(Bucket=self.bucket, Key=key, Body=body, ContentEncoding="gzip", **extra)
+        return len(body)
+
+
+def configured_sinks(log=print):
+    """Where outputs go: the volume when attached, S3 when a bucket is set"""
+    sinks = []
+    if os.path.isdir(VOLUME_DIR):
+        sinks.append(VolumeSink())
+    if S3_BUCKET:
+        try:
+            sinks.append(S3Sink())
+        except ImportError:
+            log("⚠️  OUTPUT_S3_BUCKET is set but boto3 isn't installed (pip install boto3); S3 upload disabled")
+    return sinks
+
+
+def ffmpeg_binary():
+    """System ffmpeg, else the one imageio-ffmpeg (installed for VideoHelperSuite) ships"""
+    binary = shutil.which("ffmpeg")
+    if binary:
+        return binary
+    try:
+        import imageio_ffmpeg
+
+        return imageio_ffmpeg.get_ffmpeg_exe()
+    except (ImportError, RuntimeError):
+        return None
+
+
+def make_thumbnail(path, dest, ffmpeg=None):
+    """JPEG thumbnail of an image or a video's first frame; False if no tool can make it"""
+    if kind_of(path) == "image":
+        try:
+            from PIL import Image
+        except ImportError:
+            return False
+        with Image.open(path) as image:
+            image.thumbnail((THUMB_SIZE, THUMB_SIZE))
+            image.convert("RGB").save(dest, "JPEG", quality=80)
+        return True
+    if not ffmpeg:
+        return False
+    subprocess.run([ffmpeg, "-y", "-loglevel", "error", "-i", path, "-frames:v", "1",
+                    "-vf", f"scale={THUMB_SIZE}:{THUMB_SIZE}:force_original_aspect_ratio=decrease", dest],
+                   check=True, capture_output=True, timeout=120)
+    return True
+
+
+def make_preview(path, dest, ffmpeg):
+    """H.264 MP4 of a video browsers can't play (GIF, MOV/ProRes, MKV, AVI)"""
+    subprocess.run([ffmpeg, "-y", "-loglevel", "error", "-i", path,
+                    "-c:v", "libx264", "-preset", "veryfast", "-crf", "23", "-pix_fmt", "yuv420p",
+                    "-vf", "scale=trunc(iw/2)*2:trunc(ih/2)*2", "-c:a", "aac", "-movflags", "+faststart", dest],
+                   check=True, capture_output=True, timeout=3600)
+
+
+class OutputPipeline:
+    """
+    Follows the output folder and ships each finished file through the
+    workers. `state` remembers what was shipped (size and mtime), so a
+    restart only ships what is new or changed.
+    """
+
+    def __init__(self, output_dir=OUTPUT_DIR, sinks=None, state_path=STATE_FILE, workers=WORKERS,
+                 local_keep_bytes=LOCAL_KEEP_BYTES, scratch_dir=SCRATCH_DIR, log=print):
+        self.output_dir = output_dir
+        self.sinks = configured_sinks(log) if sinks is None else sinks
+        self.state_path = state_path
+        self.workers = max(1, workers)
+        self.local_keep_bytes = local_keep_bytes
+        self.scratch_dir = scratch_dir
+        self.log = log
+        self.ffmpeg = ffmpeg_binary()
+        self.lock = threading.Condition()
+        self.pending = collections.OrderedDict()  # relpath -> time it was queued
+        self.active = set()
+        self.lags = collections.deque(maxlen=LAGS_KEPT)  # Seconds from written to shipped
+        self.counts = collections.Counter()
+        self.local_bytes = 0
+        self.watcher = None
+        self.stopping = threading.Event()
+        self._last_save = 0.0
+        try:
+            with open(state_path) as f:
+                self.state = json.load(f).get("files", {})
+        except (OSError, ValueError):
+            self.state = {}
+
+    def save_state(self, force=False):
+        with self.lock:
+            if not force and time.time() - self._last_save < 2.0:
+                return
+            self._last_save = time.time()
+            data = json.dumps({"version": 1, "files": self.state}, indent=1, sort_keys=True)
+        tmp_path = self.state_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            f.write(data)
+        os.replace(tmp_path, self.state_path)
+
+    def enqueue(self, relpath):
+        if not _wanted(relpath):
+            return
+        with self.lock:
+            if relpath not in self.pending:
+                self.pending[relpath] = time.time()
+                self.lock.notify()
+
+    def scan(self, settle=SETTLE_SECONDS):
+        """Queue every local file not shipped in its current form; evict old shipped ones if over budget"""
+        now = time.time()
+        seen, total, shipped = set(), 0, []
+        for folder, dirs, names in os.walk(self.output_dir):
+            dirs[:] = [d for d in dirs if not d.startswith(".")]
+            for name in names:
+                path = os.path.join(folder, name)
+                relpath = os.path.relpath(path, self.output_dir)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                seen.add(relpath)
+                total += st.st_size
+                entry = self.state.get(relpath)
+                if entry and entry["size"] == st.st_size and entry["mtime"] == st.st_mtime:
+                    shipped.append((st.st_mtime, relpath, st.st_size))
+                elif now - st.st_mtime >= settle:
+                    self.enqueue(relpath)
+        with self.lock:
+            # Forget files that are gone locally (evicted, or deleted by the user)
+            for relpath in [r for r in self.state if r not in seen and r not in self.pending]:
+                del self.state[relpath]
+            self.local_bytes = total
+        self.evict(shipped)
+
+    def evict(self, shipped):
+        """Drop the oldest local copies that are safely shipped until under the local budget"""
+        if not self.sinks or not self.local_keep_bytes or self.local_bytes <= self.local_keep_bytes:
+            return
+        for _, relpath, size in sorted(shipped):
+            if self.local_bytes <= self.local_keep_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.output_dir, relpath))
+            except OSError:
+                continue
+            with self.lock:
+                self.state.pop(relpath, None)
+                self.local_bytes -= size
+            self.counts["evicted"] += 1
+        self.save_state()
+
+    def ship(self, relpath, queued=None):
+        """Derive previews for one file and copy it all to every sink; returns bytes written"""
+        path = os.path.join(self.output_dir, relpath)
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return 0
+        kind = kind_of(relpath)
+        files = [(path, relpath)]
+        scratch = os.path.join(self.scratch_dir, f"{threading.get_ident()}")
+        os.makedirs(scratch, exist_ok=True)
+        try:
+            if kind in ("image", "video"):
+                thumb = os.path.join(scratch, "thumb.jpg")
+                with metrics.span("output_stage", {"stage": "thumbnail", "kind": kind}) as info:
+                    try:
+                        if make_thumbnail(path, thumb, self.ffmpeg):
+                            files.append((thumb, os.path.join(PREVIEW_DIR, relpath + ".jpg")))
+                        else:
+                            info["status"] = "skipped"
+                    except (OSError, ValueError, subprocess.SubprocessError) as e:
+                        info.update(status="error", error=str(e))
+            if kind == "video" and self.ffmpeg and not relpath.lower().endswith(WEB_VIDEO_EXTENSIONS):
+                preview = os.path.join(scratch, "preview.mp4")
+                with metrics.span("output_stage", {"stage": "transcode", "kind": kind}) as info:
+                    try:
+                        make_preview(path, preview, self.ffmpeg)
+                        files.append((preview, os.path.join(PREVIEW_DIR, relpath + ".mp4")))
+                    except (OSError, subprocess.SubprocessError) as e:
+                        info.update(status="error", error=str(e))
+            written = 0
+            for sink in self.sinks:
+                with metrics.span("output_stage", {"stage": f"upload_{sink.name}", "kind": kind}):
+                    for source, target in files:
+                        written += sink.put(source, target)
+        finally:
+            shutil.rmtree(scratch, ignore_errors=True)
+
+        shipped = time.time()
+        # From when it was written, or queued if it predates the pipeline (a backlog at startup)
+        written_at = max(st.st_mtime, queued or 0.0)
+        lag = shipped - written_at
+        metrics.record_span("output_lag", lag, labels={"kind": kind}, start=written_at, size=st.st_size)
+        metrics.inc("output_files", labels={"kind": kind})
+        metrics.inc("output_bytes", st.st_size)
+        with self.lock:
+            self.state[relpath] = {"size": st.st_size, "mtime": st.st_mtime, "shipped": round(shipped, 3)}
+            self.lags.append(lag)
+            self.counts["shipped"] += 1
+            self.counts["bytes"] += st.st_size
+        self.save_state()
+        return written
+
+    def worker(self):
+        while True:
+            with self.lock:
+                while not self.pending and not self.stopping.is_set():
+                    self.lock.wait()
+                if not self.pending:
+                    return
+                # A file queued again while a worker ships it waits for that worker
+                relpath = next((r for r in self.pending if r not in self.active), None)
+                if relpath is None:
+                    self.lock.wait(0.5)
+                    continue
+                queued = self.pending.pop(relpath)
+                self.active.add(relpath)
+            try:
+                self.ship(relpath, queued)
+            except (OSError, RuntimeError) as e:
+                self.counts["failed"] += 1
+                self.log(f"❌ {relpath}: {e}")
+            except Exception as e:  # S3 client errors have no common stdlib base
+                self.counts["failed"] += 1
+                self.log(f"❌ {relpath}: {type(e).__name__}: {e}")
+            finally:
+                with self.lock:
+                    self.active.discard(relpath)
+                    self.lock.notify_all()
+
+    def watch(self):
+        """Feed the queue from inotify, or from periodic scans where inotify isn't available"""
+        watcher = self.watcher
+        next_scan = 0.0
+        while not self.stopping.is_set():
+            if time.time() >= next_scan:
+                self.scan()
+                next_scan = time.time() + (RESCAN_INTERVAL if watcher else SCAN_INTERVAL)
+            if watcher is None:
+                self.stopping.wait(max(0.0, next_scan - time.time()))
+                continue
+            finished = watcher.read(min(1.0, max(0.0, next_scan - time.time())))
+            if finished is None:
+                next_scan = time.time() + SETTLE_SECONDS  # Lost events or a new folder: rescan soon
+                continue
+            for relpath in finished:
+                self.enqueue(relpath)
+        if watcher:
+            watcher.close()
+
+    def start(self):
+        os.makedirs(self.output_dir, exist_ok=True)
+        try:
+            self.watcher = InotifyWatcher(self.output_dir)
+        except OSError as e:
+            self.log(f"⚠️  {e}; scanning {self.output_dir} every {SCAN_INTERVAL:.0f}s instead")
+        self.threads = [threading.Thread(target=self.worker, daemon=True, name=f"output-worker-{i}")
+                        for i in range(self.workers)]
+        self.threads.append(threading.Thread(target=self.watch, daemon=True, name="output-watch"))
+        for thread in self.threads:
+            thread.start()
+
+    def drain(self):
+        """Scan once (nothing left to settle) and wait until every queued file is shipped"""
+        self.scan(settle=0.0)
+        with self.lock:
+            while self.pending or self.active:
+                self.lock.wait(0.5)
+        self.save_state(force=True)
+
+    def stop(self):
+        self.stopping.set()
+        with self.lock:
+            self.lock.notify_all()
+        self.save_state(force=True)
+
+    def stats(self):
+        with self.lock:
+            oldest = min(self.pending.values(), default=None)
+            lags = sorted(self.lags)
+            return {
+                "watching": "inotify" if self.watcher else "scan",
+                "sinks": [sink.name for sink in self.sinks],
+                "queue_depth": len(self.pending),
+                "in_progress": len(self.active),
+                "oldest_queued_seconds": round(time.time() - oldest, 1) if oldest else 0.0,
+                "lag_p50_seconds": round(lags[len(lags) // 2], 2) if lags else 0.0,
+                "lag_max_seconds": round(lags[-1], 2) if lags else 0.0,
+                "shipped": self.counts["shipped"],
+                "shipped_bytes": self.counts["bytes"],
+                "failed": self.counts["failed"],
+                "evicted": self.counts["evicted"],
+                "local_bytes": self.local_bytes,
+            }
+
+    def prometheus(self):
+        stats = self.stats()
+        lines = []
+        for name, key, help_text in (
+                ("output_queue_depth", "queue_depth", "Finished outputs waiting for a worker"),
+                ("output_in_progress", "in_progress", "Outputs being processed"),
+                ("output_oldest_queued_seconds", "oldest_queued_seconds", "Age of the oldest queued output"),
+                ("output_lag_p50_seconds", "lag_p50_seconds", "Median time from written to shipped"),
+                ("output_lag_max_seconds", "lag_max_seconds", "Longest recent time from written to shipped"),
+                ("output_local_bytes", "local_bytes", "Size of the local output folder")):
+            lines += metrics.gauge_lines(name, [({}, stats[key])], help_text)
+        return "\n".join(lines) + "\n"
+
+    def serve_status(self, host=PIPELINE_HOST, port=PIPELINE_PORT):
+        """Serve /status (JSON), /metrics (Prometheus gauges) and /health"""
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        pipeline = self
+
+        class StatusHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.startswith("/health"):
+                    body, content_type = b"ok\n", "text/plain"
+                elif self.path.startswith("/metrics"):
+                    body, content_type = pipeline.prometheus().encode(), "text/plain; version=0.0.4"
+                elif self.path.startswith("/status") or self.path == "/":
+                    body, content_type = json.dumps(pipeline.stats(), indent=1).encode(), "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), StatusHandler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True, name="output-status").start()
+        return server
+
+
+def main(argv=None):
+    import argparse
+    import signal
+    import urllib.request
+
+    from download_queue import format_bytes
+
+    parser = argparse.ArgumentParser(description="Ship ComfyUI outputs to the volume/S3 in the background")
+    parser.add_argument("command", nargs="?", default="run", choices=["run", "sync", "status"],
+                        help="run: follow the output folder (service); sync: ship everything now and exit")
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    args = parser.parse_args(argv)
+
+    if args.command == "status":
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{PIPELINE_PORT}/status", timeout=2) as resp:
+                stats = json.load(resp)
+        except OSError:
+            print(f"❌ No output pipeline answering on port {PIPELINE_PORT}")
+            return 1
+        print(f"📤 {stats['queue_depth']} queued, {stats['in_progress']} in progress · lag p50 "
+              f"{stats['lag_p50_seconds']:.1f}s, max {stats['lag_max_seconds']:.1f}s · {stats['shipped']} shipped "
+              f"({format_bytes(stats['shipped_bytes'])}), {stats['failed']} failed · "
+              f"local {format_bytes(stats['local_bytes'])} ({stats['watching']})")
+        return 0
+
+    pipeline = OutputPipeline(workers=args.workers)
+    if args.command == "sync":
+        if not pipeline.sinks:
+            print("⏭️  No network volume or S3 bucket configured; outputs stay local")
+            return 0
+        pipeline.start()
+        pipeline.drain()
+        pipeline.stop()
+        stats = pipeline.stats()
+        print(f"✅ {stats['shipped']} outputs shipped ({format_bytes(stats['shipped_bytes'])}), "
+              f"{stats['failed']} failed")
+        return 1 if stats["failed"] else 0
+
+    try:
+        os.nice(NICENESS)
+    except OSError:
+        pass
+    pipeline.serve_status()
+    if pipeline.sinks:
+        pipeline.start()
+        print(f"📤 Output pipeline: {pipeline.output_dir} → {', '.join(s.name for s in pipeline.sinks)} "
+              f"({pipeline.workers} workers, {pipeline.stats()['watching']}, "
+              f"ffmpeg {'found' if pipeline.ffmpeg else 'missing'})")
+    else:
+        # Stay up (and healthy) so the supervisor doesn't restart us in a loop
+        print("⏭️  No network volume or S3 bucket configured; outputs stay local")
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    try:
+        while not stop.wait(1.0):
+            pass
+    except KeyboardInterrupt:
+        pass
+    pipeline.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Pre-baked image layers
+Builds the variant of the image that ships with everything first_run_setup.sh
+would install. The install is split into three layers, each pinned by its
+own lockfile, so a rebuild only redoes the layers whose lock changed:
+
+    base.lock        UI and video packages (what the wheelhouse installs)
+    comfyui.lock     ComfyUI's requirements at a pinned ComfyUI commit
+    nodes.lock.json  custom node commits and their extra packages
+
+    prebake.py lock --locks DIR                  resolve the three lockfiles
+    prebake.py install base|comfyui|nodes --locks DIR   install one layer
+
+`lock` runs inside the base image (build.sh --prebaked does that) so torch
+and the other base packages resolve to the versions the image really has.
+"""
+
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import metrics
+import node_installer
+import wheelhouse
+
+COMFYUI_URL = "https://github.com/comfyanonymous/ComfyUI.git"
+COMFYUI_DIR = "/workspace/ComfyUI"
+MANAGER_NODE = {"name": "ComfyUI-Manager", "url": "https://github.com/ltdrdata/ComfyUI-Manager.git"}
+LAYERS = ("base", "comfyui", "nodes")
+LOCK_FILES = {"base": "base.lock", "comfyui": "comfyui.lock", "nodes": "nodes.lock.json"}
+PIP_TIMEOUT = 3600
+
+
+def _write(path, text):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+def _pin_lines(pins):
+    return [f"{name}=={version}" for name, version in sorted(pins, key=lambda pin: pin[0].lower())]
+
+
+def read_pins(path):
+    """`name==version` lines of a .lock file (comments dropped)"""
+    with open(path) as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith("#")]
+
+
+def locked_commit(path):
+    """ComfyUI commit recorded in the header of comfyui.lock"""
+    with open(path) as f:
+        for line in f:
+            match = re.match(r"^#\s*comfyui-commit:\s*([0-9a-f]{7,40})", line)
+            if match:
+                return match.group(1)
+    raise RuntimeError(f"{path} has no '# comfyui-commit:' line")
+
+
+def _new_pins(pins, earlier):
+    """Pins not already provided (at any version) by an earlier layer"""
+    seen = {wheelhouse.canonical_name(line.split("==")[0]) for line in earlier}
+    return [(name, version) for name, version in pins if wheelhouse.canonical_name(name) not in seen]
+
+
+def lock(locks_dir, nodes=node_installer.CUSTOM_NODES, log=print):
+    """Resolve the three layer lockfiles into `locks_dir`; returns {layer: pin count}"""
+    os.makedirs(locks_dir, exist_ok=True)
+    counts = {}
+    base = _pin_lines(wheelhouse.resolve(packages=wheelhouse.SETUP_PACKAGES, log=log))
+    _write(os.path.join(locks_dir, LOCK_FILES["base"]),
+           "# Layer 1: UI and video packages (prebake.py lock)\n" + "\n".join(base) + "\n")
+    counts["base"] = len(base)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # ComfyUI at its current head; the layer is rebuilt when this commit changes
+        clone = node_installer.clone_node({"name": "ComfyUI", "url": COMFYUI_URL}, tmp)
+        if clone["status"] != "installed":
+            raise RuntimeError(clone["message"])
+        pins = wheelhouse.resolve([os.path.join(clone["path"], "requirements.txt")], packages=(),
+                                  constraints=wheelhouse.CONSTRAINTS + base, log=log)
+        comfyui = _pin_lines(_new_pins(pins, base))
+        _write(os.path.join(locks_dir, LOCK_FILES["comfyui"]),
+               f"# Layer 2: ComfyUI requirements (prebake.py lock)\n# comfyui-commit: {clone['commit']}\n"
+               + "\n".join(comfyui) + "\n")
+        counts["comfyui"] = len(comfyui)
+        log(f"🔒 ComfyUI {clone['commit'][:12]}: {len(comfyui)} packages on top of the base layer")
+
+        nodes_dir = os.path.join(tmp, "custom_nodes")
+        results = node_installer.clone_all([MANAGER_NODE] + list(nodes), nodes_dir, log=log)
+        failed = [result["name"] for result in results if result["status"] != "installed"]
+        if failed:
+            raise RuntimeError(f"could not clone: {', '.join(failed)}")
+        requirement_lists = [list(node_installer.EXTRA_PACKAGES)]
+        for result in results:
+            requirements_file = os.path.join(result["path"], "requirements.txt")
+            if os.path.isfile(requirements_file):
+                requirement_lists.append(node_installer.read_requirements(requirements_file))
+        requirements = node_installer.merge_requirements(requirement_lists)
+        requirements_file = os.path.join(tmp, "nodes-requirements.txt")
+        _write(requirements_file, "\n".join(requirements) + "\n")
+        pins = wheelhouse.resolve([requirements_file], packages=(),
+                                  constraints=node_installer.CONSTRAINTS + base + comfyui, log=log)
+        packages = _pin_lines(_new_pins(pins, base + comfyui))
+        node_installer.write_lockfile(os.path.join(locks_dir, LOCK_FILES["nodes"]), results,
+                                      requirements, packages)
+        counts["nodes"] = len(packages)
+        log(f"🔒 {len(results)} custom nodes pinned, {len(packages)} packages on top of ComfyUI")
+    return counts
+
+
+def _pip_install(pins, log=print):
+    """`pip install --no-deps` of exact pins: the lock is already the full closure"""
+    if not pins:
+        return True
+    with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as f:
+        f.write("\n".join(pins) + "\n")
+    try:
+        with metrics.span("pip", {"command": "install", "via": "prebake"}) as span:
+            result = subprocess.run([sys.executable, "-m", "pip", "install", "--no-cache-dir", "--no-deps",
+                                     "-r", f.name], capture_output=True, text=True, timeout=PIP_TIMEOUT)
+            if result.returncode != 0:
+                span.update(status="error", exit_code=result.returncode)
+    finally:
+        os.remove(f.name)
+    if result.returncode != 0:
+        log("❌ pip install failed:\n" + "\n".join(result.stderr.strip().splitlines()[-15:]))
+        return False
+    log(f"✅ Installed {len(pins)} packages")
+    return True
+
+
+def install(layer, locks_dir, log=print):
+    """Install one layer from its lockfile; returns success"""
+    started = time.time()
+    path = os.path.join(locks_dir, LOCK_FILES[layer])
+    if layer == "base":
+        ok = _pip_install(read_pins(path), log)
+    elif layer == "comfyui":
+        commit = locked_commit(path)
+        clone = node_installer.clone_node({"name": os.path.basename(COMFYUI_DIR), "url": COMFYUI_URL,
+                                           "commit": commit}, os.path.dirname(COMFYUI_DIR))
+        log(clone["message"])
+        os.makedirs(os.path.join(COMFYUI_DIR, "custom_nodes"), exist_ok=True)
+        ok = clone["status"] != "failed" and _pip_install(read_pins(path), log)
+    else:
+        data = node_installer.load_lockfile(path)
+        nodes = [dict(entry, name=name) for name, entry in data.get("nodes", {}).items()]
+        results = node_installer.clone_all(nodes, node_installer.CUSTOM_NODES_DIR, log=log)
+        ok = all(result["status"] != "failed" for result in results) and _pip_install(data.get("packages", []), log)
+        if ok:
+            # The node installer sees the lockfile and skips its dependency step
+            os.makedirs(os.path.dirname(node_installer.LOCKFILE) or ".", exist_ok=True)
+            shutil.copyfile(path, node_installer.LOCKFILE)
+    metrics.record_span("prebake_layer", time.time() - started, "ok" if ok else "error",
+                        {"layer": layer}, start=started)
+    log(f"{'✅' if ok else '❌'} Layer {layer} in {time.time() - started:.1f}s")
+    return ok
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Lock and install the pre-baked image layers")
+    parser.add_argument("command", choices=["lock", "install"])
+    parser.add_argument("layer", nargs="?", choices=LAYERS, help="install: layer to install")
+    parser.add_argument("--locks", default="docker/locks", help="Folder with the layer lockfiles")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == "lock":
+            counts = lock(args.locks)
+            print(" | ".join(f"{layer}: {counts[layer]} pins" for layer in LAYERS))
+            return 0
+        if not args.layer:
+            parser.error("install needs a layer")
+        return 0 if install(args.layer, args.locks) else 1
+    except (OSError, RuntimeError, subprocess.TimeoutExpired) as e:
+        print(f"❌ {e}")
+        return 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
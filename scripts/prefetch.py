@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Workflow-driven model prefetch
+Scans the user's ComfyUI workflows at boot (and again whenever one changes),
+works out which referenced models are missing and queues them at low
+priority on the shared download scheduler, so the first run of a workflow
+doesn't start with a download. Interactive downloads always go first.
+"""
+
+import os
+import threading
+import time
+
+from download_queue import PRIORITY_LOW, QUEUED, RUNNING
+from model_downloader import MODEL_DIRS
+from model_manifest import DEFAULT_MANIFEST, queue_manifest
+from workflow_analyzer import plan, scan_workflow
+
+WORKFLOWS_DIR = os.environ.get("COMFYUI_WORKFLOWS_DIR", "/workspace/ComfyUI/user/default/workflows")
+PREFETCH_ENABLED = os.environ.get("PREFETCH_MODELS", "1") != "0"
+RESCAN_INTERVAL = 60
+
+
+def workflow_files(workflows_dir=WORKFLOWS_DIR):
+    """{path: mtime} for every .json workflow under `workflows_dir`"""
+    files = {}
+    for root, _, names in os.walk(workflows_dir):
+        for name in names:
+            if name.endswith(".json"):
+                path = os.path.join(root, name)
+                try:
+                    files[path] = os.path.getmtime(path)
+                except OSError:
+                    continue
+    return files
+
+
+def _in_flight(scheduler):
+    """Target paths of downloads that are already queued or running"""
+    return {os.path.join(job.target_dir, job.filename or "") for job in scheduler.jobs()
+            if job.status in (QUEUED, RUNNING)}
+
+
+def prefetch(scheduler, inventory, workflows_dir=WORKFLOWS_DIR, manifests=(DEFAULT_MANIFEST,), seen=None,
+             log=print):
+    """
+    Queue the missing models of every new or changed workflow at PRIORITY_LOW.
+
+    `seen` ({path: mtime}) is updated in place so repeated calls only look at
+    workflows saved since the last one. Returns the queued jobs.
+    """
+    seen = {} if seen is None else seen
+    changed = {path: mtime for path, mtime in workflow_files(workflows_dir).items() if seen.get(path) != mtime}
+    if not changed:
+        return []
+
+    entries = {}
+    no_url = 0
+    for path, mtime in sorted(changed.items()):
+        seen[path] = mtime
+        try:
+            result = plan(scan_workflow(path), inventory, manifests)
+        except (OSError, ValueError) as e:
+            log(f"⚠️  Prefetch: skipping {os.path.basename(path)}: {e}")
+            continue
+        no_url += len(result["models"]["no_url"])
+        for model in result["models"]["missing"]:
+            target = os.path.join(MODEL_DIRS[model["category"]], model["filename"])
+            entries.setdefault(target, {
+                "url": model["url"], "category": model["category"], "filename": model["filename"],
+                "size": None, "sha256": model["sha256"], "optional": True, "headers": {},
+            })
+
+    busy = _in_flight(scheduler)
+    entries = [entry for target, entry in entries.items() if target not in busy]
+    jobs, _ = queue_manifest(entries, scheduler, MODEL_DIRS, priority=PRIORITY_LOW)
+    if jobs or no_url:
+        log(f"🔮 Prefetch: {len(changed)} workflows checked, {len(jobs)} models queued in the background"
+            + (f", {no_url} without a known URL" if no_url else ""))
+    return jobs
+
+
+def start_background_prefetch(scheduler, inventory, workflows_dir=WORKFLOWS_DIR, interval=RESCAN_INTERVAL,
+                              log=print):
+    """Prefetch now, then re-check the workflows every `interval` seconds in a daemon thread"""
+    seen = {}
+
+    def loop():
+        while True:
+            try:
+                prefetch(scheduler, inventory, workflows_dir, seen=seen, log=log)
+            except Exception as e:
+                log(f"⚠️  Prefetch failed: {e}")
+            time.sleep(interval)
+
+    thread = threading.Thread(target=loop, daemon=True, name="model-prefetch")
+    thread.start()
+    return thread
+
+
+def main(argv=None):
+    import argparse
+
+    from model_downloader import download_scheduler, get_inventory
+    from model_manifest import format_report, wait_for_manifest
+
+    parser = argparse.ArgumentParser(description="Download the models referenced by saved workflows")
+    parser.add_argument("--dir", default=WORKFLOWS_DIR, help="Workflows directory")
+    parser.add_argument("--manifest", action="append", default=[DEFAULT_MANIFEST],
+                        help="Manifest(s) to look up download URLs in")
+    args = parser.parse_args(argv)
+
+    started = time.time()
+    jobs = prefetch(download_scheduler, get_inventory(), args.dir, args.manifest)
+    if not jobs:
+        print("✅ Nothing to prefetch")
+        return 0
+    print(format_report(wait_for_manifest(jobs, [], started)))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
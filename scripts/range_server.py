@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Local Range-capable HTTP server
+Serves a directory with single-range (HTTP 206) support so the download engine
+can be exercised without a network. `--selftest` creates a synthetic file,
+downloads it with one and with several connections and checks the sha256,
+then once more with connections reset mid-segment to check that retried
+ranges are neither hashed nor reported twice.
+"""
+
+import argparse
+import hashlib
+import os
+import re
+import shutil
+import socket
+import struct
+import sys
+import tempfile
+import threading
+import time
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+
+class RangeRequestHandler(SimpleHTTPRequestHandler):
+    """SimpleHTTPRequestHandler that honours `Range: bytes=a-b` requests"""
+
+    ranges = True
+    quiet = True
+    rate_limit = None  # Bytes/sec per connection, to mimic per-stream WAN limits
+    reset_after = None  # Bytes into a range response after which the connection is reset
+    resets = None  # Shared [count] of resets left, so retries eventually succeed
+
+    def log_message(self, format, *args):
+        if not self.quiet:
+            super().log_message(format, *args)
+
+    def send_head(self):
+        path = self.translate_path(self.path)
+        if os.path.isdir(path) or not os.path.isfile(path):
+            return super().send_head()
+
+        size = os.path.getsize(path)
+        start, end = 0, size - 1
+        match = re.match(r"bytes=(\d*)-(\d*)$", self.headers.get("Range", "").strip())
+        partial_content = self.ranges and match is not None
+        if partial_content:
+            if match.group(1):
+                start = int(match.group(1))
+                end = int(match.group(2)) if match.group(2) else size - 1
+            else:
+                start = max(0, size - int(match.group(2)))
+            end = min(end, size - 1)
+            if start > end:
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{size}")
+                self.end_headers()
+                return None
+
+        f = open(path, "rb")
+        f.seek(start)
+        self.send_response(206 if partial_content else 200)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(end + 1 - start))
+        if self.ranges:
+            self.send_header("Accept-Ranges", "bytes")
+        if partial_content:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        self.end_headers()
+        self._remaining = end + 1 - start
+        return f
+
+    def copyfile(self, source, outputfile):
+        remaining = getattr(self, "_remaining", None)
+        if remaining is None:
+            return super().copyfile(source, outputfile)
+        started = time.time()
+        sent = 0
+        reset_at = None
+        if self.reset_after and remaining > self.reset_after and self.headers.get("Range") and self.resets[0] > 0:
+            self.resets[0] -= 1
+            reset_at = self.reset_after
+        while remaining > 0:
+            if reset_at is not None and sent >= reset_at:
+                # Abortive close (RST), like a dropped connection mid-transfer
+                self.connection.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack("ii", 1, 0))
+                self.connection.close()
+                return
+            chunk = source.read(min(256 * 1024, remaining))
+            if not chunk:
+                break
+            try:
+                outputfile.write(chunk)
+            except (BrokenPipeError, ConnectionResetError):
+                return  # Client hung up (e.g. a probe that only wanted headers)
+            remaining -= len(chunk)
+            sent += len(chunk)
+            if self.rate_limit:
+                delay = sent / self.rate_limit - (time.time() - started)
+                if delay > 0:
+                    time.sleep(delay)
+
+
+def serve(directory, port=0, ranges=True, host="127.0.0.1", rate_limit=None, reset_after=None, resets=0):
+    """
+    Start a background server for `directory`; returns (server, base_url).
+    With `reset_after`, the first `resets` range responses are cut off with
+    a connection reset after that many bytes.
+    """
+    handler = type("Handler", (RangeRequestHandler,),
+                   {"ranges": ranges, "rate_limit": rate_limit, "reset_after": reset_after,
+                    "resets": [resets]})
+    server = ThreadingHTTPServer((host, port), partial(handler, directory=directory))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def make_synthetic_file(path, size, block=4 * 1024 * 1024):
+    """Write `size` pseudo-random bytes to `path` and return their sha256"""
+    digest = hashlib.sha256()
+    seed = os.urandom(block)
+    written = 0
+    with open(path, "wb") as f:
+        while written < size:
+            chunk = seed[: min(block, size - written)]
+            # Vary each block so misplaced ranges can't hash the same
+            chunk = written.to_bytes(8, "little") + chunk[8:]
+            f.write(chunk)
+            digest.update(chunk)
+            written += len(chunk)
+    return digest.hexdigest()
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(4 * 1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def selftest(size_mb, connections, rate_limit=None):
+    """Download a synthetic file from a local server and report throughput"""
+    from segmented_download import segmented_download
+
+    workdir = tempfile.mkdtemp(prefix="range-selftest-")
+    ok = True
+    try:
+        source = os.path.join(workdir, "model.safetensors")
+        expected = make_synthetic_file(source, size_mb * 1024 * 1024)
+        for ranges in (True, False):
+            server, base_url = serve(workdir, ranges=ranges, rate_limit=rate_limit)
+            try:
+                for count in sorted({1, connections}):
+                    target = os.path.join(workdir, f"out-{count}-{ranges}.bin")
+                    result = segmented_download(f"{base_url}/model.safetensors", target,
+                                                connections=count)
+                    match = file_sha256(target) == expected
+                    ok = ok and match
+                    print(f"{'✅' if match else '❌'} ranges={ranges!s:<5} "
+                          f"connections={count:<3} used={result['connections']:<3} "
+                          f"{result['bytes_per_sec'] / 1e6:8.1f} MB/s")
+                    os.remove(target)
+            finally:
+                server.shutdown()
+
+        # Connections dropped part-way through segments: the retries must resume, not re-count
+        server, base_url = serve(workdir, rate_limit=rate_limit, reset_after=3 * 1024 * 1024,
+                                 resets=max(2, connections // 2))
+        try:
+            target = os.path.join(workdir, "out-reset.bin")
+            reported = []
+            result = segmented_download(f"{base_url}/model.safetensors", target, connections=connections,
+                                        progress=lambda done, total: reported.append(done))
+            match = file_sha256(target) == expected and result["sha256"] == expected
+            counted = max(reported, default=0)  # Callbacks from several threads may land out of order
+            exact = counted == size_mb * 1024 * 1024
+            ok = ok and match and exact
+            print(f"{'✅' if match and exact else '❌'} resets={max(2, connections // 2):<4} "
+                  f"connections={connections:<3} hash {'ok' if match else 'WRONG'}, "
+                  f"progress {counted} of {size_mb * 1024 * 1024} bytes")
+            os.remove(target)
+        finally:
+            server.shutdown()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--dir", default=".", help="Directory to serve")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--no-ranges", action="store_true", help="Ignore Range headers")
+    parser.add_argument("--selftest", type=int, metavar="SIZE_MB",
+                        help="Run an offline download check with a file of SIZE_MB")
+    parser.add_argument("--connections", type=int, default=8)
+    parser.add_argument("--rate-limit", type=float, metavar="MB_PER_SEC",
+                        help="Cap each connection's throughput (simulates a WAN link)")
+    args = parser.parse_args()
+    rate_limit = args.rate_limit * 1e6 if args.rate_limit else None
+
+    if args.selftest:
+        sys.exit(0 if selftest(args.selftest, args.connections, rate_limit) else 1)
+
+    server, base_url = serve(os.path.abspath(args.dir), args.port, not args.no_ranges,
+                             args.host, rate_limit)
+    print(f"Serving {os.path.abspath(args.dir)} at {base_url} (ranges={not args.no_ranges})")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
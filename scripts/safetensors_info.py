@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+Safetensors header reader and model classifier
+Memory-maps only the 8-byte length prefix and JSON header of a .safetensors
+file (never the weights) and infers the architecture (SD1.5/SDXL/Flux/Wan/...),
+component kind, dtype and parameter count from tensor names and shapes.
+"""
+
+import collections
+import json
+import math
+import mmap
+import os
+import re
+import struct
+import sys
+import time
+
+MAX_HEADER_SIZE = 100 * 1024 * 1024
+
+# Where each component kind belongs (keys of MODEL_DIRS)
+CATEGORY_FOR_KIND = {
+    "checkpoint": "Checkpoints",
+    "diffusion_model": "Diffusion Models",
+    "lora": "LoRAs",
+    "vae": "VAE",
+    "controlnet": "ControlNet",
+    "text_encoder": "CLIP",
+    "clip_vision": "CLIP Vision",
+    "ip_adapter": "IP-Adapter",
+    "upscale": "Upscale Models",
+    "embedding": "Embeddings",
+}
+
+DTYPE_NAMES = {
+    "F64": "fp64", "F32": "fp32", "F16": "fp16", "BF16": "bf16",
+    "F8_E4M3": "fp8_e4m3fn", "F8_E5M2": "fp8_e5m2",
+    "I64": "int64", "I32": "int32", "I16": "int16", "I8": "int8", "U8": "uint8", "BOOL": "bool",
+}
+DTYPE_SIZES = {
+    "F64": 8, "F32": 4, "F16": 2, "BF16": 2, "F8_E4M3": 1, "F8_E5M2": 1,
+    "I64": 8, "I32": 4, "I16": 2, "I8": 1, "U8": 1, "BOOL": 1,
+}
+
+_DTYPE_RE = re.compile(r'"dtype"\s*:\s*"(\w+)"')
+_SPEC_RE = re.compile(r'"dtype"\s*:\s*"(\w+)"\s*,\s*"shape"\s*:\s*\[([^\]]*)\]')
+_METADATA_RE = re.compile(r'"__metadata__"\s*:\s*')
+# Wan's DiT blocks are numbered straight off the model ("blocks.0.cross_attn", kohya-style "blocks_0_cross_attn");
+# SD LoRAs only have transformer_blocks_N_attn1/2 and text-encoder layers_N_self_attn
+_WAN_LORA_RE = re.compile(r'(?<![a-z])blocks[._]\d+[._](?:self|cross)_attn')
+
+
+def read_header_text(path):
+    """Return (header JSON text, size of the tensor data that follows it)"""
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        prefix = os.pread(fd, 8, 0)
+        if len(prefix) != 8:
+            raise ValueError("File too short for a safetensors header")
+        (header_size,) = struct.unpack("<Q", prefix)
+        file_size = os.fstat(fd).st_size
+        if header_size > MAX_HEADER_SIZE or header_size + 8 > file_size:
+            raise ValueError(f"Implausible safetensors header size {header_size}")
+        # Map just the prefix + header; the weights after it are never touched
+        with mmap.mmap(fd, 8 + header_size, access=mmap.ACCESS_READ) as mm:
+            text = mm[8:8 + header_size].decode("utf-8")
+    finally:
+        os.close(fd)
+    if not text.lstrip().startswith("{"):
+        raise ValueError("Not a safetensors header")
+    return text, file_size - 8 - header_size
+
+
+def read_header(path):
+    """Return the parsed JSON header of a .safetensors file (tensor specs + __metadata__)"""
+    return json.loads(read_header_text(path)[0])
+
+
+def _split_metadata(text):
+    """Pull the __metadata__ object out of the header text; returns (metadata, tensor text)"""
+    match = _METADATA_RE.search(text)
+    if not match:
+        return {}, text
+    metadata, end = json.JSONDecoder().raw_decode(text, match.end())
+    return (metadata if isinstance(metadata, dict) else {}), text[:match.start()] + text[end:]
+
+
+def _shape(text, name):
+    """Shape of tensor `name` straight from the header text, or []"""
+    match = re.search(re.escape(f'"{name}"') + r'\s*:\s*\{[^}]*"shape"\s*:\s*\[([^\]]*)\]', text)
+    return [int(d) for d in match.group(1).split(",") if d.strip()] if match else []
+
+
+def _count_params(text, tensors, data_size):
+    """Parameter count and dominant dtype without building per-tensor dicts"""
+    first = _DTYPE_RE.search(text)
+    if first is None:
+        return 0, "?"
+    # Compact JSON (what every safetensors writer emits) lets one str.count spot single-dtype files
+    if text.count(f'"dtype":"{first.group(1)}"') == tensors:
+        # Single dtype: the data section size gives the parameter count directly
+        return data_size // DTYPE_SIZES.get(first.group(1), 1), first.group(1)
+
+    params_by_dtype = collections.Counter()
+    for dtype, shape in _SPEC_RE.findall(text):
+        params_by_dtype[dtype] += math.prod(int(d) for d in shape.split(",") if d.strip())
+    if not params_by_dtype:
+        return 0, "?"
+    return sum(params_by_dtype.values()), params_by_dtype.most_common(1)[0][0]
+
+
+def _has(text, *patterns):
+    return any(p in text for p in patterns)
+
+
+def _diffusion_architecture(text):
+    """Identify the denoiser family from its tensor names"""
+    if _has(text, "input_blocks.", "down_blocks."):
+        # UNet: SDXL adds a pooled-text/size embedding that SD1.5 lacks
+        return "sdxl" if _has(text, "label_emb.", "add_embedding.") else "sd15"
+    if _has(text, "double_blocks.", "single_blocks.", "single_transformer_blocks."):
+        return "flux"
+    if _has(text, "patch_embedding.") and _has(text, "text_embedding.", "blocks.0.cross_attn."):
+        return "wan"
+    if _has(text, "joint_blocks."):
+        return "sd3"
+    return "unknown"
+
+
+def _lora_architecture(text):
+    if _has(text, "double_blocks", "single_blocks", "single_transformer_blocks"):
+        return "flux"
+    if _has(text, "self_attn", "cross_attn") and _WAN_LORA_RE.search(text):
+        return "wan"
+    if _has(text, "lora_te1_", "lora_te2_", "text_encoder_2", "input_blocks_4_1_transformer_blocks_1",
+            "input_blocks.4.1.transformer_blocks.1"):
+        return "sdxl"
+    if _has(text, "lora_unet_", "lora_te_", "unet.", "input_blocks", "down_blocks"):
+        return "sd15"
+    return "unknown"
+
+
+def _text_encoder_architecture(text):
+    if _has(text, "encoder.block.0.layer."):
+        # UMT5 keeps a relative attention bias in every block, T5 only in the first
+        return "umt5" if text.count("relative_attention_bias") > 1 else "t5"
+    if _has(text, "visual.") and _has(text, "model.layers.0."):
+        return "qwen"
+    if _has(text, "model.layers.0.", "layers.0.self_attn."):
+        return "llm"
+    layers = set(re.findall(r"encoder\.layers\.(\d+)\.", text))
+    if len(layers) >= 24:
+        return "clip_g"
+    if layers:
+        return "clip_l"
+    return "unknown"
+
+
+def classify_text(text, data_size):
+    """
+    Infer what a safetensors file is from its raw header text.
+
+    Tensor names are matched as substrings of the header rather than parsed
+    into dicts, so a file costs a handful of linear scans over its header.
+    Returns a dict with kind (see CATEGORY_FOR_KIND),
+    architecture, dtype, params, tensors, category and metadata.
+    """
+    metadata, text = _split_metadata(text)
+    tensors = text.count('"data_offsets"')
+    params, dtype = _count_params(text, tensors, data_size)
+    kind, architecture = "unknown", "unknown"
+
+    # Cheap shared-substring checks first: each _has miss is a full scan of the header
+    if ("lora" in text and _has(text, "lora_up", "lora_down", "lora_A.", "lora_B.", "lora.up",
+                                "lora.down")) or _has(text, ".hada_", ".lokr_"):
+        kind, architecture = "lora", _lora_architecture(text)
+    elif _has(text, "image_proj.") and _has(text, "ip_adapter.", "to_k_ip", "to_v_ip"):
+        kind = "ip_adapter"
+        architecture = "sdxl" if (_shape(text, "image_proj.proj.weight") or [0])[0] >= 8192 else "sd15"
+    elif _has(text, "emb_params", "string_to_param") or (
+            tensors <= 2 and _has(text, '"clip_l"', '"clip_g"')):
+        kind = "embedding"
+        architecture = "sdxl" if '"clip_g"' in text else "sd15"
+    elif ("control" in text and _has(text, "control_model.", "controlnet_cond_embedding.",
+                                     "controlnet_blocks.")) or _has(text, "input_hint_block.", "zero_convs."):
+        kind, architecture = "controlnet", _diffusion_architecture(text)
+    elif _has(text, "first_stage_model.") and _has(text, "model.diffusion_model."):
+        kind, architecture = "checkpoint", _diffusion_architecture(text)
+    elif _diffusion_architecture(text) != "unknown" and not _has(
+            text, "encoder.down.", "decoder.up.", "text_model.", "vision_model.", "encoder.block."):
+        kind, architecture = "diffusion_model", _diffusion_architecture(text)
+    elif _has(text, "decoder.conv_in.", "decoder.up.", "decoder.upsamples.", "decoder.up_blocks."):
+        kind = "vae"
+        if _has(text, "decoder.upsamples.", "encoder.downsamples."):
+            architecture = "wan"
+        else:
+            conv_in = _shape(text, "decoder.conv_in.weight")
+            architecture = {16: "flux", 4: "sd"}.get(conv_in[1] if len(conv_in) > 1 else 0, "unknown")
+    elif _has(text, "vision_model.encoder.layers.") and not _has(text, "text_model."):
+        kind, architecture = "clip_vision", "clip_vision"
+    elif _has(text, "text_model.encoder.layers.", "encoder.block.0.layer.", "model.layers.0.",
+              "transformer.resblocks."):
+        kind, architecture = "text_encoder", _text_encoder_architecture(text)
+    elif _has(text, "conv_first.", "body.0.", "model.0.weight", "upconv1."):
+        kind, architecture = "upscale", "esrgan"
+
+    return {
+        "kind": kind,
+        "architecture": architecture,
+        "dtype": DTYPE_NAMES.get(dtype, dtype),
+        "params": params,
+        "tensors": tensors,
+        "category": CATEGORY_FOR_KIND.get(kind),
+        "metadata": metadata,
+    }
+
+
+def classify(header):
+    """Classify an already parsed header dict (see classify_text)"""
+    data_size = max((spec["data_offsets"][1] for name, spec in header.items()
+                     if name != "__metadata__" and isinstance(spec, dict)), default=0)
+    return classify_text(json.dumps(header, separators=(",", ":")), data_size)
+
+
+def guess_category_from_name(filename):
+    """Fallback routing for files without a safetensors header (.pth, .ckpt, .onnx, ...)"""
+    name = filename.lower()
+    if "lora" in name:
+        return "LoRAs"
+    if "vae" in name:
+        return "VAE"
+    if "ip-adapter" in name or "ip_adapter" in name:
+        return "IP-Adapter"
+    if "control" in name or name.endswith(".onnx"):
+        return "ControlNet"
+    if "esrgan" in name or "upscale" in name or re.search(r"(^|[^a-z])x[248]", name):
+        return "Upscale Models"
+    if "clip_vision" in name:
+        return "CLIP Vision"
+    if "clip" in name or "t5" in name:
+        return "CLIP"
+    return "Checkpoints"
+
+
+def inspect(path):
+    """Classify a model file; returns None for unreadable/non-safetensors files"""
+    if not path.endswith((".safetensors", ".sft")):
+        return None
+    try:
+        return classify_text(*read_header_text(path))
+    except (OSError, ValueError):
+        return None
+
+
+def describe(info):
+    """Short human readable summary, e.g. 'SDXL checkpoint · fp16 · 3.5B params'"""
+    if not info or info["kind"] == "unknown":
+        return "unrecognised"
+    params = info["params"] or 0
+    size = f"{params / 1e9:.1f}B" if params >= 1e9 else f"{params / 1e6:.0f}M"
+    arch = info["architecture"].upper() if info["architecture"] != "unknown" else ""
+    return f"{arch} {info['kind'].replace('_', ' ')} · {info['dtype']} · {size} params".strip()
+
+
+def main(paths):
+    started = time.time()
+    count = 0
+    for root in paths:
+        files = [root] if os.path.isfile(root) else [
+            os.path.join(r, f) for r, _, fs in os.walk(root) for f in fs]
+        for path in sorted(files):
+            info = inspect(path)
+            if info is None:
+                continue
+            count += 1
+            print(f"{info['category'] or '?':<16} {describe(info):<45} {path}")
+    print(f"\nClassified {count} files in {time.time() - started:.2f}s")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:] or ["/workspace/ComfyUI/models"])
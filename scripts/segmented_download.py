@@ -0,0 +1,466 @@
+#!/usr/bin/env python3
+"""
+Segmented HTTP download engine
+Splits a file into byte ranges, fetches them over several connections at once
+and writes each range straight to its offset in a preallocated file.
+Falls back to a single (resumable) stream when the server ignores Range requests.
+The sha256 is computed alongside the download: a single stream is hashed as
+it arrives, while segmented downloads are read back (mostly from the page
+cache) as the written prefix grows, so the digest is ready soon after the
+last byte instead of after a separate full pass.
+Transfers can be throttled by shared token buckets (bytes/sec).
+"""
+
+import ctypes
+import errno
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_CONNECTIONS = int(os.environ.get("DOWNLOAD_CONNECTIONS", "8"))
+MIN_SEGMENT_SIZE = 16 * 1024 * 1024  # Don't split files into ranges smaller than this
+CHUNK_SIZE = 1024 * 1024
+SEGMENT_RETRIES = 3
+HASH_CHUNK = 8 * 1024 * 1024
+USER_AGENT = "comfyui-runpod-downloader/1.0"
+FALLOC_FL_KEEP_SIZE = 0x01
+THROTTLE_STEP = 0.25  # Longest sleep between cancel checks while throttled
+
+
+class DownloadCancelled(Exception):
+    """Raised when a download is cancelled through its cancel event"""
+
+
+class TokenBucket:
+    """
+    Thread-safe bytes/sec limiter shared by any number of transfers.
+
+    `reserve(count)` takes the bytes up front (going into debt if needed) and
+    returns how long the caller should sleep, so concurrent readers are paced
+    in the order they asked. A rate of 0/None means unlimited.
+    """
+
+    def __init__(self, rate=None, burst=None):
+        self.lock = threading.Lock()
+        self.set_rate(rate, burst)
+
+    def set_rate(self, rate, burst=None):
+        with self.lock:
+            self.rate = float(rate or 0)
+            self.burst = float(burst or max(self.rate, CHUNK_SIZE))
+            self.tokens = self.burst
+            self.updated = time.monotonic()
+
+    def reserve(self, count):
+        with self.lock:
+            if not self.rate:
+                return 0.0
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= count
+            return -self.tokens / self.rate if self.tokens < 0 else 0.0
+
+
+def _throttle(limits, count, cancel_event):
+    """Wait until every bucket in `limits` allows `count` more bytes"""
+    delay = max([bucket.reserve(count) for bucket in limits] + [0.0])
+    deadline = time.monotonic() + delay
+    while delay > 0:
+        _check_cancel(cancel_event)
+        time.sleep(min(delay, THROTTLE_STEP))
+        delay = deadline - time.monotonic()
+
+
+_libc = None
+
+
+def preallocate(fd, size, keep_size=False):
+    """
+    Reserve `size` bytes of disk for `fd` up front; returns False if unsupported.
+
+    Running out of space then fails here, before any data is fetched, instead
+    of halfway through. Uses fallocate(2) directly because posix_fallocate
+    silently falls back to writing zeros on filesystems without support.
+    `keep_size` allocates without changing the visible file size.
+    """
+    global _libc
+    if size <= 0:
+        return False
+    try:
+        if _libc is None:
+            _libc = ctypes.CDLL(None, use_errno=True)
+        fallocate = _libc.fallocate
+    except (OSError, AttributeError):
+        return False
+    fallocate.argtypes = [ctypes.c_int, ctypes.c_int, ctypes.c_longlong, ctypes.c_longlong]
+    if fallocate(fd, FALLOC_FL_KEEP_SIZE if keep_size else 0, 0, size) == 0:
+        return True
+    err = ctypes.get_errno()
+    if err in (errno.EOPNOTSUPP, errno.ENOSYS, errno.EINVAL):
+        return False
+    raise OSError(err, f"Cannot reserve {size} bytes: {os.strerror(err)}")
+
+
+def _request(url, headers=None, byte_range=None, method="GET"):
+    """Build a urllib request with our default headers and an optional Range"""
+    request_headers = {"User-Agent": USER_AGENT}
+    request_headers.update(headers or {})
+    if byte_range is not None:
+        request_headers["Range"] = "bytes=%d-%s" % (
+            byte_range[0], "" if byte_range[1] is None else byte_range[1]
+        )
+    return urllib.request.Request(url, headers=request_headers, method=method)
+
+
+def _filename_from_disposition(disposition):
+    """Extract the filename from a Content-Disposition header, if any"""
+    if not disposition:
+        return None
+    match = re.search(r"filename\*=(?:UTF-8'')?([^;]+)", disposition, re.IGNORECASE)
+    if match:
+        return os.path.basename(urllib.parse.unquote(match.group(1).strip().strip('"')))
+    match = re.search(r'filename="?([^";]+)"?', disposition, re.IGNORECASE)
+    if match:
+        return os.path.basename(match.group(1).strip())
+    return None
+
+
+def probe(url, headers=None, timeout=30):
+    """Resolve redirects and find out the size and Range support of a URL"""
+    with urllib.request.urlopen(_request(url, headers, (0, 0)), timeout=timeout) as resp:
+        info = {
+            "url": resp.geturl(),
+            "size": None,
+            "ranges": False,
+            "filename": _filename_from_disposition(resp.headers.get("Content-Disposition")),
+            "headers": dict(resp.headers.items()),
+        }
+        content_range = resp.headers.get("Content-Range", "")
+        match = re.match(r"bytes\s+\d+-\d+/(\d+)", content_range)
+        if resp.status == 206 and match:
+            info["ranges"] = True
+            info["size"] = int(match.group(1))
+        elif resp.headers.get("Content-Length"):
+            info["size"] = int(resp.headers["Content-Length"])
+    return info
+
+
+def plan_segments(size, connections, min_segment=MIN_SEGMENT_SIZE):
+    """Split [0, size) into at most `connections` inclusive byte ranges"""
+    count = max(1, min(connections, size // max(1, min_segment)))
+    step = -(-size // count)
+    return [(start, min(start + step, size) - 1) for start in range(0, size, step)]
+
+
+class _Progress:
+    """Thread-safe byte counter that forwards to an optional callback"""
+
+    def __init__(self, total, callback=None, done=0):
+        self.total = total
+        self.done = done
+        self.callback = callback
+        self.lock = threading.Lock()
+
+    def add(self, count):
+        with self.lock:
+            self.done += count
+            done = self.done
+        if self.callback:
+            self.callback(done, self.total)
+
+
+class _OrderedHasher:
+    """
+    Hashes a file front-to-back while its segments are still being written.
+
+    Segments finish out of order, so the hasher follows the contiguous prefix
+    of written bytes and reads it back with pread while it is still in the
+    page cache. This is a second read of the data that overlaps the
+    download rather than following it; bytes past the first unfinished
+    segment wait until it completes, so with equal segments running in
+    parallel much of the read-back still lands near the end.
+    """
+
+    def __init__(self, fd, segments, done):
+        self.fd = fd
+        self.segments = segments
+        self.written = [e + 1 - s if (s, e) in done else 0 for s, e in segments]
+        self.digest = hashlib.sha256()
+        self.hashed = 0
+        self.closed = False
+        self.aborted = False
+        self.cond = threading.Condition()
+        self.thread = threading.Thread(target=self._run, daemon=True, name="download-hasher")
+        self.thread.start()
+
+    def callback(self, index):
+        start, end = self.segments[index]
+
+        def add(count):
+            with self.cond:
+                # Never past the segment: bytes counted twice must not mark the next one as written
+                self.written[index] = min(self.written[index] + count, end + 1 - start)
+                self.cond.notify()
+        return add
+
+    def _frontier(self):
+        total = 0
+        for (start, end), written in zip(self.segments, self.written):
+            total += written
+            if written < end + 1 - start:
+                break
+        return total
+
+    def _run(self):
+        while True:
+            with self.cond:
+                while not self.closed and self._frontier() <= self.hashed:
+                    self.cond.wait()
+                frontier = self._frontier()
+                if frontier <= self.hashed:
+                    return
+            while self.hashed < frontier and not self.aborted:
+                chunk = os.pread(self.fd, min(HASH_CHUNK, frontier - self.hashed), self.hashed)
+                if not chunk:
+                    return
+                self.digest.update(chunk)
+                self.hashed += len(chunk)
+
+    def finish(self):
+        """Wait for the hasher to catch up and return the hex digest"""
+        with self.cond:
+            self.closed = True
+            self.cond.notify()
+        self.thread.join()
+        return self.digest.hexdigest()
+
+    def abort(self):
+        """Stop hashing without waiting for the remaining bytes"""
+        self.aborted = True
+        self.finish()
+
+
+class _AnyEvent:
+    """Looks like a threading.Event that is set when any of its members is set"""
+
+    def __init__(self, *events):
+        self.events = [e for e in events if e is not None]
+
+    def is_set(self):
+        return any(e.is_set() for e in self.events)
+
+
+def _check_cancel(cancel_event):
+    if cancel_event is not None and cancel_event.is_set():
+        raise DownloadCancelled("Download cancelled")
+
+
+def _fetch_range(url, headers, fd, start, end, on_data, cancel_event, timeout, limits=()):
+    """Fetch bytes [start, end] and pwrite them at their offset; returns bytes written"""
+    offset = start
+    with urllib.request.urlopen(_request(url, headers, (start, end)), timeout=timeout) as resp:
+        if resp.status != 206:
+            raise IOError(f"Server ignored Range request (HTTP {resp.status})")
+        while offset <= end:
+            _check_cancel(cancel_event)
+            chunk = resp.read(min(CHUNK_SIZE, end + 1 - offset))
+            if not chunk:
+                break
+            os.pwrite(fd, chunk, offset)
+            offset += len(chunk)
+            on_data(len(chunk))
+            _throttle(limits, len(chunk), cancel_event)
+    return offset - start
+
+
+def _fetch_segment(url, headers, fd, segment, on_data, cancel_event, timeout, limits=()):
+    """Fetch one segment, resuming from the last written byte on transient errors"""
+    start, end = segment
+    attempt = 0
+
+    def advance(count):
+        # Counted as the bytes land, so a retry after a reset picks up exactly where they stopped
+        nonlocal start
+        start += count
+        on_data(count)
+
+    while True:
+        try:
+            _fetch_range(url, headers, fd, start, end, advance, cancel_event, timeout, limits)
+            if start > end:
+                return segment
+            raise IOError(f"Connection closed early at byte {start} of segment {segment}")
+        except DownloadCancelled:
+            raise
+        except Exception:
+            attempt += 1
+            if attempt >= SEGMENT_RETRIES:
+                raise
+            time.sleep(attempt)
+
+
+def _load_state(state_path, size, segments):
+    """Return the segments a previous, interrupted run already completed"""
+    try:
+        with open(state_path) as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return set()
+    if state.get("size") != size or state.get("segments") != [list(s) for s in segments]:
+        return set()
+    return {tuple(s) for s in state.get("done", [])}
+
+
+def _save_state(state_path, size, segments, done):
+    tmp_path = state_path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"size": size, "segments": segments, "done": sorted(done)}, f)
+    os.replace(tmp_path, state_path)
+
+
+def _download_segmented(info, part_path, headers, connections, progress_cb, cancel_event, timeout,
+                        limits=()):
+    size = info["size"]
+    segments = plan_segments(size, connections)
+    state_path = part_path + ".json"
+    done = _load_state(state_path, size, segments) if os.path.exists(part_path) else set()
+    progress = _Progress(size, progress_cb, sum(e + 1 - s for s, e in done))
+    state_lock = threading.Lock()
+    failed = threading.Event()  # Stops sibling segments as soon as one gives up
+    watch = _AnyEvent(cancel_event, failed)
+
+    fd = os.open(part_path, os.O_RDWR | os.O_CREAT, 0o644)
+    hasher = None
+    try:
+        if os.fstat(fd).st_size != size:
+            if not preallocate(fd, size):
+                os.ftruncate(fd, size)
+        hasher = _OrderedHasher(fd, segments, done)
+
+        def run(segment):
+            hash_data = hasher.callback(segments.index(segment))
+
+            def on_data(count):
+                progress.add(count)
+                hash_data(count)
+
+            try:
+                _fetch_segment(info["url"], headers, fd, segment, on_data, watch, timeout, limits)
+            except Exception:
+                failed.set()
+                raise
+            with state_lock:
+                done.add(segment)
+                _save_state(state_path, size, segments, done)
+
+        pending = [s for s in segments if s not in done]
+        with ThreadPoolExecutor(max_workers=max(1, len(pending))) as pool:
+            futures = [pool.submit(run, s) for s in pending]
+        errors = [f.exception() for f in futures if f.exception() is not None]
+        if errors:
+            # Report the segment that actually failed, not the siblings it stopped
+            real = [e for e in errors if not isinstance(e, DownloadCancelled)]
+            raise (real or errors)[0]
+        sha256 = hasher.finish()
+        os.fsync(fd)
+    finally:
+        if hasher is not None:
+            hasher.abort()  # No-op after a successful finish()
+        os.close(fd)
+
+    if os.path.exists(state_path):
+        os.remove(state_path)
+    return len(segments), sha256
+
+
+def _download_single(info, part_path, headers, progress_cb, cancel_event, timeout, limits=()):
+    existing = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+    stale = os.path.exists(part_path + ".json")  # Sparse leftovers of a segmented run
+    if stale or not info["ranges"] or (info["size"] is not None and existing >= info["size"]):
+        existing = 0
+    if stale:
+        # The .part is rewritten from byte 0, so its segment state no longer describes it
+        os.remove(part_path + ".json")
+    byte_range = (existing, None) if existing else None
+    progress = _Progress(info["size"], progress_cb, existing)
+    digest = hashlib.sha256()
+
+    with urllib.request.urlopen(_request(info["url"], headers, byte_range), timeout=timeout) as resp:
+        if byte_range and resp.status != 206:
+            existing = 0
+            progress.done = 0
+        with open(part_path, "r+b" if existing else "wb") as f:
+            if info["size"]:
+                # Keep the size honest: a resume reads it as the number of bytes fetched
+                preallocate(f.fileno(), info["size"], keep_size=True)
+            # Resumed downloads have to hash the bytes we already have first
+            remaining = existing
+            while remaining > 0:
+                chunk = f.read(min(HASH_CHUNK, remaining))
+                if not chunk:
+                    break
+                digest.update(chunk)
+                remaining -= len(chunk)
+            f.seek(existing)
+            while True:
+                _check_cancel(cancel_event)
+                chunk = resp.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                f.write(chunk)
+                digest.update(chunk)
+                progress.add(len(chunk))
+                _throttle(limits, len(chunk), cancel_event)
+            f.truncate()
+    if info["size"] is not None and os.path.getsize(part_path) != info["size"]:
+        raise IOError(
+            f"Incomplete download: got {os.path.getsize(part_path)} of {info['size']} bytes"
+        )
+    return 1, digest.hexdigest()
+
+
+def segmented_download(url, output_path, connections=DEFAULT_CONNECTIONS, headers=None,
+                       progress=None, cancel_event=None, info=None, timeout=60, limits=()):
+    """
+    Download `url` to `output_path` over up to `connections` parallel ranges.
+
+    Data is written to `<output_path>.part` and renamed into place once complete,
+    so a half-written file never shows up under its final name. Interrupted
+    downloads resume from the completed segments (or bytes, for single streams).
+    `progress(done_bytes, total_bytes)` is called as data arrives and setting
+    `cancel_event` aborts the transfer with DownloadCancelled. `limits` is a
+    sequence of TokenBuckets that every received chunk is paced by. The result
+    includes the file's sha256, hashed incrementally as the bytes arrive.
+    """
+    started = time.time()
+    info = info or probe(url, headers, timeout)
+    part_path = output_path + ".part"
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+
+    size = info["size"]
+    if info["ranges"] and size and connections > 1 and size >= 2 * MIN_SEGMENT_SIZE:
+        used, sha256 = _download_segmented(info, part_path, headers, connections, progress,
+                                   cancel_event, timeout, limits)
+    else:
+        used, sha256 = _download_single(info, part_path, headers, progress, cancel_event, timeout,
+                                        limits)
+
+    os.replace(part_path, output_path)
+    elapsed = max(time.time() - started, 1e-6)
+    size = os.path.getsize(output_path)
+    return {
+        "path": output_path,
+        "size": size,
+        "elapsed": elapsed,
+        "connections": used,
+        "segmented": used > 1,
+        "bytes_per_sec": size / elapsed,
+        "sha256": sha256,
+    }
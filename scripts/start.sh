@@ -11,6 +11,20 @@ export PYTHONUNBUFFERED=1
 export PYTORCH_CUDA_ALLOC_CONF=garbage_collection_threshold:0.6,max_split_size_mb:128
 export CUDA_MODULE_LOADING=LAZY
 
+# Bring-up timing: every step below is a span in the metrics trace
+# (`metrics.py report` shows the timeline, the supervisor serves it on /metrics)
+METRICS="python3 /workspace/scripts/metrics.py"
+BOOT_START=$(date +%s.%N)
+$METRICS mark boot
+
+# A fresh pod on a volume that already saw a set-up pod unpacks that environment snapshot
+# (packages + custom nodes, zstd shards restored in parallel) instead of installing it all again
+if [ ! -f "/workspace/.setup_complete" ] && [ -d "/runpod-volume" ]; then
+    if $METRICS span boot_step --label step=env_restore -- python3 /workspace/scripts/env_snapshot.py restore; then
+        touch /workspace/.setup_complete
+    fi
+fi
+
 # Run first-time setup if needed (never fails)
 if [ ! -f "/workspace/.setup_complete" ]; then
     echo ""
@@ -18,108 +32,65 @@ if [ ! -f "/workspace/.setup_complete" ]; then
     echo "   This will install all dependencies using RunPod's fast internet"
     echo "   Services will start even if some dependencies fail to install"
     echo ""
-    bash /workspace/scripts/first_run_setup.sh || echo "⚠️ Setup had some issues, but continuing to start services..."
+    $METRICS span boot_step --label step=first_run_setup -- bash /workspace/scripts/first_run_setup.sh \
+        || echo "⚠️ Setup had some issues, but continuing to start services..."
     echo ""
 fi
 
-# Create symbolic link for persistent storage if using RunPod network volume
-if [ -d "/runpod-volume" ] && [ ! -L "/workspace/ComfyUI/models" ]; then
-    echo "Setting up persistent storage..."
-    mkdir -p /runpod-volume/models
-    mkdir -p /runpod-volume/output
-
-    # Backup existing models if any
-    if [ -d "/workspace/ComfyUI/models" ]; then
-        cp -rn /workspace/ComfyUI/models/* /runpod-volume/models/ 2>/dev/null || true
+# Use the RunPod network volume for models and outputs. On first attach the local folders
+# are set aside and symlinked to the volume at once; their contents move over in the
+# background (parallel, resumable) while services start, and ComfyUI sees both meanwhile.
+# With OUTPUT_PIPELINE=1 (default) outputs stay on local disk and the supervisor's output
+# pipeline copies them to the volume, so saving frames never waits on network storage.
+OUTPUT_PIPELINE=${OUTPUT_PIPELINE:-1}
+if [ -d "/runpod-volume" ]; then
+    OUTPUT_LINKED=$([ -L "/workspace/ComfyUI/output" ] && echo 1 || echo 0)
+    if [ ! -L "/workspace/ComfyUI/models" ] || [ "$OUTPUT_PIPELINE" = "$OUTPUT_LINKED" ]; then
+        echo "Setting up persistent storage..."
+        $METRICS span boot_step --label step=volume_prepare -- python3 /workspace/scripts/volume_migrate.py prepare
     fi
+    if python3 /workspace/scripts/volume_migrate.py pending; then
+        echo "📦 Moving local models/outputs to the volume in the background (log: /workspace/volume-migrate.log)"
+        nohup python3 /workspace/scripts/volume_migrate.py run >> /workspace/volume-migrate.log 2>&1 &
+    fi
+fi
 
-    # Create symlinks
-    rm -rf /workspace/ComfyUI/models
-    ln -s /runpod-volume/models /workspace/ComfyUI/models
-
-    rm -rf /workspace/ComfyUI/output
-    ln -s /runpod-volume/output /workspace/ComfyUI/output
+# Local model cache in front of the network volume: hot models load from container disk.
+# Recently used models (from the access log on the volume) are pre-warmed at idle I/O priority.
+if $METRICS span boot_step --label step=model_cache_setup -- python3 /workspace/scripts/model_cache.py setup; then
+    IONICE=$(command -v ionice > /dev/null && echo "ionice -c 3")
+    nice -n 19 $IONICE python3 /workspace/scripts/model_cache.py prewarm >> /workspace/model-cache.log 2>&1 &
+fi
 
-    echo "Persistent storage configured."
+# Lazy custom nodes: only the node packs saved workflows use stay on ComfyUI's import path;
+# the rest are parked as <pack>.disabled and come back (or get installed) when a workflow needs them
+if [ "${LAZY_NODES:-0}" = "1" ]; then
+    $METRICS span boot_step --label step=node_sync -- python3 /workspace/scripts/node_registry.py sync
 fi
 
 # Fix numpy compatibility issue (opencv-python upgrades to 2.x which breaks scipy/ComfyUI)
+# Skipped when the environment matches the wheelhouse lock (numpy<2 is part of its resolve)
 echo "🔧 Checking numpy version compatibility..."
-pip install --no-cache-dir 'numpy<2.0' --force-reinstall --quiet 2>&1 | grep -v "Requirement already satisfied" || true
-echo "✅ Numpy compatibility verified"
-
-# Function to start Jupyter Lab
-start_jupyter() {
-    echo "Starting Jupyter Lab on port 8888..."
-    cd /workspace
-    nohup jupyter lab \
-        --ip=0.0.0.0 \
-        --port=8888 \
-        --no-browser \
-        --allow-root \
-        --ServerApp.token='' \
-        --ServerApp.password='' \
-        --ServerApp.allow_origin='*' \
-        --ServerApp.base_url="${JUPYTER_BASE_URL:-/}" \
-        > /workspace/jupyter.log 2>&1 &
-    echo "Jupyter started with PID $!"
-}
-
-# Function to start ComfyUI
-start_comfyui() {
-    echo "Starting ComfyUI on port 8188..."
-    cd /workspace/ComfyUI
-    nohup python main.py \
-        --listen 0.0.0.0 \
-        --port 8188 \
-        --enable-cors-header \
-        --preview-method auto \
-        > /workspace/comfyui.log 2>&1 &
-    echo "ComfyUI started with PID $!"
-}
-
-# Function to start Model & Custom Nodes Manager
-start_model_downloader() {
-    echo "Starting Model & Custom Nodes Manager on port 7860..."
-    cd /workspace/scripts
-    nohup python model_downloader.py > /workspace/model-manager.log 2>&1 &
-    echo "Model Manager started with PID $!"
-}
-
-# Function to start AI-Toolkit web interface (if installed)
-start_ai_toolkit_ui() {
-    if [ -d "/workspace/ai-toolkit" ]; then
-        echo "Starting AI-Toolkit UI on port 7861..."
-        cd /workspace/ai-toolkit
-
-        # Try different UI file names with nohup for proper backgrounding
-        if [ -f "app.py" ]; then
-            nohup python app.py --server-name 0.0.0.0 --server-port 7861 > /workspace/ai-toolkit-ui.log 2>&1 &
-            echo "AI-Toolkit UI (app.py) started with PID $!"
-        elif [ -f "ui.py" ]; then
-            nohup python ui.py --server-name 0.0.0.0 --server-port 7861 > /workspace/ai-toolkit-ui.log 2>&1 &
-            echo "AI-Toolkit UI (ui.py) started with PID $!"
-        elif [ -f "webui.py" ]; then
-            nohup python webui.py --server-name 0.0.0.0 --server-port 7861 > /workspace/ai-toolkit-ui.log 2>&1 &
-            echo "AI-Toolkit UI (webui.py) started with PID $!"
-        elif [ -f "gradio_app.py" ]; then
-            nohup python gradio_app.py --server_name 0.0.0.0 --server_port 7861 > /workspace/ai-toolkit-ui.log 2>&1 &
-            echo "AI-Toolkit UI (gradio_app.py) started with PID $!"
-        else
-            echo "⚠️  AI-Toolkit installed but no web UI file found (app.py, ui.py, webui.py, or gradio_app.py)"
-            echo "   Available files in /workspace/ai-toolkit:"
-            ls -la /workspace/ai-toolkit/*.py 2>/dev/null | head -10 || echo "   No Python files found"
-        fi
-    else
-        echo "ℹ️  AI-Toolkit not installed. Install it via Model & Nodes Manager (port 7860)"
-    fi
-}
+STEP_START=$(date +%s.%N)
+if python3 /workspace/scripts/wheelhouse.py check --quiet; then
+    echo "✅ Environment matches the wheelhouse lock, numpy reinstall skipped"
+elif python3 -c "import numpy, sys; sys.exit(int(numpy.__version__.split('.')[0]) >= 2)" 2>/dev/null; then
+    echo "✅ Numpy compatibility verified"
+else
+    pip install --no-cache-dir 'numpy<2.0' --force-reinstall --quiet 2>&1 | grep -v "Requirement already satisfied" || true
+    echo "✅ Numpy compatibility verified"
+fi
+$METRICS record boot_step --since "$STEP_START" --label step=numpy_check
 
 # Display access information
 display_info() {
     echo ""
     echo "========================================="
-    echo "Services Started Successfully!"
+    if [ "$SERVICES_READY" -eq 0 ]; then
+        echo "Services Started Successfully!"
+    else
+        echo "Some Services Are Not Ready - check the logs in /workspace"
+    fi
     echo "========================================="
     echo ""
 
@@ -129,12 +100,14 @@ display_info() {
         echo "Jupyter:               https://${RUNPOD_POD_ID}-8888.proxy.runpod.net"
         echo "Model & Nodes Manager: https://${RUNPOD_POD_ID}-7860.proxy.runpod.net"
         echo "AI-Toolkit UI:         https://${RUNPOD_POD_ID}-7861.proxy.runpod.net"
+        echo "Job Gateway (API):     https://${RUNPOD_POD_ID}-8190.proxy.runpod.net"
     else
         # Local or other hosting
         echo "ComfyUI:               http://localhost:8188"
         echo "Jupyter:               http://localhost:8888"
         echo "Model & Nodes Manager: http://localhost:7860"
         echo "AI-Toolkit UI:         http://localhost:7861"
+        echo "Job Gateway (API):     http://localhost:8190"
     fi
 
     echo ""
@@ -160,38 +133,42 @@ display_info() {
     echo "========================================="
 }
 
-# Start services
-start_jupyter
-sleep 2
-start_comfyui
-sleep 2
-start_model_downloader
-sleep 2
-start_ai_toolkit_ui
+# Start all services in parallel under the supervisor, which owns them from here on:
+# crashed services are restarted immediately (with backoff if they keep crashing) and
+# status/CPU/RSS/restart metrics are served on port ${SUPERVISOR_PORT:-9099} (/status, /health)
+python3 /workspace/scripts/supervisor.py run &
+SUPERVISOR_PID=$!
+trap 'kill -TERM $SUPERVISOR_PID 2>/dev/null; wait $SUPERVISOR_PID; exit 0' TERM INT
+
+# Wait until every service answered on its port (time-to-ready is printed by the supervisor)
+python3 /workspace/scripts/supervisor.py wait > /dev/null
+SERVICES_READY=$?
+$METRICS record pod_bringup --since "$BOOT_START" --status "$([ "$SERVICES_READY" -eq 0 ] && echo ok || echo error)"
+# Keep the volume's environment snapshot current for the next pod (idle I/O, skipped when unchanged)
+if [ -d "/runpod-volume" ]; then
+    IONICE=$(command -v ionice > /dev/null && echo "ionice -c 3")
+    nice -n 19 $IONICE python3 /workspace/scripts/env_snapshot.py snapshot --if-changed >> /workspace/env-snapshot.log 2>&1 &
+fi
+if [ ! -d "/workspace/ai-toolkit" ]; then
+    echo "ℹ️  AI-Toolkit not installed. Install it via Model & Nodes Manager (port 7860)"
+fi
 
 # Display info
-sleep 3
 display_info
 
-# Keep container running and monitor processes
 echo ""
-echo "Container is ready. Monitoring services..."
+echo "Container is ready. Services are supervised by supervisor.py."
+echo "Run 'python3 /workspace/scripts/supervisor.py status' for status and resource usage,"
+echo "and 'python3 /workspace/scripts/metrics.py report' to see where bring-up time went."
 echo "Press Ctrl+C to stop all services."
 echo ""
 
-# Monitor main processes
+# Keep the container running. A supervisor that dies is started again; services it had
+# started keep running in their own sessions and the new one adopts them.
 while true; do
-    # Check if ComfyUI is still running
-    if ! pgrep -f "python.*main.py.*8188" > /dev/null; then
-        echo "ComfyUI stopped. Restarting..."
-        start_comfyui
-    fi
-
-    # Check if Jupyter is still running
-    if ! pgrep -f "jupyter-lab.*8888" > /dev/null; then
-        echo "Jupyter stopped. Restarting..."
-        start_jupyter
-    fi
-
-    sleep 30
+    wait $SUPERVISOR_PID
+    echo "⚠️  Supervisor exited with code $?; restarting it in 5s"
+    sleep 5
+    python3 /workspace/scripts/supervisor.py run &
+    SUPERVISOR_PID=$!
 done
@@ -0,0 +1,617 @@
+#!/usr/bin/env python3
+"""
+Service supervisor for the pod
+Starts Jupyter, ComfyUI, the Model Manager and the AI-Toolkit UI at the same
+time, waits for each to answer on its port (HTTP health endpoint or TCP
+connect) and reports the measured time-to-ready. It then owns the children:
+an exit is noticed the moment it happens and the service is restarted with
+exponential backoff, while CPU/RSS/restart metrics are served over HTTP
+(JSON on /status, Prometheus text on /metrics together with the spans and
+counters every script writes to the metrics trace).
+"""
+
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import metrics
+from model_cache import CACHE_CONFIG
+from node_registry import record_import_times
+from output_pipeline import PIPELINE_PORT, S3_BUCKET
+from volume_migrate import OUTPUT_PIPELINE, UNION_CONFIG, VOLUME_DIR
+
+STATUS_FILE = os.environ.get("SERVICES_STATUS_FILE", "/workspace/.services_status.json")
+STATUS_HOST = os.environ.get("SUPERVISOR_HOST", "0.0.0.0")
+STATUS_PORT = int(os.environ.get("SUPERVISOR_PORT", "9099"))
+PROBE_INTERVAL = 0.25
+PROBE_TIMEOUT = 2.0
+METRICS_INTERVAL = 5.0
+BACKOFF_INITIAL = 1.0
+BACKOFF_MAX = 60.0
+STABLE_AFTER = 60.0  # Seconds of uptime after which a crash no longer escalates the backoff
+STOP_TIMEOUT = 10.0
+ADOPTED_PROBE_INTERVAL = 5.0
+ADOPTED_FAILURES = 3  # Failed probes in a row before an adopted service is replaced
+
+STARTING, READY, UNREADY, BACKOFF, STOPPED = "starting", "ready", "unready", "backoff", "stopped"
+
+AI_TOOLKIT_DIR = "/workspace/ai-toolkit"
+# AI-Toolkit ships its UI under different names depending on the version
+AI_TOOLKIT_UIS = [
+    ("app.py", ["--server-name", "0.0.0.0", "--server-port", "7861"]),
+    ("ui.py", ["--server-name", "0.0.0.0", "--server-port", "7861"]),
+    ("webui.py", ["--server-name", "0.0.0.0", "--server-port", "7861"]),
+    ("gradio_app.py", ["--server_name", "0.0.0.0", "--server_port", "7861"]),
+]
+
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def _jupyter_base_url():
+    base_url = os.environ.get("JUPYTER_BASE_URL", "/") or "/"
+    return base_url if base_url.endswith("/") else base_url + "/"
+
+
+def _ai_toolkit_command():
+    for filename, args in AI_TOOLKIT_UIS:
+        if os.path.isfile(os.path.join(AI_TOOLKIT_DIR, filename)):
+            return ["python", filename] + args
+    return None
+
+
+def _comfyui_command():
+    command = ["python", "main.py", "--listen", "0.0.0.0", "--port", "8188",
+               "--enable-cors-header", "--preview-method", "auto"]
+    if os.path.exists(CACHE_CONFIG):
+        # Local model cache searched before the network volume (written by model_cache.py setup)
+        command += ["--extra-model-paths-config", CACHE_CONFIG]
+    if os.path.exists(UNION_CONFIG):
+        # Models still being moved to the volume (written by volume_migrate.py prepare)
+        command += ["--extra-model-paths-config", UNION_CONFIG]
+    return command
+
+
+def default_services():
+    """The pod's services, in display order"""
+    services = [
+        {
+            "name": "Jupyter",
+            "command": [
+                "jupyter", "lab", "--ip=0.0.0.0", "--port=8888", "--no-browser", "--allow-root",
+                "--ServerApp.token=", "--ServerApp.password=", "--ServerApp.allow_origin=*",
+                f"--ServerApp.base_url={_jupyter_base_url()}",
+            ],
+            "cwd": "/workspace",
+            "log": "/workspace/jupyter.log",
+            "port": 8888,
+            "health": _jupyter_base_url() + "api",
+            "timeout": 60,
+        },
+        {
+            "name": "ComfyUI",
+            "command": _comfyui_command(),
+            "cwd": "/workspace/ComfyUI",
+            "log": "/workspace/comfyui.log",
+            "port": 8188,
+            "health": "/system_stats",
+            "timeout": 600,  # Custom node imports can take minutes on first boot
+            "on_ready": record_import_times,  # Called with the log path: per-pack import times
+        },
+        {
+            "name": "Model Manager",
+            "command": ["python", "model_downloader.py"],
+            "cwd": "/workspace/scripts",
+            "log": "/workspace/model-manager.log",
+            "port": 7860,
+            "health": "/",
+            "timeout": 120,
+        },
+        {
+            "name": "Gateway",
+            "command": ["python", "gateway.py"],
+            "cwd": "/workspace/scripts",
+            "log": "/workspace/gateway.log",
+            "port": 8190,
+            "health": "/health",
+            "timeout": 60,
+            "optional": True,  # ComfyUI's own API on 8188 keeps working without it
+        },
+    ]
+    if OUTPUT_PIPELINE and (os.path.isdir(VOLUME_DIR) or S3_BUCKET):
+        services.append({
+            "name": "Output Pipeline",
+            "command": ["python", "output_pipeline.py"],
+            "cwd": "/workspace/scripts",
+            "log": "/workspace/output-pipeline.log",
+            "port": PIPELINE_PORT,
+            "health": "/health",
+            "timeout": 60,
+            "optional": True,
+        })
+    ai_toolkit = _ai_toolkit_command()
+    if ai_toolkit:
+        services.append({
+            "name": "AI-Toolkit UI",
+            "command": ai_toolkit,
+            "cwd": AI_TOOLKIT_DIR,
+            "log": "/workspace/ai-toolkit-ui.log",
+            "port": 7861,
+            "health": None,  # TCP connect only; the UIs have no common health route
+            "timeout": 120,
+            "optional": True,
+        })
+    return services
+
+
+def probe(port, health=None, host="127.0.0.1", timeout=PROBE_TIMEOUT):
+    """True once `port` accepts connections (and `health` answers with a non-5xx status)"""
+    if health is None:
+        try:
+            with socket.create_connection((host, port), timeout=timeout):
+                return True
+        except OSError:
+            return False
+    try:
+        with urllib.request.urlopen(f"http://{host}:{port}{health}", timeout=timeout) as resp:
+            return resp.status < 500
+    except urllib.error.HTTPError as e:
+        return e.code < 500  # Auth redirects/404s still mean the server is up
+    except (OSError, ValueError):
+        return False
+
+
+def launch(service):
+    """Start a service in its own session (so its whole tree can be measured and stopped)"""
+    with open(service["log"], "ab") as log_file:
+        return subprocess.Popen(
+            service["command"], cwd=service["cwd"], stdout=log_file, stderr=subprocess.STDOUT,
+            stdin=subprocess.DEVNULL, start_new_session=True,
+        )
+
+
+def session_usage(session_id):
+    """(cpu ticks, rss bytes) summed over every process in a session, from /proc"""
+    ticks = rss = 0
+    try:
+        pids = [name for name in os.listdir("/proc") if name.isdigit()]
+    except OSError:
+        return 0, 0
+    for pid in pids:
+        try:
+            with open(f"/proc/{pid}/stat") as f:
+                # The command name may contain spaces; fields resume after the closing paren
+                fields = f.read().rsplit(")", 1)[1].split()
+        except (OSError, IndexError):
+            continue
+        # fields[0] is field 3 (state): session is field 6, utime/stime 14/15, rss 24
+        if int(fields[3]) != session_id:
+            continue
+        ticks += int(fields[11]) + int(fields[12])
+        rss += int(fields[21]) * PAGE_SIZE
+    return ticks, rss
+
+
+def write_status(status, path=STATUS_FILE):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(status, f, indent=1)
+    os.replace(tmp_path, path)
+
+
+class Supervisor:
+    """Owns the service processes: parallel start, restart with backoff, metrics"""
+
+    def __init__(self, services, status_path=STATUS_FILE, log=print):
+        self.services = {service["name"]: service for service in services}
+        self.status_path = status_path
+        self.log = log
+        self.started_at = time.time()
+        self.lock = threading.Lock()
+        self.stopping = threading.Event()
+        self.boot_complete = threading.Event()
+        self._pending_boot = set(self.services)
+        self._restart_requested = set()
+        self.processes = {}
+        self.trace = metrics.TraceAggregator()
+        self.state = {
+            name: {
+                "status": STARTING, "pid": None, "port": service["port"],
+                "optional": service.get("optional", False), "restarts": 0, "last_exit": None,
+                "uptime_started": None, "ready_seconds": None, "backoff": 0.0,
+                "cpu_percent": 0.0, "rss_bytes": 0, "peak_rss_bytes": 0, "error": "",
+            }
+            for name, service in self.services.items()
+        }
+
+    # Lifecycle -------------------------------------------------------------
+
+    def start(self):
+        """Launch every service at once; returns immediately"""
+        for name in self.services:
+            threading.Thread(target=self._run_service, args=(name,), daemon=True,
+                             name=f"supervise-{name}").start()
+        threading.Thread(target=self._sample_metrics, daemon=True, name="supervisor-metrics").start()
+
+    def stop(self):
+        """Terminate every service's process group, escalating to SIGKILL"""
+        self.stopping.set()
+        with self.lock:
+            processes = list(self.processes.items())
+        for name, process in processes:
+            try:
+                os.killpg(process.pid, signal.SIGTERM)
+            except OSError:
+                pass
+        deadline = time.time() + STOP_TIMEOUT
+        for name, process in processes:
+            try:
+                process.wait(timeout=max(0.0, deadline - time.time()))
+            except subprocess.TimeoutExpired:
+                try:
+                    os.killpg(process.pid, signal.SIGKILL)
+                except OSError:
+                    pass
+            self.state[name]["status"] = STOPPED
+
+    def restart(self, name):
+        """Stop a running service so its supervising thread starts it again at once; returns success"""
+        with self.lock:
+            process = self.processes.get(name)
+            if process is None or process.returncode is not None:
+                return False
+            self._restart_requested.add(name)
+        try:
+            os.killpg(process.pid, signal.SIGTERM)
+        except OSError:
+            return False
+
+        def escalate():
+            try:
+                process.wait(timeout=STOP_TIMEOUT)
+            except subprocess.TimeoutExpired:
+                try:
+                    os.killpg(process.pid, signal.SIGKILL)
+                except OSError:
+                    pass
+
+        threading.Thread(target=escalate, daemon=True, name=f"restart-{name}").start()
+        return True
+
+    def _settle_boot(self, name):
+        with self.lock:
+            self._pending_boot.discard(name)
+            done = not self._pending_boot
+        if done and not self.boot_complete.is_set():
+            self.boot_complete.set()
+            write_status(self.snapshot(), self.status_path)
+
+    def _run_service(self, name):
+        service = self.services[name]
+        state = self.state[name]
+        backoff = 0.0
+        adopted = False
+        while not self.stopping.is_set():
+            started = time.time()
+            # Something already listening (e.g. a manual start): adopt it instead of fighting it
+            if not adopted and state["restarts"] == 0 and probe(service["port"], service.get("health")):
+                adopted = True
+                state.update(status=READY, ready_seconds=0.0, error="already running")
+                self._settle_boot(name)
+                self._watch_adopted(name)
+                if self.stopping.is_set():
+                    return
+                # It went away: from here on the supervisor runs (and restarts) its own instance
+                state.update(status=STARTING, restarts=state["restarts"] + 1, error="")
+                metrics.inc("service_exits", labels={"service": name})
+                self.log(f"💥 {name} (not started by the supervisor) stopped answering; starting it")
+                started = time.time()
+            try:
+                process = launch(service)
+            except OSError as e:
+                state.update(status=UNREADY, error=str(e))
+                self._settle_boot(name)
+                return
+            with self.lock:
+                self.processes[name] = process
+            state.update(status=STARTING, pid=process.pid, uptime_started=started, error="")
+            self.log(f"▶️  {name} started with PID {process.pid}")
+            threading.Thread(target=self._await_ready, args=(name, process, started), daemon=True,
+                             name=f"ready-{name}").start()
+
+            # Blocks in waitpid(): we learn about a crash the instant it happens
+            code = process.wait()
+            if self.stopping.is_set():
+                return
+            uptime = time.time() - started
+            state.update(last_exit={"code": code, "at": time.time(), "uptime": round(uptime, 1)},
+                         pid=None, cpu_percent=0.0, rss_bytes=0)
+            with self.lock:
+                requested = name in self._restart_requested
+                self._restart_requested.discard(name)
+            if requested:
+                backoff = 0.0
+                state.update(status=STARTING, restarts=state["restarts"] + 1, error="")
+                self.log(f"🔄 {name} restarting on request (restart #{state['restarts']})")
+                continue
+            # Crash loops back off exponentially; a service that ran for a while restarts at once
+            backoff = 0.0 if uptime >= STABLE_AFTER else min(max(backoff * 2, BACKOFF_INITIAL),
+                                                             BACKOFF_MAX)
+            state.update(status=BACKOFF, backoff=backoff, restarts=state["restarts"] + 1,
+                         error=f"exited with code {code} after {uptime:.1f}s")
+            metrics.inc("service_exits", labels={"service": name})
+            self.log(f"💥 {name} exited with code {code} after {uptime:.1f}s; "
+                     f"restarting in {backoff:.0f}s (restart #{state['restarts']})")
+            if self.stopping.wait(backoff):
+                return
+
+    def _watch_adopted(self, name):
+        """Probe a service the supervisor didn't start until it stops answering (or the supervisor stops)"""
+        service = self.services[name]
+        state = self.state[name]
+        failures = 0
+        while failures < ADOPTED_FAILURES and not self.stopping.wait(ADOPTED_PROBE_INTERVAL):
+            if probe(service["port"], service.get("health")):
+                failures = 0
+                state.update(status=READY, error="already running")
+            else:
+                failures += 1
+                state.update(status=UNREADY, error=f"adopted instance failed {failures} probes")
+
+    def _await_ready(self, name, process, started):
+        service = self.services[name]
+        state = self.state[name]
+        deadline = started + service["timeout"]
+        while process.returncode is None and not self.stopping.is_set():
+            if probe(service["port"], service.get("health")):
+                seconds = round(time.time() - started, 2)
+                state.update(status=READY, error="")
+                if state["ready_seconds"] is None:
+                    state["ready_seconds"] = seconds
+                metrics.record_span("service_ready", seconds, labels={"service": name}, start=started,
+                                    restart=state["restarts"])
+                self.log(f"✅ {name} ready on port {service['port']} in {seconds:.1f}s")
+                if service.get("on_ready"):
+                    try:
+                        service["on_ready"](service["log"])
+                    except Exception as e:
+                        self.log(f"⚠️  {name}: on_ready hook failed: {e}")
+                break
+            if time.time() >= deadline:
+                state.update(status=UNREADY, error=f"not ready after {service['timeout']}s")
+                metrics.record_span("service_ready", time.time() - started, "error", {"service": name}, started,
+                                    restart=state["restarts"])
+                self.log(f"❌ {name}: not ready after {service['timeout']}s")
+                break
+            time.sleep(PROBE_INTERVAL)
+        else:
+            if process.returncode is not None and name in self._pending_boot:
+                self.log(f"❌ {name}: exited with code {process.returncode} before becoming ready")
+        self._settle_boot(name)
+
+    # Metrics ---------------------------------------------------------------
+
+    def _sample_metrics(self):
+        previous = {}
+        while not self.stopping.wait(METRICS_INTERVAL):
+            for name, state in self.state.items():
+                pid = state["pid"]
+                if not pid:
+                    previous.pop(name, None)
+                    continue
+                ticks, rss = session_usage(pid)
+                now = time.time()
+                if name in previous and previous[name][0] == pid:
+                    _, last_ticks, last_time = previous[name]
+                    elapsed = max(now - last_time, 1e-6)
+                    state["cpu_percent"] = round(100.0 * (ticks - last_ticks) / CLOCK_TICKS / elapsed, 1)
+                previous[name] = (pid, ticks, now)
+                state["rss_bytes"] = rss
+                state["peak_rss_bytes"] = max(state["peak_rss_bytes"], rss)
+
+    def snapshot(self):
+        """JSON-serialisable status of every service"""
+        services = {}
+        for name, state in self.state.items():
+            entry = dict(state)
+            entry["uptime"] = (round(time.time() - state["uptime_started"], 1)
+                               if state["pid"] and state["uptime_started"] else 0.0)
+            del entry["uptime_started"]
+            services[name] = entry
+        return {
+            "started_at": self.started_at,
+            "boot_complete": self.boot_complete.is_set(),
+            "ready": all(s["status"] == READY for s in self.state.values() if not s["optional"]),
+            "services": services,
+        }
+
+    def prometheus(self):
+        """Service gauges plus everything in the metrics trace, as Prometheus text"""
+        services = self.snapshot()["services"]
+        lines = []
+        for name, key, help_text in (
+                ("service_up", None, "1 when the service answers on its port"),
+                ("service_restarts", "restarts", "Restarts since the supervisor started"),
+                ("service_cpu_percent", "cpu_percent", "CPU use of the service's process group"),
+                ("service_rss_bytes", "rss_bytes", "Resident memory of the service's process group"),
+                ("service_uptime_seconds", "uptime", "Seconds since the current process started")):
+            lines += metrics.gauge_lines(name, [
+                ({"service": service}, int(s["status"] == READY) if key is None else s[key])
+                for service, s in services.items()], help_text)
+        return "\n".join(lines) + "\n" + self.trace.render()
+
+    def serve_status(self, host=STATUS_HOST, port=STATUS_PORT):
+        """
+        Serve /status (JSON), /metrics (Prometheus) and /health (200 when
+        required services are ready); POST /restart/<service> restarts a
+        service, for local callers only.
+        """
+        supervisor = self
+
+        class StatusHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                snapshot = supervisor.snapshot()
+                if self.path.startswith("/health"):
+                    code = 200 if snapshot["ready"] else 503
+                    body = b"ok\n" if code == 200 else b"not ready\n"
+                    content_type = "text/plain"
+                elif self.path.startswith("/metrics"):
+                    code = 200
+                    body = supervisor.prometheus().encode()
+                    content_type = "text/plain; version=0.0.4"
+                elif self.path.startswith("/status") or self.path == "/":
+                    code = 200
+                    body = json.dumps(snapshot, indent=1).encode()
+                    content_type = "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(code)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                name = urllib.parse.unquote(self.path[len("/restart/"):])
+                if not self.path.startswith("/restart/") or name not in supervisor.services:
+                    self.send_error(404)
+                    return
+                if self.client_address[0] not in ("127.0.0.1", "::1"):
+                    self.send_error(403)
+                    return
+                restarted = supervisor.restart(name)
+                body = json.dumps({"service": name, "restarted": restarted}).encode()
+                self.send_response(200 if restarted else 409)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), StatusHandler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True, name="supervisor-status").start()
+        return server
+
+
+def format_report(snapshot):
+    """Time-to-ready table for the boot log"""
+    lines = []
+    lines.append("=" * 60)
+    lines.append("SERVICE READINESS")
+    lines.append("=" * 60)
+    for name, result in snapshot["services"].items():
+        ready = result["status"] == READY
+        icon = "✅" if ready else ("⚠️ " if result["optional"] else "❌")
+        detail = f"{result['ready_seconds']:.1f}s" if ready else result["error"]
+        lines.append(f"{icon} {name:<16} :{result['port']:<6} {detail}")
+    lines.append("")
+    seconds = max((s["ready_seconds"] or 0.0) for s in snapshot["services"].values()) \
+        if snapshot["services"] else 0.0
+    lines.append(f"All services up in {seconds:.1f}s" if snapshot["ready"]
+                 else "Some services failed to become ready (see logs in /workspace)")
+    lines.append("=" * 60)
+    return "\n".join(lines)
+
+
+def _fetch_status(port=STATUS_PORT, timeout=PROBE_TIMEOUT):
+    with urllib.request.urlopen(f"http://127.0.0.1:{port}/status", timeout=timeout) as resp:
+        return json.load(resp)
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Start and supervise the pod services")
+    subparsers = parser.add_subparsers(dest="command")
+    run_parser = subparsers.add_parser("run", help="Start all services and supervise them (default)")
+    run_parser.add_argument("--only", nargs="+", help="Service names to start")
+    wait_parser = subparsers.add_parser("wait", help="Wait for a running supervisor to finish booting")
+    wait_parser.add_argument("--timeout", type=float, default=900)
+    subparsers.add_parser("status", help="Show service status and metrics")
+    restart_parser = subparsers.add_parser("restart", help="Restart one service of a running supervisor")
+    restart_parser.add_argument("name", help="Service name, e.g. ComfyUI")
+    args = parser.parse_args(argv)
+
+    if args.command == "restart":
+        request = urllib.request.Request(f"http://127.0.0.1:{STATUS_PORT}/restart/{urllib.parse.quote(args.name)}",
+                                         data=b"", method="POST")
+        try:
+            with urllib.request.urlopen(request, timeout=PROBE_TIMEOUT) as resp:
+                json.load(resp)
+        except urllib.error.HTTPError as e:
+            print(f"❌ {args.name}: " + ("no such service" if e.code == 404 else "not running"))
+            return 1
+        except OSError:
+            print(f"❌ No supervisor answering on port {STATUS_PORT}")
+            return 1
+        print(f"🔄 {args.name} restarting")
+        return 0
+
+    if args.command == "wait":
+        deadline = time.time() + args.timeout
+        while time.time() < deadline:
+            try:
+                snapshot = _fetch_status()
+                if snapshot["boot_complete"]:
+                    print(format_report(snapshot))
+                    return 0 if snapshot["ready"] else 1
+            except (OSError, ValueError):
+                pass
+            time.sleep(PROBE_INTERVAL)
+        print("❌ Supervisor did not finish booting in time")
+        return 1
+
+    if args.command == "status":
+        try:
+            snapshot = _fetch_status()
+        except OSError:
+            print(f"❌ No supervisor answering on port {STATUS_PORT}")
+            return 1
+        for name, s in snapshot["services"].items():
+            icon = {READY: "✅", STARTING: "⏳", BACKOFF: "🔁"}.get(s["status"], "❌")
+            print(f"{icon} {name:<16} {s['status']:<9} pid={s['pid'] or '-':<7} "
+                  f"cpu={s['cpu_percent']:5.1f}% rss={s['rss_bytes'] / 2 ** 20:7.0f} MB "
+                  f"restarts={s['restarts']} uptime={s['uptime']:.0f}s")
+        return 0 if snapshot["ready"] else 1
+
+    services = default_services()
+    if getattr(args, "only", None):
+        services = [s for s in services if s["name"] in args.only]
+    supervisor = Supervisor(services)
+    try:
+        supervisor.serve_status()
+    except OSError as e:
+        print(f"⚠️  Status endpoint unavailable on port {STATUS_PORT}: {e}")
+
+    def shutdown(signum, frame):
+        print("🛑 Stopping services...")
+        supervisor.stop()
+        sys.exit(0)
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+
+    supervisor.start()
+    supervisor.boot_complete.wait()
+    print(format_report(supervisor.snapshot()), flush=True)
+    while True:
+        time.sleep(3600)
+        write_status(supervisor.snapshot(), supervisor.status_path)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
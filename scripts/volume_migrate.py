@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+"""
+Background migration of local models/outputs onto the network volume
+On first attach the local folders are set aside (a rename, so it is instant)
+and replaced with symlinks to the volume; their contents are then moved over
+in the background by parallel workers while services start. ComfyUI sees
+the union of both through an extra_model_paths entry for the set-aside
+folder. Copies are hashed as they stream, fsynced before the source is
+deleted and checkpointed on the volume, so an interrupted run resumes from
+the last fsynced offset.
+With OUTPUT_PIPELINE on (the default) outputs are not symlinked: ComfyUI
+writes them to local disk and output_pipeline.py copies them over.
+"""
+
+import glob
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from download_queue import format_bytes, format_eta
+from model_cache import FOLDERS
+from model_integrity import IntegrityIndex, mmap_sha256
+
+VOLUME_DIR = "/runpod-volume"
+COMFYUI_DIR = "/workspace/ComfyUI"
+TREES = ("models", "output")
+STAGING_SUFFIX = ".migrating"
+STATE_FILE = os.path.join(VOLUME_DIR, ".volume_migration.json")
+UNION_CONFIG = "/workspace/.volume_migration_paths.yaml"
+WORKERS = int(os.environ.get("MIGRATE_WORKERS", "4"))
+COPY_CHUNK = 16 * 1024 * 1024
+CHECKPOINT_MIN_SIZE = 64 * 1024 * 1024  # Larger files get their progress checkpointed for resume
+CHECKPOINT_INTERVAL = 256 * 1024 * 1024  # fsync + record the copied offset this often
+PROGRESS_INTERVAL = 5.0
+PARTIAL_SUFFIX = ".migrating.partial"
+OUTPUT_PIPELINE = os.environ.get("OUTPUT_PIPELINE", "1") == "1"
+
+
+def staging_dirs(tree, comfyui_dir=COMFYUI_DIR):
+    """Set-aside copies of a tree that still hold files to migrate"""
+    return sorted(path for path in glob.glob(os.path.join(comfyui_dir, f".{tree}{STAGING_SUFFIX}*"))
+                  if os.path.isdir(path))
+
+
+def pending(comfyui_dir=COMFYUI_DIR):
+    return any(staging_dirs(tree, comfyui_dir) for tree in TREES)
+
+
+def write_union_config(comfyui_dir=COMFYUI_DIR, config_path=UNION_CONFIG):
+    """Point ComfyUI at models that have not been moved yet (removed once none are left)"""
+    staging = staging_dirs("models", comfyui_dir)
+    if not staging:
+        if os.path.exists(config_path):
+            os.remove(config_path)
+        return
+    lines = ["# Generated by volume_migrate.py: models not yet moved to the volume"]
+    for i, base_path in enumerate(staging):
+        lines += [f"migrating_{i}:", f"    base_path: {base_path}"]
+        for folder, subfolders in FOLDERS.items():
+            lines.append(f"    {folder}: |")
+            lines.extend(f"        {subfolder}/" for subfolder in subfolders)
+    tmp_path = config_path + ".tmp"
+    with open(tmp_path, "w") as f:
+        f.write("\n".join(lines) + "\n")
+    os.replace(tmp_path, config_path)
+
+
+def linked_trees():
+    """Trees that live on the volume behind a symlink"""
+    return tuple(tree for tree in TREES if tree != "output" or not OUTPUT_PIPELINE)
+
+
+def prepare(comfyui_dir=COMFYUI_DIR, volume_dir=VOLUME_DIR, log=print):
+    """Set the local trees aside and symlink the volume in their place (no data is copied)"""
+    for tree in TREES:
+        local = os.path.join(comfyui_dir, tree)
+        target = os.path.join(volume_dir, tree)
+        os.makedirs(target, exist_ok=True)
+        if tree not in linked_trees():
+            if os.path.islink(local):
+                # Switched to the output pipeline: write locally again, the volume copy stays
+                os.remove(local)
+                os.makedirs(local)
+                log(f"📤 {tree} is written locally and shipped to {target} by the output pipeline")
+            continue
+        if os.path.islink(local):
+            continue
+        if os.path.isdir(local):
+            staging = os.path.join(comfyui_dir, f".{tree}{STAGING_SUFFIX}")
+            if os.path.exists(staging):
+                staging += f".{int(time.time())}"  # An interrupted migration is still pending
+            os.rename(local, staging)
+            log(f"📦 Local {tree} set aside for migration: {staging}")
+        os.symlink(target, local)
+    write_union_config(comfyui_dir)
+    log("Persistent storage configured.")
+
+
+class Progress:
+    """Thread-safe byte/file counters with a periodic throughput line"""
+
+    def __init__(self, total_bytes, total_files, log=print):
+        self.total_bytes = total_bytes
+        self.files_left = total_files
+        self.done_bytes = 0
+        self.started = time.time()
+        self.lock = threading.Lock()
+        self.log = log
+        self._samples = [(self.started, 0)]
+
+    def add(self, count):
+        with self.lock:
+            self.done_bytes += count
+
+    def file_done(self):
+        with self.lock:
+            self.files_left -= 1
+
+    def line(self):
+        now = time.time()
+        with self.lock:
+            done, files_left = self.done_bytes, self.files_left
+            self._samples = [s for s in self._samples if now - s[0] <= 30] + [(now, done)]
+            first = self._samples[0]
+        speed = (done - first[1]) / (now - first[0]) if now > first[0] else 0.0
+        left = max(self.total_bytes - done, 0)
+        percent = 100.0 * done / self.total_bytes if self.total_bytes else 100.0
+        return (f"📦 {format_bytes(done)} / {format_bytes(self.total_bytes)} ({percent:.0f}%) · "
+                f"{format_bytes(speed)}/s · {format_bytes(left)} left · "
+                f"ETA {format_eta(left / speed if speed > 0 else None)} · {files_left} files left")
+
+
+class Migration:
+    """Moves every file of the staging trees onto the volume, resumably"""
+
+    def __init__(self, comfyui_dir=COMFYUI_DIR, volume_dir=VOLUME_DIR, state_path=STATE_FILE,
+                 workers=WORKERS, index=None, log=print):
+        self.comfyui_dir = comfyui_dir
+        self.volume_dir = volume_dir
+        self.state_path = state_path
+        self.workers = workers
+        self.index = index or IntegrityIndex()
+        self.log = log
+        self.lock = threading.Lock()
+        self._last_save = 0.0
+        try:
+            with open(state_path) as f:
+                self.state = json.load(f).get("files", {})
+        except (OSError, ValueError):
+            self.state = {}
+
+    def save_state(self, force=False):
+        with self.lock:
+            if not force and time.time() - self._last_save < 2.0:
+                return
+            self._last_save = time.time()
+            data = json.dumps({"version": 1, "files": self.state}, indent=1, sort_keys=True)
+        tmp_path = self.state_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            f.write(data)
+        os.replace(tmp_path, self.state_path)
+
+    def _set(self, key, entry, force=False):
+        with self.lock:
+            self.state[key] = entry
+        self.save_state(force)
+
+    def files(self):
+        """[(key, source, target, size)] for every file still in a staging tree"""
+        found = []
+        for tree in TREES:
+            for staging in staging_dirs(tree, self.comfyui_dir):
+                for root, _, names in os.walk(staging):
+                    for name in names:
+                        source = os.path.join(root, name)
+                        relpath = os.path.relpath(source, staging)
+                        target = os.path.join(self.volume_dir, tree, relpath)
+                        found.append((f"{tree}/{relpath}", source, target, os.path.getsize(source)))
+        return found
+
+    def migrate_file(self, key, source, target, progress):
+        """Move one file; returns 'renamed', 'copied', 'skipped' or 'conflict'"""
+        st = os.stat(source)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+
+        if os.path.exists(target):
+            # Already on the volume (e.g. an earlier pod): identical files are just dropped locally
+            if os.path.getsize(target) == st.st_size and self.index.sha256(target, "migrate") == mmap_sha256(source):
+                os.remove(source)
+                self._set(key, {"status": "done", "size": st.st_size})
+                progress.add(st.st_size)
+                return "skipped"
+            self._set(key, {"status": "conflict", "size": st.st_size}, force=True)
+            progress.add(st.st_size)
+            return "conflict"
+
+        if os.stat(os.path.dirname(target)).st_dev == st.st_dev:
+            os.rename(source, target)  # Same filesystem: no data is copied
+            self._set(key, {"status": "done", "size": st.st_size})
+            progress.add(st.st_size)
+            return "renamed"
+
+        partial = target + PARTIAL_SUFFIX
+        entry = self.state.get(key) or {}
+        offset = 0
+        if (entry.get("status") == "copying" and entry.get("size") == st.st_size
+                and entry.get("mtime") == st.st_mtime and os.path.exists(partial)):
+            # Only the prefix that was fsynced before the checkpoint is known to be on the volume
+            offset = min(entry.get("offset", 0), os.path.getsize(partial), st.st_size)
+        checkpoint = {"status": "copying", "size": st.st_size, "mtime": st.st_mtime}
+        self._set(key, dict(checkpoint, offset=offset), force=st.st_size >= CHECKPOINT_MIN_SIZE)
+
+        digest = hashlib.sha256()
+        with open(partial, "r+b" if offset else "wb") as dst:
+            # Resume: hash the copied prefix from the volume, so the index gets the target's real hash
+            remaining = offset
+            while remaining:
+                chunk = dst.read(min(COPY_CHUNK, remaining))
+                digest.update(chunk)
+                remaining -= len(chunk)
+            progress.add(offset)
+            dst.truncate()
+            synced = offset
+            with open(source, "rb") as src:
+                src.seek(offset)
+                for chunk in iter(lambda: src.read(COPY_CHUNK), b""):
+                    digest.update(chunk)
+                    dst.write(chunk)
+                    progress.add(len(chunk))
+                    if st.st_size >= CHECKPOINT_MIN_SIZE and dst.tell() - synced >= CHECKPOINT_INTERVAL:
+                        dst.flush()
+                        os.fsync(dst.fileno())
+                        synced = dst.tell()
+                        self._set(key, dict(checkpoint, offset=synced), force=True)
+            dst.flush()
+            os.fsync(dst.fileno())
+        os.utime(partial, ns=(st.st_atime_ns, st.st_mtime_ns))
+        os.replace(partial, target)
+        sha256 = digest.hexdigest()
+        self.index.record(target, sha256, "migrate", save=False)
+        # Only now is the volume copy durable and complete, so the local file can go
+        os.remove(source)
+        self._set(key, {"status": "done", "size": st.st_size, "sha256": sha256})
+        return "copied"
+
+    def _cleanup(self):
+        """Remove emptied staging trees; anything left behind is a conflict"""
+        for tree in TREES:
+            for staging in staging_dirs(tree, self.comfyui_dir):
+                for root, dirs, files in os.walk(staging, topdown=False):
+                    if not os.listdir(root):
+                        os.rmdir(root)
+        write_union_config(self.comfyui_dir)
+
+    def run(self):
+        started = time.time()
+        files = self.files()
+        progress = Progress(sum(size for _, _, _, size in files), len(files), self.log)
+        self.log(f"📦 Migrating {len(files)} files ({format_bytes(progress.total_bytes)}) to {self.volume_dir} "
+                 f"with {self.workers} workers")
+        results = {"renamed": 0, "copied": 0, "skipped": 0, "conflict": 0, "failed": 0}
+        finished = threading.Event()
+
+        def report():
+            while not finished.wait(PROGRESS_INTERVAL):
+                self.log(progress.line())
+
+        reporter = threading.Thread(target=report, daemon=True)
+        reporter.start()
+
+        def work(item):
+            key, source, target, _ = item
+            try:
+                outcome = self.migrate_file(key, source, target, progress)
+            except OSError as e:
+                self.log(f"❌ {key}: {e}")
+                outcome = "failed"
+            if outcome == "conflict":
+                self.log(f"⚠️  {key}: a different file already exists on the volume; local copy kept")
+            progress.file_done()
+            return outcome
+
+        # Biggest first so the long copies overlap with the many small ones
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            for outcome in pool.map(work, sorted(files, key=lambda item: -item[3])):
+                results[outcome] += 1
+        finished.set()
+
+        self.index.save()
+        self.save_state(force=True)
+        self._cleanup()
+        elapsed = time.time() - started
+        self.log(progress.line())
+        self.log(f"✅ Migration finished in {elapsed:.1f}s: {results['copied']} copied, "
+                 f"{results['renamed']} renamed, {results['skipped']} already on the volume, "
+                 f"{results['conflict']} conflicts, {results['failed']} failed")
+        return results
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Move local models/outputs onto the network volume")
+    parser.add_argument("command", choices=["prepare", "pending", "run", "status"])
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    args = parser.parse_args(argv)
+
+    if args.command == "prepare":
+        prepare()
+        return 0
+    if args.command == "pending":
+        return 0 if pending() else 1
+    if args.command == "status":
+        migration = Migration()
+        files = migration.files()
+        done = sum(1 for entry in migration.state.values() if entry.get("status") == "done")
+        print(f"{len(files)} files ({format_bytes(sum(f[3] for f in files))}) left to migrate, "
+              f"{done} done" + (", nothing pending" if not pending() else ""))
+        return 0
+    results = Migration(workers=args.workers).run()
+    return 1 if results["failed"] or results["conflict"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
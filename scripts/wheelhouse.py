@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+"""
+Wheelhouse: offline dependency cache for first-run setup
+Resolves the setup requirements once, keeps the resulting wheels (including
+ones built from sdists) on the persistent volume with a hash-pinned lock,
+and reinstalls from them offline on every fresh pod.
+
+    wheelhouse.py build     resolve + download/build wheels + write the lock
+    wheelhouse.py install   offline, hash-checked install from the wheelhouse
+    wheelhouse.py check     exit 0 if the environment already matches the lock
+    wheelhouse.py sync      check, else install (building first if needed)
+"""
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+from importlib import metadata
+
+import metrics
+
+WHEELHOUSE_DIR = os.environ.get(
+    "WHEELHOUSE_DIR",
+    "/runpod-volume/.wheelhouse" if os.path.isdir("/runpod-volume") else "/workspace/.wheelhouse",
+)
+LOCK_NAME = "requirements.lock"
+COMFYUI_REQUIREMENTS = "/workspace/ComfyUI/requirements.txt"
+PIP_TIMEOUT = 3600
+
+# What first_run_setup.sh installs, in the same groups
+SETUP_PACKAGES = [
+    # Jupyter and Gradio (needed for UI)
+    "jupyter", "jupyterlab", "notebook", "gradio",
+    # Video processing
+    "opencv-python", "imageio", "imageio-ffmpeg", "av", "moviepy", "insightface", "onnxruntime-gpu",
+]
+
+# opencv pulls numpy 2.x, which breaks scipy/ComfyUI
+CONSTRAINTS = ["numpy<2.0"]
+
+# Provided by the CUDA base image: pinned to the installed version, never put in the wheelhouse
+BASE_PACKAGES = ("torch", "torchvision", "torchaudio", "triton", "xformers")
+BASE_PREFIXES = ("nvidia-",)
+
+
+def canonical_name(name):
+    """PEP 503 normalised project name"""
+    return re.sub(r"[-_.]+", "-", name).lower()
+
+
+def lock_path(wheelhouse=WHEELHOUSE_DIR):
+    return os.path.join(wheelhouse, LOCK_NAME)
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(8 * 1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _pip(*args, timeout=PIP_TIMEOUT):
+    with metrics.span("pip", {"command": args[0], "via": "wheelhouse"}) as span:
+        result = subprocess.run([sys.executable, "-m", "pip"] + list(args),
+                                capture_output=True, text=True, timeout=timeout)
+        if result.returncode != 0:
+            span.update(status="error", exit_code=result.returncode)
+    return result
+
+
+def _wheel_name(filename):
+    """(canonical name, version) from a wheel filename"""
+    parts = filename[:-len(".whl")].split("-")
+    return canonical_name(parts[0]), parts[1]
+
+
+def read_lock(path):
+    """Lock entries as {canonical name: {name, version, sha256}}"""
+    pins = {}
+    with open(path) as f:
+        for line in f:
+            match = re.match(r"^([A-Za-z0-9._-]+)==(\S+)\s+--hash=sha256:([0-9a-f]{64})", line.strip())
+            if match:
+                name, version, sha256 = match.groups()
+                pins[canonical_name(name)] = {"name": name, "version": version, "sha256": sha256}
+    return pins
+
+
+def _is_base(name):
+    name = canonical_name(name)
+    return name in BASE_PACKAGES or name.startswith(BASE_PREFIXES)
+
+
+def _base_pins():
+    """`name==version` of every base package installed in this environment"""
+    pins = []
+    for name in BASE_PACKAGES:
+        try:
+            pins.append(f"{name}=={metadata.version(name)}")
+        except metadata.PackageNotFoundError:
+            continue
+    return pins
+
+
+def inputs_hash(requirement_files=(), packages=SETUP_PACKAGES, constraints=CONSTRAINTS):
+    """
+    sha256 of everything a resolve depends on: packages, constraints, the
+    contents of the requirement files, the Python version and the base
+    image's package versions. Stored in the lock so sync notices when the
+    lock no longer describes what setup asks for.
+    """
+    digest = hashlib.sha256()
+    parts = [sys.version.split()[0]] + sorted(packages) + sorted(constraints) + _base_pins()
+    digest.update("\n".join(parts).encode())
+    for path in sorted(f for f in requirement_files if os.path.isfile(f)):
+        digest.update(b"\0" + file_sha256(path).encode())
+    return digest.hexdigest()
+
+
+def lock_inputs(path):
+    """Inputs hash recorded in a lock's header, or None (older locks have none)"""
+    with open(path) as f:
+        for line in f:
+            match = re.match(r"^#\s*inputs:\s*([0-9a-f]{64})", line)
+            if match:
+                return match.group(1)
+    return None
+
+
+def _base_stubs(folder):
+    """
+    Write a metadata-only wheel for every installed base package into
+    `folder`; returns their `name==version` pins.
+
+    The CUDA image's builds carry local versions (torch 2.2.0+cu121) that
+    PyPI doesn't have, so the resolve finds them here instead and treats
+    them as given. The stubs declare no dependencies: whatever the base
+    image needs is already installed.
+    """
+    pins = _base_pins()
+    for pin in pins:
+        name, version = pin.split("==")
+        dist_info = f"{name}-{version}.dist-info"
+        with zipfile.ZipFile(os.path.join(folder, f"{name}-{version}-py3-none-any.whl"), "w") as wheel:
+            wheel.writestr(f"{dist_info}/METADATA", f"Metadata-Version: 2.1\nName: {name}\nVersion: {version}\n")
+            wheel.writestr(f"{dist_info}/WHEEL", "Wheel-Version: 1.0\nRoot-Is-Purelib: true\nTag: py3-none-any\n")
+            wheel.writestr(f"{dist_info}/RECORD", "")
+    return pins
+
+
+def resolve(requirement_files=(), packages=SETUP_PACKAGES, constraints=CONSTRAINTS, log=print):
+    """
+    Resolve the full setup dependency closure with `pip install --dry-run --report`.
+
+    The resolve ignores what is installed (so the lock is the same on a fresh
+    or an already provisioned pod), but base image packages such as torch are
+    constrained to their installed version (served from local stubs, see
+    _base_stubs) and left out of the result. Returns a list of (name, version)
+    pins.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        stubs = os.path.join(tmp, "base")
+        os.makedirs(stubs)
+        base_pins = _base_stubs(stubs)
+        constraints_file = os.path.join(tmp, "constraints.txt")
+        report_file = os.path.join(tmp, "report.json")
+        with open(constraints_file, "w") as f:
+            f.write("\n".join(list(constraints) + base_pins) + "\n")
+        args = ["install", "--dry-run", "--ignore-installed", "--quiet", "--report", report_file,
+                "-c", constraints_file, "--find-links", stubs]
+        for requirement_file in requirement_files:
+            args += ["-r", requirement_file]
+        result = _pip(*(args + list(packages)))
+        if result.returncode != 0:
+            raise RuntimeError("pip could not resolve the setup requirements:\n"
+                               + "\n".join(result.stderr.strip().splitlines()[-15:]))
+        with open(report_file) as f:
+            report = json.load(f)
+    pins = [(item["metadata"]["name"], item["metadata"]["version"]) for item in report.get("install", [])
+            if not _is_base(item["metadata"]["name"])]
+    log(f"🧮 Resolved {len(pins)} distributions not provided by the base image")
+    return pins
+
+
+def build(wheelhouse=WHEELHOUSE_DIR, requirement_files=(), packages=SETUP_PACKAGES,
+          constraints=CONSTRAINTS, log=print):
+    """Resolve, fetch/build every wheel into the wheelhouse and write the hash-pinned lock"""
+    started = time.time()
+    requirement_files = [f for f in requirement_files if os.path.isfile(f)]
+    pins = resolve(requirement_files, packages, constraints, log)
+    os.makedirs(wheelhouse, exist_ok=True)
+
+    # Reuse wheels that are already in the wheelhouse; only fetch/build the rest
+    have = {}
+    for filename in os.listdir(wheelhouse):
+        if filename.endswith(".whl"):
+            have[_wheel_name(filename)] = filename
+    missing = [(name, version) for name, version in pins if (canonical_name(name), version) not in have]
+
+    if missing:
+        log(f"📦 Fetching/building {len(missing)} wheels ({len(pins) - len(missing)} already cached)")
+        staging = tempfile.mkdtemp(prefix=".staging-", dir=wheelhouse)
+        try:
+            result = _pip("wheel", "--no-deps", "--quiet", "-w", staging,
+                          *[f"{name}=={version}" for name, version in missing])
+            if result.returncode != 0:
+                raise RuntimeError("pip wheel failed:\n"
+                                   + "\n".join(result.stderr.strip().splitlines()[-15:]))
+            for filename in os.listdir(staging):
+                if filename.endswith(".whl"):
+                    os.replace(os.path.join(staging, filename), os.path.join(wheelhouse, filename))
+                    have[_wheel_name(filename)] = filename
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+    lines = [
+        "# Generated by wheelhouse.py build — install with:",
+        "#   pip install --no-index --find-links <wheelhouse> --require-hashes --no-deps -r requirements.lock",
+        f"# python {sys.version.split()[0]}, constraints: {', '.join(constraints)}",
+        f"# inputs: {inputs_hash(requirement_files, packages, constraints)}",
+    ]
+    keep = set()
+    for name, version in sorted(pins, key=lambda pin: canonical_name(pin[0])):
+        filename = have.get((canonical_name(name), version))
+        if filename is None:
+            raise RuntimeError(f"No wheel produced for {name}=={version}")
+        keep.add(filename)
+        lines.append(f"{name}=={version} --hash=sha256:{file_sha256(os.path.join(wheelhouse, filename))}")
+
+    tmp_path = lock_path(wheelhouse) + ".tmp"
+    with open(tmp_path, "w") as f:
+        f.write("\n".join(lines) + "\n")
+    os.replace(tmp_path, lock_path(wheelhouse))
+
+    # Drop wheels from older builds that the new lock no longer references
+    for filename in os.listdir(wheelhouse):
+        if filename.endswith(".whl") and filename not in keep:
+            os.remove(os.path.join(wheelhouse, filename))
+
+    log(f"🔒 Wheelhouse ready: {len(keep)} wheels, lock at {lock_path(wheelhouse)} "
+        f"({time.time() - started:.1f}s)")
+    return len(keep)
+
+
+def check(wheelhouse=WHEELHOUSE_DIR):
+    """Return the lock entries whose installed version differs (empty list = environment matches)"""
+    pins = read_lock(lock_path(wheelhouse))
+    installed = {}
+    for dist in metadata.distributions():
+        name = dist.metadata["Name"]
+        if name:
+            installed[canonical_name(name)] = dist.version
+    return [
+        (pin["name"], pin["version"], installed.get(key))
+        for key, pin in pins.items()
+        if installed.get(key) != pin["version"]
+    ]
+
+
+def install(wheelhouse=WHEELHOUSE_DIR, log=print):
+    """Offline, hash-checked install of everything in the lock; returns success"""
+    started = time.time()
+    result = _pip("install", "--no-index", "--find-links", wheelhouse, "--require-hashes",
+                  "--no-deps", "--quiet", "-r", lock_path(wheelhouse))
+    if result.returncode != 0:
+        log("❌ Offline install failed:\n" + "\n".join(result.stderr.strip().splitlines()[-15:]))
+        return False
+    log(f"✅ Installed {len(read_lock(lock_path(wheelhouse)))} packages offline "
+        f"in {time.time() - started:.1f}s")
+    return True
+
+
+def sync(wheelhouse=WHEELHOUSE_DIR, requirement_files=(), log=print):
+    """
+    Bring the environment in line with the lock, building the wheelhouse on
+    first use and re-resolving when the setup requirements have changed
+    since the lock was written.
+    """
+    lock = lock_path(wheelhouse)
+    if os.path.exists(lock) and lock_inputs(lock) != inputs_hash(requirement_files):
+        log("🔁 Setup requirements changed since the lock was built; re-resolving")
+        try:
+            build(wheelhouse, requirement_files, log=log)
+        except (OSError, RuntimeError, subprocess.TimeoutExpired) as e:
+            # Offline or unresolvable: the old lock still beats an online install
+            log(f"⚠️  Re-resolve failed ({e}); keeping the existing lock")
+    if os.path.exists(lock):
+        mismatched = check(wheelhouse)
+        if not mismatched:
+            log("✅ Environment already matches the wheelhouse lock")
+            return True
+        log(f"📦 {len(mismatched)} packages differ from the lock; installing offline")
+        if install(wheelhouse, log):
+            return True
+        log("🔁 Rebuilding the wheelhouse")
+    build(wheelhouse, requirement_files, log=log)
+    return install(wheelhouse, log)
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Offline wheel cache for first-run setup")
+    parser.add_argument("command", choices=["build", "install", "check", "sync"])
+    parser.add_argument("--dir", default=WHEELHOUSE_DIR, help="Wheelhouse directory")
+    parser.add_argument("-r", "--requirements", action="append",
+                        default=[COMFYUI_REQUIREMENTS], help="Extra requirements file(s)")
+    parser.add_argument("--quiet", action="store_true", help="check: only set the exit code")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == "check":
+            if not os.path.exists(lock_path(args.dir)):
+                if not args.quiet:
+                    print(f"⚠️  No lock at {lock_path(args.dir)}")
+                return 2
+            mismatched = check(args.dir)
+            if not args.quiet:
+                for name, wanted, have in mismatched:
+                    print(f"❌ {name}: lock {wanted}, installed {have or 'missing'}")
+                print("✅ Environment matches the lock" if not mismatched
+                      else f"{len(mismatched)} packages differ from the lock")
+            return 1 if mismatched else 0
+        if args.command == "build":
+            build(args.dir, args.requirements)
+            return 0
+        if args.command == "install":
+            return 0 if install(args.dir) else 1
+        return 0 if sync(args.dir, args.requirements) else 1
+    except (OSError, RuntimeError, subprocess.TimeoutExpired) as e:
+        print(f"❌ {e}")
+        return 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
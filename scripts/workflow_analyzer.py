@@ -0,0 +1,412 @@
+#!/usr/bin/env python3
+"""
+Workflow requirements analyzer
+Streams a ComfyUI workflow (UI export or API prompt format) node by node,
+collects every node type and model filename it references, and diffs them
+against the installed custom nodes and the model inventory. The result is a
+minimal plan: the node packs to clone and a manifest of just the models the
+workflow needs, which can be run in parallel with --apply.
+"""
+
+import json
+import os
+import threading
+import time
+
+from model_downloader import MODEL_DIRS, download_scheduler, get_inventory
+from model_manifest import DEFAULT_MANIFEST, ManifestError, load_manifest, queue_manifest, \
+    wait_for_manifest, format_report
+from node_registry import COMFYUI_DIR, NodeRegistry, hydrate, needed_packs, plan_packs
+from safetensors_info import guess_category_from_name
+
+CHUNK_SIZE = 64 * 1024
+
+MODEL_EXTENSIONS = (".safetensors", ".sft", ".ckpt", ".pt", ".pt2", ".pth", ".bin", ".gguf", ".onnx")
+
+# Loader node type -> MODEL_DIRS category of its model widgets
+LOADER_CATEGORIES = {
+    "CheckpointLoaderSimple": "Checkpoints",
+    "CheckpointLoader": "Checkpoints",
+    "ImageOnlyCheckpointLoader": "Checkpoints",
+    "UNETLoader": "Diffusion Models",
+    "UnetLoaderGGUF": "Diffusion Models",
+    "WanVideoModelLoader": "Diffusion Models",
+    "LoraLoader": "LoRAs",
+    "LoraLoaderModelOnly": "LoRAs",
+    "WanVideoLoraSelect": "LoRAs",
+    "VAELoader": "VAE",
+    "WanVideoVAELoader": "VAE",
+    "ControlNetLoader": "ControlNet",
+    "DiffControlNetLoader": "ControlNet",
+    "CLIPLoader": "CLIP",
+    "DualCLIPLoader": "CLIP",
+    "TripleCLIPLoader": "CLIP",
+    "LoadWanVideoT5TextEncoder": "CLIP",
+    "CLIPVisionLoader": "CLIP Vision",
+    "IPAdapterModelLoader": "IP-Adapter",
+    "UpscaleModelLoader": "Upscale Models",
+}
+
+# API-format input name -> category, for loaders not listed above
+INPUT_CATEGORIES = {
+    "ckpt_name": "Checkpoints",
+    "unet_name": "Diffusion Models",
+    "lora_name": "LoRAs",
+    "vae_name": "VAE",
+    "control_net_name": "ControlNet",
+    "clip_name": "CLIP",
+    "clip_name1": "CLIP",
+    "clip_name2": "CLIP",
+    "clip_name3": "CLIP",
+    "ipadapter_file": "IP-Adapter",
+}
+
+# ComfyUI model folder names (as used in embedded "models" entries) -> category
+FOLDER_CATEGORIES = dict({os.path.basename(path): category for category, path in MODEL_DIRS.items()},
+                         text_encoders="CLIP", unet="Diffusion Models")
+
+
+class JSONStream:
+    """
+    Incremental JSON reader over a file object.
+
+    Containers are walked with items()/elements() and individual values are
+    decoded with value(), so only the value being decoded (one node, not the
+    whole workflow) is ever held in memory.
+    """
+
+    def __init__(self, f, chunk_size=CHUNK_SIZE):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _more(self):
+        # Read at least as much as is buffered so a huge value needs O(log n) refills
+        data = self.f.read(max(self.chunk_size, len(self.buf) - self.pos))
+        if not data:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + data
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """Next non-whitespace character ('' at end of input)"""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in " \t\r\n":
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._more():
+                return ""
+
+    def expect(self, char):
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Expected {char!r} but found {found or 'end of input'!r}")
+        self.pos += 1
+
+    def value(self):
+        """Decode the next complete value"""
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+                # A number or literal ending exactly at the buffer edge may continue in the next chunk
+                if end < len(self.buf) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self._more()
+
+    def items(self):
+        """Yield the keys of an object; the caller must consume each value before continuing"""
+        self.expect("{")
+        if self.peek() == "}":
+            self.pos += 1
+            return
+        while True:
+            key = self.value()
+            self.expect(":")
+            yield key
+            if self.peek() == ",":
+                self.pos += 1
+                continue
+            self.expect("}")
+            return
+
+    def elements(self):
+        """Yield the decoded elements of an array one at a time"""
+        self.expect("[")
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        while True:
+            yield self.value()
+            if self.peek() == ",":
+                self.pos += 1
+                continue
+            self.expect("]")
+            return
+
+    def skip(self):
+        """Discard the next value without materialising large arrays"""
+        if self.peek() == "[":
+            for _ in self.elements():
+                pass
+        else:
+            self.value()
+
+
+def _model_category(node_type, input_name, filename, directory=None):
+    return (LOADER_CATEGORIES.get(node_type) or INPUT_CATEGORIES.get(input_name)
+            or FOLDER_CATEGORIES.get(directory or "") or guess_category_from_name(filename))
+
+
+def _is_model(value):
+    return isinstance(value, str) and value.lower().endswith(MODEL_EXTENSIONS)
+
+
+class WorkflowScan:
+    """What one workflow references: node types (with their pack hints) and model files"""
+
+    def __init__(self):
+        self.format = None
+        self.nodes = 0
+        self.types = {}  # type -> pack hint (cnr_id / aux_id) or None
+        self.models = {}  # filename -> {filename, category, url, node_types}
+        self.subgraphs = set()
+
+    def add_type(self, node_type, pack=None):
+        if node_type and (pack or node_type not in self.types):
+            self.types[node_type] = pack or self.types.get(node_type)
+
+    def add_model(self, filename, category, node_type, url=None):
+        model = self.models.setdefault(filename, {"filename": filename, "category": category,
+                                                  "url": None, "node_types": []})
+        if url:
+            model["url"] = url
+        if node_type and node_type not in model["node_types"]:
+            model["node_types"].append(node_type)
+
+    def add_ui_node(self, node):
+        self.nodes += 1
+        node_type = node.get("type")
+        properties = node.get("properties") or {}
+        self.add_type(node_type, properties.get("cnr_id") or properties.get("aux_id"))
+        widgets = node.get("widgets_values")
+        values = widgets.items() if isinstance(widgets, dict) else enumerate(widgets or [])
+        for key, value in values:
+            if _is_model(value):
+                self.add_model(value, _model_category(node_type, key, value), node_type)
+        # Newer exports embed download links for the models a node uses
+        for model in properties.get("models") or []:
+            if model.get("name"):
+                category = _model_category(node_type, None, model["name"], model.get("directory"))
+                self.add_model(model["name"], category, node_type, model.get("url"))
+
+    def add_api_node(self, node):
+        self.nodes += 1
+        node_type = node.get("class_type")
+        self.add_type(node_type)
+        for key, value in (node.get("inputs") or {}).items():
+            if _is_model(value):
+                self.add_model(value, _model_category(node_type, key, value), node_type)
+
+
+def scan_workflow(path):
+    """Stream a workflow file and collect its node types and model references"""
+    scan = WorkflowScan()
+    with open(path, encoding="utf-8") as f:
+        stream = JSONStream(f)
+        for key in stream.items():
+            if key == "nodes" and stream.peek() == "[":
+                scan.format = "ui"
+                for node in stream.elements():
+                    scan.add_ui_node(node)
+            elif key == "definitions" and stream.peek() == "{":
+                # Subgraph definitions: their nodes count, their ids are not real node types
+                for subkey in stream.items():
+                    if subkey != "subgraphs" or stream.peek() != "[":
+                        stream.skip()
+                        continue
+                    for subgraph in stream.elements():
+                        scan.subgraphs.add(subgraph.get("id"))
+                        for node in subgraph.get("nodes") or []:
+                            scan.add_ui_node(node)
+            elif key == "prompt" and stream.peek() == "{":
+                # /prompt request body: {"prompt": {id: node, ...}}
+                scan.format = "api"
+                for _ in stream.items():
+                    node = stream.value()
+                    if isinstance(node, dict):
+                        scan.add_api_node(node)
+            elif stream.peek() == "{" and scan.format != "ui":
+                node = stream.value()
+                if isinstance(node, dict) and "class_type" in node:
+                    scan.format = "api"
+                    scan.add_api_node(node)
+            else:
+                stream.skip()
+    if scan.format is None:
+        raise ValueError(f"{path} is neither a ComfyUI UI workflow nor an API prompt")
+    return scan
+
+
+def _manifest_index(manifest_paths):
+    """{filename: manifest entry} from the given manifests (missing files are ignored)"""
+    index = {}
+    for path in manifest_paths:
+        try:
+            for entry in load_manifest(path, MODEL_DIRS):
+                index.setdefault(entry["filename"], entry)
+        except (OSError, ManifestError):
+            continue
+    return index
+
+
+def plan(scan, inventory=None, manifest_paths=(DEFAULT_MANIFEST,), comfyui_dir=COMFYUI_DIR, registry=None):
+    """
+    Diff a scan against what is installed.
+
+    Returns {"packs": [{name, url, types, disabled}], "unresolved_types": [...],
+    "models": {"present": [...], "missing": [...], "no_url": [...]},
+    "manifest": {"models": [...]}}; the manifest holds only missing models with a known URL.
+    """
+    inventory = inventory or get_inventory()
+    custom_nodes_dir = os.path.join(comfyui_dir, "custom_nodes")
+    registry = registry or NodeRegistry(custom_nodes_dir)
+    packs_for_type, unresolved = registry.resolve(scan.types, scan.subgraphs, comfyui_dir)
+    packs, unknown = plan_packs(needed_packs(scan.types, packs_for_type, custom_nodes_dir), custom_nodes_dir)
+
+    known_urls = _manifest_index(manifest_paths)
+    present, missing, no_url = [], [], []
+    for model in scan.models.values():
+        rows = inventory.find(model["filename"])
+        if rows:
+            in_place = [row for row in rows if row["category"] == model["category"]]
+            present.append(dict(model, path=(in_place or rows)[0]["path"], misplaced=not in_place))
+            continue
+        entry = known_urls.get(os.path.basename(model["filename"]))
+        url = model["url"] or (entry or {}).get("url")
+        if not url:
+            no_url.append(model)
+            continue
+        # Subfolder-relative widget values (e.g. "wan/x.safetensors") keep their subfolder
+        missing.append(dict(model, url=url, sha256=(entry or {}).get("sha256")))
+
+    manifest = {"models": [
+        {"url": model["url"], "category": model["category"], "filename": model["filename"],
+         **({"sha256": model["sha256"]} if model["sha256"] else {})}
+        for model in missing
+    ]}
+    return {
+        "format": scan.format,
+        "nodes": scan.nodes,
+        "node_types": len(scan.types),
+        "packs": packs,
+        "unresolved_types": sorted(unresolved + unknown),
+        "models": {"present": present, "missing": missing, "no_url": no_url},
+        "manifest": manifest,
+    }
+
+
+def format_plan(result, path=""):
+    lines = []
+    lines.append("=" * 60)
+    lines.append(f"WORKFLOW REQUIREMENTS{': ' + os.path.basename(path) if path else ''}")
+    lines.append("=" * 60)
+    lines.append(f"{result['nodes']} nodes, {result['node_types']} node types ({result['format']} format)")
+    lines.append("")
+    if result["packs"]:
+        lines.append(f"🧩 Node packs to install ({len(result['packs'])}):")
+        for pack in result["packs"]:
+            lines.append(f"   {pack['name']:<30} for {', '.join(pack['types'][:4])}"
+                         + (f" +{len(pack['types']) - 4}" if len(pack["types"]) > 4 else "")
+                         + (" (disabled, will be enabled)" if pack.get("disabled") else ""))
+    else:
+        lines.append("✅ All node packs installed")
+    for node_type in result["unresolved_types"]:
+        lines.append(f"❓ No known pack provides node type {node_type}")
+    lines.append("")
+    models = result["models"]
+    for model in models["present"]:
+        note = f" ⚠️  found in {model['path']}, expected {model['category']}" if model["misplaced"] else ""
+        lines.append(f"✅ {model['filename']}{note}")
+    for model in models["missing"]:
+        lines.append(f"⬇️  {model['filename']} → {model['category']}")
+    for model in models["no_url"]:
+        lines.append(f"❓ {model['filename']} → {model['category']} (no download URL known; "
+                     f"used by {', '.join(model['node_types'])})")
+    lines.append("")
+    lines.append(f"Plan: install {len(result['packs'])} packs, download {len(models['missing'])} models"
+                 + (f", {len(models['no_url'])} models need a URL" if models["no_url"] else ""))
+    lines.append("=" * 60)
+    return "\n".join(lines)
+
+
+def apply_plan(result, log=print):
+    """Enable or clone the missing packs and download the missing models at the same time"""
+    started = time.time()
+    node_summary = {}
+
+    def run_nodes():
+        node_summary.update(hydrate(result["packs"], log=log))
+
+    nodes_thread = None
+    if result["packs"]:
+        nodes_thread = threading.Thread(target=run_nodes, name="workflow-nodes")
+        nodes_thread.start()
+
+    entries = [dict(model, size=None, optional=False, headers={}) for model in result["models"]["missing"]]
+    jobs, skipped = queue_manifest(entries, download_scheduler, MODEL_DIRS)
+    summary = wait_for_manifest(jobs, skipped, started)
+    if jobs or skipped:
+        log(format_report(summary))
+    if nodes_thread:
+        nodes_thread.join()
+        log(f"🧩 Packs: {len(node_summary['enabled'])} enabled, {len(node_summary['installed'])} installed, "
+            f"{len(node_summary['failed'])} failed")
+    log(f"⏱️  Workflow requirements applied in {time.time() - started:.1f}s")
+    return not summary["failed"] and not node_summary.get("failed")
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Find the nodes and models a ComfyUI workflow needs")
+    parser.add_argument("workflow", help="Workflow JSON (UI export or API prompt)")
+    parser.add_argument("--manifest", action="append", default=[DEFAULT_MANIFEST],
+                        help="Manifest(s) to look up download URLs in")
+    parser.add_argument("--write-manifest", metavar="PATH",
+                        help="Write the missing models as a manifest (for model_downloader.py fetch)")
+    parser.add_argument("--apply", action="store_true", help="Install packs and download models now")
+    parser.add_argument("--json", action="store_true", help="Print the plan as JSON")
+    args = parser.parse_args(argv)
+
+    try:
+        scan = scan_workflow(args.workflow)
+    except (OSError, ValueError) as e:
+        print(f"❌ {e}")
+        return 2
+    result = plan(scan, get_inventory(), args.manifest)
+
+    print(json.dumps(result, indent=1) if args.json else format_plan(result, args.workflow))
+    if args.write_manifest:
+        tmp_path = args.write_manifest + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(result["manifest"], f, indent=2)
+        os.replace(tmp_path, args.write_manifest)
+        print(f"📋 Manifest written: {args.write_manifest}")
+    if args.apply:
+        return 0 if apply_plan(result) else 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())